@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# asyncio API For The Device Information Obtainer
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is the part of the package that lets asyncio programs collect disk
+information without blocking their event loop.
+
+For example:
+
+>>> import getdevinfo.aio as aio
+>>> disk_info = await aio.get_info_async()
+
+On Linux, the commands are run with asyncio's subprocess support, and the
+stages that process their output (which read small amounts from devices
+and sysfs) are run in a small thread pool, in the same order as
+linux.get_info() runs them. On macOS and Cygwin, the platform's get_info()
+is run in a thread. Either way, the result is the same dictionary that
+getdevinfo.get_info() returns, and the same cache is used.
+
+.. note::
+        get_info_async() shares scans with getdevinfo.get_info(), and like
+        it, only runs one scan at a time.
+
+.. module: aio.py
+    :platform: Linux, macOS, Cygwin
+    :synopsis: asyncio API for GetDevInfo.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <support@hamishmb.com>
+
+"""
+
+import os
+import time
+import asyncio
+import functools
+import concurrent.futures
+import subprocess
+import threading
+import weakref
+
+from . import errors
+from . import getdevinfo
+from . import linux
+from . import projection
+from . import report
+from .collector import Collector
+
+#How many commands and stages can run at once by default.
+DEFAULT_LIMIT = 4
+
+#The lock get_linux_info_async() holds for each event loop (see get_lock()).
+LOCKS = weakref.WeakKeyDictionary()
+LOCKS_LOCK = threading.Lock()
+
+async def get_info_async(name_main=False, use_cache=True, use_snapshot=False, fields=None,
+                         limit=DEFAULT_LIMIT, timings=False, lazy=False):
+    """
+    This function is the asyncio version of getdevinfo.get_info(). It
+    returns the same disk information dictionary.
+
+    Like getdevinfo.get_info(), it shares a scan that is already running
+    (in this or any other thread) for the same fields, and only one scan
+    runs at a time. Waiting for one is done in a thread, so the event
+    loop isn't blocked. A scan this starts runs in the event loop, so
+    getdevinfo.get_info() callers that share it get its results too.
+    Saving the results (eg the snapshot) is done in a thread as well.
+
+    If it is cancelled, any commands the scan started are killed, and
+    anyone sharing the scan gets asyncio.CancelledError too. Stages that
+    are already running in the thread pool can't be interrupted, and
+    finish in the background.
+
+    Kwargs:
+        name_main (bool):       See getdevinfo.get_info().
+        use_cache (bool):       See getdevinfo.get_info().
+        use_snapshot (bool):    See getdevinfo.get_info().
+        fields (iterable):      See getdevinfo.get_info().
+        limit (int):            How many commands and stages can run at
+                                once. Default = DEFAULT_LIMIT.
+
+        timings (bool):         See getdevinfo.get_info().
+        lazy (bool):            See getdevinfo.get_info().
+
+    Returns:
+        dict, the disk info dictionary (or a tuple of the dictionary and
+        errors, if name_main is True). If timings is True, a tuple with
+        the report added at the end.
+
+    Raises:
+        The same as getdevinfo.get_info(), and asyncio.CancelledError.
+
+    Usage:
+
+    >>> disk_info = await get_info_async()
+
+    OR:
+
+    >>> disk_info = await get_info_async(limit=<anInt>)
+
+    OR:
+
+    >>> disk_info = await get_info_async(lazy=True)
+    """
+
+    fields = projection.normalise(fields)
+    cached, fingerprint = getdevinfo.get_cached_result(use_cache, use_snapshot)
+
+    if cached is not None:
+        return getdevinfo.add_report(getdevinfo.format_result(cached, name_main, fields),
+                                     report.ScanReport(cached=True).finish(), timings)
+
+    loop = get_running_loop()
+
+    #The scan, once it has been started in the event loop, and whether we were cancelled.
+    started = []
+    cancelled = threading.Event()
+    lock = threading.Lock()
+
+    async def scan_async():
+        scanner = Collector()
+
+        if scanner.module is linux:
+            await get_linux_info_async(fields=fields, lazy=lazy, limit=limit, collector=scanner)
+
+        else:
+            await loop.run_in_executor(None, functools.partial(scanner.get_info, fields=fields,
+                                                               lazy=lazy))
+
+        #This writes files, so don't block the loop with it.
+        result = await loop.run_in_executor(None, functools.partial(getdevinfo.finish_scan,
+                                                                    scanner, fingerprint,
+                                                                    name_main, use_snapshot,
+                                                                    fields, raw=True))
+
+        return result, scanner.report
+
+    def scan():
+        #This runs in the executor, while we hold the flight, so the scan is run in the loop.
+        with lock:
+            if cancelled.is_set():
+                raise asyncio.CancelledError()
+
+            future = asyncio.run_coroutine_threadsafe(scan_async(), loop)
+            started.append(future)
+
+        return future.result()
+
+    #A scan that had already started when we were called is too old.
+    max_age = None if use_cache else 0
+
+    try:
+        result, scan_report = await loop.run_in_executor(None, getdevinfo.FLIGHTS.run,
+                                                         (fields, lazy, use_snapshot), scan,
+                                                         max_age)
+
+    except asyncio.CancelledError:
+        #Kill the commands, if the scan has started, or make sure it doesn't.
+        with lock:
+            cancelled.set()
+
+            for future in started:
+                future.cancel()
+
+        raise
+
+    return getdevinfo.add_report(getdevinfo.format_result(result, name_main), scan_report,
+                                 timings)
+
+async def get_linux_info_async(backend="lshw", fields=None, limit=DEFAULT_LIMIT, collector=None,
+                               lazy=False):
+    """
+    This function is the asyncio version of linux.get_info(). Like that
+    function, it leaves the results in linux.DISKINFO, unless another
+    collector.Collector is given. The collector's report is replaced with
+    one for this scan. Only one of these scans runs at a time in each
+    event loop.
+
+    Kwargs:
+        backend (str):          See linux.get_info(). Default = "lshw".
+        fields (iterable):      See linux.get_info(). Default = None.
+        limit (int):            See get_info_async(). Default = DEFAULT_LIMIT.
+        collector (Collector):  Where to keep the state of the scan.
+                                Default = None (linux.COLLECTOR).
+
+        lazy (bool):            See linux.get_info(). Default = False.
+
+    Raises:
+        RuntimeError, if no disks were found.
+
+        ValueError, if the backend or any of the fields aren't known.
+
+    Usage:
+
+    >>> await get_linux_info_async()
+
+    OR:
+
+    >>> await get_linux_info_async(backend=<aBackend>, fields=<someFields>, limit=<anInt>)
+    """
+
+    if backend not in ("lshw", "sysfs"):
+        raise ValueError("Unknown backend: "+str(backend))
+
+    env = os.environ.copy()
+    env["LC_ALL"] = "C"
+
+    if collector is None:
+        collector = linux.COLLECTOR
+
+    async with get_lock():
+        collector.reset(projection.normalise(fields), lazy)
+        collector.backend = backend
+        collector.report = report.ScanReport()
+
+        try:
+            commands, stages = linux.get_commands_and_stages(backend, collector.fields,
+                                                             collector.lazy)
+            collector.stages = frozenset(stages)
+            await run_stages_async(collector, commands, stages, env=env, limit=limit)
+
+            #See linux.collect_info().
+            linux.device_ready(collector, *collector.diskinfo)
+            projection.project(collector.diskinfo, collector.fields)
+
+            #Check we found some disks.
+            if not collector.diskinfo:
+                collector.errors.append("aio.get_linux_info_async(): No disks found!\n")
+                raise RuntimeError("No disks found!")
+
+        finally:
+            collector.report.finish()
+
+            if collector is linux.COLLECTOR:
+                linux.DISKINFO = collector.diskinfo
+                linux.ERRORS = collector.errors
+
+def get_running_loop():
+    """
+    Private, implementation detail.
+
+    This function returns the event loop running the current coroutine.
+    asyncio.get_running_loop() is only in Python 3.7 and later. Before
+    that, get_event_loop() does the same thing in a coroutine.
+    """
+
+    if hasattr(asyncio, "get_running_loop"):
+        return asyncio.get_running_loop()
+
+    return asyncio.get_event_loop()
+
+def get_lock():
+    """
+    Private, implementation detail.
+
+    This function returns the lock that get_linux_info_async() holds while
+    it scans, so only one of its scans runs at a time in each event loop.
+    Each event loop has its own lock, as they can't be shared between loops.
+    """
+
+    loop = get_running_loop()
+
+    with LOCKS_LOCK:
+        lock = LOCKS.get(loop)
+
+        if lock is None:
+            lock = LOCKS[loop] = asyncio.Lock()
+
+        return lock
+
+async def run_command_async(collector, command, semaphore, env=None):
+    """
+    Private, implementation detail.
+
+    This function is the asyncio version of linux.run_command(). If it is
+    cancelled, the command is killed.
+
+    Args:
+        collector (Collector):          The state of the scan.
+        command (list):                 The command to run, and its arguments.
+        semaphore (asyncio.Semaphore):  Held while the command runs.
+
+    Kwargs:
+        env (dict):                     The environment to run the command in.
+                                        Default = None (use ours).
+
+    Returns:
+        string/None. The output, or None if the command failed.
+    """
+
+    scan_report = collector.report
+
+    async with semaphore:
+        start = time.perf_counter()
+
+        try:
+            process = await asyncio.create_subprocess_exec(*command, stdout=subprocess.PIPE,
+                                                           stderr=subprocess.STDOUT, env=env)
+
+        except OSError as err:
+            collector.errors.append(errors.ErrorRecord("aio.run_command_async(): Exception: "
+                                                       + str(err)+" while running "
+                                                       + ' '.join(command)+"\n",
+                                                       command=command))
+
+            if report.recording(scan_report):
+                scan_report.add_command(command, time.perf_counter() - start, None)
+
+            return None
+
+        try:
+            stdout = (await process.communicate())[0]
+
+        except asyncio.CancelledError:
+            try:
+                process.kill()
+
+            except ProcessLookupError:
+                pass
+
+            await process.wait()
+            raise
+
+        finally:
+            if report.recording(scan_report):
+                scan_report.add_command(command, time.perf_counter() - start, process.returncode)
+
+    if process.returncode != 0:
+        err = subprocess.CalledProcessError(process.returncode, command)
+        collector.errors.append(errors.ErrorRecord("aio.run_command_async(): Exception: "+str(err)
+                                                   + " while running "+' '.join(command)+"\n",
+                                                   command=command, exit_code=process.returncode))
+        return None
+
+    return stdout.decode("utf-8", errors="replace")
+
+async def run_stages_async(collector, commands, stages, env=None, limit=DEFAULT_LIMIT):
+    """
+    Private, implementation detail.
+
+    This function is the asyncio version of linux.run_stages(), and works
+    the same way, except that at most limit commands and stages run at once.
+
+    Args:
+        collector (Collector):  The state of the scan.
+        commands (dict):        See linux.run_stages().
+        stages (dict):          See linux.run_stages().
+
+    Kwargs:
+        env (dict):             The environment to run the commands in.
+                                Default = None (use ours).
+
+        limit (int):            How many commands and stages can run at once.
+                                Default = DEFAULT_LIMIT.
+    """
+
+    loop = get_running_loop()
+    semaphore = asyncio.Semaphore(limit)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=limit)
+
+    outputs = {}
+    finished = set()
+    waiting = dict(stages)
+    running = {}
+
+    async def run_stage(name, function):
+        async with semaphore:
+            return await loop.run_in_executor(executor, linux.run_stage, collector, name,
+                                              function, outputs)
+
+    try:
+        for name, command in commands.items():
+            running[asyncio.ensure_future(run_command_async(collector, command, semaphore,
+                                                            env))] = name
+
+        while running or waiting:
+            #Start any stages that now have everything they need.
+            for name, (function, dependencies) in list(waiting.items()):
+                if finished.issuperset(dependencies):
+                    running[asyncio.ensure_future(run_stage(name, function))] = name
+                    del waiting[name]
+
+            if not running:
+                #Nothing left can ever finish, so these can never run.
+                collector.errors.append("aio.run_stages_async(): Stages with missing "
+                                        + "dependencies: "+', '.join(sorted(waiting))+"\n")
+                break
+
+            done = (await asyncio.wait(list(running), return_when=asyncio.FIRST_COMPLETED))[0]
+
+            for task in done:
+                name = running.pop(task)
+
+                try:
+                    result = task.result()
+
+                except Exception as err:
+                    collector.errors.append(errors.ErrorRecord("aio.run_stages_async(): "
+                                                               + "Unhandled exception: "+str(err)
+                                                               + " in stage "+name+"\n",
+                                                               stage=name))
+
+                else:
+                    if name in commands:
+                        outputs[name] = result
+
+                finished.add(name)
+
+    finally:
+        #If we were cancelled, make sure the commands are killed before returning.
+        for task in running:
+            task.cancel()
+
+        if running:
+            await asyncio.wait(list(running))
+
+        executor.shutdown(wait=False)
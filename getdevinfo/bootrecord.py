@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Boot Record Reader For The Device Information Obtainer
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is the part of the package that reads boot records (MBRs/PBRs)
+from devices, and finds the readable strings in them. It is used by the
+Linux and Cygwin modules, and does the same job as running dd and strings
+for each device, but without starting any processes.
+
+.. module: bootrecord.py
+    :platform: Linux, Cygwin
+    :synopsis: In-process boot record reader for GetDevInfo.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <support@hamishmb.com>
+
+"""
+
+import os
+import re
+
+from . import report
+
+#The size of a boot record, in bytes.
+BOOT_RECORD_SIZE = 512
+
+#Runs of 4 or more printable ASCII characters (or tabs), as found by strings(1).
+STRINGS_PATTERN = re.compile(rb"[\t\x20-\x7e]{4,}")
+
+class BootRecordReader:
+    """
+    Reads boot records from devices using a single reusable buffer.
+
+    .. note::
+        Each reader has its own buffer, so don't share one between threads.
+
+    Usage:
+
+    >>> reader = BootRecordReader()
+    >>> boot_record = reader.read(<aDiskName>)
+    """
+
+    def __init__(self, size=BOOT_RECORD_SIZE):
+        self.size = size
+        self.buffer = bytearray(size)
+
+    def read(self, disk):
+        """
+        Reads the boot record of the given device or partition.
+
+        Args:
+            disk (str):     The name of a partition/device.
+
+        Returns:
+            bytes. The boot record. This is shorter than the requested size
+            if the device is smaller than that.
+
+        Raises:
+            OSError, if the device couldn't be opened or read.
+
+        Usage:
+
+        >>> boot_record = reader.read(<aDiskName>)
+        """
+
+        fd = os.open(disk, os.O_RDONLY)
+
+        try:
+            if hasattr(os, "preadv"):
+                count = os.preadv(fd, [self.buffer], 0)
+
+            else:
+                data = os.pread(fd, self.size, 0)
+                count = len(data)
+                self.buffer[:count] = data
+
+        finally:
+            os.close(fd)
+
+        return bytes(self.buffer[:count])
+
+def read_boot_records(disks, scan_report=None):
+    """
+    This function reads the boot records of a batch of devices, reusing
+    the same buffer for all of them.
+
+    Devices that couldn't be read are left out of the results. Call
+    BootRecordReader().read() for one of those to find out why.
+
+    Args:
+        disks (iterable):   The names of partitions/devices.
+
+    Kwargs:
+        scan_report (ScanReport):   The report to record the time spent
+                                    reading each device in (see report.py).
+                                    Default = None (don't record it).
+
+    Returns:
+        dict. The boot record of each device that could be read, keyed by
+        device name.
+
+    Usage:
+
+    >>> boot_records = read_boot_records(<aListOfDiskNames>)
+    """
+
+    reader = BootRecordReader()
+    boot_records = {}
+
+    for disk in disks:
+        try:
+            with report.device(scan_report, disk):
+                boot_records[disk] = reader.read(disk)
+
+        except OSError:
+            continue
+
+    return boot_records
+
+def get_strings(boot_record):
+    """
+    This function finds the readable strings in a boot record, in the
+    same form we used to get from running strings on it.
+
+    Args:
+        boot_record (bytes):    The boot record.
+
+    Returns:
+        list. The readable strings, with any spaces removed. As with
+        strings' output, this always ends with an empty string.
+
+    Usage:
+
+    >>> boot_record_strings = get_strings(<aBootRecord>)
+    """
+
+    boot_record_strings = []
+
+    for match in STRINGS_PATTERN.finditer(boot_record):
+        boot_record_strings.append(match.group().decode("ascii").replace(" ", ""))
+
+    boot_record_strings.append("")
+
+    return boot_record_strings
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Result Cache For The Device Information Obtainer
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is the part of the package that lets getdevinfo.get_info() return
+the results of a recent scan, instead of running all the tools again,
+and lets callers that ask at the same time share one scan (see
+SingleFlight).
+
+A cached result is used if it is younger than the cache's TTL, and a
+cheap fingerprint of the system's block devices hasn't changed since it
+was stored. The fingerprint is made from /proc/partitions (which has the
+device number and size of every device and partition) and the names in
+/sys/block, so adding, removing, or resizing a device or partition makes
+the cache miss straight away.
+
+.. note::
+    Changes that don't affect any of those (eg a partition being
+    reformatted) aren't noticed until the TTL runs out. Call invalidate()
+    after making changes like that.
+
+.. module: cache.py
+    :platform: Linux, macOS, Cygwin
+    :synopsis: In-process result cache for GetDevInfo.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <support@hamishmb.com>
+
+"""
+
+import os
+import copy
+import hashlib
+import threading
+import time
+
+#How long results are kept, in seconds, by default.
+DEFAULT_TTL = 5
+
+#The files the fingerprint is made from.
+PROC_PARTITIONS = "/proc/partitions"
+SYSFS_BLOCK = "/sys/block"
+
+def get_fingerprint(proc_partitions=None, sysfs_block=None):
+    """
+    This function makes a fingerprint of the system's block devices, which
+    changes when devices or partitions are added, removed, or resized.
+
+    Kwargs:
+        proc_partitions (str):  Where to read the partitions list from.
+                                Default = PROC_PARTITIONS.
+
+        sysfs_block (str):      Where to find block devices in sysfs.
+                                Default = SYSFS_BLOCK.
+
+    Returns:
+        string/None. The fingerprint, or None if there's nothing to make
+        one from on this platform (eg macOS).
+
+    Usage:
+
+    >>> fingerprint = get_fingerprint()
+    """
+
+    if proc_partitions is None:
+        proc_partitions = PROC_PARTITIONS
+
+    if sysfs_block is None:
+        sysfs_block = SYSFS_BLOCK
+
+    fingerprint = hashlib.sha1()
+    partitions = read_file(proc_partitions)
+
+    if partitions is not None:
+        fingerprint.update(partitions)
+
+    try:
+        names = sorted(os.listdir(sysfs_block))
+
+    except OSError:
+        names = []
+
+    if partitions is None and not names:
+        return None
+
+    for name in names:
+        fingerprint.update(name.encode("utf-8", errors="replace")+b"\x00")
+
+        #Only needed if /proc/partitions is missing, as it has all of these.
+        if partitions is None:
+            for attribute in ("size", "dev"):
+                fingerprint.update((read_file(os.path.join(sysfs_block, name, attribute))
+                                    or b"")+b"\x00")
+
+    return fingerprint.hexdigest()
+
+def read_file(path):
+    """
+    Private, implementation detail.
+
+    Reads a small file (like those in /proc and sysfs) without any
+    buffering, returning None if it couldn't be read.
+    """
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+
+    except OSError:
+        return None
+
+    try:
+        chunks = []
+
+        while True:
+            chunk = os.read(fd, 65536)
+
+            if not chunk:
+                return b"".join(chunks)
+
+            chunks.append(chunk)
+
+    except OSError:
+        return None
+
+    finally:
+        os.close(fd)
+
+class ResultCache:
+    """
+    Holds the result of the last scan, and decides whether it is still
+    fresh enough to use. It is safe to share between threads.
+
+    .. note::
+        The cached result is shared with everyone who gets it, so don't
+        modify it.
+
+    Kwargs:
+        ttl (float):            How long results are kept, in seconds.
+                                None means forever (as long as the
+                                fingerprint matches), and 0 turns the
+                                cache off. Default = DEFAULT_TTL.
+
+        fingerprint (function): Called with no arguments to make the
+                                fingerprint. Default = get_fingerprint.
+
+    Usage:
+
+    >>> cache = ResultCache()
+    >>> result = cache.get()
+    >>> if result is None:
+    >>>     result = <scan>
+    >>>     cache.store(result)
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, fingerprint=get_fingerprint):
+        self.ttl = ttl
+        self.fingerprint = fingerprint
+        self.lock = threading.Lock()
+        self.result = None
+        self.result_fingerprint = None
+        self.stored_at = None
+
+    def get(self, max_age=None):
+        """
+        Returns the cached result if it is still fresh, or None if there
+        isn't one, or it has expired, or the fingerprint has changed.
+
+        Kwargs:
+            max_age (float):    Also return None if the result is older
+                                than this, in seconds (it is still kept
+                                for other callers). Default = None (only
+                                use the TTL).
+        """
+
+        with self.lock:
+            if self.result is None:
+                return None
+
+            age = time.monotonic() - self.stored_at
+
+            if self.ttl is not None and age >= self.ttl:
+                self.result = None
+                return None
+
+            if max_age is not None and age > max_age:
+                return None
+
+            if self.fingerprint() != self.result_fingerprint:
+                self.result = None
+                return None
+
+            return self.result
+
+    def store(self, result, fingerprint=None):
+        """
+        Stores a result.
+
+        Args:
+            result:         The result to store.
+
+        Kwargs:
+            fingerprint:    The fingerprint from before the scan started,
+                            so changes during the scan make the next get()
+                            miss. Default = the fingerprint now.
+        """
+
+        if fingerprint is None:
+            fingerprint = self.fingerprint()
+
+        with self.lock:
+            self.result = result
+            self.result_fingerprint = fingerprint
+            self.stored_at = time.monotonic()
+
+    def invalidate(self):
+        """Throws away the cached result, so the next get() misses."""
+        with self.lock:
+            self.result = None
+            self.result_fingerprint = None
+            self.stored_at = None
+
+class Flight:
+    """
+    Private, implementation detail.
+
+    A call made by SingleFlight, and its result, once it has one.
+    """
+
+    __slots__ = ("started", "done", "result", "error")
+
+    def __init__(self):
+        self.started = None
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Lets callers that ask for the same thing at the same time share one
+    call, instead of each making their own. Calls are made one at a time,
+    in the caller's thread, and everyone waiting for a call gets its
+    result (or its exception). It is safe to share between threads.
+
+    If the call raises an exception, the caller that made it gets that
+    exception, and each of the others gets a copy of it, raised from it,
+    so each thread's traceback is its own.
+
+    A caller that comes along while a call is being made shares it, unless
+    it started more than max_age seconds ago. It then waits for that call
+    to finish, and makes a new call, which any others that come along in
+    the meantime share.
+
+    Usage:
+
+    >>> flights = SingleFlight()
+    >>> result = flights.run(<aKey>, <aFunction>)
+
+    OR:
+
+    >>> result = flights.run(<aKey>, <aFunction>, max_age=<aNumberOfSeconds>)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.call_lock = threading.Lock()
+        self.flights = {}
+
+    def run(self, key, function, max_age=None):
+        """
+        Calls function (with no arguments), or waits for a call with the
+        same key that is already queued or running, and returns its result.
+
+        Args:
+            key:                Calls with equal keys are shared.
+            function:           What to call.
+
+        Kwargs:
+            max_age (float):    Don't share a call that started more than
+                                this many seconds ago. 0 means only share
+                                calls that haven't started yet.
+                                Default = None (share any call).
+
+        Returns:
+            What function returned.
+
+        Raises:
+            Whatever function raised.
+        """
+
+        with self.lock:
+            flight = self.flights.get(key)
+
+            if flight is not None and (flight.started is None or max_age is None
+                                       or time.monotonic() - flight.started <= max_age):
+                leader = False
+
+            else:
+                flight = Flight()
+                self.flights[key] = flight
+                leader = True
+
+        if leader:
+            self.call(key, flight, function)
+
+        flight.done.wait()
+
+        if flight.error is not None:
+            if leader:
+                raise flight.error
+
+            raise copy_error(flight.error) from flight.error
+
+        return flight.result
+
+    def call(self, key, flight, function):
+        """
+        Private, implementation detail.
+
+        Makes a call for run(), once any other call has finished.
+        """
+
+        with self.call_lock:
+            with self.lock:
+                flight.started = time.monotonic()
+
+            try:
+                flight.result = function()
+
+            except BaseException as err:
+                flight.error = err
+
+            finally:
+                with self.lock:
+                    if self.flights.get(key) is flight:
+                        del self.flights[key]
+
+                flight.done.set()
+
+def copy_error(error):
+    """
+    Private, implementation detail.
+
+    Returns a new exception like error (the same type, with the same
+    arguments), to raise in a thread that shared a call that raised error.
+    If error can't be copied, a RuntimeError is returned instead.
+    """
+
+    try:
+        copied = copy.copy(error)
+
+    except Exception: #pylint: disable=broad-except
+        copied = error
+
+    if copied is error or not isinstance(copied, BaseException):
+        return RuntimeError("A shared call failed: "+repr(error))
+
+    copied.__traceback__ = None
+    return copied
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Independent Scans For The Device Information Obtainer
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is the part of the package that holds the state of a scan, so that
+several scans can run at once, eg in different threads, or a scan of a
+few devices while a full scan is running.
+
+Everything a scan finds (eg the disk info dictionary and the errors) is
+kept on a Collector, and the platform modules (linux, macos, and cygwin)
+pass it to every function that needs it, so scans with different
+Collectors don't share anything:
+
+>>> collector = Collector()
+>>> disk_info = collector.get_info()
+>>> collector.errors
+
+The platform modules' own get_info() and get_devices() functions use a
+Collector of their own (eg linux.COLLECTOR), and leave its results in
+their DISKINFO and ERRORS globals, as before. getdevinfo.get_info() uses
+a new Collector for each scan.
+
+.. note::
+        Each Collector runs one scan at a time; use one Collector for each
+        scan that should run at the same time. Collectors can be reused.
+
+.. module: collector.py
+    :platform: Linux, macOS, Cygwin
+    :synopsis: Independent scans for GetDevInfo.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <support@hamishmb.com>
+
+"""
+
+import threading
+
+from . import errors
+from . import projection
+from . import report
+
+class Collector:
+    """
+    Collects disk information, and holds the state of the scan while it
+    runs, so it can run at the same time as scans with other Collectors.
+
+    Kwargs:
+        platform_module (module):   The platform module to use (linux,
+                                    macos, or cygwin). Default = None
+                                    (the one for this platform).
+
+    Attributes:
+        diskinfo (dict):            The disk info dictionary from the last
+                                    scan, or None before the first one.
+
+        errors (ErrorStore):        The errors from the last scan (see
+                                    errors.py).
+
+        report (ScanReport):        The report for the scan that is running,
+                                    or the last one, or None before the
+                                    first one. Each scan gets a new one,
+                                    which the platform module records in.
+
+        listener (function):        Called with the name and entry of each
+                                    device, partition, and logical volume
+                                    as soon as its entry is finished (see
+                                    getdevinfo.iter_info()). Default = None.
+
+    The other attributes are private, and are only used by the platform
+    module while a scan runs.
+
+    Usage:
+
+    >>> collector = Collector()
+    >>> disk_info = collector.get_info()
+
+    OR:
+
+    >>> disk_info = Collector().get_devices([<aDiskName>])
+    """
+
+    def __init__(self, platform_module=None):
+        if platform_module is None:
+            #Imported here, as getdevinfo imports the platform modules, which import this.
+            from . import getdevinfo
+            platform_module = getdevinfo.get_platform_module()
+
+        self.module = platform_module
+        self.lock = threading.Lock()
+        self.listener = None
+
+        #Held while entries are passed to the listener, as stages run in parallel.
+        self.ready_lock = threading.Lock()
+
+        #The report for the last scan.
+        self.report = None
+
+        self.reset()
+        self.diskinfo = None
+
+    def reset(self, fields=None, lazy=False):
+        """
+        Private, implementation detail.
+
+        Throws away everything from the last scan, ready for a new one.
+
+        Kwargs:
+            fields (frozenset): From projection.normalise(). Default = None.
+            lazy (bool):        See get_info(). Default = False.
+        """
+
+        self.diskinfo = {}
+        self.errors = errors.ErrorStore()
+
+        #The fields that were asked for (see projection.py), or None for all of them.
+        self.fields = fields
+
+        #Whether expensive fields are left until they're read (see lazy.py).
+        self.lazy = lazy
+
+        #What the platform module has read so far, eg boot records, keyed by device.
+        self.backend = None
+        self.disklinks = {}
+        self.bootrecords = {}
+        self.partitiontables = {}
+        self.blocksizes = {}
+        self.lsblk_output = None
+        self.plist = None
+
+        #The stages the scan runs, the devices that have been passed to the
+        #listener, and the stages the others are still waiting for.
+        self.stages = frozenset()
+        self.announced = set()
+        self.waiting = {}
+
+        #Partitions and volumes held back until their device has been passed on.
+        self.held = {}
+
+    def get_info(self, fields=None, lazy=False, **options):
+        """
+        Scans for disks, like getdevinfo.get_info(), but without using the
+        cache. The errors are left in errors, and the report in report.
+
+        Kwargs:
+            fields (iterable):  See getdevinfo.get_info(). Default = None.
+            lazy (bool):        See getdevinfo.get_info(). Default = False.
+
+            Anything else is passed to the platform module, eg backend
+            on Linux (see linux.get_info()).
+
+        Returns:
+            dict, the disk info dictionary.
+
+        Raises:
+            ValueError, if any of the fields don't exist.
+
+            RuntimeError, if no disks were found.
+
+        Usage:
+
+        >>> disk_info = collector.get_info()
+
+        OR:
+
+        >>> disk_info = collector.get_info(fields=<someFields>)
+
+        OR:
+
+        >>> disk_info = collector.get_info(backend="sysfs")
+        """
+
+        fields = projection.normalise(fields)
+
+        with self.lock:
+            self.report = report.ScanReport()
+
+            try:
+                self.module.collect_info(self, fields=fields, lazy=lazy, **options)
+
+            finally:
+                self.report.finish()
+
+            return self.diskinfo
+
+    def get_devices(self, disks, fields=None):
+        """
+        Gets the information for some devices, like getdevinfo.get_devices().
+        The errors are left in errors, and the report in report.
+
+        Args:
+            disks (list):       See getdevinfo.get_devices().
+
+        Kwargs:
+            fields (iterable):  See getdevinfo.get_info(). Default = None.
+
+        Returns:
+            dict, the disk info dictionary, with only these devices in it.
+
+        Usage:
+
+        >>> disk_info = collector.get_devices([<aDiskName>, <anotherDiskName>])
+        """
+
+        with self.lock:
+            self.report = report.ScanReport()
+
+            try:
+                return self.module.collect_devices(self, disks, fields=fields)
+
+            finally:
+                self.report.finish()
+
+    def get_device(self, disk, fields=None):
+        """
+        Gets the information for one device. See get_devices().
+
+        Usage:
+
+        >>> disk_info = collector.get_device(<aDiskName>)
+        """
+
+        return self.get_devices([disk], fields=fields)
@@ -44,10 +44,18 @@ module, but you can call it directly if you like.
 
 """
 
+import sys
 import subprocess
 import os
 import json
 
+from . import bootrecord
+from . import errors
+from . import partitiontable
+from . import projection
+from . import report
+from .collector import Collector
+
 #Determine path to blkid and smartctl.
 if os.getenv("RESOURCEPATH") is None:
     #Installed in Cygwin as usual.
@@ -61,11 +69,19 @@ else:
     BLKID = RESOURCEPATH+"/bin/blkid"
     SMARTCTL = RESOURCEPATH+"/bin/smartctl"
 
-#Define global variables to make pylint happy.
+#The state of the scans run by get_info() and get_devices(). Scans with
+#other Collectors (see collector.py) can run at the same time.
+COLLECTOR = Collector(sys.modules[__name__])
+
+#The results of the last scan run by get_info() or get_devices().
 DISKINFO = None
-ERRORS = []
+ERRORS = COLLECTOR.errors
+
+#Fields that need smartctl and blkid to be run.
+SMARTCTL_FIELDS = ("Vendor", "Product", "RawCapacity", "Capacity", "Description")
+BLKID_FIELDS = ("Partitioning", "FileSystem", "UUID")
 
-def get_info():
+def get_info(fields=None):
     """
     This function is the Cygwin-specific way of getting disk information.
     It makes use of the smartctl and blkid commands to gather
@@ -75,37 +91,228 @@ def get_info():
     it **doesn't** return the disk infomation. Instead, it is left as a
     global attribute in this module (DISKINFO).
 
+    The scan is run with COLLECTOR, so only one of these runs at a time.
+    Use a collector.Collector of your own to run a scan alongside it.
+
+    Kwargs:
+        fields (iterable):  The fields to collect (see projection.py).
+                            smartctl and blkid are only run if some of the
+                            fields they provide were asked for.
+                            Default = None (all of them).
+
     Raises:
-        Nothing, hopefully, but errors have a small chance of propagation
-        up to here here. Wrap it in a try:, except: block if you are worried.
+        ValueError, if any of the fields don't exist. Nothing else,
+        hopefully, but errors have a small chance of propagation up to
+        here here. Wrap it in a try:, except: block if you are worried.
 
     Usage:
 
     >>> get_info()
+
+    OR:
+
+    >>> get_info(fields=<aSetOfFields>)
     """
+
     global DISKINFO
-    DISKINFO = {}
+    global ERRORS
+
+    try:
+        COLLECTOR.get_info(fields=fields)
+
+    finally:
+        DISKINFO = COLLECTOR.diskinfo
+        ERRORS = COLLECTOR.errors
+
+def collect_info(collector, fields=None, lazy=False): #pylint: disable=unused-argument
+    """
+    Private, implementation detail.
+
+    This function does the work of get_info(), leaving the results in the
+    given collector.Collector instead of this module's globals. Use
+    Collector.get_info() rather than calling this directly.
+
+    Args:
+        collector (Collector):  Where to keep the state of the scan.
+
+    Kwargs:
+        fields (iterable):      See get_info(). Default = None.
+        lazy (bool):            Ignored; lazy fields are only supported
+                                on Linux. Default = False.
+
+    Raises:
+        The same as get_info().
+
+    Usage:
+
+    >>> collect_info(<aCollector>)
+
+    OR:
+
+    >>> collect_info(<aCollector>, fields=<aSetOfFields>)
+    """
+
+    collector.reset(projection.normalise(fields))
+    diskinfo = collector.diskinfo
 
     #Find all disks.
-    for disk in os.listdir("/dev"):
-        #HDDs, SSDs, NVME SSDs, Optical drives, Tape drives.
-        if "sd" in disk or "sr" in disk or "nvme" in disk \
-            or "st" in disk and "std" not in disk:
+    with report.stage(collector.report, "list"):
+        for disk in os.listdir("/dev"):
+            #HDDs, SSDs, NVME SSDs, Optical drives, Tape drives.
+            if "sd" in disk or "sr" in disk or "nvme" in disk \
+                or "st" in disk and "std" not in disk:
+
+                disk = "/dev/"+disk
 
-            disk = "/dev/"+disk
+                diskinfo[disk] = {}
+                diskinfo[disk]["Name"] = disk
 
-            DISKINFO[disk] = {}
-            DISKINFO[disk]["Name"] = disk
+    #Read all the boot records in one go, except for optical drives.
+    if projection.wants(collector.fields, "BootRecord", "BootRecordStrings"):
+        with report.stage(collector.report, "bootrecords"):
+            collector.bootrecords = bootrecord.read_boot_records([disk for disk in diskinfo
+                                                                  if "/dev/sr" not in disk],
+                                                                 scan_report=collector.report)
 
     #Save some info for later use.
-    for disk in DISKINFO:
-        get_device_info(disk)
+    with report.stage(collector.report, "devices"):
+        for disk in diskinfo:
+            with report.device(collector.report, disk):
+                get_device_info(collector, disk)
+
+            device_ready(collector, disk)
+
+    projection.project(diskinfo, collector.fields)
 
     #Check we found some disks.
-    if not DISKINFO:
+    if not diskinfo:
         raise RuntimeError("No Disks found!")
 
-def get_device_info(host_disk):
+def get_devices(disks, fields=None):
+    """
+    This function gets the information for some devices, without looking
+    at any of the others. smartctl and blkid are only run for these
+    devices.
+
+    Like get_info(), it leaves the information in DISKINFO, replacing
+    anything there before.
+
+    .. note::
+        Partitions aren't supported on Cygwin yet, so only devices can be
+        given.
+
+    Args:
+        disks (list):       The devices, eg ["/dev/sda"].
+
+    Kwargs:
+        fields (iterable):  See get_info(). Default = None (all of them).
+
+    Returns:
+        dict. The disk info dictionary. Devices that don't exist are
+        reported in ERRORS.
+
+    Raises:
+        ValueError, if any of the fields don't exist.
+
+    Usage:
+
+    >>> disk_info = get_devices([<aDiskName>, <anotherDiskName>])
+    """
+
+    global DISKINFO
+    global ERRORS
+
+    try:
+        return COLLECTOR.get_devices(disks, fields=fields)
+
+    finally:
+        DISKINFO = COLLECTOR.diskinfo
+        ERRORS = COLLECTOR.errors
+
+def collect_devices(collector, disks, fields=None):
+    """
+    Private, implementation detail.
+
+    This function does the work of get_devices(), leaving the results in
+    the given collector.Collector instead of this module's globals. Use
+    Collector.get_devices() rather than calling this directly.
+
+    Args:
+        collector (Collector):  Where to keep the state of the scan.
+        disks (list):           See get_devices().
+
+    Kwargs:
+        fields (iterable):      See get_info(). Default = None.
+
+    Returns:
+        dict. The disk info dictionary.
+
+    Usage:
+
+    >>> disk_info = collect_devices(<aCollector>, [<aDiskName>])
+    """
+
+    collector.reset(projection.normalise(fields))
+    diskinfo = collector.diskinfo
+
+    for disk in disks:
+        if not os.path.exists(disk):
+            collector.errors.append(errors.ErrorRecord("cygwin.get_devices(): Couldn't find "
+                                                       + disk+"\n", device=disk))
+            continue
+
+        diskinfo[disk] = {}
+        diskinfo[disk]["Name"] = disk
+
+    if projection.wants(collector.fields, "BootRecord", "BootRecordStrings"):
+        collector.bootrecords = bootrecord.read_boot_records([disk for disk in diskinfo
+                                                              if "/dev/sr" not in disk],
+                                                             scan_report=collector.report)
+
+    for disk in diskinfo:
+        get_device_info(collector, disk)
+
+    projection.project(diskinfo, collector.fields)
+
+    return diskinfo
+
+def get_device(disk, fields=None):
+    """
+    This function gets the information for a device. See get_devices().
+
+    Usage:
+
+    >>> disk_info = get_device(<aDiskName>)
+    """
+
+    return get_devices([disk], fields=fields)
+
+def device_ready(collector, *disks):
+    """
+    Private, implementation detail.
+
+    This function passes the entries for some devices, partitions, or
+    logical volumes that have just been finished to the collector's
+    listener, if it is set. Ones that aren't in the disk info dictionary are skipped.
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+    Usage:
+
+    >>> device_ready(<aCollector>, <aDiskName>, <anotherDiskName>)
+    """
+
+    listener = collector.listener
+
+    if listener is None:
+        return
+
+    for disk in disks:
+        if disk in collector.diskinfo:
+            listener(disk, collector.diskinfo[disk])
+
+def get_device_info(collector, host_disk):
     """
     Private, implementation detail.
 
@@ -117,6 +324,8 @@ def get_device_info(host_disk):
         Functionality not yet complete.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         host_disk:  The name of the device.
 
     Returns:
@@ -124,121 +333,168 @@ def get_device_info(host_disk):
 
     Usage:
 
-    >>> host_disk = get_device_info(<aNode>)
+    >>> host_disk = get_device_info(<aCollector>, <aNode>)
     """
 
+    diskinfo = collector.diskinfo
+
     #TODO determine these somehow later.
-    DISKINFO[host_disk]["Type"] = "Device"
-    DISKINFO[host_disk]["HostDevice"] = "N/A"
-    DISKINFO[host_disk]["Partitions"] = []
+    diskinfo[host_disk]["Type"] = "Device"
+    diskinfo[host_disk]["HostDevice"] = "N/A"
+    diskinfo[host_disk]["Partitions"] = []
 
-    #Get smartctl output for more disk info.
-    #Due to fork errors, try this up to five times.
-    count = 0
-    output = ""
+    #Only run smartctl if something it provides was asked for.
+    data = {}
 
-    while count < 5:
-        try:
-            cmd = subprocess.run([SMARTCTL, "-i", host_disk, "-j"], stdout=subprocess.PIPE,
-                                 stderr=subprocess.STDOUT, check=False)
+    if projection.wants(collector.fields, *SMARTCTL_FIELDS):
+        #Get smartctl output for more disk info.
+        #Due to fork errors, try this up to five times.
+        count = 0
+        output = ""
 
-            output = cmd.stdout.decode("utf-8", errors="replace")
+        while count < 5:
+            try:
+                cmd = report.run(collector.report, [SMARTCTL, "-i", host_disk, "-j"],
+                                 stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=False)
 
-        except OSError:
-            count += 1
+                output = cmd.stdout.decode("utf-8", errors="replace")
 
-        except subprocess.CalledProcessError as err:
-            ERRORS.append("cygwin.get_block_size(): Error encountered running smartctl: "
-                          + str(err)+"\n")
+            except OSError:
+                count += 1
 
-        else:
-            break
+            except subprocess.CalledProcessError as err:
+                collector.errors.append(errors.ErrorRecord("cygwin.get_block_size(): Error "
+                                                           + "encountered running smartctl: "
+                                                           + str(err)+"\n",
+                                                           device=host_disk, command=err.cmd,
+                                                           exit_code=err.returncode))
 
-    if output == "":
-        #Fork/other error encountered.
-        ERRORS.append("cygwin.get_device_info(): Fork or other error encountered too many"
-                      + " times trying to run smartctl\n")
+            else:
+                break
 
-        return host_disk
+        if output == "":
+            #Fork/other error encountered.
+            collector.errors.append(errors.ErrorRecord("cygwin.get_device_info(): Fork or other "
+                                                       + "error encountered too many times trying "
+                                                       + "to run smartctl\n", device=host_disk,
+                                                       command=[SMARTCTL, "-i", host_disk, "-j"]))
 
-    else:
-        try:
-            data = json.loads(output)
+            return host_disk
 
-        except ValueError:
-            #Not a valid JSON document!
-            ERRORS.append("cygwin.get_device_info(): smartctl output is not valid JSON! Output: "
-                          + output+"\n")
+        else:
+            try:
+                data = json.loads(output)
 
-            return host_disk
+            except ValueError:
+                #Not a valid JSON document!
+                collector.errors.append(errors.ErrorRecord("cygwin.get_device_info(): smartctl "
+                                                           + "output is not valid JSON! Output: "
+                                                           + output+"\n",
+                                                           device=host_disk))
+
+                return host_disk
 
     #Vendor and product.
     if "model_name" in data.keys():
-        DISKINFO[host_disk]["Vendor"] = get_vendor(data)
-        DISKINFO[host_disk]["Product"] = get_product(data)
+        diskinfo[host_disk]["Vendor"] = get_vendor(data)
+        diskinfo[host_disk]["Product"] = get_product(data)
 
     else:
-        DISKINFO[host_disk]["Vendor"] = "Unknown"
-        DISKINFO[host_disk]["Product"] = "Unknown"
+        diskinfo[host_disk]["Vendor"] = "Unknown"
+        diskinfo[host_disk]["Product"] = "Unknown"
 
     #Ignore capacities for all optical media.
     if "/dev/cdrom" not in host_disk and "/dev/sr" not in host_disk \
         and "/dev/dvd" not in host_disk and "user_capacity" in data:
 
-        DISKINFO[host_disk]["RawCapacity"], DISKINFO[host_disk]["Capacity"] = get_capacity(data)
+        diskinfo[host_disk]["RawCapacity"], diskinfo[host_disk]["Capacity"] = get_capacity(data)
 
     else:
-        DISKINFO[host_disk]["RawCapacity"], DISKINFO[host_disk]["Capacity"] = ("N/A", "N/A")
+        diskinfo[host_disk]["RawCapacity"], diskinfo[host_disk]["Capacity"] = ("N/A", "N/A")
 
-    DISKINFO[host_disk]["Description"] = get_description(data, host_disk)
-    DISKINFO[host_disk]["Flags"] = get_capabilities(host_disk)
+    #get_description() runs cygpath.
+    if projection.wants(collector.fields, "Description"):
+        diskinfo[host_disk]["Description"] = get_description(collector, data, host_disk)
 
-    #Get blkid output for these.
-    #Due to fork errors, try this up to five times.
-    count = 0
-    output = ""
+    else:
+        diskinfo[host_disk]["Description"] = "N/A"
+    diskinfo[host_disk]["Flags"] = get_capabilities(host_disk)
 
-    try:
-        while count < 5:
-            try:
-                cmd = subprocess.run([BLKID, host_disk, "-o", "export"], stdout=subprocess.PIPE,
-                                     stderr=subprocess.STDOUT, check=True)
+    #Only run blkid if something it provides was asked for.
+    if not projection.wants(collector.fields, *BLKID_FIELDS):
+        diskinfo[host_disk]["Partitioning"] = "Unknown"
+        diskinfo[host_disk]["FileSystem"] = "Unknown"
+        diskinfo[host_disk]["UUID"] = "Unknown"
 
-            except OSError as error:
-                count += 1
+    else:
+        #Get blkid output for these.
+        #Due to fork errors, try this up to five times.
+        count = 0
+        output = ""
 
-                if count >= 5:
-                    ERRORS.append("cygwin.get_device_info(): Fork error encountered too many"
-                                  + " times trying to run blkid\n")
+        try:
+            while count < 5:
+                try:
+                    cmd = report.run(collector.report, [BLKID, host_disk, "-o", "export"],
+                                     stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=True)
 
-                    raise subprocess.CalledProcessError(None, "Fork error encountered too many times") from error
+                except OSError as error:
+                    count += 1
 
-            else:
-                break
+                    if count >= 5:
+                        collector.errors.append("cygwin.get_device_info(): Fork error encountered "
+                                                + "too many times trying to run blkid\n")
 
-    except subprocess.CalledProcessError as err:
-        ERRORS.append("cygwin.get_device_info(): subprocess.CalledProcessError encountered"
-                      + " trying to run blkid. Error: "+str(err)+"\n")
+                        raise subprocess.CalledProcessError(None, "Fork error encountered too many times") from error
 
-        DISKINFO[host_disk]["Partitioning"] = "Unknown"
-        DISKINFO[host_disk]["FileSystem"] = "Unknown"
-        DISKINFO[host_disk]["UUID"] = "Unknown"
+                else:
+                    break
 
-    else:
-        output = cmd.stdout.decode("utf-8", errors="replace").split("\n")
+        except subprocess.CalledProcessError as err:
+            collector.errors.append(errors.ErrorRecord("cygwin.get_device_info(): "
+                                                       + "subprocess.CalledProcessError "
+                                                       + "encountered trying to run blkid. "
+                                                       + "Error: "+str(err)+"\n",
+                                                       device=host_disk,
+                                                       command=[BLKID, host_disk, "-o", "export"],
+                                                       exit_code=err.returncode))
+
+            diskinfo[host_disk]["Partitioning"] = "Unknown"
+            diskinfo[host_disk]["FileSystem"] = "Unknown"
+            diskinfo[host_disk]["UUID"] = "Unknown"
 
-        DISKINFO[host_disk]["Partitioning"] = get_partitioning(output)
-        DISKINFO[host_disk]["FileSystem"] = get_file_system(output)
-        DISKINFO[host_disk]["UUID"] = get_uuid(output)
+        else:
+            output = cmd.stdout.decode("utf-8", errors="replace").split("\n")
+
+            diskinfo[host_disk]["Partitioning"] = get_partitioning(output)
+            diskinfo[host_disk]["FileSystem"] = get_file_system(output)
+            diskinfo[host_disk]["UUID"] = get_uuid(output)
+
+    #Read the partition table directly if we can, rather than relying on blkid.
+    if "/dev/cdrom" not in host_disk and "/dev/sr" not in host_disk \
+        and "/dev/dvd" not in host_disk and projection.wants(collector.fields, "Partitioning"):
+
+        try:
+            table = partitiontable.read_partition_table(host_disk)
+
+        except (OSError, ValueError, OverflowError, MemoryError) as err:
+            collector.errors.append(errors.ErrorRecord("cygwin.get_device_info(): Exception: "
+                                                       + str(err)+" while reading partition "
+                                                       + "table of "+host_disk+"\n", device=host_disk))
+
+        else:
+            if table["Scheme"] != "Unknown":
+                diskinfo[host_disk]["Partitioning"] = table["Scheme"]
 
-    DISKINFO[host_disk]["ID"] = get_id(host_disk)
+    diskinfo[host_disk]["ID"] = get_id(host_disk)
 
     #Don't try to get Boot Records for optical drives.
     if "/dev/cdrom" in host_disk or "/dev/sr" in host_disk or "/dev/dvd" in host_disk:
-        DISKINFO[host_disk]["BootRecord"], DISKINFO[host_disk]["BootRecordStrings"] = ("N/A", ["N/A"])
+        diskinfo[host_disk]["BootRecord"], diskinfo[host_disk]["BootRecordStrings"] = ("N/A", ["N/A"])
 
     else:
-        DISKINFO[host_disk]["BootRecord"], DISKINFO[host_disk]["BootRecordStrings"] = get_boot_record(host_disk)
+        diskinfo[host_disk]["BootRecord"], diskinfo[host_disk]["BootRecordStrings"] = \
+            get_boot_record(collector, host_disk)
 
     return host_disk
 
@@ -375,7 +631,7 @@ def get_capacity(data):
     #Include the unit in the result for both exact and human-readable sizes.
     return str(raw_capacity), str(human_readable_size)+" "+unit
 
-def get_description(data, disk):
+def get_description(collector, data, disk):
     """
     Private, implementation detail.
 
@@ -383,6 +639,8 @@ def get_description(data, disk):
     by parsing smartctl's output.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         data:         Parsed JSON from smartctl.
         disk (str):   Name of a device/partition.
 
@@ -392,7 +650,7 @@ def get_description(data, disk):
 
     Usage:
 
-    >>> description = get_description(<smartctl-data>, <aDisk>)
+    >>> description = get_description(<aCollector>, <smartctl-data>, <aDisk>)
     """
 
     #Gather info to create some descriptions.
@@ -400,13 +658,13 @@ def get_description(data, disk):
     drive_letter = "<unknown>"
 
     try:
-        cmd = subprocess.run(["cygpath", "-w", disk], stdout=subprocess.PIPE,
-                             stderr=subprocess.STDOUT, check=True)
+        cmd = report.run(collector.report, ["cygpath", "-w", disk], stdout=subprocess.PIPE,
+                         stderr=subprocess.STDOUT, check=True)
 
     except (subprocess.CalledProcessError, OSError):
         #Disk doesn't exist or no Windows equivelant.
-        ERRORS.append("cygwin.get_description(): Disk "+disk+" doesn't exist or has no Windows"
-                      + " equivelant\n")
+        collector.errors.append("cygwin.get_description(): Disk "+disk+" doesn't exist or has "
+                                + "no Windows equivelant\n")
 
     else:
         output = cmd.stdout.decode("utf-8", errors="replace").strip()
@@ -588,13 +846,15 @@ def get_id(disk):
     #TODO
     return "Unknown"
 
-def get_boot_record(disk):
+def get_boot_record(collector, disk):
     """
     Private, implementation detail.
 
     This function gets the MBR/PBR of a given disk.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         disk (str):   The name of a partition/device.
 
     Returns:
@@ -605,33 +865,26 @@ def get_boot_record(disk):
 
     Usage:
 
-    >>> boot_record, boot_record_strings = get_boot_record(<aDiskName>)
+    >>> boot_record, boot_record_strings = get_boot_record(<aCollector>, <aDiskName>)
     """
 
-    #Use status=none to avoid getting status messages from dd in our boot record.
-    cmd = subprocess.run(["dd", "if="+disk, "bs=512", "count=1", "status=none"],
-                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=False)
-
-    boot_record = cmd.stdout
-    return_value = cmd.returncode
+    #Don't read it if it wasn't asked for.
+    if not projection.wants(collector.fields, "BootRecord", "BootRecordStrings"):
+        return ("N/A", ["N/A"])
 
-    if return_value != 0:
-        return ("Unknown", ["Unknown"])
+    #Use the boot record read by get_info() if we have it.
+    boot_record = collector.bootrecords.get(disk)
 
-    #Get the readable strings in the boot record.
-    with subprocess.Popen(["strings"], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
-                           stderr=subprocess.STDOUT) as cmd:
-
-        cmd.stdin.write(boot_record)
-        boot_record_strings = cmd.communicate()[0].decode("utf-8", errors="replace").replace(" ", "").split("\n")
-        return_value = cmd.returncode
+    if boot_record is None:
+        try:
+            boot_record = bootrecord.BootRecordReader().read(disk)
 
-    if return_value != 0:
-        return (boot_record, ["Unknown"])
+        except OSError:
+            return ("Unknown", ["Unknown"])
 
-    return (boot_record, boot_record_strings)
+    return (boot_record, bootrecord.get_strings(boot_record))
 
-def get_block_size(disk):
+def get_block_size(disk, collector=None):
     """
     **Public**
 
@@ -651,6 +904,10 @@ def get_block_size(disk):
         disk (str):     The partition/device/logical volume that
                         we want the block size for.
 
+    Kwargs:
+        collector (Collector):  Where to record any errors. Default = None
+                                (COLLECTOR, so they end up in ERRORS).
+
     Returns:
         int/None. The block size.
 
@@ -662,6 +919,9 @@ def get_block_size(disk):
     >>> block_size = get_block_size(<aDeviceName>)
     """
 
+    if collector is None:
+        collector = COLLECTOR
+
     #Run smartctl to try and get blocksize information.
     command = [SMARTCTL, "-i", disk, "-j"]
 
@@ -670,20 +930,20 @@ def get_block_size(disk):
 
     while count < 5:
         try:
-            runcmd = subprocess.run(command, stdout=subprocess.PIPE,
-                                    stderr=subprocess.STDOUT, check=False)
+            runcmd = report.run(collector.report, command, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, check=False)
 
         except OSError:
             count += 1
 
             if count >= 5:
-                ERRORS.append("cygwin.get_block_size(): Fork/other error encountered too many"
-                               + " times trying to run smartctl\n")
+                collector.errors.append("cygwin.get_block_size(): Fork/other error encountered "
+                                        + "too many times trying to run smartctl\n")
                 return None
 
         except subprocess.CalledProcessError as err:
-            ERRORS.append("cygwin.get_block_size(): Error encountered running smart ctl: "
-                          + str(err)+"\n")
+            collector.errors.append("cygwin.get_block_size(): Error encountered running smart "
+                                    + "ctl: "+str(err)+"\n")
 
             return None
 
@@ -691,15 +951,17 @@ def get_block_size(disk):
             break
 
     #Get the output and pass it to compute_block_size.
-    return compute_block_size(runcmd.stdout.decode("utf-8", errors="replace"))
+    return compute_block_size(collector, runcmd.stdout.decode("utf-8", errors="replace"))
 
-def compute_block_size(stdout):
+def compute_block_size(collector, stdout):
     """
     Private, implementation detail.
 
     Used to process and tidy up the block size output from smartctl.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         stdout (str):       The block size.
 
     Returns:
@@ -710,7 +972,7 @@ def compute_block_size(stdout):
 
     Usage:
 
-    >>> compute_block_size(<stdoutFromSmartctl>)
+    >>> compute_block_size(<aCollector>, <stdoutFromSmartctl>)
     """
 
     try:
@@ -718,8 +980,8 @@ def compute_block_size(stdout):
 
     except ValueError:
         #Not a valid JSON document!
-        ERRORS.append("cygwin.compute_block_size(): smartctl output is not valid JSON! Output: "
-                      + stdout+"\n")
+        collector.errors.append("cygwin.compute_block_size(): smartctl output is not valid JSON! "
+                                + "Output: "+stdout+"\n")
 
         return None
 
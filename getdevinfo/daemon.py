@@ -0,0 +1,715 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Daemon For The Device Information Obtainer
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is the part of the package that runs GetDevInfo as a daemon, which
+scans once (as root), keeps the disk information up to date, and answers
+queries from other processes (which don't need to be root) over a Unix
+domain socket.
+
+Start it with:
+
+>>> sudo python3 -m getdevinfo --serve
+
+And query it with:
+
+>>> import getdevinfo.daemon as daemon
+>>> with daemon.Client() as client:
+>>>     disk_info = client.snapshot()
+
+On Linux, the disk information is kept up to date with block device
+uevents (see monitor.py). Elsewhere, or if uevents aren't available,
+everything is scanned again every RESCAN_INTERVAL seconds.
+
+Protocol:
+
+Each message (in both directions) is a 4-byte big-endian length, followed
+by that many bytes of UTF-8 JSON. Bytes (eg boot records) are sent the
+same way as in snapshots (see snapshot.py). A client can send as many
+requests as it likes over one connection. Requests are dictionaries with
+a "Request" key:
+
+    - {"Request": "snapshot"}
+        -> {"Generation": int, "DiskInfo": dict, "Errors": list}
+
+    - {"Request": "device", "Name": str}
+        -> {"Generation": int, "Device": dict}
+
+    - {"Request": "fields", "Fields": list, "Devices": list (optional)}
+        -> {"Generation": int, "DiskInfo": dict}
+
+    - {"Request": "changes", "Since": int}
+        -> {"Generation": int, "Full": bool, "Changed": dict, "Removed": list}
+
+The generation goes up by one every time anything changes. "changes"
+returns the devices that have changed or been removed since the given
+generation. "Full" is True if the generation is newer than the daemon's
+(eg because it has been restarted), or more than HISTORY generations old,
+in which case every device is returned as changed. Failed requests get
+{"Error": str}.
+
+The socket can only be used by root, and the members of the group given
+with "--socket-group" (the daemon's own group by default), as the boot
+records of every disk can be read through it.
+
+.. module: daemon.py
+    :platform: Linux, macOS, Cygwin
+    :synopsis: Inventory daemon and client for GetDevInfo.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <support@hamishmb.com>
+
+"""
+
+import os
+import sys
+import copy
+import functools
+import shutil
+import errno
+import json
+import platform
+import socket
+import socketserver
+import stat
+import struct
+import threading
+import time
+
+from . import snapshot
+from .collector import Collector
+
+#Where the daemon listens by default.
+SOCKET_PATH = "/run/getdevinfo.sock"
+
+#Who can use the socket: root, and members of the socket's group.
+SOCKET_MODE = 0o660
+
+#How many generations of changes are remembered for "changes" requests.
+HISTORY = 1000
+
+#How often to scan everything again when uevents aren't available, in seconds.
+RESCAN_INTERVAL = 60
+
+#The largest request the daemon accepts, and the largest response a client accepts.
+MAX_REQUEST_SIZE = 65536
+MAX_RESPONSE_SIZE = 64*1024*1024
+
+#The length prefix on each message.
+HEADER = struct.Struct(">I")
+
+#-------------------- Protocol --------------------
+def encode_message(message):
+    """
+    Private, implementation detail.
+
+    Encodes a message, with its length prefix.
+    """
+
+    data = json.dumps(message, default=snapshot.encode_bytes,
+                      separators=(",", ":")).encode("utf-8")
+
+    return HEADER.pack(len(data))+data
+
+def read_message(stream, max_size):
+    """
+    Private, implementation detail.
+
+    Reads a message from a file-like object.
+
+    Returns:
+        The message, or None if the stream ended before one started.
+
+    Raises:
+        ValueError, if the message is too big, truncated, or isn't valid JSON.
+    """
+
+    header = stream.read(HEADER.size)
+
+    if not header:
+        return None
+
+    if len(header) < HEADER.size:
+        raise ValueError("Truncated message header")
+
+    length = HEADER.unpack(header)[0]
+
+    if length > max_size:
+        raise ValueError("Message too big ("+str(length)+" bytes)")
+
+    data = stream.read(length)
+
+    if len(data) < length:
+        raise ValueError("Truncated message")
+
+    return json.loads(data.decode("utf-8"), object_hook=snapshot.decode_bytes)
+
+#-------------------- Server --------------------
+class Inventory:
+    """
+    Holds the disk information the daemon serves, and what changed in
+    each generation.
+
+    Each published version is never modified afterwards, so requests can
+    be answered without holding the lock. Only the entries that changed
+    are copied when a new version is published. The others are shared
+    with the version before.
+
+    Kwargs:
+        history (int):  How many generations of changes to remember.
+                        Clients asking for changes since an older one get
+                        everything. Default = HISTORY.
+
+    Usage:
+
+    >>> inventory = Inventory()
+    >>> inventory.publish(<aDiskInfoDict>, <anErrorsList>)
+    >>> response = inventory.handle_request(<aRequest>)
+    """
+
+    def __init__(self, history=HISTORY):
+        self.lock = threading.Lock()
+
+        #Held while publishing, so requests only wait for the new version to be swapped in.
+        self.publish_lock = threading.Lock()
+        self.generation = 0
+        self.diskinfo = {}
+        self.errors = []
+
+        #The generation each device last changed in, including removed devices,
+        #for changes since the oldest generation that is remembered.
+        self.history = history
+        self.oldest = 0
+        self.changed = {}
+
+        #The encoded response to the snapshot request, for this generation.
+        self.encoded_snapshot = None
+
+    def publish(self, diskinfo, errors):
+        """
+        Publishes a new version of the disk information, if anything has
+        changed since the last one.
+
+        Args:
+            diskinfo (dict):    The disk info dictionary. The entries that
+                                have changed are copied.
+            errors (list):      The errors from the scan.
+
+        Returns:
+            bool. True if anything changed.
+        """
+
+        errors = list(errors)
+
+        with self.publish_lock:
+            #Nothing else changes the published version while we hold publish_lock.
+            old = self.diskinfo
+            changed = set(name for name in set(old) | set(diskinfo)
+                          if old.get(name) != diskinfo.get(name))
+
+            if self.generation and not changed and errors == self.errors:
+                return False
+
+            diskinfo = {name: copy.deepcopy(info) if name in changed else old[name]
+                        for name, info in diskinfo.items()}
+
+            with self.lock:
+                self.generation += 1
+
+                for name in changed:
+                    self.changed[name] = self.generation
+
+                #Forget changes that no client can ask for any more.
+                if self.generation - self.history > self.oldest:
+                    self.oldest = self.generation - self.history
+                    self.changed = {name: generation for name, generation in self.changed.items()
+                                    if generation > self.oldest}
+
+                self.diskinfo = diskinfo
+                self.errors = errors
+                self.encoded_snapshot = None
+
+            return True
+
+    def get_state(self):
+        """Returns the current generation, disk info dictionary and errors."""
+        with self.lock:
+            return self.generation, self.diskinfo, self.errors
+
+    def get_encoded_snapshot(self):
+        """
+        Private, implementation detail.
+
+        Returns the encoded response to the snapshot request, encoding it
+        only once per generation.
+        """
+
+        with self.lock:
+            if self.encoded_snapshot is None:
+                self.encoded_snapshot = encode_message({"Generation": self.generation,
+                                                        "DiskInfo": self.diskinfo,
+                                                        "Errors": self.errors})
+
+            return self.encoded_snapshot
+
+    def handle_request(self, request):
+        """
+        Answers a request (see the module docstring).
+
+        Args:
+            request (dict):     The request.
+
+        Returns:
+            dict. The response.
+        """
+
+        if not isinstance(request, dict):
+            return {"Error": "Requests must be JSON objects"}
+
+        generation, diskinfo, errors = self.get_state()
+        kind = request.get("Request")
+
+        if kind == "snapshot":
+            return {"Generation": generation, "DiskInfo": diskinfo, "Errors": errors}
+
+        if kind == "device":
+            name = request.get("Name")
+
+            if not isinstance(name, str):
+                return {"Error": "Name must be a string"}
+
+            if name not in diskinfo:
+                return {"Error": "No such device: "+str(name)}
+
+            return {"Generation": generation, "Device": diskinfo[name]}
+
+        if kind == "fields":
+            fields = request.get("Fields")
+            devices = request.get("Devices", list(diskinfo))
+
+            if not is_string_list(fields) or not is_string_list(devices):
+                return {"Error": "Fields and Devices must be lists of strings"}
+
+            return {"Generation": generation,
+                    "DiskInfo": {name: {field: diskinfo[name][field] for field in fields
+                                        if field in diskinfo[name]}
+                                 for name in devices if name in diskinfo}}
+
+        if kind == "changes":
+            since = request.get("Since")
+
+            if not isinstance(since, int):
+                return {"Error": "Since must be an integer"}
+
+            #Read everything at once, so it's all from the same generation.
+            with self.lock:
+                generation, diskinfo = self.generation, self.diskinfo
+                full = since > generation or since < self.oldest
+
+                if full:
+                    names = set(diskinfo) | set(self.changed)
+
+                else:
+                    names = [name for name, changed in self.changed.items() if changed > since]
+
+            return {"Generation": generation, "Full": full,
+                    "Changed": {name: diskinfo[name] for name in names if name in diskinfo},
+                    "Removed": sorted(name for name in names if name not in diskinfo)}
+
+        return {"Error": "Unknown request: "+str(kind)}
+
+def is_string_list(value):
+    """
+    Private, implementation detail.
+
+    Returns True if a value from a request is a list of strings.
+    """
+
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Private, implementation detail.
+
+    Answers requests on a connection until the client disconnects.
+    """
+
+    def handle(self):
+        inventory = self.server.inventory
+
+        while True:
+            try:
+                request = read_message(self.rfile, MAX_REQUEST_SIZE)
+
+            except ValueError as err:
+                self.wfile.write(encode_message({"Error": "Bad request: "+str(err)}))
+                return
+
+            if request is None:
+                return
+
+            try:
+                if isinstance(request, dict) and request.get("Request") == "snapshot":
+                    response = inventory.get_encoded_snapshot()
+
+                else:
+                    response = encode_message(inventory.handle_request(request))
+
+            except Exception as err: #pylint: disable=broad-except
+                #Answer anyway, so the client isn't left waiting.
+                response = encode_message({"Error": "Couldn't answer request: "+str(err)})
+
+            self.wfile.write(response)
+            self.wfile.flush()
+
+class Server(socketserver.ThreadingUnixStreamServer):
+    """
+    The daemon's server. Each connection is handled in its own thread.
+
+    Args:
+        socket_path (str):          Where to listen.
+
+    Kwargs:
+        scanner (function):         Called with no arguments to scan
+                                    everything. Returns a tuple of the disk
+                                    info dictionary and errors.
+                                    Default = a full scan with the server's
+                                    own collector.Collector, which uevents
+                                    are then applied to on Linux.
+
+        rescan_interval (float):    See RESCAN_INTERVAL.
+
+        group (str/int):            The group (name or ID) whose members
+                                    can use the socket. Default = None (the
+                                    daemon's own group).
+
+    Raises:
+        OSError, if the socket couldn't be created.
+
+        LookupError, if the group doesn't exist.
+
+    Usage:
+
+    >>> server = Server(<aPath>)
+    >>> server.start()
+    >>> server.serve_forever()
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, scanner=None, rescan_interval=RESCAN_INTERVAL, group=None):
+        self.socket_path = socket_path
+        self.collector = None
+
+        if scanner is None:
+            self.collector = Collector()
+            scanner = functools.partial(scan, self.collector)
+
+        self.scanner = scanner
+        self.rescan_interval = rescan_interval
+        self.inventory = Inventory()
+
+        #Held while the disk information is being changed.
+        self.update_lock = threading.Lock()
+
+        remove_stale_socket(socket_path)
+        socketserver.ThreadingUnixStreamServer.__init__(self, socket_path, RequestHandler)
+
+        #Only root can scan, but members of the group can ask.
+        try:
+            if group is not None:
+                shutil.chown(socket_path, group=group)
+
+            os.chmod(socket_path, SOCKET_MODE)
+
+        except (OSError, LookupError):
+            self.server_close()
+            raise
+
+    def server_close(self):
+        socketserver.ThreadingUnixStreamServer.server_close(self)
+
+        try:
+            os.remove(self.socket_path)
+
+        except OSError:
+            pass
+
+    def rescan(self):
+        """Scans everything again, and publishes the results."""
+        with self.update_lock:
+            diskinfo, errors = self.scanner()
+            self.inventory.publish(diskinfo, errors)
+
+    def start(self):
+        """
+        Does the first scan, then starts a thread that keeps the disk
+        information up to date.
+        """
+
+        self.rescan()
+
+        uevent_monitor = None
+
+        if platform.system() == "Linux" and self.collector is not None:
+            from . import monitor
+
+            try:
+                uevent_monitor = monitor.Monitor(collector=self.collector)
+                uevent_monitor.open()
+
+            except OSError:
+                uevent_monitor = None
+
+        if uevent_monitor is not None:
+            target, args = self.watch, (uevent_monitor,)
+
+        else:
+            target, args = self.poll, ()
+
+        threading.Thread(target=target, args=args, daemon=True).start()
+
+    def poll(self):
+        """
+        Private, implementation detail.
+
+        Scans everything again every rescan_interval seconds.
+        """
+
+        while True:
+            time.sleep(self.rescan_interval)
+            self.rescan()
+
+    def watch(self, uevent_monitor):
+        """
+        Private, implementation detail.
+
+        Applies uevents to the disk information as they arrive. Falls back
+        to polling if the uevent socket stops working.
+        """
+
+        from . import monitor
+
+        while True:
+            try:
+                message = uevent_monitor.sock.recv(monitor.MAX_MESSAGE_SIZE)
+
+            except OSError as err:
+                if err.errno != errno.ENOBUFS:
+                    uevent_monitor.close()
+                    self.poll()
+                    return
+
+                #Some events were lost, so we can't trust the disk information any more.
+                self.rescan()
+                continue
+
+            received = time.monotonic()
+
+            with self.update_lock:
+                if uevent_monitor.handle_message(message, received=received) is not None:
+                    self.inventory.publish(self.collector.diskinfo, self.collector.errors)
+
+def scan(collector):
+    """
+    Private, implementation detail.
+
+    Scans everything with the given collector.Collector, without using any
+    cached results, and returns the disk info dictionary and errors.
+    """
+
+    return collector.get_info(), collector.errors
+
+def remove_stale_socket(socket_path):
+    """
+    Private, implementation detail.
+
+    Removes a socket left behind by a daemon that didn't exit cleanly.
+
+    Raises:
+        OSError, if the path exists and isn't a socket, or another daemon
+        is still listening on it.
+    """
+
+    try:
+        mode = os.lstat(socket_path).st_mode
+
+    except FileNotFoundError:
+        return
+
+    if not stat.S_ISSOCK(mode):
+        raise OSError(errno.EEXIST, "Not a socket", socket_path)
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        probe.connect(socket_path)
+
+    except OSError:
+        os.remove(socket_path)
+        return
+
+    finally:
+        probe.close()
+
+    raise OSError(errno.EADDRINUSE, "Another daemon is already running", socket_path)
+
+def serve(socket_path=None, rescan_interval=RESCAN_INTERVAL, group=None):
+    """
+    This function runs the daemon. It never returns.
+
+    Kwargs:
+        socket_path (str):          Where to listen. Default = SOCKET_PATH.
+        rescan_interval (float):    See RESCAN_INTERVAL.
+        group (str/int):            See Server. Default = None.
+
+    Raises:
+        OSError, if the socket couldn't be created.
+
+        LookupError, if the group doesn't exist.
+
+    Usage:
+
+    >>> serve()
+
+    OR:
+
+    >>> serve(socket_path=<aPath>)
+
+    OR:
+
+    >>> serve(group=<aGroupName>)
+    """
+
+    if socket_path is None:
+        socket_path = SOCKET_PATH
+
+    server = Server(socket_path, rescan_interval=rescan_interval, group=group)
+
+    try:
+        server.start()
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+    finally:
+        server.server_close()
+
+#-------------------- Client --------------------
+class Client:
+    """
+    Queries a running daemon. The connection is opened when the first
+    request is made, and reused for later requests.
+
+    Kwargs:
+        socket_path (str):  Where the daemon listens. Default = SOCKET_PATH.
+        timeout (float):    How long to wait for the daemon, in seconds.
+                            Default = 5.
+
+    Raises (from each request):
+        OSError, if the daemon couldn't be reached.
+
+        ValueError, if the response was invalid, or the daemon reported
+        an error (eg an unknown device).
+
+    Usage:
+
+    >>> with Client() as client:
+    >>>     disk_info = client.snapshot()
+    >>>     sda = client.device("/dev/sda")
+    """
+
+    def __init__(self, socket_path=None, timeout=5):
+        self.socket_path = socket_path if socket_path is not None else SOCKET_PATH
+        self.timeout = timeout
+        self.sock = None
+        self.rfile = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Closes the connection."""
+        if self.sock is not None:
+            self.rfile.close()
+            self.sock.close()
+            self.sock = None
+            self.rfile = None
+
+    def request(self, request):
+        """
+        Sends a request (see the module docstring), and returns the response.
+        """
+
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(self.timeout)
+
+            try:
+                self.sock.connect(self.socket_path)
+
+            except OSError:
+                self.sock.close()
+                self.sock = None
+                raise
+
+            self.rfile = self.sock.makefile("rb")
+
+        try:
+            self.sock.sendall(encode_message(request))
+            response = read_message(self.rfile, MAX_RESPONSE_SIZE)
+
+        except (OSError, ValueError):
+            self.close()
+            raise
+
+        if response is None:
+            self.close()
+            raise ValueError("The daemon closed the connection")
+
+        if "Error" in response:
+            raise ValueError(response["Error"])
+
+        return response
+
+    def snapshot(self):
+        """Returns the disk info dictionary."""
+        return self.request({"Request": "snapshot"})["DiskInfo"]
+
+    def device(self, name):
+        """Returns the information for one device."""
+        return self.request({"Request": "device", "Name": name})["Device"]
+
+    def fields(self, fields, devices=None):
+        """
+        Returns a disk info dictionary with only the given fields, for the
+        given devices (or all of them).
+        """
+
+        request = {"Request": "fields", "Fields": list(fields)}
+
+        if devices is not None:
+            request["Devices"] = list(devices)
+
+        return self.request(request)["DiskInfo"]
+
+    def changes(self, since):
+        """Returns the changes since a generation (see the module docstring)."""
+        return self.request({"Request": "changes", "Since": since})
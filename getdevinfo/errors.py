@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Error Records For The Device Information Obtainer
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is the part of the package that keeps the errors from a scan.
+
+Each platform module's ERRORS is an ErrorStore, which is replaced with a
+new, empty one at the start of each scan, and only keeps the most recent
+errors (see DEFAULT_LIMIT), so long-running programs (eg ones using
+monitor.py) don't keep every error forever.
+
+Each error is an ErrorRecord. These are strings, the same as the errors
+always were (eg "linux.get_info(): Exception: ... while running lshw\\n"),
+so code that treats them as strings still works, but they also have:
+
+    - function  - The function that reported it, eg "linux.get_info".
+    - message   - The rest of the error, without the newline.
+    - stage     - The stage that was running (see linux.run_stages()),
+                  or None.
+    - device    - The device it is about, or None.
+    - command   - The command that failed, or None.
+    - exit_code - The command's exit code, or None if it couldn't be
+                  started, or there was no command.
+
+For example:
+
+>>> for error in linux.ERRORS:
+>>>     if error.device is not None:
+>>>         print(error.device, error.message)
+
+.. module: errors.py
+    :platform: Linux, macOS, Cygwin
+    :synopsis: Structured, bounded error records for GetDevInfo.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <support@hamishmb.com>
+
+"""
+
+import time
+import threading
+import contextlib
+import collections
+import collections.abc
+
+#How many errors a store keeps by default. The oldest are dropped first.
+DEFAULT_LIMIT = 1000
+
+#The stage each thread is running, if any (see in_stage()).
+STAGE = threading.local()
+
+class ErrorRecord(str):
+    """
+    An error. It is the same string errors have always been, with the
+    details of the error as attributes (see the top of this module).
+
+    Args:
+        text (str):             The error, eg "linux.get_info(): No disks found!\\n".
+
+    Kwargs:
+        device (str):           The device it is about. Default = None.
+        command (list):         The command that failed. Default = None.
+        exit_code (int):        The command's exit code. Default = None.
+        stage (str):            The stage that was running. Default = the
+                                one this thread is running (see in_stage()).
+
+    Usage:
+
+    >>> ERRORS.append(ErrorRecord(<anError>, device=<aDiskName>))
+    """
+
+    def __new__(cls, text, device=None, command=None, exit_code=None, stage=None):
+        record = super().__new__(cls, text)
+
+        if "(): " in text:
+            record.function, record.message = text.split("(): ", 1)
+
+        else:
+            record.function, record.message = (None, text)
+
+        record.message = record.message.rstrip("\n")
+        record.stage = stage if stage is not None else getattr(STAGE, "name", None)
+        record.device = device
+        record.command = list(command) if command is not None else None
+        record.exit_code = exit_code
+        record.time = time.time()
+
+        return record
+
+    def as_dict(self):
+        """Returns the details of the error as a dictionary, eg for saving as JSON."""
+        return {"Function": self.function, "Message": self.message, "Stage": self.stage,
+                "Device": self.device, "Command": self.command, "ExitCode": self.exit_code,
+                "Time": self.time}
+
+    def __reduce__(self):
+        return (ErrorRecord, (str(self), self.device, self.command, self.exit_code, self.stage))
+
+class ErrorStore(collections.abc.Sequence):
+    """
+    The errors from a scan. It works like a list of ErrorRecords, but only
+    keeps the most recent limit errors; dropped says how many older ones
+    were thrown away. It is safe to share between threads.
+
+    Plain strings added to it are turned into ErrorRecords.
+
+    Kwargs:
+        limit (int):    How many errors to keep. Default = DEFAULT_LIMIT.
+
+    Usage:
+
+    >>> store = ErrorStore()
+    >>> store.append(<anError>)
+    """
+
+    def __init__(self, limit=DEFAULT_LIMIT):
+        self.records = collections.deque(maxlen=limit)
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def append(self, error):
+        """Adds an error (an ErrorRecord, or a string), dropping the oldest if the store is full."""
+        if not isinstance(error, ErrorRecord):
+            error = ErrorRecord(error)
+
+        with self.lock:
+            if len(self.records) == self.records.maxlen:
+                self.dropped += 1
+
+            self.records.append(error)
+
+    def extend(self, errors):
+        """Adds several errors. See append()."""
+        for error in errors:
+            self.append(error)
+
+    def clear(self):
+        """Throws away all of the errors."""
+        with self.lock:
+            self.records.clear()
+            self.dropped = 0
+
+    def as_dicts(self):
+        """Returns the details of each error, as ErrorRecord.as_dict() does."""
+        return [error.as_dict() for error in self]
+
+    def __getitem__(self, index):
+        with self.lock:
+            return list(self.records)[index]
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.records))
+
+    def __eq__(self, other):
+        if isinstance(other, (ErrorStore, list)):
+            return list(self) == list(other)
+
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+
+        if result is NotImplemented:
+            return result
+
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "ErrorStore("+repr(list(self))+")"
+
+@contextlib.contextmanager
+def in_stage(name):
+    """
+    This function records that the code in a with block is running the
+    named stage, so errors reported by it say so.
+
+    Usage:
+
+    >>> with in_stage(<aStageName>):
+    >>>     <run the stage>
+    """
+
+    previous = getattr(STAGE, "name", None)
+    STAGE.name = name
+
+    try:
+        yield
+
+    finally:
+        STAGE.name = previous
@@ -51,20 +51,103 @@ disk information as a dictionary.
 
 import platform
 import sys
+import argparse
+import json
+import threading
+import queue
+import collections
+
+from . import cache
+from . import projection
+from . import records
+from . import report
+from . import snapshot
+from .collector import Collector
 
 #Declare version; useful for users of the module.
 VERSION = "2.0.0"
 
-def get_info(name_main=False):
+#Results of recent scans. Set CACHE.ttl to change how long they're kept.
+CACHE = cache.ResultCache()
+
+#Scans that are queued or running, so callers at the same time can share them.
+FLIGHTS = cache.SingleFlight()
+
+#Where get_info() writes the errors from each scan (unless name_main is
+#True). Set this to None to not write them anywhere.
+ERRORS_PATH = "/tmp/getdevinfo.errors"
+
+#What iter_info() yields: each device, partition, and logical volume as
+#it is assembled, and then a summary of the whole scan.
+DeviceEvent = collections.namedtuple("DeviceEvent", ("name", "info"))
+Summary = collections.namedtuple("Summary", ("diskinfo", "errors", "report"))
+
+def get_info(name_main=False, use_cache=True, use_snapshot=False, fields=None, lazy=False,
+             timings=False, max_staleness=None):
     """
     This function is used to determine the platform you're using
     (Linux or macOS) and run the relevant tools. Then, it returns
     the disk information dictionary to the caller.
 
+    If the last scan was recent enough, and no devices or partitions have
+    been added, removed, or resized since, its results are returned
+    instead of scanning again (see cache.ResultCache). Each caller gets its
+    own copy of the results, so changing them doesn't change the cache, or
+    what other callers get.
+
+    With use_snapshot=True, the results are also saved to disk (see
+    snapshot.py), and later processes load them from there instead of
+    scanning, as long as the devices haven't changed. This is useful for
+    programs that run briefly and often.
+
+    If other threads call this while a scan is running, they wait for it
+    and get its results, instead of running their own scan, as long as
+    they asked for the same fields, and it is fresh enough for them (see
+    max_staleness). Only one scan runs at a time.
+
+    Kwargs:
+        use_cache (bool):       Whether to use the results of a recent
+                                scan (or the snapshot). The results of
+                                this scan are stored either way.
+                                Default = True.
+
+        use_snapshot (bool):    Whether to load and save a snapshot at
+                                snapshot.SNAPSHOT_PATH. Default = False.
+
+        fields (iterable):      Only collect these fields (see projection.py
+                                for the fields, and what each one costs).
+                                Work needed only for other fields is skipped.
+                                If all the fields are cached, they're copied
+                                from there instead. Partial results aren't
+                                cached. Default = None (all of them).
+
+        lazy (bool):            Leave the expensive fields (boot records, and
+                                file systems that need blkid) until they are
+                                first read, instead of reading them all
+                                during the scan (see lazy.py). Reading every
+                                field (eg saving a snapshot) still reads them
+                                all. Only has an effect on Linux.
+                                Default = False.
+
+        timings (bool):         Also return a report.ScanReport, saying how
+                                long each stage, command, and device took.
+                                Callers that share a scan share its report.
+                                Default = False.
+
+        max_staleness (float):  The oldest results (in seconds) that will
+                                do, from the cache or a scan that is already
+                                running. It can't be longer than CACHE.ttl.
+                                The snapshot isn't used if this is given, as
+                                its age isn't known. Default = None (use any
+                                results the cache has, and share any scan).
+
     Returns:
-        dict, the disk info dictionary.
+        dict, the disk info dictionary. If timings is True, a tuple of the
+        dictionary and the report.
 
     Raises:
+        ValueError, if any of the fields don't exist.
+
         Hopefully nothing, but if there is an unhandled error or
         bug elsewhere, there's a small chance it could propagate
         to here. If this concerns you, you can wrap this code in
@@ -78,61 +161,440 @@ def get_info(name_main=False):
     Usage:
 
     >>> disk_info = get_info()
+
+    OR:
+
+    >>> disk_info = get_info(use_cache=False)
+
+    OR:
+
+    >>> disk_info = get_info(use_snapshot=True)
+
+    OR:
+
+    >>> disk_info = get_info(fields={"Name", "Capacity", "UUID"})
+
+    OR:
+
+    >>> disk_info = get_info(lazy=True)
+
+    OR:
+
+    >>> disk_info, scan_report = get_info(timings=True)
+
+    OR:
+
+    >>> disk_info = get_info(max_staleness=<aNumberOfSeconds>)
+    """
+
+    fields = projection.normalise(fields)
+
+    #A scan that had already started when we were called is too old.
+    if not use_cache:
+        max_staleness = 0
+
+    cached, fingerprint = get_cached_result(use_cache, use_snapshot and max_staleness is None,
+                                            max_staleness)
+
+    if cached is not None:
+        return add_report(format_result(cached, name_main, fields),
+                          report.ScanReport(cached=True).finish(), timings)
+
+    def scan():
+        #Each scan has its own state, so it can't be disturbed by other scans.
+        scanner = Collector()
+        scanner.get_info(fields=fields, lazy=lazy)
+
+        return finish_scan(scanner, fingerprint, name_main, use_snapshot, fields,
+                           raw=True), scanner.report
+
+    result, scan_report = FLIGHTS.run((fields, lazy, use_snapshot), scan, max_age=max_staleness)
+
+    return add_report(format_result(result, name_main), scan_report, timings)
+
+def iter_info(name_main=False, use_cache=True, fields=None, lazy=False):
+    """
+    This function scans for disks like get_info(), but yields each device,
+    partition, and logical volume as soon as its entry is finished, so the
+    first results can be used (eg shown) while slow devices are still being
+    read. Once the scan has finished, a Summary is yielded, with the disk
+    info dictionary, the errors, and a report.ScanReport.
+
+    Each device is yielded as a DeviceEvent, with its name, and a copy of
+    its entry. Nothing later in the scan changes it, so it is the same as
+    the entry in the Summary. On Linux, each one is yielded as soon as it
+    has been found, or, if the partitioning or block size fields were
+    asked for, once those have been read for it.
+
+    If the cache has recent enough results (see get_info()), each device
+    in them is yielded straight away instead. Otherwise, the scan runs in
+    another thread, once any other scan has finished, and its results are
+    stored in the cache, as with get_info(). The snapshot isn't used.
+
+    .. note::
+        If you stop iterating early, the scan still runs to the end, in
+        the background.
+
+    Kwargs:
+        name_main (bool):   See get_info(). Default = False.
+        use_cache (bool):   See get_info(). Default = True.
+        fields (iterable):  See get_info(). Default = None (all of them).
+        lazy (bool):        See get_info(). Default = False.
+
+    Yields:
+        DeviceEvent, for each device, partition, and logical volume, and
+        then a Summary.
+
+    Raises:
+        ValueError, if any of the fields don't exist.
+
+        The same as the platform module's get_info() (eg RuntimeError, if
+        no disks were found), after the devices that were found have been
+        yielded.
+
+    Usage:
+
+    >>> for event in iter_info():
+    >>>     if isinstance(event, DeviceEvent):
+    >>>         <show event.info>
+
+    OR:
+
+    >>> for event in iter_info(fields={"Name", "Capacity"}):
+    >>>     <do something>
+    """
+
+    fields = projection.normalise(fields)
+    cached, fingerprint = get_cached_result(use_cache, False)
+
+    if cached is not None:
+        diskinfo, errors = cached
+        diskinfo = projection.project_copy(diskinfo, fields)
+
+        for name, info in diskinfo.items():
+            yield DeviceEvent(name, info)
+
+        yield Summary(diskinfo, errors, report.ScanReport(cached=True).finish())
+        return
+
+    events = queue.Queue()
+    outcome = []
+
+    def on_ready(name, info):
+        #Copy it now, so the caller can't change what's cached.
+        events.put(DeviceEvent(name, projection.project_copy({name: info}, fields)[name]))
+
+    def scan():
+        scanner = Collector()
+        scanner.listener = on_ready
+        scanner.get_info(fields=fields, lazy=lazy)
+
+        return finish_scan(scanner, fingerprint, name_main, False, fields,
+                           raw=True), scanner.report
+
+    def run_scan():
+        try:
+            #Never shared, as the devices are only yielded to this caller.
+            outcome.append(FLIGHTS.run(object(), scan))
+
+        except Exception as err: #pylint: disable=broad-except
+            outcome.append(err)
+
+        finally:
+            events.put(None)
+
+    threading.Thread(target=run_scan, daemon=True).start()
+
+    event = events.get()
+
+    while event is not None:
+        yield event
+        event = events.get()
+
+    if isinstance(outcome[0], Exception):
+        raise outcome[0]
+
+    (diskinfo, errors), scan_report = outcome[0]
+    yield Summary(projection.project_copy(diskinfo, None), list(errors), scan_report)
+
+def get_records(use_cache=True, use_snapshot=False, fields=None):
+    """
+    This function is like get_info(), but returns compact records instead
+    of dictionaries (see records.py), which use much less memory on systems
+    with a lot of devices. Use records.InventoryView() for code that
+    expects the disk info dictionary.
+
+    .. note::
+        The cache keeps the dictionaries they were made from for
+        CACHE.ttl seconds. Call invalidate() to free them sooner.
+
+    Kwargs:
+        use_cache (bool):       See get_info(). Default = True.
+        use_snapshot (bool):    See get_info(). Default = False.
+        fields (iterable):      See get_info(). Default = None (all of them).
+
+    Returns:
+        dict. A records.DeviceRecord for each device, keyed by device name.
+
+    Raises:
+        The same as get_info().
+
+    Usage:
+
+    >>> records = get_records()
+
+    OR:
+
+    >>> records = get_records(fields={"Name", "Capacity"})
+    """
+
+    return records.from_diskinfo(get_info(use_cache=use_cache, use_snapshot=use_snapshot,
+                                          fields=fields))
+
+def get_devices(disks, fields=None):
+    """
+    This function gets the information for some devices, without scanning
+    the whole system, which is much faster when only a few devices are
+    needed (eg after one was plugged in). On Linux and macOS, the devices'
+    partitions (and, on Linux, the logical volumes on them) are included,
+    and a partition or logical volume can be given instead of its device.
+
+    The cache isn't used, and the results aren't stored in it. Like
+    iter_info(), it waits for any scan that is already running, but
+    never shares one.
+
+    Args:
+        disks (list):       The devices, eg ["/dev/sda", "/dev/sdb"].
+
+    Kwargs:
+        fields (iterable):  See get_info(). Default = None (all of them).
+
+    Returns:
+        dict, the disk info dictionary, with only these devices in it.
+        Devices that couldn't be found are left out.
+
+    Raises:
+        ValueError, if any of the fields don't exist.
+
+    Usage:
+
+    >>> disk_info = get_devices([<aDiskName>, <anotherDiskName>])
+
+    OR:
+
+    >>> disk_info = get_devices([<aDiskName>], fields={"Name", "Capacity"})
+    """
+
+    def scan():
+        return Collector().get_devices(disks, fields=fields)
+
+    #Never shared, as other callers want other devices.
+    return FLIGHTS.run(object(), scan)
+
+def get_device(disk, fields=None):
+    """
+    This function gets the information for one device. See get_devices().
+
+    Usage:
+
+    >>> disk_info = get_device(<aDiskName>)
+    """
+
+    return get_devices([disk], fields=fields)
+
+def get_cached_result(use_cache, use_snapshot, max_age=None):
+    """
+    Private, implementation detail.
+
+    This function finds the results of a recent scan, if they can be used,
+    in the cache or the snapshot.
+
+    Args:
+        use_cache (bool):       See get_info().
+        use_snapshot (bool):    See get_info().
+
+    Kwargs:
+        max_age (float):        See get_info()'s max_staleness.
+                                Default = None.
+
+    Returns:
+        tuple (tuple/None, string/None). The cached disk info dictionary and
+        errors (or None if there wasn't a usable result), and the fingerprint
+        to store the results of a new scan with.
     """
 
-    #Determine if running on Linux or Mac.
-    if platform.system() == 'Linux':
-        is_linux = True
-        is_cygwin = False
+    if use_cache:
+        cached = CACHE.get(max_age=max_age)
+
+        if cached is not None:
+            return cached, None
 
-    elif "CYGWIN" in platform.system():
-        is_linux = True
-        is_cygwin = True
+    #Take the fingerprint first, so changes during the scan aren't missed.
+    fingerprint = CACHE.fingerprint()
 
-    elif platform.system() == "Darwin":
-        is_linux = False
-        is_cygwin = False
+    if use_cache and use_snapshot:
+        loaded = snapshot.load(fingerprint)
 
-    #Used to temporarily hold errors.
-    temp_errors = []
+        if loaded is not None:
+            CACHE.store(loaded, fingerprint=fingerprint)
+            return loaded, fingerprint
 
-    if is_linux and not is_cygwin:
-        from . import linux
-        get_info_platform = linux.get_info
+    return None, fingerprint
 
-    elif is_cygwin:
+def get_platform_module():
+    """
+    Private, implementation detail.
+
+    This function imports and returns the module for the platform we're
+    running on (linux, cygwin, or macos).
+    """
+
+    if "CYGWIN" in platform.system():
         from . import cygwin
-        get_info_platform = cygwin.get_info
+        return cygwin
 
-    else:
+    if platform.system() == "Darwin":
         from . import macos
-        get_info_platform = macos.get_info
+        return macos
+
+    from . import linux
+    return linux
 
-    get_info_platform()
+def finish_scan(scanner, fingerprint, name_main, use_snapshot, fields=None, raw=False):
+    """
+    Private, implementation detail.
 
-    if is_linux and not is_cygwin:
-        diskinfo = linux.DISKINFO
-        errors = linux.ERRORS
+    This function stores the results of a scan in the cache (and the
+    snapshot, if asked), and returns them the way get_info() does.
 
-    elif is_cygwin:
-        diskinfo = cygwin.DISKINFO
-        errors = cygwin.ERRORS
+    Args:
+        scanner (Collector):        The collector that did the scan.
+        fingerprint (str/None):     The fingerprint from before the scan.
+        name_main (bool):           See get_info().
+        use_snapshot (bool):        See get_info().
 
-    else:
-        diskinfo = macos.DISKINFO
-        errors = macos.ERRORS
+    Kwargs:
+        fields (frozenset):         From projection.normalise(). Results
+                                    with only some fields aren't stored.
+                                    Default = None.
+
+        raw (bool):                 Return the disk info dictionary and
+                                    errors as a tuple, whatever name_main
+                                    is. Default = False.
+    """
 
-    if temp_errors:
-        for error in temp_errors:
-            errors.append(error)
+    diskinfo = scanner.diskinfo
+    errors = scanner.errors
 
-    if name_main is False:
-        with open("/tmp/getdevinfo.errors", "w", encoding="utf-8") as errors_file:
+    #Results with only some of the fields can't be reused.
+    if fields is None:
+        #Without a fingerprint, a snapshot could never be loaded.
+        if use_snapshot and fingerprint is not None:
+            try:
+                snapshot.save(diskinfo, list(errors), fingerprint)
+
+            except (OSError, TypeError, ValueError) as err:
+                errors.append("getdevinfo.get_info(): Couldn't save snapshot: "+str(err)+"\n")
+
+        CACHE.store((diskinfo, list(errors)), fingerprint=fingerprint)
+
+    if name_main is False and ERRORS_PATH is not None:
+        with open(ERRORS_PATH, "w", encoding="utf-8") as errors_file:
             errors_file.writelines(errors)
 
+    if raw:
+        return (diskinfo, errors)
+
+    return format_result((diskinfo, errors), name_main)
+
+def format_result(result, name_main, fields=None):
+    """
+    Private, implementation detail.
+
+    Returns a copy of the disk info dictionary, or of the disk info
+    dictionary and errors if name_main is True, so the caller can't change
+    the cached results. If only some fields were asked for, the copy only
+    has those.
+    """
+
+    diskinfo, errors = result
+    diskinfo = projection.project_copy(diskinfo, fields)
+
+    if name_main is False:
         return diskinfo
 
-    return diskinfo, errors
+    return diskinfo, list(errors)
+
+def add_report(result, scan_report, timings):
+    """
+    Private, implementation detail.
+
+    Adds the report to the end of what get_info() returns, if timings is
+    True.
+    """
+
+    if not timings:
+        return result
+
+    if isinstance(result, tuple):
+        return result + (scan_report,)
+
+    return (result, scan_report)
+
+def monitor(callback=None):
+    """
+    This function collects the disk information, and then keeps it up to
+    date as devices are added, removed, and changed, by listening for the
+    uevents from udev (see monitor.Monitor). It never returns.
+
+    Only Linux is supported.
+
+    Kwargs:
+        callback (function):    Called with the disk info dictionary, and
+                                a dictionary describing each update
+                                (including how long it took). Default = None.
+
+    Raises:
+        NotImplementedError, if not running on Linux.
+
+        OSError, if the uevent socket couldn't be opened or read.
+
+    Usage:
+
+    >>> monitor()
+
+    OR:
+
+    >>> monitor(callback=<aFunction>)
+    """
+
+    if platform.system() != "Linux":
+        raise NotImplementedError("Monitoring is only supported on Linux")
+
+    from . import monitor as uevent_monitor
+
+    #Updates are made to this scan's disk info dictionary.
+    scanner = Collector()
+    scanner.get_info()
+
+    def on_update(update):
+        if callback is not None:
+            callback(scanner.diskinfo, update)
+
+    uevent_monitor.Monitor(callback=on_update, collector=scanner).run()
+
+def invalidate():
+    """
+    This function throws away the results of the last scan, so the next
+    call to get_info() scans again. Use it after changing something the
+    cache doesn't notice by itself, eg reformatting a partition.
+
+    Usage:
+
+    >>> invalidate()
+    """
+
+    CACHE.invalidate()
 
 #For development only.
 def run():
@@ -143,19 +605,132 @@ def run():
     #Run with python -m from outside package.
     # eg:
     #   python3 -m getdevinfo
-    disk_info, errors = get_info(name_main=True)
+    #   python3 -m getdevinfo --timings
+    #   python3 -m getdevinfo --format ndjson --fields Name,Capacity,UUID
+    #   python3 -m getdevinfo --format json --device /dev/sda
+    #   python3 -m getdevinfo --serve
+    parser = argparse.ArgumentParser(prog="getdevinfo",
+                                     description="Gathers information about disks.")
+
+    parser.add_argument("--timings", action="store_true",
+                        help="Show how long each stage, command, and device took.")
+
+    parser.add_argument("--format", choices=("text", "ndjson", "json"), default="text",
+                        help="How to print the information. ndjson prints each device as a "
+                             + "JSON object on its own line, as soon as its information has "
+                             + "all been gathered. json prints the same information as one "
+                             + "object, keyed by device name, at the end. Errors (and "
+                             + "timings) go to stderr. Default: text.")
+
+    parser.add_argument("--fields", default=None,
+                        help="Only collect these fields, separated by commas, eg "
+                             + "Name,Capacity,UUID. Default: all of them.")
+
+    parser.add_argument("--device", action="append", default=None, dest="devices",
+                        help="Only get the information for this device (and its partitions). "
+                             + "Can be given more than once.")
+
+    parser.add_argument("--serve", action="store_true",
+                        help="Run as a daemon, answering queries over a Unix socket.")
+
+    parser.add_argument("--socket", default=None,
+                        help="The socket the daemon listens on. Default: /run/getdevinfo.sock.")
+
+    parser.add_argument("--socket-group", default=None,
+                        help="The group whose members can query the daemon. Default: the "
+                             + "daemon's own group.")
+
+    args = parser.parse_args()
+
+    if args.serve:
+        from . import daemon
+        daemon.serve(socket_path=args.socket, group=args.socket_group)
+        return
+
+    fields = None
+
+    if args.fields is not None:
+        fields = [field.strip() for field in args.fields.split(",") if field.strip()]
+
+    try:
+        fields = projection.normalise(fields)
+
+    except ValueError as err:
+        parser.error(str(err))
+
+    if args.devices:
+        #Only the named devices are probed. There's no scan to stream.
+        scanner = Collector()
+        disk_info = scanner.get_devices(args.devices, fields=fields)
+        errors = scanner.errors
+        events = [DeviceEvent(name, info) for name, info in disk_info.items()]
+        events.append(Summary(disk_info, errors, scanner.report))
+
+    else:
+        events = iter_info(name_main=True, fields=fields)
+
+    if args.format == "text":
+        print_text(events, args.timings)
+
+    else:
+        print_json(events, args.format, args.timings)
+
+def print_text(events, timings):
+    """
+    Private, implementation detail.
+
+    Prints the results from iter_info() (or the same for some devices) in
+    a (semi :D) readable way, and exits with status 1 if there were errors.
+    """
+
+    summary = list(events)[-1]
+    disk_info = summary.diskinfo
 
-    #Print the info in a (semi :D) readable way.
     keys = list(disk_info)
     keys.sort()
 
     for key in keys:
         print("\n\n", disk_info[key], "\n\n")
 
+    if timings:
+        print("Timings:\n")
+        print(summary.report.format())
+
     #Print out any errors, if there are any.
-    if errors:
+    if summary.errors:
         print("Errors encountered:")
-        for error in errors:
+        for error in summary.errors:
             print("\n\n", error, "\n\n")
 
         sys.exit(1)
+
+def print_json(events, output_format, timings):
+    """
+    Private, implementation detail.
+
+    Prints the results from iter_info() (or the same for some devices) as
+    JSON: each device on its own line as soon as it is finished if
+    output_format is "ndjson", or one object at the end if it is "json". Bytes are stored
+    as base64, as in snapshots. Errors (and the timings, if asked for) are
+    printed to stderr, as JSON, one per line, and the exit status is 1 if
+    there were any errors.
+    """
+
+    for event in events:
+        if isinstance(event, Summary):
+            summary = event
+
+        elif output_format == "ndjson":
+            print(json.dumps(event.info, default=snapshot.encode_bytes), flush=True)
+
+    if output_format == "json":
+        print(json.dumps(summary.diskinfo, default=snapshot.encode_bytes, sort_keys=True))
+
+    for error in summary.errors:
+        print(json.dumps(error.as_dict()), file=sys.stderr)
+
+    if timings:
+        print(json.dumps(summary.report.as_dict()), file=sys.stderr)
+
+    if summary.errors:
+        sys.exit(1)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Lazy Fields For The Device Information Obtainer
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is the part of the package that lets getdevinfo.get_info(lazy=True)
+leave the expensive fields (eg boot records, and file systems that need
+blkid) until something actually reads them.
+
+Each device's entry in the disk info dictionary is then a LazyDict, which
+works like a normal dictionary, except that some of its values are
+Deferred until they are first read. A Deferred value is worked out once,
+and the result is kept, so reading it again (or from a copy) is free.
+
+Anything that reads every value (eg items(), values(), ==, json.dumps(),
+copy.deepcopy() and pickle) works them all out first, and gets normal
+values. copy.deepcopy() and pickle give normal dictionaries.
+
+.. module: lazy.py
+    :platform: Linux
+    :synopsis: Lazily-computed fields for GetDevInfo.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <support@hamishmb.com>
+
+"""
+
+import threading
+
+class Deferred:
+    """
+    A value that is worked out by calling a function the first time it is
+    needed. It is safe to share between threads; the function is only
+    called once.
+
+    Args:
+        function (function):    Works out the value.
+        *args:                  Passed to the function.
+
+    Usage:
+
+    >>> value = Deferred(<aFunction>, <anArgument>)
+    >>> value.get()
+    """
+
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+        self.lock = threading.Lock()
+        self.done = False
+        self.value = None
+
+    def get(self):
+        """Returns the value, working it out if that hasn't been done yet."""
+        with self.lock:
+            if not self.done:
+                self.value = self.function(*self.args)
+                self.done = True
+
+                #Let the arguments be garbage collected.
+                self.function = self.args = None
+
+            return self.value
+
+class Item(Deferred):
+    """
+    One item of a tuple returned by a Deferred, so functions that work out
+    several fields at once (eg the boot record and its strings) only do
+    it once. See split().
+    """
+
+    def __init__(self, deferred, index):
+        super().__init__(lambda: deferred.get()[index])
+
+def split(deferred, count):
+    """
+    This function splits a Deferred that returns a tuple into one Deferred
+    for each item, so it can be unpacked like the tuple.
+
+    Args:
+        deferred (Deferred):    Returns a tuple.
+        count (int):            How many items the tuple has.
+
+    Returns:
+        tuple. A Deferred for each item.
+
+    Usage:
+
+    >>> boot_record, boot_record_strings = split(Deferred(<aFunction>, <aDisk>), 2)
+    """
+
+    return tuple(Item(deferred, index) for index in range(count))
+
+def resolve(value):
+    """
+    Private, implementation detail.
+
+    Returns the value a Deferred stands for, or value itself if it isn't one.
+    """
+
+    if isinstance(value, Deferred):
+        return value.get()
+
+    return value
+
+class LazyDict(dict):
+    """
+    A dictionary where some of the values can be Deferred. They are
+    worked out the first time they are read, and then kept.
+
+    Usage:
+
+    >>> info = LazyDict()
+    >>> info["BootRecord"] = Deferred(<aFunction>, <aDisk>)
+    >>> info["BootRecord"]
+    """
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+
+        if isinstance(value, Deferred):
+            value = value.get()
+            dict.__setitem__(self, key, value)
+
+        return value
+
+    def __iter__(self):
+        #Overriding this stops dict() and {**info} copying the Deferred
+        #values directly.
+        return dict.__iter__(self)
+
+    def __eq__(self, other):
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def __reduce__(self):
+        #Copies and pickles are normal dictionaries.
+        return (dict, (dict(self.items()),))
+
+    def is_deferred(self, key):
+        """Returns True if the value of key hasn't been worked out yet."""
+        return isinstance(dict.get(self, key), Deferred)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+
+        return default
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+
+        self[key] = default
+        return default
+
+    def pop(self, key, *default):
+        return resolve(dict.pop(self, key, *default))
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        return key, resolve(value)
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def copy(self):
+        """
+        Returns a shallow copy. Values that haven't been worked out yet are
+        shared with the copy, so they are still only worked out once.
+        """
+
+        return self.subset(self)
+
+    def subset(self, keys):
+        """
+        Returns a copy with only the given keys (if they are present),
+        without working out any values.
+
+        Args:
+            keys (iterable):    The keys to keep.
+        """
+
+        copy = LazyDict()
+
+        for key in keys:
+            if key in self:
+                dict.__setitem__(copy, key, dict.__getitem__(self, key))
+
+        return copy
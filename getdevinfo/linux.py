@@ -46,161 +46,1358 @@ module, but you can call it directly if you like.
 """
 
 import subprocess
+import sys
 import os
 import json
-import bs4
-from bs4 import BeautifulSoup
+import fcntl
+import struct
+import concurrent.futures
+import xml.etree.ElementTree as ElementTree
+
+from . import bootrecord
+from . import errors
+from . import lazy
+from . import partitiontable
+from . import projection
+from . import report
+from . import superblock
+from .collector import Collector
+
+#The state of the scans run by get_info() and get_devices(). Scans with
+#other Collectors (see collector.py) can run at the same time.
+COLLECTOR = Collector(sys.modules[__name__])
+
+#The results of the last scan run by get_info() or get_devices().
+DISKINFO = None
+ERRORS = COLLECTOR.errors
+
+#Where the kernel lists block devices.
+SYSFS_BLOCK = "/sys/block"
+
+#The block size fields, where to find them in a device's queue folder in
+#sysfs, and the ioctls that get them if that doesn't work (see <linux/fs.h>).
+BLOCK_SIZE_SOURCES = (
+    ("LogicalBlockSize", "logical_block_size", 0x1268), #BLKSSZGET
+    ("PhysicalBlockSize", "physical_block_size", 0x127B), #BLKPBSZGET
+    ("MinimumIOSize", "minimum_io_size", 0x1278), #BLKIOMIN
+    ("OptimalIOSize", "optimal_io_size", 0x1279), #BLKIOOPT
+)
+
+#Where udev keeps the symlinks that give devices persistent names.
+DISK_LINKS_DIR = "/dev/disk"
+DISK_LINK_KINDS = ("by-uuid", "by-id", "by-label", "by-partuuid", "by-path")
+
+def get_info(backend="lshw", fields=None, lazy=False):
+    """
+    This function is the Linux-specific way of getting disk information.
+    It makes use of the lshw and lsblk commands to gather information,
+    and finds logical volumes using device-mapper's entries in sysfs.
+
+    Alternatively, the sysfs backend finds devices and partitions by
+    reading /sys/block directly, which is much faster and doesn't need lshw
+    or lsblk, but gives less detailed descriptions and flags.
+
+    The commands are run concurrently, and the output of each one is
+    processed as soon as everything that processing depends on is
+    available (see run_stages()). If one of the commands fails, the
+    information from the others is still collected.
+
+    It uses the other functions in this module to acheive its work, and
+    it **doesn't** return the disk infomation. Instead, it is left as a
+    global attribute in this module (DISKINFO).
+
+    The scan is run with COLLECTOR, so only one of these runs at a time.
+    Use a collector.Collector of your own to run a scan alongside it.
+
+    Kwargs:
+        backend (str):      How to find devices and partitions. Default = "lshw".
+
+            - "lshw"        - Use lshw, and lsblk for NVME disks.
+            - "sysfs"       - Read /sys/block.
+
+        fields (iterable):  The fields to collect (see projection.py). The
+                            work needed only for other fields is skipped.
+                            Default = None (all of them).
+
+        lazy (bool):        Leave the boot records and file systems until
+                            they are first read (see lazy.py). Errors from
+                            reading them are added to ERRORS then.
+                            Default = False.
+
+    ERRORS is replaced with a new errors.ErrorStore at the start of each scan.
+
+    Raises:
+        RuntimeError, if no disks were found at all. Other errors have a small
+        chance of propagation up to here here. Wrap it in a try:, except: block
+        if you are worried.
+
+        ValueError, if the backend isn't one of the above, or any of the
+        fields don't exist.
+
+    Usage:
+
+    >>> get_info()
+
+    OR:
+
+    >>> get_info(backend=<aBackend>)
+
+    OR:
+
+    >>> get_info(fields=<aSetOfFields>)
+
+    OR:
+
+    >>> get_info(lazy=True)
+    """
+
+    global DISKINFO
+    global ERRORS
+
+    try:
+        COLLECTOR.get_info(backend=backend, fields=fields, lazy=lazy)
+
+    finally:
+        DISKINFO = COLLECTOR.diskinfo
+        ERRORS = COLLECTOR.errors
+
+def collect_info(collector, backend="lshw", fields=None, lazy=False):
+    """
+    Private, implementation detail.
+
+    This function does the work of get_info(), leaving the results in the
+    given collector.Collector instead of this module's globals. Use
+    Collector.get_info() rather than calling this directly.
+
+    Args:
+        collector (Collector):  Where to keep the state of the scan.
+
+    Kwargs:
+        backend (str):          See get_info(). Default = "lshw".
+        fields (iterable):      See get_info(). Default = None.
+        lazy (bool):            See get_info(). Default = False.
+
+    Raises:
+        The same as get_info().
+
+    Usage:
+
+    >>> collect_info(<aCollector>)
+
+    OR:
+
+    >>> collect_info(<aCollector>, backend=<aBackend>, fields=<aSetOfFields>)
+    """
+
+    if backend not in ("lshw", "sysfs"):
+        raise ValueError("Unknown backend: "+str(backend))
+
+    env = os.environ.copy()
+    env["LC_ALL"] = "C"
+
+    collector.reset(projection.normalise(fields), lazy)
+    collector.backend = backend
+
+    commands, stages = get_commands_and_stages(backend, collector.fields, collector.lazy)
+    collector.stages = frozenset(stages)
+    run_stages(collector, commands, stages, env)
+
+    #Anything still waiting for a stage that failed is as finished as it will get.
+    device_ready(collector, *collector.diskinfo)
+    projection.project(collector.diskinfo, collector.fields)
+
+    #Check we found some disks.
+    if not collector.diskinfo:
+        collector.errors.append("linux.get_info(): No disks found!\n")
+        raise RuntimeError("No disks found!")
+
+def get_devices(disks, fields=None):
+    """
+    This function gets the information for some devices, without scanning
+    the whole system. Only the named devices (or the devices the named
+    partitions and logical volumes are on), their partitions, and the
+    logical volumes on them, are looked at, using sysfs like the sysfs
+    backend of get_info(). No commands are run.
+
+    Like get_info(), it leaves the information in DISKINFO, and the errors
+    in ERRORS, replacing anything there before.
+
+    Args:
+        disks (list):       The devices, partitions, or logical volumes,
+                            eg ["/dev/sda", "/dev/mapper/fedora-root"].
+
+    Kwargs:
+        fields (iterable):  See get_info(). Default = None (all of them).
+
+    Returns:
+        dict. The disk info dictionary. Anything that couldn't be found is
+        reported in ERRORS.
+
+    Raises:
+        ValueError, if any of the fields don't exist.
+
+    Usage:
+
+    >>> disk_info = get_devices([<aDiskName>, <anotherDiskName>])
+
+    OR:
+
+    >>> disk_info = get_devices([<aDiskName>], fields=<aSetOfFields>)
+    """
+
+    global DISKINFO
+    global ERRORS
+
+    try:
+        return COLLECTOR.get_devices(disks, fields=fields)
+
+    finally:
+        DISKINFO = COLLECTOR.diskinfo
+        ERRORS = COLLECTOR.errors
+
+def collect_devices(collector, disks, fields=None):
+    """
+    Private, implementation detail.
+
+    This function does the work of get_devices(), leaving the results in
+    the given collector.Collector instead of this module's globals. Use
+    Collector.get_devices() rather than calling this directly.
+
+    Args:
+        collector (Collector):  Where to keep the state of the scan.
+        disks (list):           See get_devices().
+
+    Kwargs:
+        fields (iterable):      See get_info(). Default = None.
+
+    Returns:
+        dict. The disk info dictionary.
+
+    Usage:
+
+    >>> disk_info = collect_devices(<aCollector>, [<aDiskName>])
+    """
+
+    collector.reset(projection.normalise(fields))
+    collector.backend = "sysfs"
+
+    if projection.wants(collector.fields, "UUID", "ID"):
+        collector.disklinks = get_disk_links()
+
+    try:
+        names = sorted(os.listdir(SYSFS_BLOCK))
+
+    except OSError as err:
+        collector.errors.append("linux.get_devices(): Exception: "+str(err)+" while reading "
+                                + SYSFS_BLOCK+"\n")
+        return collector.diskinfo
+
+    dm_names = {}
+
+    for name in names:
+        if name.startswith("dm-"):
+            dm_names[name] = read_sysfs_attribute(os.path.join(SYSFS_BLOCK, name, "dm", "name"))
+
+    #Find the devices to probe, and any logical volumes that were asked for.
+    hosts = []
+    volumes = set()
+
+    for disk in disks:
+        name = find_sysfs_name(disk, names, dm_names)
+
+        if name is None:
+            collector.errors.append(errors.ErrorRecord("linux.get_devices(): Couldn't find "+disk
+                                                       + " in "+SYSFS_BLOCK+"\n", device=disk))
+            continue
+
+        if name.startswith("dm-"):
+            volumes.add(name)
+
+        for host in get_sysfs_hosts(name, names):
+            if host not in hosts:
+                hosts.append(host)
+
+    for host in hosts:
+        host_disk = get_sysfs_device_info(collector, host)
+
+        if projection.wants(collector.fields, "Partitioning", *partitiontable.GEOMETRY_FIELDS):
+            get_partition_table_info(collector, host_disk)
+
+    #The logical volumes on anything we just looked at.
+    probed = set(disk[5:].replace("/", "!") for disk in collector.diskinfo)
+
+    for name in sorted(dm_names):
+        if dm_names[name] is None:
+            continue
+
+        if name in volumes or probed.intersection(get_sysfs_slaves(name)):
+            get_dm_lv_info(collector, name, dm_names)
+
+    if projection.wants(collector.fields, *projection.OPTIONAL_FIELDS):
+        add_block_sizes(collector, list(collector.diskinfo))
+
+    projection.project(collector.diskinfo, collector.fields)
+
+    return collector.diskinfo
+
+def get_device(disk, fields=None):
+    """
+    This function gets the information for a device, its partitions, and
+    the logical volumes on it. See get_devices().
+
+    Usage:
+
+    >>> disk_info = get_device(<aDiskName>)
+    """
+
+    return get_devices([disk], fields=fields)
+
+def find_sysfs_name(disk, names, dm_names):
+    """
+    Private, implementation detail.
+
+    This function finds the kernel's name for a device, partition, or
+    device-mapper device.
+
+    Args:
+        disk (str):         The device, eg /dev/sda1, or /dev/mapper/fedora-root.
+        names (list):       The names in /sys/block.
+        dm_names (dict):    The device-mapper name of each dm device,
+                            keyed by kernel name.
+
+    Returns:
+        string/None. The kernel's name, eg sda1, or None if it couldn't be found.
+
+    Usage:
+
+    >>> name = find_sysfs_name(<aDiskName>, <aList>, <aDict>)
+    """
+
+    #Symlinks (eg /dev/disk/by-uuid/*, /dev/mapper/*) point to the real device.
+    disk = os.path.realpath(disk)
+
+    if disk.startswith("/dev/mapper/"):
+        for name, dm_name in dm_names.items():
+            if dm_name == disk[12:]:
+                return name
+
+        return None
+
+    if not disk.startswith("/dev/"):
+        return None
+
+    #Some names have / replaced with ! eg cciss!c0d0.
+    name = disk[5:].replace("/", "!")
+
+    if name in names:
+        return name
+
+    for host in names:
+        if os.path.isdir(os.path.join(SYSFS_BLOCK, host, name)) \
+            and read_sysfs_attribute(os.path.join(SYSFS_BLOCK, host, name, "partition")) is not None:
+
+            return name
+
+    return None
+
+def get_sysfs_hosts(name, names):
+    """
+    Private, implementation detail.
+
+    This function finds the devices (whole disks) under a device, partition,
+    or device-mapper device.
+
+    Args:
+        name (str):     The kernel's name for it, eg sda1.
+        names (list):   The names in /sys/block.
+
+    Returns:
+        list. The kernel's names for the devices.
+
+    Usage:
+
+    >>> hosts = get_sysfs_hosts(<aKernelName>, <aList>)
+    """
+
+    if not name.startswith("dm-"):
+        if name in names:
+            return [name]
+
+        for host in names:
+            if os.path.isdir(os.path.join(SYSFS_BLOCK, host, name)):
+                return [host]
+
+        return []
+
+    hosts = []
+
+    for slave in get_sysfs_slaves(name):
+        for host in get_sysfs_hosts(slave, names):
+            if host not in hosts:
+                hosts.append(host)
+
+    return hosts
+
+def get_sysfs_partitions(name):
+    """
+    Private, implementation detail.
+
+    This function finds the partitions on a device in sysfs.
+
+    Args:
+        name (str):     The kernel's name for the device, eg sda.
+
+    Returns:
+        list. The kernel's names for the partitions, in order of partition
+        number.
+
+    Usage:
+
+    >>> partitions = get_sysfs_partitions(<aKernelName>)
+    """
+
+    sysfs_dir = os.path.join(SYSFS_BLOCK, name)
+
+    #Partitions are the subfolders with a partition number in them.
+    partitions = []
+
+    try:
+        children = os.listdir(sysfs_dir)
+
+    except OSError:
+        children = []
+
+    for child in children:
+        number = read_sysfs_attribute(os.path.join(sysfs_dir, child, "partition"))
+
+        if number is not None and number.isdigit():
+            partitions.append((int(number), child))
+
+    return [child for _number, child in sorted(partitions)]
+
+def get_sysfs_slaves(name, seen=None):
+    """
+    Private, implementation detail.
+
+    This function finds everything a device-mapper device is on, following
+    stacked dm devices (eg an LV in a LUKS container) all the way down.
+
+    Args:
+        name (str):     The kernel's name for it, eg dm-0.
+
+    Kwargs:
+        seen (set):     Used when following dm devices. Default = None.
+
+    Returns:
+        set. The kernel's names for the devices and partitions it is on.
+
+    Usage:
+
+    >>> slaves = get_sysfs_slaves(<aKernelName>)
+    """
+
+    if seen is None:
+        seen = set()
+
+    try:
+        slaves = os.listdir(os.path.join(SYSFS_BLOCK, name, "slaves"))
+
+    except OSError:
+        return set()
+
+    result = set()
+
+    for slave in slaves:
+        if slave in seen:
+            continue
+
+        seen.add(slave)
+
+        if slave.startswith("dm-"):
+            result.update(get_sysfs_slaves(slave, seen))
+
+        else:
+            result.add(slave)
+
+    return result
+
+def get_commands_and_stages(backend="lshw", fields=None, lazy=False):
+    """
+    Private, implementation detail.
+
+    This function returns the commands get_info() runs, and the stages
+    that process their output, for run_stages(). Stages that only collect
+    fields that weren't asked for (or, if lazy is True, that are only read
+    when needed) are left out.
+
+    Kwargs:
+        backend (str):          See get_info(). Default = "lshw".
+        fields (frozenset):     From projection.normalise(). Default = None.
+        lazy (bool):            See get_info(). Default = False.
+
+    Returns:
+        tuple (dict, dict). The commands and the stages.
+
+    Usage:
+
+    >>> commands, stages = get_commands_and_stages()
+
+    OR:
+
+    >>> commands, stages = get_commands_and_stages(backend=<aBackend>, fields=<someFields>)
+    """
+
+    commands = {
+        "lshw": ["lshw", "-sanitize", "-class", "disk", "-class", "volume", "-xml"],
+        "lsblk": ["lsblk", "-o", "NAME,SIZE,TYPE,FSTYPE,VENDOR,MODEL,UUID", "-b", "-J"],
+    }
+
+    #Devices from lshw go in first, then NVME disks that only lsblk knows about,
+    #and then the logical volumes, which need the host partitions to be present.
+    #Partition tables are read as soon as all the devices are known, alongside
+    #the LVM stage, and block sizes once the logical volumes are known too.
+    #Each device is passed to the listener as soon as the stages that fill in
+    #its fields have processed it (see device_added()), so a device that
+    #neither of those last two stages is run for is passed on when it's added.
+    stages = {
+        "bootrecords": (boot_records_stage, []),
+        "links": (links_stage, []),
+        "lshw": (lshw_stage, ["lshw", "links", "bootrecords"]),
+        "lsblk": (lsblk_stage, ["lsblk", "lshw"]),
+        "lvm": (lvm_stage, ["lsblk"]),
+        "blocksizes": (block_sizes_stage, ["lvm"]),
+        "partitiontables": (partition_tables_stage, ["lsblk"]),
+    }
+
+    if backend == "sysfs":
+        del commands["lshw"]
+        del commands["lsblk"]
+        del stages["lshw"]
+        del stages["lsblk"]
+
+        stages["sysfs"] = (sysfs_stage, ["links", "bootrecords"])
+        stages["lvm"] = (lvm_stage, ["sysfs"])
+        stages["partitiontables"] = (partition_tables_stage, ["sysfs"])
+
+    skipped = []
+
+    #Boot records are read one at a time when they're needed if lazy is True.
+    if lazy or not projection.wants(fields, "BootRecord", "BootRecordStrings"):
+        skipped.append("bootrecords")
+
+    if not projection.wants(fields, "UUID", "ID"):
+        skipped.append("links")
+
+    if not projection.wants(fields, "Partitioning", *partitiontable.GEOMETRY_FIELDS):
+        skipped.append("partitiontables")
+
+    if not projection.wants(fields, *projection.OPTIONAL_FIELDS):
+        skipped.append("blocksizes")
+
+    for name in skipped:
+        del stages[name]
+
+    for name, (function, dependencies) in stages.items():
+        stages[name] = (function, [dependency for dependency in dependencies
+                                   if dependency not in skipped])
+
+    return commands, stages
+
+def run_command(collector, command, env=None):
+    """
+    Private, implementation detail.
+
+    This function runs a command and returns its output.
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        command (list):     The command to run, and its arguments.
+
+    Kwargs:
+        env (dict):         The environment to run the command in.
+                            Default = None (use ours).
+
+    Returns:
+        string/None. The output:
+
+            - None          - The command failed.
+            - Anything else - The output of the command.
+
+    Usage:
+
+    >>> output = run_command(<aCollector>, <aCommand>)
+
+    OR:
+
+    >>> output = run_command(<aCollector>, <aCommand>, env=<anEnv>)
+    """
+
+    try:
+        cmd = report.run(collector.report, command, check=True, stdout=subprocess.PIPE,
+                         stderr=subprocess.STDOUT, env=env)
+
+    except (OSError, subprocess.CalledProcessError) as err:
+        collector.errors.append(errors.ErrorRecord("linux.get_info(): Exception: "+str(err)
+                                                   + " while running "+' '.join(command)+"\n",
+                                                   command=command,
+                                                   exit_code=getattr(err, "returncode", None)))
+        return None
+
+    return cmd.stdout.decode("utf-8", errors="replace")
+
+def run_stages(collector, commands, stages, env=None):
+    """
+    Private, implementation detail.
+
+    This function runs a set of commands, and the stages that process
+    their output. All of the commands are started at once, and each stage
+    is started as soon as every command and stage it depends on has
+    finished, so a slow command only holds up the stages that need it.
+
+    Each command and stage can fail on its own. A failed command gives
+    its dependent stages None as its output, and a stage that raises an
+    exception is recorded in the collector's errors, but the stages that
+    depend on it are still run. Errors reported by a stage say which stage it was
+    (see errors.py).
+
+    How long each stage and command took is recorded in the collector's
+    report, if it has one (see report.py).
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        commands (dict):    Command names, mapped to the commands to run.
+
+        stages (dict):      Stage names, mapped to (function, dependencies)
+                            tuples. Each function is called with a dictionary
+                            of command names to their output, and the
+                            dependencies are a list of command and stage
+                            names.
+
+    Kwargs:
+        env (dict):         The environment to run the commands in.
+                            Default = None (use ours).
+
+    Usage:
+
+    >>> run_stages(<aCollector>, <aDict>, <aDict>)
+
+    OR:
+
+    >>> run_stages(<aCollector>, <aDict>, <aDict>, env=<anEnv>)
+    """
+
+    outputs = {}
+    finished = set()
+    waiting = dict(stages)
+    running = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(commands)+len(stages)) as executor:
+        for name, command in commands.items():
+            running[executor.submit(run_command, collector, command, env)] = name
+
+        while running or waiting:
+            #Start any stages that now have everything they need.
+            for name, (function, dependencies) in list(waiting.items()):
+                if finished.issuperset(dependencies):
+                    running[executor.submit(run_stage, collector, name, function, outputs)] = name
+                    del waiting[name]
+
+            if not running:
+                #Nothing left can ever finish, so these can never run.
+                collector.errors.append("linux.run_stages(): Stages with missing dependencies: "
+                                        + ', '.join(sorted(waiting))+"\n")
+                break
+
+            done = concurrent.futures.wait(running,
+                                           return_when=concurrent.futures.FIRST_COMPLETED)[0]
+
+            for future in done:
+                name = running.pop(future)
+
+                try:
+                    result = future.result()
+
+                except Exception as err:
+                    collector.errors.append(errors.ErrorRecord("linux.run_stages(): Unhandled "
+                                                               + "exception: "+str(err)
+                                                               + " in stage "+name+"\n",
+                                                               stage=name))
+
+                else:
+                    if name in commands:
+                        outputs[name] = result
+
+                finished.add(name)
+
+def run_stage(collector, name, function, outputs):
+    """
+    Private, implementation detail.
+
+    This function runs a stage for run_stages(), and records how long it
+    took in the collector's report, if it has one. Errors reported by
+    the stage are marked with its name.
+
+    Args:
+        collector (Collector):  The state of the scan.
+        name (str):             The name of the stage.
+        function (function):    The stage.
+        outputs (dict):         The output of the commands.
+
+    Returns:
+        Whatever the stage returns.
+
+    Usage:
+
+    >>> run_stage(<aCollector>, <aStageName>, <aFunction>, <aDict>)
+    """
+
+    with report.stage(collector.report, name), errors.in_stage(name):
+        return function(collector, outputs)
+
+def boot_records_stage(collector, outputs): #pylint: disable=unused-argument
+    """
+    Private, implementation detail.
+
+    This stage reads the boot records of all the block devices in
+    /proc/partitions in one batch, while the commands are still running.
+    get_boot_record() then looks them up in the collector's bootrecords.
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        outputs (dict):     The output of the commands run by get_info().
+
+    Usage:
+
+    >>> boot_records_stage(<aCollector>, <aDict>)
+    """
+
+    collector.bootrecords = {}
+
+    disks = []
+
+    try:
+        with open("/proc/partitions", "r", encoding="utf-8") as partitions:
+            #Skip the header.
+            lines = partitions.read().split("\n")[2:]
+
+    except OSError as err:
+        collector.errors.append("linux.boot_records_stage(): Exception: "+str(err)
+                                + " while reading /proc/partitions\n")
+        return
+
+    for line in lines:
+        try:
+            #Some names have / replaced with ! eg cciss!c0d0.
+            disk = "/dev/"+line.split()[3].replace("!", "/")
+
+        except IndexError:
+            continue
+
+        #Ignore loop, zram, nbd, and optical devices.
+        if "/dev/loop" in disk or "/dev/zram" in disk or "/dev/nbd" in disk \
+            or "/dev/sr" in disk:
+
+            continue
+
+        disks.append(disk)
+
+    collector.bootrecords = bootrecord.read_boot_records(disks, scan_report=collector.report)
+
+def links_stage(collector, outputs): #pylint: disable=unused-argument
+    """
+    Private, implementation detail.
+
+    This stage indexes the symlinks in /dev/disk for get_uuid(), get_id()
+    and get_disk_link().
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        outputs (dict):     The output of the commands run by get_info().
+
+    Usage:
+
+    >>> links_stage(<aCollector>, <aDict>)
+    """
+
+    collector.disklinks = get_disk_links()
+
+def get_disk_links(directory=None):
+    """
+    Private, implementation detail.
+
+    This function reads the symlinks in /dev/disk/by-uuid, by-id, by-label,
+    by-partuuid and by-path, and indexes them by the kernel name of the
+    device they point to, so each lookup afterwards is a dictionary lookup.
+
+    Kwargs:
+        directory (str):    The folder to read. Default = None (DISK_LINKS_DIR).
+
+    Returns:
+        dict. For each kind of link (eg "by-uuid"), a dictionary mapping
+        kernel names (eg "sda1") to a sorted list of link names.
+
+    Usage:
+
+    >>> disk_links = get_disk_links()
+
+    OR:
+
+    >>> disk_links = get_disk_links(directory=<aFolder>)
+    """
+
+    if directory is None:
+        directory = DISK_LINKS_DIR
+
+    disk_links = {}
+
+    for kind in DISK_LINK_KINDS:
+        index = {}
+        disk_links[kind] = index
+
+        try:
+            entries = os.scandir(os.path.join(directory, kind))
+
+        except OSError:
+            #Not all of these folders exist on every system.
+            continue
+
+        with entries:
+            for entry in entries:
+                try:
+                    target = os.readlink(entry.path)
+
+                except OSError:
+                    continue
+
+                index.setdefault(os.path.basename(target), []).append(entry.name)
+
+        for names in index.values():
+            names.sort()
+
+    return disk_links
+
+def lshw_stage(collector, outputs):
+    """
+    Private, implementation detail.
+
+    This stage parses lshw's XML output, and adds the devices and
+    partitions it finds to the disk info dictionary.
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        outputs (dict):     The output of the commands run by get_info().
+
+    Usage:
+
+    >>> lshw_stage(<aCollector>, <aDict>)
+    """
+
+    if outputs["lshw"] is None:
+        return
+
+    found_list = False
+
+    try:
+        #Each device is assembled as soon as its node closes.
+        for node, found_list in parse_lshw_output(outputs["lshw"]):
+            #These are devices.
+            host_disk = get_device_info(collector, node)
+
+            #Get the info of any partitions and sub-partitions (logical partitions)
+            #these devices contain.
+            for subnode in node.iter_descendants():
+                get_partition_info(collector, subnode, host_disk)
+
+            device_added(collector, ("blocksizes", "partitiontables"), host_disk,
+                         *collector.diskinfo[host_disk]["Partitions"])
+
+    except ElementTree.ParseError as err:
+        collector.errors.append("linux.lshw_stage(): Exception: "+str(err)
+                                + " while parsing lshw output\n")
+
+    if not found_list:
+        collector.errors.append("linux.lshw_stage(): lshw found no disks!\n")
+
+class LshwNode:
+    """
+    Private, implementation detail.
+
+    A compact record of the parts of an lshw <node> element that we use.
+    Text is kept as it is in the XML, so the helpers that read these still
+    handle bytes as well as strings.
+
+    Only the first <logicalname> is kept. The others are mount points.
+    """
+
+    __slots__ = ("logicalname", "physid", "description", "vendor", "product", "size",
+                 "capacity", "capabilities", "configuration", "children")
+
+    #Child elements that are stored as text.
+    TEXT_FIELDS = ("logicalname", "physid", "description", "vendor", "product", "size",
+                   "capacity")
+
+    def __init__(self):
+        self.logicalname = None
+        self.physid = None
+        self.description = None
+        self.vendor = None
+        self.product = None
+        self.size = None
+        self.capacity = None
+        self.capabilities = []
+        self.configuration = {}
+        self.children = []
+
+    def iter_descendants(self):
+        """Yields every node below this one, in document order."""
+        for child in self.children:
+            yield child
+            yield from child.iter_descendants()
+
+def parse_lshw_output(output):
+    """
+    Private, implementation detail.
+
+    This function parses lshw's XML output one element at a time, without
+    building a tree of the whole document. Each top-level node (device) is
+    yielded as soon as it closes, with its partitions as children. The
+    elements are discarded as soon as they have been read.
+
+    Args:
+        output (str):   lshw's XML output.
+
+    Yields:
+        tuple (LshwNode, bool). A device, and whether a <list> element was
+        found (lshw always puts the devices in one).
+
+    Raises:
+        xml.etree.ElementTree.ParseError, if the XML isn't valid.
+
+    Usage:
+
+    >>> for node, found_list in parse_lshw_output(<lshwOutput>):
+    >>>     ...
+    """
+
+    #The tags of the elements we're inside, and the nodes we're inside.
+    tags = []
+    nodes = []
+    found_list = False
+
+    for event, element in iter_xml_events(output):
+        if event == "start":
+            tags.append(element.tag)
+
+            if element.tag == "list":
+                found_list = True
+
+            elif element.tag == "node":
+                node = LshwNode()
+
+                #Add it to its parent now, so partitions stay in document order.
+                if nodes:
+                    nodes[-1].children.append(node)
+
+                nodes.append(node)
+
+            continue
+
+        tags.pop()
+
+        if not nodes:
+            continue
+
+        parent = tags[-1] if tags else None
+
+        if element.tag == "node":
+            node = nodes.pop()
+            element.clear()
+
+            if not nodes:
+                yield node, found_list
+
+        elif parent == "node":
+            if element.tag in LshwNode.TEXT_FIELDS and getattr(nodes[-1], element.tag) is None:
+                setattr(nodes[-1], element.tag, element.text)
+
+        elif parent == "capabilities" and element.tag == "capability" and tags[-2] == "node":
+            nodes[-1].capabilities.append(element.get("id"))
+
+        elif parent == "configuration" and element.tag == "setting" and tags[-2] == "node":
+            nodes[-1].configuration[element.get("id")] = element.get("value")
+
+def iter_xml_events(output, chunk_size=65536):
+    """
+    Private, implementation detail.
+
+    This function feeds an XML document to a pull parser a chunk at a time,
+    and yields the start and end events as they become available.
+
+    Args:
+        output (str):       The XML document.
+
+    Kwargs:
+        chunk_size (int):   How much to parse at once. Default = 65536.
+
+    Yields:
+        tuple (str, Element). The event ("start" or "end"), and the element.
+
+    Raises:
+        xml.etree.ElementTree.ParseError, if the XML isn't valid.
+
+    Usage:
+
+    >>> for event, element in iter_xml_events(<anXMLDocument>):
+    >>>     ...
+    """
+
+    parser = ElementTree.XMLPullParser(events=("start", "end"))
+
+    for start in range(0, len(output), chunk_size):
+        parser.feed(output[start:start+chunk_size])
+        yield from parser.read_events()
+
+    parser.close()
+    yield from parser.read_events()
+
+def sysfs_stage(collector, outputs): #pylint: disable=unused-argument
+    """
+    Private, implementation detail.
+
+    This stage finds devices and partitions in sysfs, and adds them to
+    the disk info dictionary.
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        outputs (dict):     The output of the commands run by get_info().
+
+    Usage:
+
+    >>> sysfs_stage(<aCollector>, <aDict>)
+    """
+
+    parse_sysfs(collector)
+
+def lsblk_stage(collector, outputs):
+    """
+    Private, implementation detail.
+
+    This stage parses lsblk's output to find any NVME disks (lshw currently
+    doesn't detect these).
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        outputs (dict):     The output of the commands run by get_info().
+
+    Usage:
+
+    >>> lsblk_stage(<aCollector>, <aDict>)
+    """
+
+    if outputs["lsblk"] is None:
+        return
+
+    collector.lsblk_output = outputs["lsblk"]
+
+    #FIXME: Handle exceptions properly here.
+    try:
+        parse_lsblk_output(collector)
+
+    except Exception as err:
+        collector.errors.append("linux.get_info(): Unhandled exception: "+str(err)
+                                + " while parsing lsblk output\n")
+
+def lvm_stage(collector, outputs): #pylint: disable=unused-argument
+    """
+    Private, implementation detail.
+
+    This stage finds any LVM disks in device-mapper's entries in sysfs.
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        outputs (dict):     The output of the commands run by get_info().
+
+    Usage:
+
+    >>> lvm_stage(<aCollector>, <aDict>)
+    """
+
+    parse_device_mapper(collector)
+
+def partition_tables_stage(collector, outputs): #pylint: disable=unused-argument
+    """
+    Private, implementation detail.
+
+    This stage reads the partition table of each device, and uses it to
+    fill in the partitioning scheme of the device (replacing the guess made
+    from lshw's output), and the geometry of each of its partitions (see
+    partitiontable.GEOMETRY_FIELDS).
+
+    If a partition table can't be read, the partitioning scheme is left
+    alone, and the geometry fields are "Unknown".
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        outputs (dict):     The output of the commands run by get_info().
+
+    Usage:
+
+    >>> partition_tables_stage(<aCollector>, <aDict>)
+    """
+
+    collector.partitiontables = {}
+
+    #The logical volumes are added alongside this, and don't have partition tables.
+    for disk in list(collector.diskinfo):
+        if collector.diskinfo[disk]["Type"] == "Device":
+            get_partition_table_info(collector, disk)
+            device_processed(collector, "partitiontables", disk,
+                             *collector.diskinfo[disk]["Partitions"])
+
+def block_sizes_stage(collector, outputs): #pylint: disable=unused-argument
+    """
+    Private, implementation detail.
+
+    This stage adds the block size fields (see BLOCK_SIZE_SOURCES) to every
+    device, partition, and logical volume. It is only run if they were
+    asked for.
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        outputs (dict):     The output of the commands run by get_info().
+
+    Usage:
+
+    >>> block_sizes_stage(<aCollector>, <aDict>)
+    """
+
+    for disk in list(collector.diskinfo):
+        add_block_sizes(collector, [disk])
+        device_processed(collector, "blocksizes", disk)
+
+def add_block_sizes(collector, disks):
+    """
+    Private, implementation detail.
+
+    This function adds the block size fields to the given entries in the
+    disk info dictionary.
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        disks (list):   The names of devices in the disk info dictionary.
+
+    Usage:
+
+    >>> add_block_sizes(<aCollector>, <aList>)
+    """
+
+    #Devices are only read once per scan (eg monitor.py re-reads one device).
+    missing = [disk for disk in disks if disk not in collector.blocksizes]
+
+    if missing:
+        collector.blocksizes.update(get_block_sizes(missing, collector=collector))
+
+    for disk in disks:
+        collector.diskinfo[disk].update(collector.blocksizes[disk])
+
+def get_partition_table_info(collector, disk):
+    """
+    Private, implementation detail.
+
+    This function reads the partition table of a device, keeps it in the
+    collector's partitiontables, and uses it to fill in the partitioning
+    scheme of the device and the geometry of its partitions. See
+    partition_tables_stage().
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        disk (str):     The name of a device in the disk info dictionary.
+
+    Usage:
+
+    >>> get_partition_table_info(<aCollector>, <aDiskName>)
+    """
+
+    diskinfo = collector.diskinfo
+
+    #Optical drives don't have partition tables.
+    if "/dev/sr" in disk or "/dev/cdrom" in disk:
+        table = None
+
+    else:
+        try:
+            with report.device(collector.report, disk):
+                table = partitiontable.read_partition_table(disk)
+
+        except (OSError, ValueError, OverflowError, MemoryError) as err:
+            collector.errors.append(errors.ErrorRecord("linux.get_partition_table_info(): "
+                                                       + "Exception: "+str(err)+" while reading "
+                                                       + "partition table of "+disk+"\n",
+                                                       device=disk))
+
+            table = None
 
-#Define global variables to make pylint happy.
-DISKINFO = None
-LSUUIDOUTPUT = None
-LSBLKOUTPUT = None
-LSIDOUTPUT = None
-LVMOUTPUT = None
-ERRORS = []
+    collector.partitiontables[disk] = table
+
+    if table is not None and table["Scheme"] != "Unknown":
+        diskinfo[disk]["Partitioning"] = table["Scheme"]
 
-def get_info():
+    for partition in diskinfo[disk]["Partitions"]:
+        if partition in diskinfo:
+            diskinfo[partition].update(partitiontable.get_geometry(
+                table, get_partition_number(disk, partition)))
+
+def new_info(collector):
     """
-    This function is the Linux-specific way of getting disk information.
-    It makes use of the lshw, blkid, and lvdisplay commands to gather
-    information.
+    Private, implementation detail.
 
-    It uses the other functions in this module to acheive its work, and
-    it **doesn't** return the disk infomation. Instead, it is left as a
-    global attribute in this module (DISKINFO).
+    Returns a new, empty entry for the disk info dictionary: a LazyDict
+    if the scan is lazy (see lazy.py), or a normal dictionary otherwise.
+    """
 
-    Raises:
-        Nothing, hopefully, but errors have a small chance of propagation
-        up to here here. Wrap it in a try:, except: block if you are worried.
+    if collector.lazy:
+        return lazy.LazyDict()
 
-    Usage:
+    return {}
 
-    >>> get_info()
+def device_ready(collector, *disks):
     """
-    env = os.environ.copy()
-    env["LC_ALL"] = "C"
+    Private, implementation detail.
 
-    #Run lshw to try and get disk information.
-    try:
-        cmd = subprocess.run(["lshw", "-sanitize", "-class", "disk", "-class", "volume", "-xml"],
-                             check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env)
+    This function passes the entries for some devices, partitions, or
+    logical volumes that have just been finished (see
+    get_commands_and_stages()) to the collector's listener, if it is set.
+    Ones that aren't in the disk info dictionary, or that have already
+    been passed to it, are skipped. A partition or logical volume is held
+    back until its device has been passed on, so devices always come first.
 
-    except (OSError, subprocess.CalledProcessError) as err:
-        ERRORS.append("linux.get_info(): Exception: "+str(err)+" while running lshw\n")
-        return
+    Args:
+        collector (Collector):  The state of the scan.
 
-    else:
-        #Get the output.
-        stdout = cmd.stdout.decode("utf-8", errors="replace")
+    Usage:
 
-    global DISKINFO
-    DISKINFO = {}
+    >>> device_ready(<aCollector>, <aDiskName>, <anotherDiskName>)
+    """
 
-    #Save some info for later use.
-    #UUIDs.
-    global LSUUIDOUTPUT
+    if collector.listener is None:
+        return
 
-    try:
-        cmd = subprocess.run(["ls", "-l", "/dev/disk/by-uuid/"], stdout=subprocess.PIPE,
-                             check=True, stderr=subprocess.STDOUT)
+    with collector.ready_lock:
+        for disk in disks:
+            announce(collector, disk)
 
-    except (OSError, subprocess.CalledProcessError) as err:
-        ERRORS.append("linux.get_info(): Exception: "+str(err)+" while running ls -l\n")
-        return
+def announce(collector, disk):
+    """
+    Private, implementation detail.
 
-    else:
-        LSUUIDOUTPUT = cmd.stdout.decode("utf-8", errors="replace")
+    This function passes an entry to the listener for device_ready(), and
+    then any that were held back until it had been. The caller must hold
+    the collector's ready_lock.
 
-    #IDs.
-    global LSIDOUTPUT
+    Args:
+        collector (Collector):  The state of the scan.
+        disk (str):             The name of the device.
 
-    try:
-        cmd = subprocess.run(["ls", "-l" ,"/dev/disk/by-id/"], stdout=subprocess.PIPE,
-                             check=True, stderr=subprocess.STDOUT)
+    Usage:
 
-    except (OSError, subprocess.CalledProcessError) as err:
-        ERRORS.append("linux.get_info(): Exception: "+str(err)+" while running ls -l\n")
-        LSIDOUTPUT = ""
+    >>> announce(<aCollector>, <aDiskName>)
+    """
 
-    else:
-        LSIDOUTPUT = cmd.stdout.decode("utf-8", errors="replace")
+    diskinfo = collector.diskinfo
 
-    #Parse the XML.
-    output = BeautifulSoup(stdout, "xml")
+    if disk not in diskinfo or disk in collector.announced:
+        return
 
-    if output.list is None:
-        ERRORS.append("linux.get_info(): No disks found!\n")
-        raise RuntimeError("No disks found!")
+    host_disk = diskinfo[disk]["HostDevice"]
 
-    list_of_devices = output.list.children
+    if host_disk != disk and host_disk in diskinfo and host_disk not in collector.announced:
+        collector.held.setdefault(host_disk, []).append(disk)
+        return
 
-    #Find the disks.
-    for node in list_of_devices:
-        if not isinstance(node, bs4.element.Tag):
-            continue
+    collector.announced.add(disk)
+    collector.listener(disk, diskinfo[disk])
 
-        #These are devices.
-        host_disk = get_device_info(node)
+    for held_disk in collector.held.pop(disk, []):
+        announce(collector, held_disk)
 
-        #Detect any partitions and sub-partitions (logical partitions).
-        partitions = node.find_all("node")
+def device_added(collector, later, *disks):
+    """
+    Private, implementation detail.
 
-        #Get the info of any partitions these devices contain.
-        for subnode in partitions:
-            if (not isinstance(subnode, bs4.element.Tag)) or subnode.name != "node":
-                continue
+    This function is called by the stages that add devices, partitions,
+    and logical volumes to the disk info dictionary, once they have been
+    added. Each one is passed to the listener straight away, unless any
+    of the given later stages that change it are being run in this scan,
+    in which case it is passed on once they have all processed it (see
+    device_processed()).
 
-            #partitions.
-            get_partition_info(subnode, host_disk)
+    Args:
+        collector (Collector):  The state of the scan.
+        later (tuple):          The names of the stages that change them.
 
-    #Find any NVME disks (lshw currently doesn't detect these).
-    global LSBLKOUTPUT
+    Usage:
 
-    try:
-        cmd = subprocess.run(["lsblk", "-o", "NAME,SIZE,TYPE,FSTYPE,VENDOR,MODEL,UUID", "-b",
-                              "-J"], check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                             env=env)
+    >>> device_added(<aCollector>, ("blocksizes",), <aDiskName>, <anotherDiskName>)
+    """
 
-    except (OSError, subprocess.CalledProcessError) as err:
-        ERRORS.append("linux.get_info(): Exception: "+str(err)+" while running lsblk\n")
+    waiting = collector.stages.intersection(later)
+
+    if not waiting:
+        device_ready(collector, *disks)
         return
 
-    else:
-        LSBLKOUTPUT = cmd.stdout.decode("utf-8", errors="replace")
+    with collector.ready_lock:
+        for disk in disks:
+            collector.waiting[disk] = set(waiting)
 
-    #Convert to unicode if needed to allow NVME drive detection on Python 3.5 (Ubuntu 16.04)
-    if isinstance(LSBLKOUTPUT, bytes):
-        LSBLKOUTPUT = LSBLKOUTPUT.decode("utf-8", errors="replace")
+def device_processed(collector, stage, *disks):
+    """
+    Private, implementation detail.
 
-    #FIXME: Handle exceptions properly here.
-    try:
-        parse_lsblk_output()
+    This function is called by the stages that change entries that are
+    already in the disk info dictionary, once they have finished with some
+    of them. Any that aren't waiting for another stage are passed to the
+    listener (see device_added()).
 
-    except Exception as err:
-        ERRORS.append("linux.get_info(): Unhandled exception: "+str(err)
-                      + " while parsing lsblk output\n")
+    Args:
+        collector (Collector):  The state of the scan.
+        stage (str):            The name of the stage.
 
-    #Find any LVM disks. Don't use -c because it doesn't give us enough information.
-    global LVMOUTPUT
-    try:
-        cmd = subprocess.run(["lvdisplay", "--maps"], check=True, stdout=subprocess.PIPE,
-                             stderr=subprocess.STDOUT, env=env)
+    Usage:
 
-    except (OSError, subprocess.CalledProcessError) as err:
-        ERRORS.append("linux.get_info(): Exception: "+str(err)+" while running lvdisplay --maps\n")
-        return
+    >>> device_processed(<aCollector>, "blocksizes", <aDiskName>)
+    """
 
-    else:
-        LVMOUTPUT = cmd.stdout.decode("utf-8", errors="replace").split("\n")
+    finished = []
 
-    parse_lvm_output()
+    with collector.ready_lock:
+        for disk in disks:
+            waiting = collector.waiting.get(disk)
 
-    #Check we found some disks.
-    if not DISKINFO:
-        ERRORS.append("linux.get_info(): No disks found!\n")
-        raise RuntimeError("No disks found!")
+            if waiting is None:
+                continue
+
+            waiting.discard(stage)
+
+            if not waiting:
+                del collector.waiting[disk]
+                finished.append(disk)
+
+    device_ready(collector, *finished)
 
-def get_device_info(node):
+def get_device_info(collector, node):
     """
     Private, implementation detail.
 
@@ -209,6 +1406,8 @@ def get_device_info(node):
     module to do its work.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         node:       A "node" representing a device, generated from lshw's XML
                     output.
 
@@ -217,57 +1416,59 @@ def get_device_info(node):
 
     Usage:
 
-    >>> host_disk = get_device_info(<aNode>)
+    >>> host_disk = get_device_info(<aCollector>, <aNode>)
     """
 
-    if isinstance(node.logicalname.string, bytes):
-        host_disk = node.logicalname.string.decode("utf-8") #NOTE: is this ever bytes?
+    diskinfo = collector.diskinfo
+
+    if isinstance(node.logicalname, bytes):
+        host_disk = node.logicalname.decode("utf-8") #NOTE: is this ever bytes?
 
     else:
-        host_disk = node.logicalname.string
+        host_disk = node.logicalname
 
     #Ignore loop, zram, and nbd devices.
     if "/dev/loop" in host_disk or "/dev/zram" in host_disk or "/dev/nbd" in host_disk:
         return host_disk
 
-    DISKINFO[host_disk] = {}
-    DISKINFO[host_disk]["Name"] = host_disk
-    DISKINFO[host_disk]["Type"] = "Device"
-    DISKINFO[host_disk]["HostDevice"] = "N/A"
-    DISKINFO[host_disk]["Partitions"] = []
-    DISKINFO[host_disk]["Vendor"] = get_vendor(node)
-    DISKINFO[host_disk]["Product"] = get_product(node)
+    diskinfo[host_disk] = new_info(collector)
+    diskinfo[host_disk]["Name"] = host_disk
+    diskinfo[host_disk]["Type"] = "Device"
+    diskinfo[host_disk]["HostDevice"] = "N/A"
+    diskinfo[host_disk]["Partitions"] = []
+    diskinfo[host_disk]["Vendor"] = get_vendor(node)
+    diskinfo[host_disk]["Product"] = get_product(node)
 
     #Ignore capacities for all optical media.
     if "/dev/cdrom" in host_disk or "/dev/sr" in host_disk or "/dev/dvd" in host_disk:
-        DISKINFO[host_disk]["RawCapacity"], DISKINFO[host_disk]["Capacity"] = ("N/A", "N/A")
+        diskinfo[host_disk]["RawCapacity"], diskinfo[host_disk]["Capacity"] = ("N/A", "N/A")
 
     else:
-        DISKINFO[host_disk]["RawCapacity"], DISKINFO[host_disk]["Capacity"] = get_capacity(node)
+        diskinfo[host_disk]["RawCapacity"], diskinfo[host_disk]["Capacity"] = get_capacity(node)
 
-    if isinstance(node.description.string, bytes):
+    if isinstance(node.description, bytes):
         #NOTE: is this ever bytes?
-        DISKINFO[host_disk]["Description"] = node.description.string.decode("utf-8")
+        diskinfo[host_disk]["Description"] = node.description.decode("utf-8")
 
     else:
-        DISKINFO[host_disk]["Description"] = node.description.string
+        diskinfo[host_disk]["Description"] = node.description
 
-    DISKINFO[host_disk]["Flags"] = get_capabilities(node)
-    DISKINFO[host_disk]["Partitioning"] = get_partitioning(host_disk)
-    DISKINFO[host_disk]["FileSystem"] = "N/A"
-    DISKINFO[host_disk]["UUID"] = "N/A"
-    DISKINFO[host_disk]["ID"] = get_id(host_disk)
+    diskinfo[host_disk]["Flags"] = get_capabilities(node)
+    diskinfo[host_disk]["Partitioning"] = get_partitioning(collector, host_disk)
+    diskinfo[host_disk]["FileSystem"] = "N/A"
+    diskinfo[host_disk]["UUID"] = "N/A"
+    diskinfo[host_disk]["ID"] = get_id(collector, host_disk)
 
     #Don't try to get Boot Records for optical drives.
     if "/dev/cdrom" in host_disk or "/dev/sr" in host_disk or "/dev/dvd" in host_disk:
-        DISKINFO[host_disk]["BootRecord"], DISKINFO[host_disk]["BootRecordStrings"] = ("N/A", ["N/A"])
+        diskinfo[host_disk]["BootRecord"], diskinfo[host_disk]["BootRecordStrings"] = ("N/A", ["N/A"])
 
     else:
-        DISKINFO[host_disk]["BootRecord"], DISKINFO[host_disk]["BootRecordStrings"] = get_boot_record(host_disk)
+        diskinfo[host_disk]["BootRecord"], diskinfo[host_disk]["BootRecordStrings"] = get_boot_record(collector, host_disk)
 
     return host_disk
 
-def get_partition_info(subnode, host_disk):
+def get_partition_info(collector, subnode, host_disk):
     """
     Private, implementation detail.
 
@@ -276,6 +1477,8 @@ def get_partition_info(subnode, host_disk):
     module to do its work.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         subnode:            A "node" representing a partition, generated
                             from lshw's XML output.
 
@@ -289,36 +1492,37 @@ def get_partition_info(subnode, host_disk):
 
     Usage:
 
-    >>> volume = get_device_info(<aNode>)
+    >>> volume = get_device_info(<aCollector>, <aNode>)
     """
 
-    try:
-        if isinstance(subnode.logicalname.string, bytes):
-            #NOTE: is this ever bytes?
-            volume = subnode.logicalname.string.decode("utf-8")
+    diskinfo = collector.diskinfo
 
-        else:
-            volume = subnode.logicalname.string
+    if isinstance(subnode.logicalname, bytes):
+        #NOTE: is this ever bytes?
+        volume = subnode.logicalname.decode("utf-8")
+
+    elif subnode.logicalname is not None:
+        volume = subnode.logicalname
 
-    except AttributeError:
-        if isinstance(subnode.physid.string, bytes):
+    else:
+        if isinstance(subnode.physid, bytes):
             #NOTE: is this ever bytes?
             if "nvme" in host_disk:
-                volume = host_disk+"p"+subnode.physid.string.decode("utf-8")
+                volume = host_disk+"p"+subnode.physid.decode("utf-8")
 
             else:
-                volume = host_disk+subnode.physid.string.decode("utf-8")
+                volume = host_disk+subnode.physid.decode("utf-8")
 
         else:
             if "nvme" in host_disk:
-                volume = host_disk+"p"+subnode.physid.string
+                volume = host_disk+"p"+subnode.physid
 
             else:
-                volume = host_disk+subnode.physid.string
+                volume = host_disk+subnode.physid
 
-    #Fix bug on Pmagic, if the volume already exists in DISKINFO,
+    #Fix bug on Pmagic, if the volume already exists in diskinfo,
     #or if it is an optical drive, ignore it here.
-    if volume in DISKINFO or "/dev/cdrom" in volume or "/dev/sr" in volume \
+    if volume in diskinfo or "/dev/cdrom" in volume or "/dev/sr" in volume \
         or "/dev/dvd" in volume:
 
         return None
@@ -327,325 +1531,603 @@ def get_partition_info(subnode, host_disk):
     if "/dev/loop" in host_disk or "/dev/zram" in host_disk or "/dev/nbd" in host_disk:
         return None
 
-    DISKINFO[volume] = {}
-    DISKINFO[volume]["Name"] = volume
-    DISKINFO[volume]["Type"] = "Partition"
-    DISKINFO[volume]["HostDevice"] = host_disk
-    DISKINFO[volume]["Partitions"] = []
-    DISKINFO[host_disk]["Partitions"].append(volume)
-    DISKINFO[volume]["Vendor"] = get_vendor(subnode)
-    DISKINFO[volume]["Product"] = "Host Device: "+DISKINFO[host_disk]["Product"]
-    DISKINFO[volume]["RawCapacity"], DISKINFO[volume]["Capacity"] = get_capacity(subnode)
-
-    if isinstance(subnode.description.string, bytes):
+    diskinfo[volume] = new_info(collector)
+    diskinfo[volume]["Name"] = volume
+    diskinfo[volume]["Type"] = "Partition"
+    diskinfo[volume]["HostDevice"] = host_disk
+    diskinfo[volume]["Partitions"] = []
+    diskinfo[host_disk]["Partitions"].append(volume)
+    diskinfo[volume]["Vendor"] = get_vendor(subnode)
+    diskinfo[volume]["Product"] = "Host Device: "+diskinfo[host_disk]["Product"]
+    diskinfo[volume]["RawCapacity"], diskinfo[volume]["Capacity"] = get_capacity(subnode)
+
+    if isinstance(subnode.description, bytes):
         #NOTE: is this ever bytes?
-        DISKINFO[volume]["Description"] = subnode.description.string.decode("utf-8")
+        diskinfo[volume]["Description"] = subnode.description.decode("utf-8")
 
     else:
-        DISKINFO[volume]["Description"] = subnode.description.string
+        diskinfo[volume]["Description"] = subnode.description
 
-    DISKINFO[volume]["Flags"] = get_capabilities(subnode)
+    diskinfo[volume]["Flags"] = get_capabilities(subnode)
 
     #Fx bug: don't try to get file systems of extended partitions.
-    if "extended" in DISKINFO[volume]["Flags"]:
-        DISKINFO[volume]["FileSystem"] = "N/A"
+    if "extended" in diskinfo[volume]["Flags"]:
+        diskinfo[volume]["FileSystem"] = "N/A"
 
     else:
-        DISKINFO[volume]["FileSystem"] = get_file_system(subnode)
+        diskinfo[volume]["FileSystem"] = get_file_system(collector, subnode)
 
-    DISKINFO[volume]["Partitioning"] = "N/A"
-    DISKINFO[volume]["UUID"] = get_uuid(volume)
-    DISKINFO[volume]["ID"] = get_id(volume)
-    DISKINFO[volume]["BootRecord"], DISKINFO[volume]["BootRecordStrings"] = get_boot_record(volume)
+    diskinfo[volume]["Partitioning"] = "N/A"
+    diskinfo[volume]["UUID"] = get_uuid(collector, volume)
+    diskinfo[volume]["ID"] = get_id(collector, volume)
+    diskinfo[volume]["BootRecord"], diskinfo[volume]["BootRecordStrings"] = get_boot_record(collector, volume)
 
     return volume
 
-def parse_lvm_output(testing=False):
+def parse_device_mapper(collector):
     """
     Private, implementation detail.
 
-    This function is used to get LVM partition information from the
-    output of lvdisplay --maps.
+    This function finds logical volumes by reading the dm-* entries in
+    /sys/block once, and adds them to the disk info dictionary. Other
+    device-mapper devices (eg LUKS and multipath), and the hidden layers
+    LVM uses for snapshots and thin pools, are ignored.
 
-    Kwargs:
-        testing (bool):     Used during unit tests. Default = False.
+    Args:
+        collector (Collector):  The state of the scan.
 
     Usage:
 
-    >>> parse_lvm_output()
+    >>> parse_device_mapper(<aCollector>)
+    """
+
+    try:
+        names = sorted(entry.name for entry in os.scandir(SYSFS_BLOCK)
+                       if entry.name.startswith("dm-"))
 
-    OR:
+    except OSError as err:
+        collector.errors.append("linux.parse_device_mapper(): Exception: "+str(err)
+                                + " while reading "+SYSFS_BLOCK+"\n")
 
-    >>> parse_lvm_output(testing=<aBool>)
-    """
+        return
 
-    line_counter = 0
+    #Read the names first, so devices stacked on other dm devices can be named.
+    dm_names = {}
 
-    for line in LVMOUTPUT:
-        line_counter += 1
+    for name in names:
+        dm_names[name] = read_sysfs_attribute(os.path.join(SYSFS_BLOCK, name, "dm", "name"))
 
-        try:
-            line = line.decode("utf-8", errors="replace")
+    for name in names:
+        if dm_names[name] is None:
+            continue
 
-        except AttributeError:
-            pass #Already a unicode string.
+        volume = get_dm_lv_info(collector, name, dm_names)
 
-        if "--- Logical volume ---" in line:
-            assemble_lvm_disk_info(line_counter, testing=testing)
+        if volume is not None:
+            device_added(collector, ("blocksizes",), volume)
 
-def assemble_lvm_disk_info(line_counter, testing=False):
+def get_dm_lv_info(collector, name, dm_names):
     """
     Private, implementation detail.
 
-    This function is used to assemble LVM disk info into the dictionary.
+    This function gathers and assembles information for a logical volume
+    from its entry in sysfs.
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        name (str):         The kernel name of the device. eg: dm-0
+        dm_names (dict):    The device-mapper name of each dm device,
+                            keyed by kernel name.
+
+    Returns:
+        string/None. The name of the logical volume, or None if the
+        device isn't a (visible) logical volume.
+
+    Usage:
+
+    >>> volume = get_dm_lv_info(<aCollector>, <aName>, <aDict>)
+    """
+
+    diskinfo = collector.diskinfo
+
+    sysfs_dir = os.path.join(SYSFS_BLOCK, name)
+    dm_name = dm_names[name]
+    dm_uuid = read_sysfs_attribute(os.path.join(sysfs_dir, "dm", "uuid"))
+
+    #"LVM-" then the VG and LV UUIDs. Hidden layers have a suffix after that.
+    if dm_uuid is None or not dm_uuid.startswith("LVM-") or len(dm_uuid) != 68:
+        return None
+
+    vg_name, lv_name, layer = split_dm_name(dm_name)
+
+    if layer is not None or not lv_name:
+        return None
+
+    volume = "/dev/mapper/"+dm_name
+
+    diskinfo[volume] = new_info(collector)
+    diskinfo[volume]["Name"] = volume
+    diskinfo[volume]["Aliases"] = [volume, "/dev/"+vg_name+"/"+lv_name]
+    diskinfo[volume]["VGName"], diskinfo[volume]["LVName"] = vg_name, lv_name
+    diskinfo[volume]["Type"] = "Partition"
+    diskinfo[volume]["Partitions"] = []
+    diskinfo[volume]["Vendor"] = "Linux"
+    diskinfo[volume]["Product"] = "LVM Partition"
+    diskinfo[volume]["Description"] = "LVM partition "+lv_name+" in volume group "+vg_name
+    diskinfo[volume]["Flags"] = []
+    diskinfo[volume]["FileSystem"] = get_lv_file_system(collector, volume)
+    diskinfo[volume]["Partitioning"] = "N/A"
+    diskinfo[volume]["BootRecord"], diskinfo[volume]["BootRecordStrings"] = get_boot_record(collector, volume)
+    diskinfo[volume]["ID"] = "dm-name-"+dm_name
+    diskinfo[volume]["UUID"] = format_lvm_uuid(dm_uuid[36:])
+    diskinfo[volume]["RawCapacity"], diskinfo[volume]["Capacity"] = get_sysfs_capacity(sysfs_dir)
+
+    #The physical volume(s) the LV is on. Use the first if there are several.
+    try:
+        slaves = sorted(os.listdir(os.path.join(sysfs_dir, "slaves")))
+
+    except OSError:
+        slaves = []
+
+    if not slaves:
+        host_partition = "Unknown"
+
+    elif slaves[0] in dm_names and dm_names[slaves[0]] is not None:
+        #eg an LV in a LUKS container.
+        host_partition = "/dev/mapper/"+dm_names[slaves[0]]
+
+    else:
+        host_partition = "/dev/"+slaves[0].replace("!", "/")
+
+    diskinfo[volume]["HostPartition"] = host_partition
+
+    if host_partition in diskinfo:
+        diskinfo[volume]["HostDevice"] = diskinfo[host_partition]["HostDevice"]
 
-    Like get_device_info(), and get_partition_info(), it uses some of the
-    helper functions here.
+    else:
+        diskinfo[volume]["HostDevice"] = "Unknown"
+
+    return volume
+
+def split_dm_name(dm_name):
+    """
+    Private, implementation detail.
+
+    This function splits a device-mapper name for a logical volume into
+    the VG name, LV name, and layer. LVM joins these with "-", and doubles
+    any "-" that are part of the names, eg "my--vg-root" is LV "root" in
+    VG "my-vg".
 
     Args:
-        line_counter (int):   The line in the output that informtion for a
-                              particular logical volume begins.
+        dm_name (str):  The device-mapper name.
 
-    Kwargs:
-        testing (bool):       Used during unit tests. Default = False.
+    Returns:
+        tuple (string, string, string/None). The VG name, LV name, and the
+        layer (eg "real" or "tpool"), which is None for the LV itself.
 
     Usage:
 
-    >>> assemble_lvm_disk_info(<anInt>)
+    >>> vg_name, lv_name, layer = split_dm_name(<aName>)
+    """
+
+    parts = [""]
+    index = 0
 
-    OR:
+    while index < len(dm_name):
+        if dm_name[index:index+2] == "--":
+            parts[-1] += "-"
+            index += 2
+
+        elif dm_name[index] == "-":
+            parts.append("")
+            index += 1
+
+        else:
+            parts[-1] += dm_name[index]
+            index += 1
+
+    parts += ["", ""]
 
-    >>> assemble_lvm_disk_info(<anInt>, testing=<aBool>)
+    return parts[0], parts[1], parts[2] or None
+
+def format_lvm_uuid(raw_uuid):
     """
+    Private, implementation detail.
 
-    #Get all the info related to this partition.
-    raw_lvm_info = []
+    Formats a 32-character LVM UUID in groups of 6-4-4-4-4-4-6, like LVM does.
+    """
 
-    for line in LVMOUTPUT[line_counter:]:
-        try:
-            line = line.decode("utf-8", errors="replace").replace("'", "")
+    groups = []
+    start = 0
+
+    for length in (6, 4, 4, 4, 4, 4, 6):
+        groups.append(raw_uuid[start:start+length])
+        start += length
+
+    return '-'.join(groups)
+
+def parse_lsblk_output(collector):
+    """
+    Private, implementation detail.
+
+    This function is used to get NVME disk information from the output of lsblk.
+
+    .. note::
+            This will only remain here until lshw adds support for NVME disk detection -
+            this is a temporary fix.
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+    Usage:
+
+    >>> parse_lsblk_output(<aCollector>)
+    """
+
+    diskinfo = collector.diskinfo
+
+    try:
+        data = json.loads(collector.lsblk_output)
 
-        except AttributeError:
-            line = line.replace("'", "")
+    except ValueError:
+        #Not a valid JSON document!
+        collector.errors.append("linux.parse_lsblk_output(): lsblk output is not valid JSON! "
+                                + "Output: "+collector.lsblk_output+"\n")
+        return
+
+    for disk in data["blockdevices"]:
+        host_disk = "/dev/"+disk["name"]
+
+        #If this disk is already in the diskinfo dictionary, ignore it.
+        if host_disk in diskinfo:
+            continue
 
-        except UnicodeError:
-            ERRORS.append("linux.assemble_lvm_disk_information(): UnicodeError!\n")
+        #Ignore loop, zram, and nbd devices.
+        if "/dev/loop" in host_disk or "/dev/zram" in host_disk or "/dev/nbd" in host_disk:
             continue
 
-        raw_lvm_info.append(line)
+        diskinfo[host_disk] = new_info(collector)
+        diskinfo[host_disk]["Name"] = host_disk
+        diskinfo[host_disk]["Type"] = "Device"
+        diskinfo[host_disk]["HostDevice"] = "N/A"
+        diskinfo[host_disk]["Partitions"] = []
+
+        try:
+            diskinfo[host_disk]["Vendor"] = disk["vendor"].strip()
 
-        #When we get to the next volume, stop adding stuff to this entry's data variable.
-        if "--- Logical volume ---" in line:
-            raw_lvm_info.pop()
-            break
+        except KeyError:
+            diskinfo[host_disk]["Vendor"] = "Unknown"
 
-    #Start assembling the entry.
-    for line in raw_lvm_info:
-        if "LV Path" in line:
-            #Get the volume name and a list of aliases it has.
-            if testing is False:
-                volume, alias_list = get_lv_aliases(line)
+        try:
+            diskinfo[host_disk]["Product"] = disk["model"].strip()
 
-            else:
-                #Get them from the test data, overriding the check to see if they exist.
-                volume, alias_list = get_lv_aliases_test(line) #pylint: disable=undefined-variable
+        except KeyError:
+            diskinfo[host_disk]["Product"] = "Unknown"
+
+        diskinfo[host_disk]["UUID"] = "N/A"
+        diskinfo[host_disk]["FileSystem"] = "N/A"
+
+        try:
+            diskinfo[host_disk]["RawCapacity"] = str(disk["size"])
+
+        except KeyError:
+            diskinfo[host_disk]["RawCapacity"] = "Unknown"
+
+        #Calculate human-readable capacity.
+        #Round the sizes to make them human-readable.
+        unit_list = [None, "B", "KB", "MB", "GB", "TB", "PB", "EB"]
+        unit = "B"
+
+        try:
+            human_readable_size = int(diskinfo[host_disk]["RawCapacity"])
+
+            while len(str(human_readable_size)) > 3:
+                #Shift up one unit.
+                unit = unit_list[unit_list.index(unit)+1]
+                human_readable_size = human_readable_size//1000
+
+        except (KeyError, ValueError, IndexError):
+            diskinfo[host_disk]["Capacity"] = "Unknown"
+
+        else:
+            diskinfo[host_disk]["Capacity"] = str(human_readable_size)+" "+unit
+
+        diskinfo[host_disk]["BootRecord"], diskinfo[host_disk]["BootRecordStrings"] = get_boot_record(collector, host_disk)
+
+        diskinfo[host_disk]["Description"] = generate_description(host_disk)
+        diskinfo[host_disk]["Flags"] = "Unknown"
+        diskinfo[host_disk]["Partitioning"] = "Unknown"
+        diskinfo[host_disk]["ID"] = get_id(collector, host_disk)
+
+        #Get any partitions as well.
+        if "children" in disk:
+            for child in disk["children"]:
+                child_disk = "/dev/"+child["name"]
+
+                diskinfo[child_disk] = new_info(collector)
+                diskinfo[child_disk]["Name"] = child_disk
+                diskinfo[child_disk]["Type"] = "Partition"
+                diskinfo[child_disk]["HostDevice"] = host_disk
+                diskinfo[child_disk]["Partitions"] = []
+                diskinfo[host_disk]["Partitions"].append(child_disk)
+                diskinfo[child_disk]["Vendor"] = "N/A"
+                diskinfo[child_disk]["Product"] = "Host Device: "+diskinfo[host_disk]["Product"]
+
+                try:
+                    if child["uuid"] is None:
+                        diskinfo[child_disk]["UUID"] = "Unknown"
+                    else:
+                        diskinfo[child_disk]["UUID"] = child["uuid"]
+
+                except KeyError:
+                    diskinfo[child_disk]["UUID"] = "Unknown"
+
+                try:
+                    diskinfo[child_disk]["FileSystem"] = child["fstype"]
+
+                except KeyError:
+                    diskinfo[child_disk]["FileSystem"] = "Unknown"
+
+                if diskinfo[child_disk]["FileSystem"] is None:
+                    diskinfo[child_disk]["FileSystem"] = "Unknown"
+
+                try:
+                    diskinfo[child_disk]["RawCapacity"] = str(child["size"])
+
+                except KeyError:
+                    diskinfo[child_disk]["RawCapacity"] = "Unknown"
+
+                #Calculate human-readable capacity.
+                #Round the sizes to make them human-readable.
+                unit_list = [None, "B", "KB", "MB", "GB", "TB", "PB", "EB"]
+                unit = "B"
+
+                try:
+                    human_readable_size = int(diskinfo[child_disk]["RawCapacity"])
+
+
+                    while len(str(human_readable_size)) > 3:
+                        #Shift up one unit.
+                        unit = unit_list[unit_list.index(unit)+1]
+                        human_readable_size = human_readable_size//1000
+
+                except (KeyError, ValueError, IndexError):
+                    diskinfo[child_disk]["Capacity"] = "Unknown"
+
+                else:
+                    diskinfo[child_disk]["Capacity"] = str(human_readable_size)+" "+unit
+
+                diskinfo[child_disk]["BootRecord"], diskinfo[child_disk]["BootRecordStrings"] = get_boot_record(collector, child_disk)
+
+                diskinfo[child_disk]["Description"] = "N/A"
+                diskinfo[child_disk]["Flags"] = "Unknown"
+                diskinfo[child_disk]["Partitioning"] = "N/A"
+                diskinfo[child_disk]["ID"] = get_id(collector, child_disk)
+
+        device_added(collector, ("blocksizes", "partitiontables"), host_disk,
+                     *diskinfo[host_disk]["Partitions"])
+
+def parse_sysfs(collector):
+    """
+    Private, implementation detail.
+
+    This function finds devices and their partitions by reading /sys/block,
+    without running any commands.
+
+    Device mapper devices are left for the LVM stage to find.
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+    Usage:
+
+    >>> parse_sysfs(<aCollector>)
+    """
+
+    try:
+        names = sorted(os.listdir(SYSFS_BLOCK))
+
+    except OSError as err:
+        collector.errors.append("linux.parse_sysfs(): Exception: "+str(err)+" while reading "
+                                + SYSFS_BLOCK+"\n")
+        return
+
+    for name in names:
+        #Ignore loop, zram, nbd, ram, and device mapper devices.
+        if name.startswith(("loop", "zram", "nbd", "ram", "dm-")):
+            continue
+
+        host_disk = get_sysfs_device_info(collector, name)
+        device_added(collector, ("blocksizes", "partitiontables"), host_disk,
+                     *collector.diskinfo[host_disk]["Partitions"])
 
-            DISKINFO[volume] = {}
-            DISKINFO[volume]["Name"] = volume
-            DISKINFO[volume]["Aliases"] = alias_list
-            DISKINFO[volume]["VGName"], DISKINFO[volume]["LVName"] = get_lv_and_vg_name(volume)
-            DISKINFO[volume]["Type"] = "Partition"
-            DISKINFO[volume]["Partitions"] = []
-            DISKINFO[volume]["Vendor"] = "Linux"
-            DISKINFO[volume]["Product"] = "LVM Partition"
-            DISKINFO[volume]["Description"] = "LVM partition "+DISKINFO[volume]["LVName"] \
-                                              +" in volume group "+DISKINFO[volume]["VGName"]
+def get_sysfs_device_info(collector, name):
+    """
+    Private, implementation detail.
 
-            DISKINFO[volume]["Flags"] = []
-            DISKINFO[volume]["FileSystem"] = get_lv_file_system(volume)
-            DISKINFO[volume]["Partitioning"] = "N/A"
-            DISKINFO[volume]["BootRecord"], DISKINFO[volume]["BootRecordStrings"] = get_boot_record(volume)
-            DISKINFO[volume]["ID"] = "dm-name-"+DISKINFO[volume]["VGName"]+"-" \
-                                     +DISKINFO[volume]["LVName"]
+    This function gathers and assembles information for a device (whole disk)
+    and its partitions from sysfs.
 
-        elif "LV UUID" in line:
-            DISKINFO[volume]["UUID"] = line.split()[-1]
+    Args:
+        collector (Collector):  The state of the scan.
 
-        elif "LV Size" in line:
-            DISKINFO[volume]["Capacity"] = ' '.join(line.split()[-2:])
+        name (str):     The kernel's name for the device, eg sda.
 
-            #Workaround for weird bug where size is garbled.
-            if DISKINFO[volume]["Capacity"] == "<size":
-                DISKINFO[volume]["Capacity"] = "Unknown"
+    Returns:
+        string.     The name of the device.
 
-            DISKINFO[volume]["RawCapacity"] = "Unknown"
+    Usage:
 
-        elif "Physical volume" in line:
-            DISKINFO[volume]["HostPartition"] = line.split()[-1]
+    >>> host_disk = get_sysfs_device_info(<aCollector>, <aKernelName>)
+    """
 
-            if DISKINFO[volume]["HostPartition"] in DISKINFO:
-                DISKINFO[volume]["HostDevice"] = DISKINFO[DISKINFO[volume]["HostPartition"]]["HostDevice"]
+    diskinfo = collector.diskinfo
 
-            else:
-                DISKINFO[volume]["HostDevice"] = "Unknown"
+    #Some names have / replaced with ! eg cciss!c0d0.
+    host_disk = "/dev/"+name.replace("!", "/")
+    sysfs_dir = os.path.join(SYSFS_BLOCK, name)
 
-    #If there are any entries called "Unknown" (disks that we couldn't get the name for),
-    #remove them now to prevent issues.
-    if "Unknown" in DISKINFO:
-        DISKINFO.pop("Unknown")
+    diskinfo[host_disk] = new_info(collector)
+    diskinfo[host_disk]["Name"] = host_disk
+    diskinfo[host_disk]["Type"] = "Device"
+    diskinfo[host_disk]["HostDevice"] = "N/A"
+    diskinfo[host_disk]["Partitions"] = []
+    diskinfo[host_disk]["Vendor"] = read_sysfs_attribute(os.path.join(sysfs_dir, "device", "vendor")) \
+                                    or "Unknown"
 
-def parse_lsblk_output():
-    """
-    Private, implementation detail.
+    diskinfo[host_disk]["Product"] = read_sysfs_attribute(os.path.join(sysfs_dir, "device", "model")) \
+                                     or "Unknown"
 
-    This function is used to get NVME disk information from the output of lsblk.
+    #Ignore capacities for all optical media.
+    if "/dev/sr" in host_disk:
+        diskinfo[host_disk]["RawCapacity"], diskinfo[host_disk]["Capacity"] = ("N/A", "N/A")
 
-    .. note::
-            This will only remain here until lshw adds support for NVME disk detection -
-            this is a temporary fix.
+    else:
+        diskinfo[host_disk]["RawCapacity"], diskinfo[host_disk]["Capacity"] = \
+            get_sysfs_capacity(sysfs_dir)
 
-    Usage:
+    diskinfo[host_disk]["Description"] = generate_description(host_disk)
 
-    >>> parse_lsblk_output()
-    """
+    if read_sysfs_attribute(os.path.join(sysfs_dir, "removable")) == "1":
+        diskinfo[host_disk]["Flags"] = ["removable"]
 
-    try:
-        data = json.loads(LSBLKOUTPUT)
+    else:
+        diskinfo[host_disk]["Flags"] = []
 
-    except ValueError:
-        #Not a valid JSON document!
-        ERRORS.append("linux.parse_lsblk_output(): lsblk output is not valid JSON! Output: "
-                      + LSBLKOUTPUT+"\n")
-        return
+    diskinfo[host_disk]["Partitioning"] = get_partitioning(collector, host_disk)
+    diskinfo[host_disk]["FileSystem"] = "N/A"
+    diskinfo[host_disk]["UUID"] = "N/A"
+    diskinfo[host_disk]["ID"] = get_id(collector, host_disk)
 
-    for disk in data["blockdevices"]:
-        host_disk = "/dev/"+disk["name"]
+    #Don't try to get Boot Records for optical drives.
+    if "/dev/sr" in host_disk:
+        diskinfo[host_disk]["BootRecord"], diskinfo[host_disk]["BootRecordStrings"] = ("N/A", ["N/A"])
 
-        #If this disk is already in the DISKINFO dictionary, ignore it.
-        if host_disk in DISKINFO:
-            continue
+    else:
+        diskinfo[host_disk]["BootRecord"], diskinfo[host_disk]["BootRecordStrings"] = get_boot_record(collector, host_disk)
+
+    for child in get_sysfs_partitions(name):
+        volume = "/dev/"+child.replace("!", "/")
+        partition_dir = os.path.join(sysfs_dir, child)
+
+        diskinfo[volume] = new_info(collector)
+        diskinfo[volume]["Name"] = volume
+        diskinfo[volume]["Type"] = "Partition"
+        diskinfo[volume]["HostDevice"] = host_disk
+        diskinfo[volume]["Partitions"] = []
+        diskinfo[host_disk]["Partitions"].append(volume)
+        diskinfo[volume]["Vendor"] = "N/A"
+        diskinfo[volume]["Product"] = "Host Device: "+diskinfo[host_disk]["Product"]
+        diskinfo[volume]["RawCapacity"], diskinfo[volume]["Capacity"] = \
+            get_sysfs_capacity(partition_dir)
+
+        diskinfo[volume]["Description"] = "N/A"
+        diskinfo[volume]["Flags"] = []
+        diskinfo[volume]["FileSystem"] = get_lv_file_system(collector, volume)
+        diskinfo[volume]["Partitioning"] = "N/A"
+        diskinfo[volume]["UUID"] = get_uuid(collector, volume)
+        diskinfo[volume]["ID"] = get_id(collector, volume)
+        diskinfo[volume]["BootRecord"], diskinfo[volume]["BootRecordStrings"] = get_boot_record(collector, volume)
 
-        #Ignore loop, zram, and nbd devices.
-        if "/dev/loop" in host_disk or "/dev/zram" in host_disk or "/dev/nbd" in host_disk:
-            continue
+    return host_disk
 
-        DISKINFO[host_disk] = {}
-        DISKINFO[host_disk]["Name"] = host_disk
-        DISKINFO[host_disk]["Type"] = "Device"
-        DISKINFO[host_disk]["HostDevice"] = "N/A"
-        DISKINFO[host_disk]["Partitions"] = []
+def get_partition_number(host_disk, partition):
+    """
+    Private, implementation detail.
 
-        try:
-            DISKINFO[host_disk]["Vendor"] = disk["vendor"].strip()
+    This function finds the number of a partition (its position in the
+    partition table) from sysfs, or from the end of its name if that
+    doesn't work.
 
-        except KeyError:
-            DISKINFO[host_disk]["Vendor"] = "Unknown"
+    Args:
+        host_disk (str):    The device the partition is on.
+        partition (str):    The partition.
 
-        try:
-            DISKINFO[host_disk]["Product"] = disk["model"].strip()
+    Returns:
+        int/None. The partition number, or None if it couldn't be found.
 
-        except KeyError:
-            DISKINFO[host_disk]["Product"] = "Unknown"
+    Usage:
 
-        DISKINFO[host_disk]["UUID"] = "N/A"
-        DISKINFO[host_disk]["FileSystem"] = "N/A"
+    >>> number = get_partition_number(<aHostDisk>, <aPartition>)
+    """
 
-        try:
-            DISKINFO[host_disk]["RawCapacity"] = str(disk["size"])
+    number = read_sysfs_attribute(os.path.join(SYSFS_BLOCK,
+                                               os.path.basename(os.path.realpath(host_disk)),
+                                               os.path.basename(os.path.realpath(partition)),
+                                               "partition"))
 
-        except KeyError:
-            DISKINFO[host_disk]["RawCapacity"] = "Unknown"
+    if number is None:
+        #eg /dev/sda1, /dev/nvme0n1p1.
+        digits = len(partition) - len(partition.rstrip("0123456789"))
 
-        #Calculate human-readable capacity.
-        #Round the sizes to make them human-readable.
-        unit_list = [None, "B", "KB", "MB", "GB", "TB", "PB", "EB"]
-        unit = "B"
+        if not digits:
+            return None
 
-        try:
-            human_readable_size = int(DISKINFO[host_disk]["RawCapacity"])
+        number = partition[-digits:]
 
-            while len(str(human_readable_size)) > 3:
-                #Shift up one unit.
-                unit = unit_list[unit_list.index(unit)+1]
-                human_readable_size = human_readable_size//1000
+    try:
+        return int(number)
 
-        except (KeyError, ValueError, IndexError):
-            DISKINFO[host_disk]["Capacity"] = "Unknown"
+    except ValueError:
+        return None
 
-        else:
-            DISKINFO[host_disk]["Capacity"] = str(human_readable_size)+" "+unit
+def read_sysfs_attribute(path):
+    """
+    Private, implementation detail.
 
-        DISKINFO[host_disk]["BootRecord"], DISKINFO[host_disk]["BootRecordStrings"] = get_boot_record(host_disk)
+    This function reads an attribute file from sysfs.
 
-        DISKINFO[host_disk]["Description"] = generate_description(host_disk)
-        DISKINFO[host_disk]["Flags"] = "Unknown"
-        DISKINFO[host_disk]["Partitioning"] = "Unknown"
-        DISKINFO[host_disk]["ID"] = get_id(host_disk)
+    Args:
+        path (str):     The path to the attribute.
 
-        #Get any partitions as well.
-        if "children" in disk:
-            for child in disk["children"]:
-                child_disk = "/dev/"+child["name"]
+    Returns:
+        string/None. The attribute:
 
-                DISKINFO[child_disk] = {}
-                DISKINFO[child_disk]["Name"] = child_disk
-                DISKINFO[child_disk]["Type"] = "Partition"
-                DISKINFO[child_disk]["HostDevice"] = host_disk
-                DISKINFO[child_disk]["Partitions"] = []
-                DISKINFO[host_disk]["Partitions"].append(child_disk)
-                DISKINFO[child_disk]["Vendor"] = "N/A"
-                DISKINFO[child_disk]["Product"] = "Host Device: "+DISKINFO[host_disk]["Product"]
+            - None          - Couldn't read it, or it was empty.
+            - Anything else - The value, without any surrounding whitespace.
 
-                try:
-                    if child["uuid"] is None:
-                        DISKINFO[child_disk]["UUID"] = "Unknown"
-                    else:
-                        DISKINFO[child_disk]["UUID"] = child["uuid"]
+    Usage:
 
-                except KeyError:
-                    DISKINFO[child_disk]["UUID"] = "Unknown"
+    >>> value = read_sysfs_attribute(<aPath>)
+    """
 
-                try:
-                    DISKINFO[child_disk]["FileSystem"] = child["fstype"]
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as attribute:
+            value = attribute.read().strip()
 
-                except KeyError:
-                    DISKINFO[child_disk]["FileSystem"] = "Unknown"
+    except OSError:
+        return None
 
-                if DISKINFO[child_disk]["FileSystem"] is None:
-                    DISKINFO[child_disk]["FileSystem"] = "Unknown"
+    return value or None
 
-                try:
-                    DISKINFO[child_disk]["RawCapacity"] = str(child["size"])
+def get_sysfs_capacity(sysfs_dir):
+    """
+    Private, implementation detail.
 
-                except KeyError:
-                    DISKINFO[child_disk]["RawCapacity"] = "Unknown"
+    This function gets the capacity of a device or partition from the
+    size attribute in sysfs, which is always in 512-byte sectors.
 
-                #Calculate human-readable capacity.
-                #Round the sizes to make them human-readable.
-                unit_list = [None, "B", "KB", "MB", "GB", "TB", "PB", "EB"]
-                unit = "B"
+    Args:
+        sysfs_dir (str):    The device's or partition's folder in sysfs.
 
-                try:
-                    human_readable_size = int(DISKINFO[child_disk]["RawCapacity"])
+    Returns:
+        tuple (string, string). The sizes (bytes, human-readable):
 
+            - ("Unknown", "Unknown")     - Couldn't find them.
+            - Anything else              - The sizes.
 
-                    while len(str(human_readable_size)) > 3:
-                        #Shift up one unit.
-                        unit = unit_list[unit_list.index(unit)+1]
-                        human_readable_size = human_readable_size//1000
+    Usage:
 
-                except (KeyError, ValueError, IndexError):
-                    DISKINFO[child_disk]["Capacity"] = "Unknown"
+    >>> raw_size, human_size = get_sysfs_capacity(<aFolder>)
+    """
 
-                else:
-                    DISKINFO[child_disk]["Capacity"] = str(human_readable_size)+" "+unit
+    sectors = read_sysfs_attribute(os.path.join(sysfs_dir, "size"))
 
-                DISKINFO[child_disk]["BootRecord"], DISKINFO[child_disk]["BootRecordStrings"] = get_boot_record(child_disk)
+    if sectors is None or not sectors.isdigit():
+        return "Unknown", "Unknown"
 
-                DISKINFO[child_disk]["Description"] = "N/A"
-                DISKINFO[child_disk]["Flags"] = "Unknown"
-                DISKINFO[child_disk]["Partitioning"] = "N/A"
-                DISKINFO[child_disk]["ID"] = get_id(child_disk)
+    return compute_capacity(str(int(sectors)*512))
 
 def get_vendor(node):
     """
@@ -668,12 +2150,11 @@ def get_vendor(node):
     >>> vendor = get_vendor(<aNode>)
     """
 
-    if hasattr(node.vendor, "string"):
-        if isinstance(node.vendor.string, bytes):
-            return node.vendor.string.decode("utf-8", errors="replace")
+    if isinstance(node.vendor, bytes):
+        return node.vendor.decode("utf-8", errors="replace")
 
-        if isinstance(node.vendor.string, str):
-            return node.vendor.string #Already a unicode string.
+    if isinstance(node.vendor, str):
+        return node.vendor #Already a unicode string.
 
     return "Unknown"
 
@@ -698,12 +2179,11 @@ def get_product(node):
     >>> product = get_product(<aNode>)
     """
 
-    if hasattr(node.product, "string"):
-        if isinstance(node.product.string, bytes):
-            return node.product.string.decode("utf-8", errors="replace")
+    if isinstance(node.product, bytes):
+        return node.product.decode("utf-8", errors="replace")
 
-        if isinstance(node.product.string, str):
-            return node.product.string #Already a unicode string.
+    if isinstance(node.product, str):
+        return node.product #Already a unicode string.
 
     return "Unknown"
 
@@ -729,17 +2209,40 @@ def get_capacity(node):
     >>> raw_size, human_size = get_capacity(<aNode>)
     """
 
-    if hasattr(node, "size") and hasattr(node.size, "string"):
-        #This is actually an int, despite the misleading name.
-        raw_capacity = str(node.size.string)
+    if node.size is not None:
+        #This is actually an int, despite being text in the XML.
+        raw_capacity = str(node.size)
 
-    elif hasattr(node, "capacity") and hasattr(node.capacity, "string"):
-        #This is actually an int, despite the misleading name.
-        raw_capacity = str(node.capacity.string)
+    elif node.capacity is not None:
+        #This is actually an int, despite being text in the XML.
+        raw_capacity = str(node.capacity)
 
     else:
         return "Unknown", "Unknown"
 
+    return compute_capacity(raw_capacity)
+
+def compute_capacity(raw_capacity):
+    """
+    Private, implementation detail.
+
+    This function rounds a size in bytes to a human-readable form,
+    and returns both sizes.
+
+    Args:
+        raw_capacity (str):     The size, in bytes.
+
+    Returns:
+        tuple (string, string). The sizes (bytes, human-readable):
+
+            - ("Unknown", "Unknown")     - The size wasn't valid.
+            - Anything else              - The sizes.
+
+    Usage:
+
+    >>> raw_size, human_size = compute_capacity(<aSize>)
+    """
+
     #Round the sizes to make them human-readable.
     unit_list = [None, "B", "KB", "MB", "GB", "TB", "PB", "EB"]
     unit = "B"
@@ -787,17 +2290,14 @@ def get_capabilities(node):
     flags = []
 
     try:
-        for capability in node.capabilities.children:
-            if (not isinstance(capability, bs4.element.Tag)) or capability.name != "capability":
-                continue
+        for capability in node.capabilities:
+            if isinstance(capability, bytes):
+                flags.append(capability.decode("utf-8", errors="replace"))
 
-            if isinstance(capability["id"], bytes):
-                flags.append(capability["id"].decode("utf-8", errors="replace"))
+            elif isinstance(capability, str):
+                flags.append(capability)
 
-            elif isinstance(capability["id"], str):
-                flags.append(capability["id"])
-
-    except AttributeError:
+    except TypeError:
         return []
 
     else:
@@ -834,14 +2334,20 @@ def generate_description(disk):
 
     return "None"
 
-def get_partitioning(disk):
+def get_partitioning(collector, disk):
     """
     Private, implementation detail.
 
     This function gets the partition scheme from the
     structure generated by parsing lshw's XML output.
 
+    .. note::
+        This is only a guess. partition_tables_stage() replaces it
+        with what's actually in the partition table, if that can be read.
+
     Args:
+        collector (Collector):  The state of the scan.
+
         disk (str):   The name of a device/partition in
                       the disk info dictionary.
 
@@ -855,10 +2361,10 @@ def get_partitioning(disk):
 
     Usage:
 
-    >>> partitioning = get_partitioning(<aDiskName>)
+    >>> partitioning = get_partitioning(<aCollector>, <aDiskName>)
     """
     try:
-        partitioning = DISKINFO[disk]["Flags"][-1].split(":")[-1]
+        partitioning = collector.diskinfo[disk]["Flags"][-1].split(":")[-1]
 
         if partitioning in ("gpt", "dos"):
             if partitioning == "dos":
@@ -873,7 +2379,7 @@ def get_partitioning(disk):
 
     return partitioning
 
-def get_file_system(node):
+def get_file_system(collector, node):
     """
     Private, implementation detail.
 
@@ -881,6 +2387,8 @@ def get_file_system(node):
     generated by parsing lshw's XML output.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         node:   Represents a device/partition.
 
     Returns:
@@ -891,57 +2399,46 @@ def get_file_system(node):
 
     Usage:
 
-    >>> file_system = get_file_system(<aNode>)
+    >>> file_system = get_file_system(<aCollector>, <aNode>)
     """
 
     file_system = "Unknown"
     diskname = "Unknown"
 
-    try:
-        if isinstance(node.logicalname.string, bytes):
-            diskname = node.logicalname.string.decode("utf-8") #NOTE: is this ever bytes?
-
-        else:
-            diskname = node.logicalname.string
-
-    except AttributeError:
-        pass
-
-    try:
-        for config in node.configuration.children:
-            if (not isinstance(config, bs4.element.Tag)) or config.name != "setting":
-                continue
+    if isinstance(node.logicalname, bytes):
+        diskname = node.logicalname.decode("utf-8") #NOTE: is this ever bytes?
 
-            if config["id"] == "filesystem":
-                if isinstance(config["value"], bytes):
-                    file_system = config["value"].decode("utf-8", errors="replace")
+    elif node.logicalname is not None:
+        diskname = node.logicalname
 
-                elif isinstance(config["value"], str):
-                    file_system = config["value"] #Already a unicode string.
+    value = node.configuration.get("filesystem")
 
-                #Use different terminology where wanted.
-                if file_system == "fat":
-                    file_system = "vfat"
+    if isinstance(value, bytes):
+        file_system = value.decode("utf-8", errors="replace")
 
-                break
+    elif isinstance(value, str):
+        file_system = value #Already a unicode string.
 
-    except AttributeError:
-        pass
+    #Use different terminology where wanted.
+    if file_system == "fat":
+        file_system = "vfat"
 
     #Fall back to LVM equivelant if needed (works on all disks and
     #detects some things that lshw does not).
     if file_system == "Unknown" and diskname != "Unknown":
-        return get_lv_file_system(diskname)
+        return get_lv_file_system(collector, diskname)
 
     return file_system
 
-def get_uuid(disk):
+def get_uuid(collector, disk):
     """
     Private, implementation detail.
 
     This function gets the UUID of a given partition.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         disk (str):   The name of a **partition**.
 
     Returns:
@@ -952,34 +2449,20 @@ def get_uuid(disk):
 
     Usage:
 
-    >>> uuid = get_uuid(<aPartitionName>)
+    >>> uuid = get_uuid(<aCollector>, <aPartitionName>)
     """
 
-    uuid = "Unknown"
-
-    #Try to get the UUID from ls's output.
-    for line in LSUUIDOUTPUT.split('\n'):
-        line = line.replace("'", "")
-
-        try:
-            split_line = line.split()
-
-            if "../../"+disk.split('/')[-1] == split_line[-1]:
-                uuid = split_line[-3]
-                break
-
-        except IndexError:
-            pass
-
-    return uuid
+    return get_disk_link(collector, disk, "by-uuid")
 
-def get_id(disk):
+def get_id(collector, disk):
     """
     Private, implementation detail.
 
     This function gets the ID of a given partition or device.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         disk (str):   The name of a partition/device.
 
     Returns:
@@ -990,34 +2473,53 @@ def get_id(disk):
 
     Usage:
 
-    >>> disk_id = get_id(<aDiskName>)
+    >>> disk_id = get_id(<aCollector>, <aDiskName>)
     """
 
-    disk_id = "Unknown"
+    return get_disk_link(collector, disk, "by-id")
 
-    #Try to get the ID from ls's output.
-    for line in LSIDOUTPUT.split('\n'):
-        line = line.replace("'", "")
+def get_disk_link(collector, disk, kind):
+    """
+    Private, implementation detail.
 
-        try:
-            split_line = line.split()
+    This function gets the name of a given partition or device
+    from one of the folders in /dev/disk.
 
-            if "../../"+disk.split('/')[-1] == split_line[-1]:
-                disk_id = split_line[-3]
-                break
+    Args:
+        collector (Collector):  The state of the scan.
 
-        except IndexError:
-            pass
+        disk (str):   The name of a partition/device.
+        kind (str):   The folder, eg "by-label". See DISK_LINK_KINDS.
+
+    Returns:
+        string. The name:
+
+            - "Unknown"     - Couldn't find it.
+            - Anything else - The name. If there's more than one, this
+                              is the first in sorted order.
 
-    return disk_id
+    Usage:
+
+    >>> label = get_disk_link(<aCollector>, <aDiskName>, <aKind>)
+    """
+
+    #Look up the kernel name, in case this is a link like /dev/mapper/name or /dev/cdrom.
+    names = collector.disklinks.get(kind, {}).get(os.path.basename(os.path.realpath(disk)))
 
-def get_boot_record(disk):
+    if not names:
+        return "Unknown"
+
+    return names[0]
+
+def get_boot_record(collector, disk):
     """
     Private, implementation detail.
 
     This function gets the MBR/PBR of a given disk.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         disk (str):   The name of a partition/device.
 
     Returns:
@@ -1028,45 +2530,66 @@ def get_boot_record(disk):
 
     Usage:
 
-    >>> boot_record, boot_record_strings = get_boot_record(<aDiskName>)
+    >>> boot_record, boot_record_strings = get_boot_record(<aCollector>, <aDiskName>)
     """
 
-    #Use status=none to avoid getting status messages from dd in our boot record.
-    try:
-        cmd = subprocess.run(["dd", "if="+disk, "bs=512", "count=1", "status=none"],
-                             check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    #Don't read it if it wasn't asked for.
+    if not projection.wants(collector.fields, "BootRecord", "BootRecordStrings"):
+        return ("N/A", ["N/A"])
 
-    except (OSError, subprocess.CalledProcessError) as err:
-        ERRORS.append("linux.get_boot_record(): Exception: "+str(err)+" while running dd\n")
-        return_value = 1
+    if collector.lazy:
+        return lazy.split(lazy.Deferred(read_boot_record, collector, disk), 2)
 
-    else:
-        boot_record = cmd.stdout.decode("utf-8", errors="replace")
-        return_value = cmd.returncode
+    return read_boot_record(collector, disk)
+
+def read_boot_record(collector, disk):
+    """
+    Private, implementation detail.
+
+    This function reads the MBR/PBR of a given disk. See get_boot_record().
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        disk (str):   The name of a partition/device.
+
+    Returns:
+        tuple (string, string). The boot record (raw, any readable strings).
+
+    Usage:
+
+    >>> boot_record, boot_record_strings = read_boot_record(<aCollector>, <aDiskName>)
+    """
 
-    if return_value != 0:
-        return ("Unknown", ["Unknown"])
+    #Use the boot record read by boot_records_stage() if we have it.
+    #LVM names are links, so look those up under the real device name.
+    boot_record = collector.bootrecords.get(os.path.realpath(disk))
 
-    #Get the readable strings in the boot record.
-    with subprocess.Popen(["strings"], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
-                          stderr=subprocess.STDOUT) as cmd:
+    if boot_record is None:
+        try:
+            with report.device(collector.report, disk):
+                boot_record = bootrecord.BootRecordReader().read(disk)
 
-        cmd.stdin.write(bytes(boot_record, encoding="utf-8"))
-        boot_record_strings = cmd.communicate()[0].decode("utf-8", errors="replace").replace(" ", "").split("\n")
-        return_value = cmd.returncode
+        except OSError as err:
+            collector.errors.append(errors.ErrorRecord("linux.get_boot_record(): Exception: "
+                                                       + str(err)+" while reading boot record\n",
+                                                       device=disk))
 
-    if return_value != 0:
-        return (boot_record, ["Unknown"])
+            return ("Unknown", ["Unknown"])
 
-    return (boot_record, boot_record_strings)
+    return (boot_record.decode("utf-8", errors="replace"), bootrecord.get_strings(boot_record))
 
-def get_lv_file_system(disk):
+def get_lv_file_system(collector, disk):
     """
     Private, implementation detail.
 
-    This function gets the file system of a logical volume.
+    This function gets the file system of a logical volume (or any
+    other volume). Most file systems are recognised by reading their
+    superblocks directly, and blkid is only run for ones that aren't.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         disk (str):   The name of a logical volume.
 
     Returns:
@@ -1074,17 +2597,63 @@ def get_lv_file_system(disk):
 
     Usage:
 
-    >>> file_system = get_lv_file_system(<anLVName>)
+    >>> file_system = get_lv_file_system(<aCollector>, <anLVName>)
+    """
+
+    #Don't read it if it wasn't asked for.
+    if not projection.wants(collector.fields, "FileSystem"):
+        return "Unknown"
+
+    if collector.lazy:
+        return lazy.Deferred(read_lv_file_system, collector, disk)
+
+    with report.device(collector.report, disk):
+        return read_lv_file_system(collector, disk)
+
+def read_lv_file_system(collector, disk):
+    """
+    Private, implementation detail.
+
+    This function reads the file system of a volume. See get_lv_file_system().
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        disk (str):   The name of a volume.
+
+    Returns:
+        string. The file system.
+
+    Usage:
+
+    >>> file_system = read_lv_file_system(<aCollector>, <aVolumeName>)
     """
+
+    try:
+        result = superblock.probe(disk)
+
+    except OSError as err:
+        collector.errors.append(errors.ErrorRecord("linux.get_lv_file_system(): Exception: "
+                                                   + str(err)+" while reading superblock\n",
+                                                   device=disk))
+        return "Unknown"
+
+    if result is not None:
+        return result[0]
+
+    #Fall back to blkid for anything we don't recognise.
     env = os.environ.copy()
     env["LC_ALL"] = "C"
 
     try:
-        cmd = subprocess.run(["blkid", disk], stdout=subprocess.PIPE,
-                             stderr=subprocess.STDOUT, check=True, env=env)
+        cmd = report.run(collector.report, ["blkid", disk], stdout=subprocess.PIPE,
+                         stderr=subprocess.STDOUT, check=True, env=env)
 
     except (OSError, subprocess.CalledProcessError) as err:
-        ERRORS.append("linux.get_lv_file_system(): Exception: "+str(err)+" while running blkid\n")
+        collector.errors.append(errors.ErrorRecord("linux.get_lv_file_system(): Exception: "
+                                                   + str(err)+" while running blkid\n", device=disk,
+                                                   command=["blkid", disk],
+                                                   exit_code=getattr(err, "returncode", None)))
         return "Unknown"
 
     else:
@@ -1099,145 +2668,188 @@ def get_lv_file_system(disk):
     #We didn't find the type.
     return "Unknown"
 
-def get_lv_aliases(line):
+def get_block_size(disk, collector=None):
     """
-    Private, implementation detail.
+    **Public**
 
-    .. note::
-        "name" here means path eg /dev/mapper/fedora/root.
+    .. note:
+        It is perfectly safe to use this. get_info() only includes the
+        block sizes if they are asked for (see projection.OPTIONAL_FIELDS),
+        so if you need one, just call this function with a device name to
+        get it.
 
-    This function gets the names of a logical volume.
-    There may be one or more aliases as well as a "default"
-    name. Find and return all of them.
+    This function gets the physical block size of the given device. It is
+    read again on every call, from physical_block_size in the device's
+    queue folder in sysfs, with the BLKPBSZGET ioctl (0x127B) as the
+    fallback (see get_block_sizes()), and the blockdev command if neither
+    works.
 
     Args:
-        line (int):   The line number where the LV name can be found.
+        disk (str):     The partition/device/logical volume that
+                        we want the block size for.
+
+    Kwargs:
+        collector (Collector):  Where to record any errors. Default = None
+                                (COLLECTOR, so they end up in ERRORS).
 
     Returns:
-        tuple (string, list). The aliases (default_name, all aliases).
+        int/None. The block size.
+
+            - None - Failed!
+            - int  - The block size.
 
     Usage:
 
-    >>> default_name, alias_list = get_lv_aliases(<anLVName>)
+    >>> block_size = get_block_size(<aDeviceName>)
     """
 
-    alias_list = []
-    default_name = "Unknown"
+    if collector is None:
+        collector = COLLECTOR
 
-    #Get relevant part of the output line.
-    temp = line.split()[-1]
+    block_size = get_block_sizes([disk], collector=collector)[disk]["PhysicalBlockSize"]
 
-    #Try this way first for better compatibility with most systems.
-    if os.path.exists("/dev/mapper/"+'-'.join(temp.split("/")[2:])):
-        alias_list.append("/dev/mapper/"+'-'.join(temp.split("/")[2:]))
+    #Return it the same way compute_block_size() does.
+    if block_size is not None:
+        return str(block_size)
 
-    #Alternative ways of obtaining the info.
-    if os.path.exists(temp):
-        alias_list.append(temp)
-
-    #Weird one for Ubuntu with extra - in it.
-    if "-" in temp:
-        #Get volume group name and logical volume name.
-        vg_name = temp.split("/")[2]
-        lv_name = temp.split("/")[3]
-
-        #Insert another "-" in the middle (if possible).
-        vg_name = vg_name.replace("-", "--")
+    #Run /sbin/blockdev to try and get blocksize information.
+    command = ["blockdev",  "--getpbsz", disk]
 
-        #Check whether this works.
-        if os.path.exists("/dev/mapper/"+vg_name+"-"+lv_name):
-            alias_list.append("/dev/mapper/"+vg_name+"-"+lv_name)
+    try:
+        cmd = report.run(collector.report, command, stdout=subprocess.PIPE,
+                         stderr=subprocess.STDOUT, check=True)
 
-    if len(alias_list) >= 1:
-        default_name = alias_list[0]
+    except (OSError, subprocess.CalledProcessError) as err:
+        collector.errors.append(errors.ErrorRecord("linux.get_block_size(): Exception: "+str(err)
+                                                   + " while running blockdev\n", device=disk,
+                                                   command=command,
+                                                   exit_code=getattr(err, "returncode", None)))
+        return None
 
-    return default_name, alias_list
+    else:
+        #Get the output and pass it to compute_block_size.
+        return compute_block_size(cmd.stdout.decode("utf-8", errors="replace"))
 
-def get_lv_and_vg_name(volume):
+def get_block_sizes(disks, collector=None):
     """
-    Private, implementation detail.
-
-    .. note::
-        "name" here means the names of the logical volume and
-        the volume group by themselves. eg volume "root", in
-        volume group "fedora."
+    **Public**
 
-    This function gets the name of the logical volume (LV), and the
-    name of the volume group (VG) it belongs to.
+    .. note:
+        It is perfectly safe to use this. Nothing needs to be run, so it
+        is much faster than calling get_block_size() for each device.
+
+    This function gets the block sizes of the given devices, partitions,
+    and logical volumes. They are read again on every call, so they are
+    never out of date (eg if a device is replaced by another with the same
+    name), from the files in each device's queue folder in sysfs
+    (partitions use their device's). If those can't be read, the device
+    is opened and asked with the ioctls instead (see BLOCK_SIZE_SOURCES):
+    BLKSSZGET (0x1268), BLKPBSZGET (0x127B), BLKIOMIN (0x1278) and
+    BLKIOOPT (0x1279).
 
     Args:
-        volume (str):   The path for a logical volume.
+        disks (list):   The devices, partitions, and logical volumes.
+
+    Kwargs:
+        collector (Collector):  See get_block_size(). Default = None.
 
     Returns:
-        tuple (string, string). The VG, and LV name (vg_name, lv_name):
+        dict. For each disk, a dictionary with these keys. Each is an int,
+        or None if it couldn't be found:
 
-            - ("Unknown", "Unknown") - Couldn't find them.
-            - Anything else          - The VG and LV names.
+            - "LogicalBlockSize"    - The smallest unit that can be addressed.
+            - "PhysicalBlockSize"   - The smallest unit that can be written
+                                      without reading anything else.
+            - "MinimumIOSize"       - The smallest preferred I/O size.
+            - "OptimalIOSize"       - The preferred I/O size for large
+                                      transfers, or 0 if the device doesn't
+                                      say.
 
     Usage:
 
-    >>> vg_name, lv_name = get_lv_and_vg_name(<anLVPath>)
+    >>> block_sizes = get_block_sizes([<aDeviceName>, <anotherDeviceName>])
     """
 
-    if "/dev/mapper/" in volume:
-        separator = "-"
-
-        if "--" in volume:
-            separator = "--" #Weird Ubuntu LVM thing.
+    if collector is None:
+        collector = COLLECTOR
 
-        volume_group = volume.replace("/dev/mapper/", "").split(separator)[0]
-        logical_volume = volume.replace("/dev/mapper/", "").split(separator)[1]
+    #Read these once for all of the disks.
+    try:
+        names = sorted(os.listdir(SYSFS_BLOCK))
 
-    elif "/dev/" in volume:
-        volume_group = volume.split("/")[2]
-        logical_volume = volume.split("/")[3]
+    except OSError:
+        names = []
 
-    else:
-        volume_group, logical_volume = ("Unknown", "Unknown")
+    dm_names = {name: read_sysfs_attribute(os.path.join(SYSFS_BLOCK, name, "dm", "name"))
+                for name in names if name.startswith("dm-")}
 
-    return volume_group, logical_volume
+    return {disk: read_block_sizes(collector, disk, names, dm_names) for disk in disks}
 
-def get_block_size(disk):
+def read_block_sizes(collector, disk, names, dm_names):
     """
-    **Public**
-
-    .. note:
-        It is perfectly safe to use this. The block size information
-        isn't calculated when getting device information, so if you
-        need some, just call this function with a device name to get
-        it.
+    Private, implementation detail.
 
-    This function uses the blockdev command to get the block size
-    of the given device.
+    This function reads the block sizes of a device, partition or logical
+    volume. See get_block_sizes().
 
     Args:
-        disk (str):     The partition/device/logical volume that
-                        we want the block size for.
+        collector (Collector):  The state of the scan.
 
-    Returns:
-        int/None. The block size.
+        disk (str):         The device.
+        names (list):       The names in /sys/block.
+        dm_names (dict):    The device-mapper name of each dm device,
+                            keyed by kernel name.
 
-            - None - Failed!
-            - int  - The block size.
+    Returns:
+        dict. The block sizes.
 
     Usage:
 
-    >>> block_size = get_block_size(<aDeviceName>)
+    >>> sizes = read_block_sizes(<aCollector>, <aDeviceName>, <aList>, <aDict>)
     """
 
-    #Run /sbin/blockdev to try and get blocksize information.
-    command = ["blockdev",  "--getpbsz", disk]
+    sizes = dict.fromkeys(field for field, _attribute, _request in BLOCK_SIZE_SOURCES)
+    name = find_sysfs_name(disk, names, dm_names)
+
+    if name is not None:
+        #Partitions don't have a queue folder, so use their device's.
+        hosts = [name] if name in names else get_sysfs_hosts(name, names)
+
+        for host in hosts[:1]:
+            queue = os.path.join(SYSFS_BLOCK, host, "queue")
 
+            for field, attribute, _request in BLOCK_SIZE_SOURCES:
+                value = read_sysfs_attribute(os.path.join(queue, attribute))
+
+                if value is not None and value.isdigit():
+                    sizes[field] = int(value)
+
+    if None not in sizes.values():
+        return sizes
+
+    #Ask the device for anything that wasn't in sysfs.
     try:
-        cmd = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=True)
+        fd = os.open(disk, os.O_RDONLY | os.O_NONBLOCK)
 
-    except (OSError, subprocess.CalledProcessError) as err:
-        ERRORS.append("linux.get_block_size(): Exception: "+str(err)+" while running blockdev\n")
-        return None
+    except OSError as err:
+        collector.errors.append(errors.ErrorRecord("linux.get_block_sizes(): Exception: "+str(err)
+                                                   + " while opening "+disk+"\n", device=disk))
+        return sizes
 
-    else:
-        #Get the output and pass it to compute_block_size.
-        return compute_block_size(cmd.stdout.decode("utf-8", errors="replace"))
+    try:
+        for field, _attribute, request in BLOCK_SIZE_SOURCES:
+            if sizes[field] is None:
+                sizes[field] = struct.unpack("I", fcntl.ioctl(fd, request, bytes(4)))[0]
+
+    except OSError as err:
+        collector.errors.append(errors.ErrorRecord("linux.get_block_sizes(): Exception: "+str(err)
+                                                   + " while getting block sizes of "+disk+"\n",
+                                                   device=disk))
+
+    finally:
+        os.close(fd)
+
+    return sizes
 
 def compute_block_size(stdout):
     """
@@ -45,15 +45,25 @@ module, but you can call it directly if you like.
 
 """
 
+import sys
 import subprocess
 import plistlib
 
-#Define global variables to make pylint happy.
+from . import errors
+from . import partitiontable
+from . import projection
+from . import report
+from .collector import Collector
+
+#The state of the scans run by get_info() and get_devices(). Scans with
+#other Collectors (see collector.py) can run at the same time.
+COLLECTOR = Collector(sys.modules[__name__])
+
+#The results of the last scan run by get_info() or get_devices().
 DISKINFO = None
-PLIST = None
-ERRORS = []
+ERRORS = COLLECTOR.errors
 
-def get_info():
+def get_info(fields=None):
     """
     This function is the macOS-specific way of getting disk information.
     It makes use of the diskutil list, and diskutil info commands to gather
@@ -63,28 +73,244 @@ def get_info():
     it **doesn't** return the disk infomation. Instead, it is left as a
     global attribute in this module (DISKINFO).
 
+    The scan is run with COLLECTOR, so only one of these runs at a time.
+    Use a collector.Collector of your own to run a scan alongside it.
+
+    Kwargs:
+        fields (iterable):  The fields to collect (see projection.py).
+                            Default = None (all of them).
+
     Raises:
-        Nothing, hopefully, but errors have a small chance of propagation
-        up to here here. Wrap it in a try:, except: block if you are worried.
+        ValueError, if any of the fields don't exist. Nothing else,
+        hopefully, but errors have a small chance of propagation up to
+        here here. Wrap it in a try:, except: block if you are worried.
 
     Usage:
 
     >>> get_info()
+
+    OR:
+
+    >>> get_info(fields=<aSetOfFields>)
     """
 
     global DISKINFO
-    DISKINFO = {}
+    global ERRORS
+
+    try:
+        COLLECTOR.get_info(fields=fields)
+
+    finally:
+        DISKINFO = COLLECTOR.diskinfo
+        ERRORS = COLLECTOR.errors
+
+def collect_info(collector, fields=None, lazy=False): #pylint: disable=unused-argument
+    """
+    Private, implementation detail.
+
+    This function does the work of get_info(), leaving the results in the
+    given collector.Collector instead of this module's globals. Use
+    Collector.get_info() rather than calling this directly.
+
+    Args:
+        collector (Collector):  Where to keep the state of the scan.
+
+    Kwargs:
+        fields (iterable):      See get_info(). Default = None.
+        lazy (bool):            Ignored; lazy fields are only supported
+                                on Linux. Default = False.
+
+    Raises:
+        The same as get_info().
+
+    Usage:
+
+    >>> collect_info(<aCollector>)
+
+    OR:
+
+    >>> collect_info(<aCollector>, fields=<aSetOfFields>)
+    """
+
+    collector.reset(projection.normalise(fields))
+
+    #Find the disks.
+    with report.stage(collector.report, "list"):
+        disks = list_disks(collector)
+
+    if disks is None:
+        return
+
+    #A device's entry isn't finished until its partitions (which are listed
+    #after it) have been added to it, so it is passed to the listener with
+    #them when the next device starts.
+    finished = []
+
+    with report.stage(collector.report, "devices"):
+        for disk in disks:
+            with report.device(collector.report, disk):
+                get_disk_info(collector, disk)
+
+            volume = "/dev/"+disk
+
+            if volume in collector.diskinfo and collector.diskinfo[volume]["Type"] == "Device":
+                device_ready(collector, *finished)
+                finished = []
+
+            finished.append(volume)
+
+        device_ready(collector, *finished)
+
+    projection.project(collector.diskinfo, collector.fields)
+
+    #Check we found some disks.
+    if not collector.diskinfo:
+        raise RuntimeError("No Disks found!")
+
+def get_devices(disks, fields=None):
+    """
+    This function gets the information for some devices, and their
+    partitions, without finding out about every other disk. Only
+    diskutil list and diskutil info for those devices are run.
+
+    Like get_info(), it leaves the information in DISKINFO, replacing
+    anything there before.
+
+    Args:
+        disks (list):       The devices, eg ["/dev/disk2"]. If a partition is
+                            given, its device is used.
+
+    Kwargs:
+        fields (iterable):  See get_info(). Default = None (all of them).
+
+    Returns:
+        dict. The disk info dictionary, with just these devices and their
+        partitions. Devices that don't exist are reported in ERRORS.
+
+    Raises:
+        ValueError, if any of the fields don't exist.
+
+    Usage:
+
+    >>> disk_info = get_devices([<aDiskName>, <anotherDiskName>])
+    """
+
+    global DISKINFO
+    global ERRORS
+
+    try:
+        return COLLECTOR.get_devices(disks, fields=fields)
+
+    finally:
+        DISKINFO = COLLECTOR.diskinfo
+        ERRORS = COLLECTOR.errors
+
+def collect_devices(collector, disks, fields=None):
+    """
+    Private, implementation detail.
+
+    This function does the work of get_devices(), leaving the results in
+    the given collector.Collector instead of this module's globals. Use
+    Collector.get_devices() rather than calling this directly.
+
+    Args:
+        collector (Collector):  Where to keep the state of the scan.
+        disks (list):           See get_devices().
+
+    Kwargs:
+        fields (iterable):      See get_info(). Default = None.
+
+    Returns:
+        dict. The disk info dictionary.
+
+    Usage:
+
+    >>> disk_info = collect_devices(<aCollector>, [<aDiskName>])
+    """
+
+    collector.reset(projection.normalise(fields))
+
+    host_disks = []
+
+    for disk in disks:
+        #Use the name without /dev, and find the device if this is a partition.
+        disk = disk.split("/")[-1]
+
+        if not disk.startswith("disk"):
+            collector.errors.append(errors.ErrorRecord("macos.get_devices(): Not a disk: "
+                                                       + disk+"\n", device=disk))
+            continue
+
+        if is_partition(disk):
+            disk = disk.split("s")[0]+"s"+disk.split("s")[1]
+
+        if disk not in host_disks:
+            host_disks.append(disk)
+
+    for host_disk in host_disks:
+        #diskutil list for one device lists it and its partitions.
+        for disk in list_disks(collector, host_disk) or []:
+            get_disk_info(collector, disk)
+
+    projection.project(collector.diskinfo, collector.fields)
+
+    return collector.diskinfo
+
+def get_device(disk, fields=None):
+    """
+    This function gets the information for a device, and its partitions.
+    See get_devices().
+
+    Usage:
+
+    >>> disk_info = get_device(<aDiskName>)
+    """
+
+    return get_devices([disk], fields=fields)
+
+def list_disks(collector, disk=None):
+    """
+    Private, implementation detail.
+
+    This function runs diskutil list to find the names of the disks.
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+    Kwargs:
+        disk (str):     Only list this device, and its partitions.
+                        Default = None (list everything).
+
+    Returns:
+        list/None. The names of the disks, without /dev, or None if they
+        couldn't be found.
+
+    Usage:
+
+    >>> disks = list_disks(<aCollector>)
+
+    OR:
+
+    >>> disks = list_disks(<aCollector>, <aDiskName>)
+    """
+
+    command = ["diskutil", "list", "-plist"]
+
+    if disk is not None:
+        command.append(disk)
 
     #Run diskutil list to get disk names.
     try:
-        cmd = subprocess.run(["diskutil", "list", "-plist"], stdout=subprocess.PIPE,
-                             stderr=subprocess.STDOUT, check=True)
+        cmd = report.run(collector.report, command, stdout=subprocess.PIPE,
+                         stderr=subprocess.STDOUT, check=True)
 
     except (OSError, subprocess.CalledProcessError) as err:
-        ERRORS.append("macos.get_info(): Exception: "+str(err)+" while running "
-                      + "diskutil list\n")
+        collector.errors.append(errors.ErrorRecord("macos.get_info(): Exception: "+str(err)
+                                                   + " while running diskutil list\n",
+                                                   command=command,
+                                                   exit_code=getattr(err, "returncode", None)))
 
-        return
+        return None
 
     else:
         #Get the output.
@@ -92,64 +318,105 @@ def get_info():
         stdout = cmd.stdout
 
     #Parse the plist (Property List).
-    global PLIST
 
     try:
-        PLIST = plistlib.loads(stdout)
+        collector.plist = plistlib.loads(stdout)
 
     except Exception as err:
         #TODO find which specific exceptions to handle, not in docs.
-        ERRORS.append("macos.get_info(): Error parsing plist from diskutil list."
-                      + " Output: " +stdout.decode("utf-8", errors="replace")+". Exception: "+str(err)+"\n")
+        collector.errors.append("macos.get_info(): Error parsing plist from diskutil list."
+                                + " Output: " +stdout.decode("utf-8", errors="replace")+". Exception: "+str(err)+"\n")
+
+        return None
+
+    return collector.plist["AllDisks"]
+
+def device_ready(collector, *disks):
+    """
+    Private, implementation detail.
+
+    This function passes the entries for some devices, partitions, or
+    logical volumes that have just been finished to the collector's
+    listener, if it is set. Ones that aren't in the disk info dictionary are skipped.
+
+    Args:
+        collector (Collector):  The state of the scan.
 
+    Usage:
+
+    >>> device_ready(<aCollector>, <aDiskName>, <anotherDiskName>)
+    """
+
+    listener = collector.listener
+
+    if listener is None:
         return
 
-    #Find the disks.
-    for disk in PLIST["AllDisks"]:
-        #Run diskutil info to get disk info.
-        try:
-            cmd = subprocess.run(["diskutil", "info", "-plist", disk], stdout=subprocess.PIPE,
-                              stderr=subprocess.STDOUT, check=True)
+    for disk in disks:
+        if disk in collector.diskinfo:
+            listener(disk, collector.diskinfo[disk])
 
-        except (OSError, subprocess.CalledProcessError) as err:
-            ERRORS.append("macos.get_info(): Exception: "+str(err)+" while running "
-                          + "diskutil info\n")
+def get_disk_info(collector, disk):
+    """
+    Private, implementation detail.
 
-            continue
+    This function runs diskutil info for a device or partition, and
+    adds it to the disk info dictionary.
 
-        else:
-            #Get the output.
-            #Keep this in bytes as plistlib.loads requires bytes (misleading function name)
-            stdout = cmd.stdout
+    Args:
+        collector (Collector):  The state of the scan.
 
-        #Parse the plist (Property List).
-        try:
-            PLIST = plistlib.loads(stdout)
+        disk (str): The name of a device or partition, without the
+                    leading /dev. eg: disk1s1
 
-        except Exception as err:
-            #TODO find which specific exceptions to handle, not in docs.
-            ERRORS.append("macos.get_info(): Error parsing plist from diskutil info."
-                          + " Output: " +stdout.decode("utf-8", errors="replace")+". Exception: "+str(err)+"\n")
+    Usage:
 
-            continue
+    >>> get_disk_info(<aCollector>, <aDiskName>)
+    """
 
-        #Check if the disk is a partition.
-        disk_is_partition = is_partition(disk)
 
-        if not disk_is_partition:
-            #These are devices.
-            get_device_info(disk)
+    #Run diskutil info to get disk info.
+    try:
+        cmd = report.run(collector.report, ["diskutil", "info", "-plist", disk],
+                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=True)
 
-        else:
-            #These are Partitions. Fix for disks w/ more than 9 partitions.
-            host_disk = "/dev/"+disk.split("s")[0]+"s"+disk.split("s")[1]
-            get_partition_info(disk, host_disk)
+    except (OSError, subprocess.CalledProcessError) as err:
+        collector.errors.append(errors.ErrorRecord("macos.get_info(): Exception: "+str(err)
+                                                   + " while running diskutil info\n", device=disk,
+                                                   command=["diskutil", "info", "-plist", disk],
+                                                   exit_code=getattr(err, "returncode", None)))
 
-    #Check we found some disks.
-    if not DISKINFO:
-        raise RuntimeError("No Disks found!")
+        return
 
-def get_device_info(disk):
+    else:
+        #Get the output.
+        #Keep this in bytes as plistlib.loads requires bytes (misleading function name)
+        stdout = cmd.stdout
+
+    #Parse the plist (Property List).
+    try:
+        collector.plist = plistlib.loads(stdout)
+
+    except Exception as err:
+        #TODO find which specific exceptions to handle, not in docs.
+        collector.errors.append("macos.get_info(): Error parsing plist from diskutil info."
+                                + " Output: " +stdout.decode("utf-8", errors="replace")+". Exception: "+str(err)+"\n")
+
+        return
+
+    #Check if the disk is a partition.
+    disk_is_partition = is_partition(disk)
+
+    if not disk_is_partition:
+        #These are devices.
+        get_device_info(collector, disk)
+
+    else:
+        #These are Partitions. Fix for disks w/ more than 9 partitions.
+        host_disk = "/dev/"+disk.split("s")[0]+"s"+disk.split("s")[1]
+        get_partition_info(collector, disk, host_disk)
+
+def get_device_info(collector, disk):
     """
     Private, implementation detail.
 
@@ -158,6 +425,8 @@ def get_device_info(disk):
     module to do its work.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         disk (str): The name of a device, without the leading /dev. eg: disk1
 
     Returns:
@@ -165,29 +434,31 @@ def get_device_info(disk):
 
     Usage:
 
-    >>> host_disk = get_device_info(<aNode>)
+    >>> host_disk = get_device_info(<aCollector>, <aNode>)
     """
 
+    diskinfo = collector.diskinfo
+
     host_disk = "/dev/"+disk
-    DISKINFO[host_disk] = {}
-    DISKINFO[host_disk]["Name"] = host_disk
-    DISKINFO[host_disk]["Type"] = "Device"
-    DISKINFO[host_disk]["HostDevice"] = "N/A"
-    DISKINFO[host_disk]["Partitions"] = []
-    DISKINFO[host_disk]["Vendor"] = get_vendor(disk)
-    DISKINFO[host_disk]["Product"] = get_product(disk)
-    DISKINFO[host_disk]["RawCapacity"], DISKINFO[host_disk]["Capacity"] = get_capacity()
-    DISKINFO[host_disk]["Description"] = get_description(disk)
-    DISKINFO[host_disk]["Flags"] = get_capabilities(disk)
-    DISKINFO[host_disk]["Partitioning"] = get_partitioning(disk)
-    DISKINFO[host_disk]["FileSystem"] = "N/A"
-    DISKINFO[host_disk]["UUID"] = "N/A"
-    DISKINFO[host_disk]["ID"] = get_id(disk)
-    DISKINFO[host_disk]["BootRecord"], DISKINFO[host_disk]["BootRecordStrings"] = get_boot_record(disk)
+    diskinfo[host_disk] = {}
+    diskinfo[host_disk]["Name"] = host_disk
+    diskinfo[host_disk]["Type"] = "Device"
+    diskinfo[host_disk]["HostDevice"] = "N/A"
+    diskinfo[host_disk]["Partitions"] = []
+    diskinfo[host_disk]["Vendor"] = get_vendor(collector, disk)
+    diskinfo[host_disk]["Product"] = get_product(collector, disk)
+    diskinfo[host_disk]["RawCapacity"], diskinfo[host_disk]["Capacity"] = get_capacity(collector)
+    diskinfo[host_disk]["Description"] = get_description(collector, disk)
+    diskinfo[host_disk]["Flags"] = get_capabilities(disk)
+    diskinfo[host_disk]["Partitioning"] = get_partitioning(collector, disk)
+    diskinfo[host_disk]["FileSystem"] = "N/A"
+    diskinfo[host_disk]["UUID"] = "N/A"
+    diskinfo[host_disk]["ID"] = get_id(disk)
+    diskinfo[host_disk]["BootRecord"], diskinfo[host_disk]["BootRecordStrings"] = get_boot_record(disk)
 
     return host_disk
 
-def get_partition_info(disk, host_disk):
+def get_partition_info(collector, disk, host_disk):
     """
     Private, implementation detail.
 
@@ -196,6 +467,8 @@ def get_partition_info(disk, host_disk):
     module to do its work.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         disk (str):         The name of a partition, without the leading
                             /dev. eg: disk1s1
 
@@ -209,26 +482,32 @@ def get_partition_info(disk, host_disk):
 
     Usage:
 
-    >>> volume = get_device_info(<aDisk>, <aHostDisk>)
+    >>> volume = get_device_info(<aCollector>, <aDisk>, <aHostDisk>)
     """
 
+    diskinfo = collector.diskinfo
+
     volume = "/dev/"+disk
-    DISKINFO[volume] = {}
-    DISKINFO[volume]["Name"] = volume
-    DISKINFO[volume]["Type"] = "Partition"
-    DISKINFO[volume]["HostDevice"] = host_disk
-    DISKINFO[volume]["Partitions"] = []
-    DISKINFO[host_disk]["Partitions"].append(volume)
-    DISKINFO[volume]["Vendor"] = get_vendor(disk)
-    DISKINFO[volume]["Product"] = "Host Device: "+DISKINFO[host_disk]["Product"]
-    DISKINFO[volume]["RawCapacity"], DISKINFO[volume]["Capacity"] = get_capacity()
-    DISKINFO[volume]["Description"] = get_description(disk)
-    DISKINFO[volume]["Flags"] = get_capabilities(disk)
-    DISKINFO[volume]["FileSystem"] = get_file_system(disk)
-    DISKINFO[volume]["Partitioning"] = "N/A"
-    DISKINFO[volume]["UUID"] = get_uuid(disk)
-    DISKINFO[volume]["ID"] = get_id(disk)
-    DISKINFO[volume]["BootRecord"], DISKINFO[volume]["BootRecordStrings"] = get_boot_record(disk)
+    diskinfo[volume] = {}
+    diskinfo[volume]["Name"] = volume
+    diskinfo[volume]["Type"] = "Partition"
+    diskinfo[volume]["HostDevice"] = host_disk
+    diskinfo[volume]["Partitions"] = []
+    diskinfo[host_disk]["Partitions"].append(volume)
+    diskinfo[volume]["Vendor"] = get_vendor(collector, disk)
+    diskinfo[volume]["Product"] = "Host Device: "+diskinfo[host_disk]["Product"]
+    diskinfo[volume]["RawCapacity"], diskinfo[volume]["Capacity"] = get_capacity(collector)
+    diskinfo[volume]["Description"] = get_description(collector, disk)
+    diskinfo[volume]["Flags"] = get_capabilities(disk)
+    diskinfo[volume]["FileSystem"] = get_file_system(disk)
+    diskinfo[volume]["Partitioning"] = "N/A"
+    diskinfo[volume]["UUID"] = get_uuid(disk)
+    diskinfo[volume]["ID"] = get_id(disk)
+    diskinfo[volume]["BootRecord"], diskinfo[volume]["BootRecordStrings"] = get_boot_record(disk)
+
+    #The host disk's partition table was read by get_partitioning().
+    diskinfo[volume].update(partitiontable.get_geometry(collector.partitiontables.get(host_disk),
+                                                        get_partition_number(disk)))
 
     return volume
 
@@ -254,13 +533,15 @@ def is_partition(disk):
 
     return "s" in disk.split("disk")[1]
 
-def get_vendor(disk):
+def get_vendor(collector, disk):
     """
     Private, implementation detail.
 
     This function gets the vendor of the given disk.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         disk (str):   Name of a device/partition.
 
     Returns:
@@ -271,28 +552,30 @@ def get_vendor(disk):
 
     Usage:
 
-    >>> vendor = get_vendor(<aDisk>)
+    >>> vendor = get_vendor(<aCollector>, <aDisk>)
     """
 
-    if DISKINFO["/dev/"+disk]["Type"] == "Partition":
+    if collector.diskinfo["/dev/"+disk]["Type"] == "Partition":
         #We need to use the info from the host disk, which will be whatever came before.
-        return DISKINFO[DISKINFO["/dev/"+disk]["HostDevice"]]["Vendor"]
+        return collector.diskinfo[collector.diskinfo["/dev/"+disk]["HostDevice"]]["Vendor"]
 
     try:
-        vendor = PLIST["MediaName"].split()[0]
+        vendor = collector.plist["MediaName"].split()[0]
 
     except KeyError:
         vendor = "Unknown"
 
     return vendor
 
-def get_product(disk):
+def get_product(collector, disk):
     """
     Private, implementation detail.
 
     This function gets the product of the given disk.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         disk (str):   Name of a device/partition.
 
     Returns:
@@ -303,22 +586,22 @@ def get_product(disk):
 
     Usage:
 
-    >>> product = get_product(<aDisk>)
+    >>> product = get_product(<aCollector>, <aDisk>)
     """
 
-    if DISKINFO["/dev/"+disk]["Type"] == "Partition":
+    if collector.diskinfo["/dev/"+disk]["Type"] == "Partition":
         #We need to use the info from the host disk, which will be whatever came before.
-        return DISKINFO[DISKINFO["/dev/"+disk]["HostDevice"]]["Product"]
+        return collector.diskinfo[collector.diskinfo["/dev/"+disk]["HostDevice"]]["Product"]
 
     try:
-        product = ' '.join(PLIST["MediaName"].split()[1:])
+        product = ' '.join(collector.plist["MediaName"].split()[1:])
 
     except KeyError:
         product = "Unknown"
 
     return product
 
-def get_capacity():
+def get_capacity(collector):
     """
     Private, implementation detail.
 
@@ -326,6 +609,9 @@ def get_capacity():
     the diskutil info output we're storing. You can't really use this standalone.
     Also rounds it to a human-readable form, and returns both sizes.
 
+    Args:
+        collector (Collector):  The state of the scan.
+
     Returns:
         tuple (string, string). The sizes (bytes, human-readable):
 
@@ -334,11 +620,11 @@ def get_capacity():
 
     Usage:
 
-    >>> raw_size, human_size = get_capacity()
+    >>> raw_size, human_size = get_capacity(<aCollector>)
     """
 
     try:
-        raw_capacity = PLIST["TotalSize"]
+        raw_capacity = collector.plist["TotalSize"]
         raw_capacity = str(raw_capacity)
 
     except KeyError:
@@ -361,13 +647,15 @@ def get_capacity():
     #Include the unit in the result for both exact and human-readable sizes.
     return raw_capacity, str(human_readable_size)+" "+unit
 
-def get_description(disk):
+def get_description(collector, disk):
     """
     Private, implementation detail.
 
     This function generates a human-readable description of the given disk.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         disk (str):   Name of a device/partition.
 
     Returns:
@@ -376,14 +664,16 @@ def get_description(disk):
 
     Usage:
 
-    >>> description = get_description(<aDisk>)
+    >>> description = get_description(<aCollector>, <aDisk>)
     """
+
+    plist = collector.plist
     #Gather info from diskutil to create some descriptions.
     # -- Internal or external --
     internal_or_external = "Unknown "
 
-    if "Internal" in PLIST.keys():
-        if PLIST["Internal"]:
+    if "Internal" in plist.keys():
+        if plist["Internal"]:
             internal_or_external = "Internal "
 
         else:
@@ -392,13 +682,13 @@ def get_description(disk):
     # -- Type: Removable, SSD, or HDD --
     disk_type = "Unknown "
 
-    if ("Removable" in PLIST.keys() and PLIST['Removable']) or \
-       ("RemovableMedia" in PLIST.keys() and PLIST['RemovableMedia']):
+    if ("Removable" in plist.keys() and plist['Removable']) or \
+       ("RemovableMedia" in plist.keys() and plist['RemovableMedia']):
         disk_type = "Removable Drive "
 
     #Fix for old versions of OS X where the SolidState attribute is missing.
     #Means we assume things are HDDs if we can't otherwise figure them out.
-    if disk_type == "Unknown " and "SolidState" in PLIST.keys() and PLIST["SolidState"]:
+    if disk_type == "Unknown " and "SolidState" in plist.keys() and plist["SolidState"]:
         disk_type = "Solid State Drive "
 
     elif disk_type == "Unknown ":
@@ -407,19 +697,19 @@ def get_description(disk):
     # -- Bus protocol --
     bus_protocol = "Unknown"
 
-    if "BusProtocol" in PLIST.keys():
-        bus_protocol = str(PLIST["BusProtocol"])
+    if "BusProtocol" in plist.keys():
+        bus_protocol = str(plist["BusProtocol"])
 
     # -- APFS containers, volumes, physical stores --
     apfs_string = ""
 
-    if "Content" in PLIST.keys() and PLIST["Content"] == "Apple_APFS":
+    if "Content" in plist.keys() and plist["Content"] == "Apple_APFS":
         apfs_string = "(APFS Physical Store)"
 
-    elif "APFSContainerReference" in PLIST.keys() and PLIST["APFSContainerReference"] == disk:
+    elif "APFSContainerReference" in plist.keys() and plist["APFSContainerReference"] == disk:
         apfs_string = "(APFS Container)"
 
-    elif "FilesystemType" in PLIST.keys() and PLIST["FilesystemType"] == "apfs":
+    elif "FilesystemType" in plist.keys() and plist["FilesystemType"] == "apfs":
         apfs_string = "(APFS Volume)"
 
     #Assemble info into a string.
@@ -442,13 +732,77 @@ def get_capabilities(disk):
     #TODO
     return "Unknown"
 
-def get_partitioning(disk):
+def get_partitioning(collector, disk):
     """
-    Not yet implemented, returns "Unknown".
+    Private, implementation detail.
+
+    This function gets the partition scheme by reading the device's
+    partition table. The table is kept in the collector's partitiontables,
+    so the geometry of the partitions can be found without reading it again.
+
+    Args:
+        collector (Collector):  The state of the scan.
+
+        disk (str): The name of a device, without the leading /dev. eg: disk1
+
+    Returns:
+        string (str). The partition scheme:
+
+            - "Unknown"     - Couldn't find it.
+            - "mbr"         - Old-style MBR partitioning
+                              for BIOS systems.
+            - "gpt"         - New-style GPT partitioning.
+
+    Usage:
+
+    >>> partitioning = get_partitioning(<aCollector>, <aDiskName>)
     """
 
-    #TODO
-    return "Unknown"
+    #Don't read it if it wasn't asked for.
+    if not projection.wants(collector.fields, "Partitioning", *partitiontable.GEOMETRY_FIELDS):
+        collector.partitiontables["/dev/"+disk] = None
+        return "Unknown"
+
+    try:
+        table = partitiontable.read_partition_table("/dev/"+disk)
+
+    except (OSError, ValueError, OverflowError, MemoryError) as err:
+        collector.errors.append(errors.ErrorRecord("macos.get_partitioning(): Exception: "
+                                                   + str(err)+" while reading partition table "
+                                                   + "of /dev/"+disk+"\n",
+                                                   device="/dev/"+disk))
+
+        table = None
+
+    collector.partitiontables["/dev/"+disk] = table
+
+    if table is None:
+        return "Unknown"
+
+    return table["Scheme"]
+
+def get_partition_number(disk):
+    """
+    Private, implementation detail.
+
+    This function gets the number of a partition from its name.
+
+    Args:
+        disk (str): The name of a partition, without the leading /dev. eg: disk1s1
+
+    Returns:
+        int/None. The partition number, or None if the name doesn't have one.
+
+    Usage:
+
+    >>> number = get_partition_number(<aDiskName>)
+    """
+
+    try:
+        return int(disk.split("s")[2])
+
+    except (IndexError, ValueError):
+        return None
 
 def get_file_system(disk):
     """
@@ -482,7 +836,7 @@ def get_boot_record(disk):
     #TODO
     return "Unknown", "Unknown"
 
-def get_block_size(disk):
+def get_block_size(disk, collector=None):
     """
     **Public**
 
@@ -499,6 +853,10 @@ def get_block_size(disk):
         disk (str):     The partition/device that
                         we want the block size for.
 
+    Kwargs:
+        collector (Collector):  Where to record any errors. Default = None
+                                (COLLECTOR, so they end up in ERRORS).
+
     Returns:
         int/None. The block size.
 
@@ -510,30 +868,38 @@ def get_block_size(disk):
     >>> block_size = get_block_size(<aDeviceName>)
     """
 
+    if collector is None:
+        collector = COLLECTOR
+
     #Run diskutil list to get disk names.
     command = ["diskutil", "info", "-plist", disk]
 
     try:
-        cmd = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=True)
+        cmd = report.run(collector.report, command, stdout=subprocess.PIPE,
+                         stderr=subprocess.STDOUT, check=True)
 
     except (OSError, subprocess.CalledProcessError) as err:
-        ERRORS.append("macos.get_block_size(): Exception: "+str(err)+" while running "
-                      + "diskutil info\n")
+        collector.errors.append(errors.ErrorRecord("macos.get_block_size(): Exception: "+str(err)
+                                                   + " while running diskutil info\n", device=disk,
+                                                   command=command,
+                                                   exit_code=getattr(err, "returncode", None)))
 
         return None
 
     else:
         #Get the output and pass it to compute_block_size.
         #Keep this in bytes as plistlib.loads requires bytes (misleading function name)
-        return compute_block_size(disk, cmd.stdout)
+        return compute_block_size(collector, disk, cmd.stdout)
 
-def compute_block_size(disk, stdout):
+def compute_block_size(collector, disk, stdout):
     """
     Private, implementation detail.
 
     Used to process and tidy up the block size output from diskutil info.
 
     Args:
+        collector (Collector):  The state of the scan.
+
         stdout (str):       diskutil info's output.
 
     Returns:
@@ -544,7 +910,7 @@ def compute_block_size(disk, stdout):
 
     Usage:
 
-    >>> compute_block_size(<stdoutFromDiskutil>)
+    >>> compute_block_size(<aCollector>, <stdoutFromDiskutil>)
     """
 
     #Parse the plist (Property List).
@@ -553,8 +919,8 @@ def compute_block_size(disk, stdout):
 
     except Exception as err:
         #TODO find which specific exceptions to handle, not in docs.
-        ERRORS.append("macos.compute_block_size(): Error parsing plist from diskutil info."
-                      + " Output: " +stdout.decode("utf-8", errors="replace")+". Exception: "+str(err)+"\n")
+        collector.errors.append("macos.compute_block_size(): Error parsing plist from diskutil info."
+                                + " Output: " +stdout.decode("utf-8", errors="replace")+". Exception: "+str(err)+"\n")
 
         return None
 
@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Block Device Monitor For The Device Information Obtainer
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is the part of the package that keeps the Linux disk information
+dictionary up to date as devices are added, removed, and changed, instead
+of collecting everything again each time.
+
+It listens for udev's block device uevents on a netlink socket, and only
+re-probes (using sysfs) the device each event is about, along with its
+partitions. The time taken to apply each event is recorded, so you can see
+how quickly new devices become visible.
+
+For example:
+
+>>> import getdevinfo.linux as linux
+>>> import getdevinfo.monitor as monitor
+>>> linux.get_info()
+>>> monitor.Monitor().run()
+
+linux.DISKINFO is then updated in place as events arrive. To keep the
+results of another scan up to date, pass its collector.Collector:
+
+>>> monitor.Monitor(collector=<aCollector>).run()
+
+.. module: monitor.py
+    :platform: Linux
+    :synopsis: Block device uevent monitor for GetDevInfo.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <support@hamishmb.com>
+
+"""
+
+import os
+import socket
+import struct
+import time
+import collections
+
+from . import errors
+from . import linux
+from . import partitiontable
+from . import projection
+
+#From linux/netlink.h.
+NETLINK_KOBJECT_UEVENT = 15
+
+#Multicast groups. Kernel events arrive as soon as they happen. udev's events
+#arrive after udev has processed them (eg made the /dev/disk symlinks), so
+#UUIDs and IDs can be read from the links straight away.
+UEVENT_GROUP_KERNEL = 1
+UEVENT_GROUP_UDEV = 2
+
+#udev's messages start with this, followed by a header.
+UDEV_MESSAGE_PREFIX = b"libudev\x00"
+UDEV_MESSAGE_MAGIC = 0xfeedcafe
+
+#The largest message we expect.
+MAX_MESSAGE_SIZE = 65536
+
+#How many updates to remember.
+HISTORY_SIZE = 1000
+
+#Devices that get_info() ignores, so we do too.
+IGNORED_PREFIXES = ("loop", "zram", "nbd", "ram")
+
+def parse_uevent(message):
+    """
+    This function parses a uevent message from the kernel or udev.
+
+    Args:
+        message (bytes):    The message.
+
+    Returns:
+        dict/None. The properties in the message (eg "ACTION", "DEVNAME",
+        "SUBSYSTEM"), or None if the message couldn't be parsed.
+
+    Usage:
+
+    >>> event = parse_uevent(<aMessage>)
+    """
+
+    if message.startswith(UDEV_MESSAGE_PREFIX):
+        #Prefix, magic (big-endian), header size, properties offset, properties length.
+        if len(message) < 24:
+            return None
+
+        magic = struct.unpack(">I", message[8:12])[0]
+        offset, length = struct.unpack("=II", message[16:24])
+
+        if magic != UDEV_MESSAGE_MAGIC:
+            return None
+
+        fields = message[offset:offset+length].split(b"\x00")
+
+    else:
+        #"ACTION@DEVPATH", then the properties.
+        fields = message.split(b"\x00")
+
+        if not fields or b"@" not in fields[0]:
+            return None
+
+        fields = fields[1:]
+
+    event = {}
+
+    for field in fields:
+        key, separator, value = field.partition(b"=")
+
+        if separator:
+            event[key.decode("utf-8", errors="replace")] = value.decode("utf-8", errors="replace")
+
+    if "ACTION" not in event or "DEVPATH" not in event:
+        return None
+
+    return event
+
+class Monitor:
+    """
+    Applies block device uevents to a collector's disk info dictionary
+    (linux.DISKINFO by default) as they arrive.
+
+    Scan with the collector first to fill it in. Each update made is
+    recorded in history as a dictionary with the keys "Action", "Name",
+    "SeqNum", and "Latency" (seconds from receiving the event to the disk
+    info dictionary being up to date), and passed to callback, if given.
+
+    Devices are always re-probed using sysfs (see linux.collect_devices()),
+    as lshw can't probe one device on its own. If the collector scanned
+    with the lshw backend, re-probed devices have what the sysfs backend
+    finds (eg its Description and Vendor) instead. Scan with
+    backend="sysfs" to keep them consistent.
+
+    By default, udev's events are used, as they arrive once the
+    /dev/disk links have been made. On systems without udev, use
+    UEVENT_GROUP_KERNEL. The UUID and ID of a device might not have
+    been found then, as the links might not exist yet.
+
+    .. note::
+        Events are applied in the thread that calls run() or
+        handle_message(). Don't read the disk info dictionary from other
+        threads while an event is being applied.
+
+    Kwargs:
+        callback (function):    Called with each update. Default = None.
+        group (int):            The netlink group to listen to.
+                                Default = UEVENT_GROUP_UDEV.
+
+        collector (Collector):  The scan to keep up to date. Default = None
+                                (linux.COLLECTOR, whose results are in
+                                linux.DISKINFO).
+
+    Usage:
+
+    >>> Monitor().run()
+
+    OR:
+
+    >>> Monitor(callback=<aFunction>, group=<aGroup>).run(max_events=<anInt>)
+    """
+
+    def __init__(self, callback=None, group=UEVENT_GROUP_UDEV, collector=None):
+        self.callback = callback
+        self.group = group
+        self.sock = None
+        self.history = collections.deque(maxlen=HISTORY_SIZE)
+
+        if collector is None:
+            collector = linux.COLLECTOR
+
+        self.collector = collector
+
+        if collector.diskinfo is None:
+            collector.diskinfo = {}
+
+            if collector is linux.COLLECTOR:
+                linux.DISKINFO = collector.diskinfo
+
+        #Logical volumes are named after their dm name, which we can't
+        #read once they've been removed, so remember them.
+        self.dm_volumes = {}
+        self.dm_names = {}
+        self.update_dm_names()
+
+    def open(self):
+        """
+        Opens the netlink socket, if it isn't already open.
+
+        Raises:
+            OSError, if the socket couldn't be opened.
+        """
+
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM,
+                                      NETLINK_KOBJECT_UEVENT)
+
+            self.sock.bind((os.getpid(), self.group))
+
+    def close(self):
+        """Closes the socket."""
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def fileno(self):
+        """Returns the socket's file descriptor, so a Monitor can be used with select()."""
+        self.open()
+        return self.sock.fileno()
+
+    def run(self, max_events=None):
+        """
+        Receives and applies events until max_events have been received,
+        or forever if max_events is None.
+
+        Kwargs:
+            max_events (int):   How many messages to receive. Default = None.
+
+        Raises:
+            OSError, if the socket couldn't be opened or read.
+        """
+
+        self.open()
+        count = 0
+
+        while max_events is None or count < max_events:
+            message = self.sock.recv(MAX_MESSAGE_SIZE)
+            count += 1
+
+            self.handle_message(message, received=time.monotonic())
+
+    def handle_message(self, message, received=None):
+        """
+        Parses a message, and applies it if it is about a block device.
+
+        Args:
+            message (bytes):    The message.
+
+        Kwargs:
+            received (float):   When the message was received, from
+                                time.monotonic(). Default = now.
+
+        Returns:
+            dict/None. The update that was made (see the class docstring),
+            or None if the message was ignored.
+        """
+
+        if received is None:
+            received = time.monotonic()
+
+        event = parse_uevent(message)
+
+        if event is None or event.get("SUBSYSTEM") != "block":
+            return None
+
+        #This is the name in sysfs, eg cciss!c0d0.
+        name = event["DEVPATH"].rstrip("/").split("/")[-1]
+
+        if name.startswith(IGNORED_PREFIXES):
+            return None
+
+        try:
+            disk = self.apply(event["ACTION"], name, event.get("DEVTYPE"), event["DEVPATH"])
+
+        except Exception as err:
+            self.collector.errors.append(errors.ErrorRecord("monitor.Monitor.handle_message(): "
+                                                            + "Unhandled exception: "+str(err)
+                                                            + " while applying "+event["ACTION"]
+                                                            + " event for "+name+"\n",
+                                                            device="/dev/"
+                                                            + name.replace("!", "/")))
+
+            return None
+
+        if disk is None:
+            return None
+
+        update = {"Action": event["ACTION"], "Name": disk, "SeqNum": event.get("SEQNUM", "Unknown"),
+                  "Latency": time.monotonic() - received}
+
+        self.history.append(update)
+
+        if self.callback is not None:
+            self.callback(update)
+
+        return update
+
+    def apply(self, action, name, devtype, devpath):
+        """
+        Private, implementation detail.
+
+        Applies an event to the disk info dictionary.
+
+        Args:
+            action (str):   eg "add", "remove", or "change".
+            name (str):     The kernel name of the device. eg: sda1
+            devtype (str):  "disk" or "partition".
+            devpath (str):  The device's path in sysfs, without /sys.
+
+        Returns:
+            string/None. The name of the device in the disk info
+            dictionary, or None if nothing changed.
+        """
+
+        if action not in ("add", "remove", "change"):
+            return None
+
+        if name.startswith("dm-"):
+            return self.apply_dm(action, name)
+
+        if devtype == "partition":
+            #Re-probe the whole host device, so the partition list stays in order.
+            host_name = devpath.rstrip("/").split("/")[-2]
+
+            if action == "remove":
+                return self.remove_partition("/dev/"+name.replace("!", "/"))
+
+            self.reprobe_device(host_name)
+            return "/dev/"+name.replace("!", "/")
+
+        if action == "remove":
+            return self.remove_device("/dev/"+name.replace("!", "/"))
+
+        return self.reprobe_device(name)
+
+    def reprobe_device(self, name):
+        """
+        Private, implementation detail.
+
+        Probes a device and its partitions again, replacing anything we
+        knew about them before. This always uses sysfs, whichever backend
+        the collector scanned with (see the class docstring).
+        """
+
+        collector = self.collector
+        host_disk = "/dev/"+name.replace("!", "/")
+
+        #Forget what was read from the device and its partitions, the ones we
+        #knew about and the ones it has now, before reading any of it again.
+        #Don't use links from the last full scan either.
+        stale = [host_disk]+["/dev/"+partition.replace("!", "/")
+                             for partition in linux.get_sysfs_partitions(name)]
+
+        if host_disk in collector.diskinfo:
+            stale += collector.diskinfo[host_disk]["Partitions"]
+
+        for volume in stale:
+            collector.bootrecords.pop(volume, None)
+            collector.partitiontables.pop(volume, None)
+            collector.blocksizes.pop(volume, None)
+
+        self.remove_device(host_disk)
+
+        if projection.wants(collector.fields, "UUID", "ID"):
+            collector.disklinks = linux.get_disk_links()
+
+        linux.get_sysfs_device_info(collector, name)
+        volumes = [host_disk]+collector.diskinfo[host_disk]["Partitions"]
+
+        if projection.wants(collector.fields, "Partitioning", *partitiontable.GEOMETRY_FIELDS):
+            linux.get_partition_table_info(collector, host_disk)
+
+        if projection.wants(collector.fields, *projection.OPTIONAL_FIELDS):
+            linux.add_block_sizes(collector, volumes)
+
+        #Only keep the fields get_info() was asked for.
+        projection.project({volume: collector.diskinfo[volume] for volume in volumes},
+                           collector.fields)
+
+        return host_disk
+
+    def remove_device(self, host_disk):
+        """
+        Private, implementation detail.
+
+        Removes a device and its partitions from the disk info dictionary.
+        """
+
+        collector = self.collector
+
+        if host_disk not in collector.diskinfo:
+            return None
+
+        for partition in collector.diskinfo[host_disk]["Partitions"]:
+            collector.diskinfo.pop(partition, None)
+            collector.bootrecords.pop(partition, None)
+
+        del collector.diskinfo[host_disk]
+        collector.bootrecords.pop(host_disk, None)
+        collector.partitiontables.pop(host_disk, None)
+
+        return host_disk
+
+    def remove_partition(self, volume):
+        """
+        Private, implementation detail.
+
+        Removes a partition from the disk info dictionary, and from its
+        host device's list of partitions.
+        """
+
+        diskinfo = self.collector.diskinfo
+
+        if volume not in diskinfo:
+            return None
+
+        host_disk = diskinfo.pop(volume)["HostDevice"]
+        self.collector.bootrecords.pop(volume, None)
+
+        if host_disk in diskinfo and volume in diskinfo[host_disk]["Partitions"]:
+            diskinfo[host_disk]["Partitions"].remove(volume)
+
+        return volume
+
+    def update_dm_names(self):
+        """
+        Private, implementation detail.
+
+        Reads the names of all the device-mapper devices, and remembers
+        which logical volume each one is.
+        """
+
+        self.dm_names = {}
+
+        try:
+            names = [name for name in os.listdir(linux.SYSFS_BLOCK) if name.startswith("dm-")]
+
+        except OSError:
+            names = []
+
+        for name in names:
+            self.dm_names[name] = linux.read_sysfs_attribute(os.path.join(linux.SYSFS_BLOCK, name,
+                                                                          "dm", "name"))
+
+            if self.dm_names[name] is not None:
+                self.dm_volumes[name] = "/dev/mapper/"+self.dm_names[name]
+
+    def apply_dm(self, action, name):
+        """
+        Private, implementation detail.
+
+        Applies an event for a device-mapper device (eg a logical volume).
+        """
+
+        collector = self.collector
+        volume = self.dm_volumes.pop(name, None)
+        removed = volume is not None and collector.diskinfo.pop(volume, None) is not None
+
+        collector.bootrecords.pop("/dev/"+name, None)
+
+        if action == "remove":
+            return volume if removed else None
+
+        self.update_dm_names()
+
+        if self.dm_names.get(name) is None:
+            return None
+
+        volume = linux.get_dm_lv_info(collector, name, self.dm_names)
+
+        if volume is not None:
+            if projection.wants(collector.fields, *projection.OPTIONAL_FIELDS):
+                collector.blocksizes.pop(volume, None)
+                linux.add_block_sizes(collector, [volume])
+
+            projection.project({volume: collector.diskinfo[volume]}, collector.fields)
+
+        return volume
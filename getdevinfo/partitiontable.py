@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Partition Table Parser For The Device Information Obtainer
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is the part of the package that reads GPT and MBR partition tables
+directly from devices (or image files). It works the same way on every
+platform, and is used to fill in the partitioning scheme of devices and
+the geometry of their partitions.
+
+The MBR, the GPT header and the usual GPT entry array are all read at
+once. Another read is only needed if the entry array is somewhere unusual,
+or to follow the chain of logical partitions in an MBR extended partition.
+
+.. module: partitiontable.py
+    :platform: Linux, macOS, Cygwin
+    :synopsis: Platform-independent partition table parser for GetDevInfo.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <support@hamishmb.com>
+
+"""
+
+import os
+import platform
+import struct
+import uuid
+import zlib
+
+try:
+    import fcntl
+
+except ImportError:
+    #Not available on Windows.
+    fcntl = None
+
+#Enough for the MBR, the GPT header and 128 128-byte entries, with 512 or 4096-byte sectors.
+READ_SIZE = 4096*2 + 128*128
+
+#The sector sizes to look for a GPT header with.
+SECTOR_SIZES = (512, 4096)
+
+#The ioctls that get a device's logical sector size, for each platform.
+#BLKSSZGET on Linux, and DKIOCGETBLOCKSIZE on macOS.
+SECTOR_SIZE_IOCTLS = {"Linux": 0x1268, "Darwin": 0x40046418}
+
+#The limits of a GPT entry array we're willing to read. The usual one is
+#128 128-byte entries (16 KiB), so anything bigger than these is corrupt.
+MAX_GPT_ENTRY_SIZE = 4096
+MAX_GPT_ENTRIES_SIZE = 1048576
+
+#MBR partition types.
+MBR_PROTECTIVE_TYPE = 0xEE
+MBR_EXTENDED_TYPES = (0x05, 0x0F, 0x85)
+
+#Stop following chains of logical partitions after this many, in case they loop.
+MAX_LOGICAL_PARTITIONS = 128
+
+#The fields added for each partition by get_geometry().
+GEOMETRY_FIELDS = ("StartLBA", "EndLBA", "PartitionType", "PartitionName",
+                   "PartitionUUID", "PartitionAttributes")
+
+def read_partition_table(disk, sector_size=None):
+    """
+    This function reads the partition table of a device.
+
+    Args:
+        disk (str):     The name of a device, or an image file.
+
+    Kwargs:
+        sector_size (int):  The device's logical sector size, which MBR
+                            partition tables (and the EBRs of logical
+                            partitions) are in. Default = None (ask the
+                            device, or 512 if that doesn't work, eg for
+                            image files). GPT headers are looked for with
+                            each of SECTOR_SIZES.
+
+    Returns:
+        dict. The partition table, with the keys:
+
+            - "Scheme"      - "gpt", "mbr" or "Unknown" (no partition table
+                              that we recognise).
+            - "SectorSize"  - The sector size the LBAs are in.
+            - "DiskUUID"    - The GPT disk GUID, or "N/A" for MBR.
+            - "Partitions"  - A dictionary of partitions, keyed by partition
+                              number, each with the keys in GEOMETRY_FIELDS.
+
+    Raises:
+        OSError, if the device couldn't be opened or read.
+
+        ValueError, if the GPT header or entry array is corrupt (eg its
+        checksum is wrong, or it is far too big).
+
+    Usage:
+
+    >>> table = read_partition_table(<aDiskName>)
+
+    OR:
+
+    >>> table = read_partition_table(<aDiskName>, sector_size=4096)
+    """
+
+    fd = os.open(disk, os.O_RDONLY)
+
+    try:
+        if sector_size is None:
+            sector_size = get_sector_size(fd)
+
+        return parse_partition_table(os.pread(fd, READ_SIZE, 0),
+                                     lambda offset, length: os.pread(fd, length, offset),
+                                     sector_size)
+
+    finally:
+        os.close(fd)
+
+def get_sector_size(fd):
+    """
+    Private, implementation detail.
+
+    This function asks a device for its logical sector size.
+
+    Args:
+        fd (int):   An open file descriptor for the device.
+
+    Returns:
+        int. The logical sector size, or 512 if the device couldn't tell
+        us (eg it's an image file, or there's no ioctl for it here).
+    """
+
+    request = SECTOR_SIZE_IOCTLS.get(platform.system())
+
+    if fcntl is None or request is None:
+        return 512
+
+    try:
+        sector_size = struct.unpack("I", fcntl.ioctl(fd, request, bytes(4)))[0]
+
+    except OSError:
+        return 512
+
+    if sector_size not in SECTOR_SIZES:
+        return 512
+
+    return sector_size
+
+def parse_partition_table(data, read, sector_size=512):
+    """
+    Private, implementation detail.
+
+    This function parses a partition table.
+
+    Args:
+        data (bytes):       The start of the device (see READ_SIZE).
+        read (function):    Called as read(offset, length) to read any
+                            other parts of the device that are needed.
+
+    Kwargs:
+        sector_size (int):  The logical sector size. Default = 512.
+
+    Returns:
+        dict. The partition table. See read_partition_table().
+
+    Raises:
+        ValueError, if the GPT header or entry array is corrupt.
+
+    Usage:
+
+    >>> table = parse_partition_table(<someBytes>, <aFunction>)
+
+    OR:
+
+    >>> table = parse_partition_table(<someBytes>, <aFunction>, sector_size=4096)
+    """
+
+    table = {"Scheme": "Unknown", "SectorSize": sector_size, "DiskUUID": "N/A", "Partitions": {}}
+
+    #Everything we understand starts with an MBR (a protective one, for GPT).
+    if len(data) < 512 or data[510:512] != b"\x55\xaa":
+        return table
+
+    mbr_entries = [parse_mbr_entry(data[446+(16*number):462+(16*number)])
+                   for number in range(4)]
+
+    if any(entry["Type"] == MBR_PROTECTIVE_TYPE for entry in mbr_entries):
+        for gpt_sector_size in SECTOR_SIZES:
+            if data[gpt_sector_size:gpt_sector_size+8] == b"EFI PART":
+                parse_gpt(table, data, read, gpt_sector_size)
+                return table
+
+    table["Scheme"] = "mbr"
+
+    for number, entry in enumerate(mbr_entries, start=1):
+        if entry["Type"] == 0 or entry["Sectors"] == 0:
+            continue
+
+        table["Partitions"][number] = make_mbr_partition(entry, 0)
+
+        if entry["Type"] in MBR_EXTENDED_TYPES:
+            parse_logical_partitions(table, read, entry["StartLBA"], sector_size)
+
+    return table
+
+def parse_mbr_entry(data):
+    """
+    Private, implementation detail.
+
+    Parses a 16-byte MBR partition entry.
+    """
+
+    status, partition_type, start, sectors = struct.unpack("<B3xB3xII", data)
+    return {"Status": status, "Type": partition_type, "StartLBA": start, "Sectors": sectors}
+
+def make_mbr_partition(entry, base):
+    """
+    Private, implementation detail.
+
+    Makes the geometry for an MBR partition entry, whose start is relative
+    to the given base LBA.
+    """
+
+    start = base+entry["StartLBA"]
+
+    return {"StartLBA": start, "EndLBA": start+entry["Sectors"]-1,
+            "PartitionType": "0x%02x" % entry["Type"], "PartitionName": "N/A",
+            "PartitionUUID": "N/A", "PartitionAttributes": entry["Status"]}
+
+def parse_logical_partitions(table, read, extended_start, sector_size=512):
+    """
+    Private, implementation detail.
+
+    This function follows the chain of EBRs in an MBR extended partition to
+    find the logical partitions, which are numbered from 5.
+
+    Args:
+        table (dict):           The partition table to add them to.
+        read (function):        Reads other parts of the device.
+        extended_start (int):   The start of the extended partition.
+
+    Kwargs:
+        sector_size (int):      The logical sector size the LBAs are in.
+                                Default = 512.
+
+    Usage:
+
+    >>> parse_logical_partitions(<aTable>, <aFunction>, <anLBA>)
+
+    OR:
+
+    >>> parse_logical_partitions(<aTable>, <aFunction>, <anLBA>, sector_size=4096)
+    """
+
+    ebr_lba = extended_start
+    seen = set()
+
+    for number in range(5, 5+MAX_LOGICAL_PARTITIONS):
+        if ebr_lba in seen:
+            break
+
+        seen.add(ebr_lba)
+
+        try:
+            ebr = read(ebr_lba*sector_size, 512)
+
+        except OSError:
+            break
+
+        if len(ebr) < 512 or ebr[510:512] != b"\x55\xaa":
+            break
+
+        logical = parse_mbr_entry(ebr[446:462])
+        next_ebr = parse_mbr_entry(ebr[462:478])
+
+        if logical["Type"] != 0 and logical["Sectors"] != 0:
+            #The logical partition's start is relative to its EBR.
+            table["Partitions"][number] = make_mbr_partition(logical, ebr_lba)
+
+        if next_ebr["Type"] == 0 or next_ebr["StartLBA"] == 0:
+            break
+
+        #The next EBR's start is relative to the extended partition.
+        ebr_lba = extended_start+next_ebr["StartLBA"]
+
+def parse_gpt(table, data, read, sector_size):
+    """
+    Private, implementation detail.
+
+    This function parses a GPT header, and its partition entries. Their
+    checksums are checked, and the sizes in the header are checked before
+    anything is read with them, so a corrupt (or malicious) device can't
+    make us read (or allocate) huge amounts.
+
+    Args:
+        table (dict):           The partition table to fill in.
+        data (bytes):           The start of the device.
+        read (function):        Reads other parts of the device.
+        sector_size (int):      The sector size the header was found with.
+
+    Raises:
+        ValueError, if the header or entry array is corrupt.
+
+    Usage:
+
+    >>> parse_gpt(<aTable>, <someBytes>, <aFunction>, <aSectorSize>)
+    """
+
+    header_size, header_crc = struct.unpack("<II", data[sector_size+12:sector_size+20])
+
+    if header_size < 92 or header_size > sector_size:
+        raise ValueError("Invalid GPT header size: "+str(header_size))
+
+    header = data[sector_size:sector_size+header_size]
+
+    if len(header) < header_size:
+        raise ValueError("GPT header is truncated")
+
+    #The checksum is calculated with its own field set to zero.
+    if zlib.crc32(header[:16]+bytes(4)+header[20:]) != header_crc:
+        raise ValueError("GPT header checksum doesn't match")
+
+    entries_lba, entry_count, entry_size, entries_crc = struct.unpack("<QIII", header[72:92])
+
+    if entry_size < 128 or entry_size % 8 or entry_size > MAX_GPT_ENTRY_SIZE:
+        raise ValueError("Invalid GPT entry size: "+str(entry_size))
+
+    length = entry_count*entry_size
+
+    if length > MAX_GPT_ENTRIES_SIZE:
+        raise ValueError("GPT entry array is too big: "+str(length)+" bytes")
+
+    table["Scheme"] = "gpt"
+    table["SectorSize"] = sector_size
+    table["DiskUUID"] = str(uuid.UUID(bytes_le=header[56:72]))
+
+    offset = entries_lba*sector_size
+
+    if offset+length <= len(data):
+        entries = data[offset:offset+length]
+
+    else:
+        try:
+            entries = read(offset, length)
+
+        except (OSError, OverflowError):
+            return
+
+    if len(entries) == length and zlib.crc32(entries) != entries_crc:
+        raise ValueError("GPT entry array checksum doesn't match")
+
+    for index in range(min(entry_count, len(entries)//entry_size)):
+        entry = entries[index*entry_size:(index+1)*entry_size]
+
+        #Unused entries have an all-zero type.
+        if entry[:16] == bytes(16):
+            continue
+
+        first_lba, last_lba, attributes = struct.unpack("<QQQ", entry[32:56])
+        name = entry[56:128].decode("utf-16-le", errors="replace").split("\x00")[0]
+
+        table["Partitions"][index+1] = {"StartLBA": first_lba, "EndLBA": last_lba,
+                                        "PartitionType": str(uuid.UUID(bytes_le=entry[:16])),
+                                        "PartitionName": name,
+                                        "PartitionUUID": str(uuid.UUID(bytes_le=entry[16:32])),
+                                        "PartitionAttributes": attributes}
+
+def get_geometry(table, number):
+    """
+    This function gets the geometry of a partition from a partition table,
+    for adding to the disk info dictionary.
+
+    Args:
+        table (dict/None):  A partition table from read_partition_table(),
+                            or None if it couldn't be read.
+
+        number (int/None):  The partition number, or None if it isn't known.
+
+    Returns:
+        dict. The fields in GEOMETRY_FIELDS. These are all "Unknown" if the
+        partition isn't in the table.
+
+    Usage:
+
+    >>> geometry = get_geometry(<aTable>, <aNumber>)
+    """
+
+    if table is None or number not in table["Partitions"]:
+        return dict.fromkeys(GEOMETRY_FIELDS, "Unknown")
+
+    return dict(table["Partitions"][number])
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Field Projection For The Device Information Obtainer
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is the part of the package that lets callers ask for only some of
+the fields in the disk info dictionary, with getdevinfo.get_info(fields=...),
+so the work needed only for the other fields is skipped.
+
+Every field has a cost class, which says what has to be done to get it:
+
+    - COST_FREE     - Comes with finding the devices (eg from lshw, sysfs,
+                      or diskutil). Asking for fewer of these doesn't make
+                      a scan any faster.
+    - COST_LOOKUP   - Looked up somewhere else (eg /dev/disk), without
+                      reading the device.
+    - COST_READ     - Read from the device itself (eg its boot record or
+                      partition table), so a scan gets faster, and works on
+                      more devices without root, without these.
+    - COST_COMMAND  - Can run another command for each device (eg blkid,
+                      for file systems that aren't recognised directly).
+
+The costs are for Linux. On Cygwin, the COST_FREE fields other than the
+structural ones need smartctl (and "Description" needs cygpath) to be
+run for each device, and on macOS everything comes from diskutil.
+
+"Name", "Type", "HostDevice" and "Partitions" are always included, so the
+devices can still be related to each other.
+
+The block size fields (see OPTIONAL_FIELDS) are only collected if they
+are asked for by name, and only on Linux.
+
+.. module: projection.py
+    :platform: Linux, macOS, Cygwin
+    :synopsis: Field selection for GetDevInfo.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <support@hamishmb.com>
+
+"""
+
+from . import lazy
+
+#Cost classes.
+COST_FREE = "free"
+COST_LOOKUP = "lookup"
+COST_READ = "read"
+COST_COMMAND = "command"
+
+#Every field, and its cost class.
+COSTS = {
+    "Name": COST_FREE,
+    "Type": COST_FREE,
+    "HostDevice": COST_FREE,
+    "Partitions": COST_FREE,
+    "Vendor": COST_FREE,
+    "Product": COST_FREE,
+    "RawCapacity": COST_FREE,
+    "Capacity": COST_FREE,
+    "Description": COST_FREE,
+    "Flags": COST_FREE,
+    "Aliases": COST_FREE,
+    "VGName": COST_FREE,
+    "LVName": COST_FREE,
+    "HostPartition": COST_FREE,
+    "UUID": COST_LOOKUP,
+    "ID": COST_LOOKUP,
+    "Partitioning": COST_READ,
+    "StartLBA": COST_READ,
+    "EndLBA": COST_READ,
+    "PartitionType": COST_READ,
+    "PartitionName": COST_READ,
+    "PartitionUUID": COST_READ,
+    "PartitionAttributes": COST_READ,
+    "BootRecord": COST_READ,
+    "BootRecordStrings": COST_READ,
+    "FileSystem": COST_COMMAND,
+    "LogicalBlockSize": COST_LOOKUP,
+    "PhysicalBlockSize": COST_LOOKUP,
+    "MinimumIOSize": COST_LOOKUP,
+    "OptimalIOSize": COST_LOOKUP,
+}
+
+#Always included.
+STRUCTURAL_FIELDS = frozenset(("Name", "Type", "HostDevice", "Partitions"))
+
+#Only collected if they're asked for by name (Linux only).
+OPTIONAL_FIELDS = frozenset(("LogicalBlockSize", "PhysicalBlockSize", "MinimumIOSize",
+                             "OptimalIOSize"))
+
+def normalise(fields):
+    """
+    This function checks a set of requested fields.
+
+    Args:
+        fields (iterable/None): The fields that were asked for, or None for
+                                all of them.
+
+    Returns:
+        frozenset/None. The fields, including the structural ones, or None
+        for all of them.
+
+    Raises:
+        ValueError, if any of the fields don't exist.
+
+    Usage:
+
+    >>> fields = normalise(<aSetOfFields>)
+    """
+
+    if fields is None:
+        return None
+
+    if isinstance(fields, str):
+        fields = [fields]
+
+    fields = frozenset(fields)
+    unknown = fields.difference(COSTS)
+
+    if unknown:
+        raise ValueError("Unknown fields: "+', '.join(sorted(unknown)))
+
+    return fields | STRUCTURAL_FIELDS
+
+def wants(fields, *names):
+    """
+    This function returns True if any of the named fields were asked for.
+    If fields is None, that means any that aren't in OPTIONAL_FIELDS.
+
+    Args:
+        fields (frozenset/None):    From normalise().
+        *names (str):               The fields to check.
+
+    Usage:
+
+    >>> if wants(<someFields>, "BootRecord", "BootRecordStrings"):
+    >>>     <read the boot record>
+    """
+
+    if fields is None:
+        return not OPTIONAL_FIELDS.issuperset(names)
+
+    return not fields.isdisjoint(names)
+
+def project(diskinfo, fields):
+    """
+    This function removes the fields that weren't asked for from a disk
+    info dictionary, in place.
+
+    Args:
+        diskinfo (dict):            The disk info dictionary.
+        fields (frozenset/None):    From normalise().
+
+    Usage:
+
+    >>> project(<aDiskInfoDict>, <someFields>)
+    """
+
+    if fields is None:
+        return
+
+    for info in diskinfo.values():
+        for field in [field for field in info if field not in fields]:
+            del info[field]
+
+def project_copy(diskinfo, fields):
+    """
+    This function returns a copy of a disk info dictionary with only the
+    fields that were asked for. The original isn't changed, and changing
+    the copy doesn't change the original: each entry is copied, and so are
+    the lists in them (eg Partitions).
+
+    Args:
+        diskinfo (dict):            The disk info dictionary.
+        fields (frozenset/None):    From normalise(). None copies all of them.
+
+    Returns:
+        dict. The copy. Lazy fields (see lazy.py) are copied without
+        working them out.
+
+    Usage:
+
+    >>> diskinfo = project_copy(<aDiskInfoDict>, <someFields>)
+    """
+
+    copy = {}
+
+    for name, info in diskinfo.items():
+        if isinstance(info, lazy.LazyDict):
+            entry = info.subset(info if fields is None else fields)
+
+        else:
+            entry = {field: value for field, value in info.items()
+                     if fields is None or field in fields}
+
+        #Read without working out lazy fields.
+        for field, value in dict.items(entry):
+            if isinstance(value, list):
+                dict.__setitem__(entry, field, list(value))
+
+        copy[name] = entry
+
+    return copy
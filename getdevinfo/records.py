@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Compact Device Records For The Device Information Obtainer
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is the part of the package that stores disk information compactly,
+for programs that keep it for a long time on systems with a lot of
+devices, partitions, and logical volumes.
+
+Each device is a DeviceRecord, which uses __slots__ instead of a
+dictionary, and has the same fields as the disk info dictionary, eg:
+
+>>> records = getdevinfo.get_records()
+>>> records["/dev/sda"].RawCapacity
+1000204886016
+
+RawCapacity is an integer (or the string it came from, eg "Unknown", if
+it isn't a number), and strings are interned, so the same ones (eg
+vendors, products, and file systems) are shared between records instead
+of being stored again for each one (this includes boot records, which
+are often the same for partitions with the same file system). Lists are
+stored as tuples.
+
+Fields that weren't collected (eg because only some fields were asked
+for, or they don't apply to the device) aren't set at all.
+
+For code that expects the disk info dictionary, as_dict() gives a
+read-only view of a record that works like the dictionary, without
+copying it, and InventoryView does the same for a whole set of records.
+
+.. module: records.py
+    :platform: Linux, macOS, Cygwin
+    :synopsis: Compact device records for GetDevInfo.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <support@hamishmb.com>
+
+"""
+
+import sys
+import collections.abc
+
+from . import projection
+
+#The fields a record can have, in the order they're shown.
+FIELDS = tuple(projection.COSTS)
+
+#Returned by DeviceRecord.get() for fields that weren't collected.
+MISSING = object()
+
+class DeviceRecord:
+    """
+    A compact record of the information about one device or partition.
+    Use from_info() to make one from an entry in the disk info dictionary.
+
+    Every field in the disk info dictionary is an attribute. Fields that
+    weren't collected aren't set, so reading them raises AttributeError.
+    Use as_dict() for something that works like the dictionary.
+
+    Usage:
+
+    >>> record = DeviceRecord.from_info(<anEntryInTheDiskInfoDict>)
+    >>> record.Capacity
+    """
+
+    __slots__ = FIELDS + ("Extra",)
+
+    @classmethod
+    def from_info(cls, info):
+        """
+        Makes a record from an entry in the disk info dictionary.
+
+        Args:
+            info (dict):    The entry, eg diskinfo["/dev/sda"].
+
+        Returns:
+            DeviceRecord. The record.
+        """
+
+        record = cls()
+
+        for field, value in info.items():
+            if field not in projection.COSTS:
+                #Keep anything we don't know about as it is.
+                if not hasattr(record, "Extra"):
+                    record.Extra = {}
+
+                record.Extra[field] = value
+                continue
+
+            setattr(record, field, pack(field, value))
+
+        return record
+
+    def get(self, field, default=None):
+        """
+        Returns a field the way the disk info dictionary has it, or default
+        if it wasn't collected.
+        """
+
+        try:
+            value = getattr(self, field)
+
+        except AttributeError:
+            try:
+                return self.Extra[field]
+
+            except (AttributeError, KeyError):
+                return default
+
+        return unpack(field, value)
+
+    def fields(self):
+        """Returns the names of the fields that were collected, in order."""
+        names = [field for field in FIELDS if hasattr(self, field)]
+
+        if hasattr(self, "Extra"):
+            names.extend(self.Extra)
+
+        return names
+
+    def as_dict(self):
+        """
+        Returns a read-only view of this record that works like its entry
+        in the disk info dictionary. Nothing is copied; each field is
+        converted back when it is read.
+        """
+
+        return RecordView(self)
+
+    def __eq__(self, other):
+        if not isinstance(other, DeviceRecord):
+            return NotImplemented
+
+        return self.as_dict() == other.as_dict()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+
+        if result is NotImplemented:
+            return result
+
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "DeviceRecord("+repr(dict(self.as_dict()))+")"
+
+    def __getstate__(self):
+        return {field: getattr(self, field) for field in self.__slots__ if hasattr(self, field)}
+
+    def __setstate__(self, state):
+        for field, value in state.items():
+            setattr(self, field, value)
+
+class RecordView(collections.abc.Mapping):
+    """
+    A read-only view of a DeviceRecord that works like its entry in the
+    disk info dictionary. See DeviceRecord.as_dict().
+    """
+
+    __slots__ = ("record",)
+
+    def __init__(self, record):
+        self.record = record
+
+    def __getitem__(self, field):
+        value = self.record.get(field, MISSING)
+
+        if value is MISSING:
+            raise KeyError(field)
+
+        return value
+
+    def __iter__(self):
+        return iter(self.record.fields())
+
+    def __len__(self):
+        return len(self.record.fields())
+
+    def __repr__(self):
+        return repr(dict(self))
+
+class InventoryView(collections.abc.Mapping):
+    """
+    A read-only view of a set of DeviceRecords that works like the disk
+    info dictionary, for code that expects that.
+
+    Args:
+        records (dict):     DeviceRecords, keyed by device name, eg from
+                            from_diskinfo().
+
+    Usage:
+
+    >>> disk_info = InventoryView(<someRecords>)
+    >>> disk_info["/dev/sda"]["Capacity"]
+    """
+
+    __slots__ = ("records",)
+
+    def __init__(self, records):
+        self.records = records
+
+    def __getitem__(self, name):
+        return self.records[name].as_dict()
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+def from_diskinfo(diskinfo):
+    """
+    This function makes records for everything in a disk info dictionary.
+
+    Args:
+        diskinfo (dict):    The disk info dictionary.
+
+    Returns:
+        dict. A DeviceRecord for each device, keyed by device name.
+
+    Usage:
+
+    >>> records = from_diskinfo(<aDiskInfoDict>)
+    """
+
+    return {sys.intern(name): DeviceRecord.from_info(info) for name, info in diskinfo.items()}
+
+def to_diskinfo(records):
+    """
+    This function turns records back into a disk info dictionary.
+
+    Args:
+        records (dict):     DeviceRecords, keyed by device name.
+
+    Returns:
+        dict. The disk info dictionary.
+
+    Usage:
+
+    >>> diskinfo = to_diskinfo(<someRecords>)
+    """
+
+    return {name: dict(record.as_dict()) for name, record in records.items()}
+
+def pack(field, value):
+    """
+    Private, implementation detail.
+
+    Converts a value from the disk info dictionary to the way a record
+    stores it.
+    """
+
+    #Only if it will be the same when it's converted back.
+    if field == "RawCapacity" and isinstance(value, str) and value.isdigit() \
+        and str(int(value)) == value:
+
+        return int(value)
+
+    if isinstance(value, list):
+        return tuple(pack(None, item) for item in value)
+
+    #Many devices have the same vendor, product, file system, boot record, etc.
+    if isinstance(value, str):
+        return sys.intern(value)
+
+    return value
+
+def unpack(field, value):
+    """
+    Private, implementation detail.
+
+    Converts a value stored in a record back to the way the disk info
+    dictionary has it.
+    """
+
+    if field == "RawCapacity" and isinstance(value, int):
+        return str(value)
+
+    if isinstance(value, tuple):
+        return list(value)
+
+    return value
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Scan Reports For The Device Information Obtainer
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is the part of the package that records where the time in a scan
+went, so slow scans can be diagnosed. getdevinfo.get_info(timings=True)
+returns a ScanReport along with the disk information, eg:
+
+>>> disk_info, scan_report = getdevinfo.get_info(timings=True)
+>>> print(scan_report)
+
+A report has:
+
+    - How long each stage took (see linux.run_stages()). On macOS and
+      Cygwin, which don't have stages, "list" and "devices" are used.
+    - Every command that was run: its arguments, how long it took, and
+      its exit code (None if it couldn't be started).
+    - How many processes were started (one for each command).
+    - How long was spent reading each device (eg its boot record,
+      partition table, and file system, and any commands run just for
+      it), so a device that is slow to respond stands out.
+
+It is also printed by "python3 -m getdevinfo --timings".
+
+Each scan has its own report (see collector.Collector.report), which is
+passed to the functions below, so scans that run at the same time don't
+record in each other's reports.
+
+.. module: report.py
+    :platform: Linux, macOS, Cygwin
+    :synopsis: Scan timing reports for GetDevInfo.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <support@hamishmb.com>
+
+"""
+
+import time
+import threading
+import contextlib
+import subprocess
+
+class CommandRecord:
+    """
+    A command that was run during a scan.
+
+    Args:
+        argv (list):            The command, and its arguments.
+        duration (float):       How long it took, in seconds.
+        returncode (int/None):  Its exit code, or None if it couldn't be
+                                started.
+    """
+
+    __slots__ = ("argv", "duration", "returncode")
+
+    def __init__(self, argv, duration, returncode):
+        self.argv = list(argv)
+        self.duration = duration
+        self.returncode = returncode
+
+    def as_dict(self):
+        """Returns the record as a dictionary, eg for saving as JSON."""
+        return {"Argv": self.argv, "Duration": self.duration, "ReturnCode": self.returncode}
+
+    def __repr__(self):
+        return "CommandRecord("+repr(self.as_dict())+")"
+
+class ScanReport:
+    """
+    A record of where the time in a scan went. Stages and devices that run
+    at the same time (in different threads) can add to the same report.
+
+    Kwargs:
+        cached (bool):  Whether the results came from the cache (or the
+                        snapshot), so nothing was scanned. Default = False.
+
+    Usage:
+
+    >>> scan_report = ScanReport()
+    >>> with scan_report.stage(<aStageName>):
+    >>>     <do something>
+    """
+
+    def __init__(self, cached=False):
+        self.cached = cached
+        self.started = time.time()
+        self.duration = None
+        self.stages = {}
+        self.commands = []
+        self.devices = {}
+
+        self.lock = threading.Lock()
+        self.start_time = time.perf_counter()
+
+    @property
+    def forks(self):
+        """How many processes were started."""
+        return len(self.commands)
+
+    @property
+    def finished(self):
+        """Whether finish() has been called."""
+        return self.duration is not None
+
+    def finish(self):
+        """Records how long the whole scan took, and returns the report."""
+        self.duration = time.perf_counter() - self.start_time
+        return self
+
+    def add_stage(self, name, duration):
+        """Records how long a stage took."""
+        with self.lock:
+            self.stages[name] = self.stages.get(name, 0.0) + duration
+
+    def add_command(self, argv, duration, returncode):
+        """Records a command that was run."""
+        with self.lock:
+            self.commands.append(CommandRecord(argv, duration, returncode))
+
+    def add_device(self, name, duration):
+        """Adds to the time spent reading a device."""
+        with self.lock:
+            self.devices[name] = self.devices.get(name, 0.0) + duration
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Times the code in the with block as the named stage."""
+        start = time.perf_counter()
+
+        try:
+            yield
+
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    @contextlib.contextmanager
+    def device(self, name):
+        """Adds the time taken by the code in the with block to the named device."""
+        start = time.perf_counter()
+
+        try:
+            yield
+
+        finally:
+            self.add_device(name, time.perf_counter() - start)
+
+    def as_dict(self):
+        """Returns the report as a dictionary, eg for saving as JSON."""
+        with self.lock:
+            return {
+                "Cached": self.cached,
+                "Started": self.started,
+                "Duration": self.duration,
+                "Forks": len(self.commands),
+                "Stages": dict(self.stages),
+                "Commands": [command.as_dict() for command in self.commands],
+                "Devices": dict(self.devices),
+            }
+
+    def format(self):
+        """Returns the report as text, with the slowest stages, commands, and devices first."""
+        report = self.as_dict()
+        lines = []
+
+        if report["Cached"]:
+            lines.append("Results came from the cache; nothing was scanned.")
+
+        if report["Duration"] is not None:
+            lines.append("Total: {0:.3f}s".format(report["Duration"]))
+
+        lines.append("Processes started: "+str(report["Forks"]))
+
+        lines.append("\nStages:")
+
+        for name, duration in sorted(report["Stages"].items(), key=lambda item: -item[1]):
+            lines.append("    {0:>10.3f}s  {1}".format(duration, name))
+
+        lines.append("\nCommands:")
+
+        for command in sorted(report["Commands"], key=lambda command: -command["Duration"]):
+            lines.append("    {0:>10.3f}s  exit {1:<5} {2}".format(
+                command["Duration"], str(command["ReturnCode"]), ' '.join(command["Argv"])))
+
+        lines.append("\nDevices:")
+
+        for name, duration in sorted(report["Devices"].items(), key=lambda item: -item[1]):
+            lines.append("    {0:>10.3f}s  {1}".format(duration, name))
+
+        return "\n".join(lines)+"\n"
+
+    def __str__(self):
+        return self.format()
+
+    def __repr__(self):
+        return "ScanReport("+repr(self.as_dict())+")"
+
+def recording(scan_report):
+    """
+    Private, implementation detail.
+
+    This function returns whether anything should be recorded in the given
+    report. Nothing is, if there isn't one, or once it has been finished
+    (eg when a lazy field is read after the scan).
+
+    Args:
+        scan_report (ScanReport):   The report, or None.
+
+    Returns:
+        bool. Whether to record in the report.
+
+    Usage:
+
+    >>> recording(<aScanReport>)
+    """
+
+    return scan_report is not None and not scan_report.finished
+
+def stage(scan_report, name):
+    """
+    This function times the code in a with block as the named stage of
+    the given report, if there is one.
+
+    Args:
+        scan_report (ScanReport):   The report, or None.
+        name (str):                 The name of the stage.
+
+    Usage:
+
+    >>> with stage(<aScanReport>, <aStageName>):
+    >>>     <do something>
+    """
+
+    if not recording(scan_report):
+        return contextlib.suppress()
+
+    return scan_report.stage(name)
+
+def device(scan_report, name):
+    """
+    This function adds the time taken by the code in a with block to the
+    named device in the given report, if there is one.
+
+    Args:
+        scan_report (ScanReport):   The report, or None.
+        name (str):                 The name of the device.
+
+    Usage:
+
+    >>> with device(<aScanReport>, <aDiskName>):
+    >>>     <read the device>
+    """
+
+    if not recording(scan_report):
+        return contextlib.suppress()
+
+    return scan_report.device(name)
+
+def run(scan_report, command, **kwargs):
+    """
+    This function runs a command with subprocess.run(), and records it in
+    the given report, if there is one.
+
+    Args:
+        scan_report (ScanReport):   The report, or None.
+        command (list):             The command to run, and its arguments.
+        **kwargs:                   Passed to subprocess.run().
+
+    Returns:
+        subprocess.CompletedProcess. The same as subprocess.run().
+
+    Raises:
+        The same as subprocess.run().
+
+    Usage:
+
+    >>> cmd = run(<aScanReport>, <aCommand>, stdout=subprocess.PIPE, check=True)
+    """
+
+    start_time = time.perf_counter()
+    returncode = None
+
+    try:
+        cmd = subprocess.run(command, **kwargs)
+        returncode = cmd.returncode
+
+    except subprocess.CalledProcessError as err:
+        returncode = err.returncode
+        raise
+
+    finally:
+        if recording(scan_report):
+            scan_report.add_command(command, time.perf_counter() - start_time, returncode)
+
+    return cmd
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Snapshot Store For The Device Information Obtainer
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is the part of the package that saves the results of a scan to disk,
+so short-lived programs can load them instead of scanning again each time
+they start.
+
+A snapshot is saved together with the fingerprint of the block devices
+it was made from (see cache.get_fingerprint()), and is only loaded if the
+fingerprint still matches. Snapshots are written atomically (to a
+temporary file that is then renamed), and are only readable by their
+owner. Snapshots that aren't owned by root or the current user, or that
+others can write to, are ignored.
+
+Use getdevinfo.get_info(use_snapshot=True) rather than calling this
+module directly.
+
+.. module: snapshot.py
+    :platform: Linux, macOS, Cygwin
+    :synopsis: On-disk snapshot store for GetDevInfo.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <support@hamishmb.com>
+
+"""
+
+import os
+import json
+import base64
+import tempfile
+
+from .errors import ErrorRecord
+
+#Where snapshots are kept by default.
+SNAPSHOT_PATH = "/var/cache/getdevinfo/snapshot.json"
+
+#Increase this whenever the layout of the disk info dictionary (or of the
+#snapshot) changes, so old snapshots aren't used.
+SCHEMA_VERSION = 2
+
+#Used to store bytes (eg boot records), which JSON can't represent.
+BYTES_TAG = "__bytes__"
+
+def save(diskinfo, errors, fingerprint, path=None):
+    """
+    This function saves a snapshot.
+
+    Args:
+        diskinfo (dict):    The disk info dictionary.
+        errors (list):      The errors from the scan. Their details (see
+                            errors.py) are saved with them.
+        fingerprint (str):  The fingerprint from before the scan started.
+
+    Kwargs:
+        path (str):         Where to save it. Default = SNAPSHOT_PATH.
+
+    Raises:
+        OSError, if the snapshot couldn't be written.
+
+        TypeError/ValueError, if the disk info dictionary contains
+        something that can't be saved.
+
+    Usage:
+
+    >>> save(<aDiskInfoDict>, <anErrorsList>, <aFingerprint>)
+
+    OR:
+
+    >>> save(<aDiskInfoDict>, <anErrorsList>, <aFingerprint>, path=<aPath>)
+    """
+
+    if path is None:
+        path = SNAPSHOT_PATH
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o755, exist_ok=True)
+
+    snapshot = {"SchemaVersion": SCHEMA_VERSION, "Fingerprint": fingerprint,
+                "DiskInfo": diskinfo, "Errors": [encode_error(error) for error in errors]}
+
+    #Encode it first, so a half-written snapshot is never left behind.
+    encoded = json.dumps(snapshot, default=encode_bytes).encode("utf-8")
+
+    #mkstemp() creates the file with mode 0600.
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+
+    try:
+        with open(fd, "wb") as snapshot_file:
+            snapshot_file.write(encoded)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+
+        os.replace(temp_path, path)
+
+    except BaseException:
+        try:
+            os.remove(temp_path)
+
+        except OSError:
+            pass
+
+        raise
+
+def load(fingerprint, path=None):
+    """
+    This function loads a snapshot, if there is one that is still valid.
+
+    Args:
+        fingerprint (str):  The fingerprint of the block devices now.
+
+    Kwargs:
+        path (str):         Where to load it from. Default = SNAPSHOT_PATH.
+
+    Returns:
+        tuple (dict, list)/None. The disk info dictionary and errors (as
+        errors.ErrorRecords), or None if there is no snapshot, it can't be
+        trusted, it's from another version of GetDevInfo, or the devices
+        have changed since it was saved.
+
+    Usage:
+
+    >>> result = load(<aFingerprint>)
+
+    OR:
+
+    >>> result = load(<aFingerprint>, path=<aPath>)
+    """
+
+    if path is None:
+        path = SNAPSHOT_PATH
+
+    #Without a fingerprint, we can't tell if the snapshot is out of date.
+    if fingerprint is None:
+        return None
+
+    try:
+        with open(path, "rb") as snapshot_file:
+            if not is_trusted(os.fstat(snapshot_file.fileno())):
+                return None
+
+            snapshot = json.loads(snapshot_file.read().decode("utf-8"),
+                                  object_hook=decode_bytes)
+
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(snapshot, dict) or snapshot.get("SchemaVersion") != SCHEMA_VERSION \
+        or snapshot.get("Fingerprint") != fingerprint:
+
+        return None
+
+    try:
+        errors = [decode_error(error) for error in snapshot["Errors"]]
+
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    return snapshot["DiskInfo"], errors
+
+def is_trusted(stat):
+    """
+    Private, implementation detail.
+
+    Returns True if a snapshot is owned by root or us, and nobody else can
+    write to it.
+    """
+
+    if stat.st_uid not in (0, os.geteuid()):
+        return False
+
+    return not stat.st_mode & 0o022
+
+def encode_bytes(obj):
+    """
+    Private, implementation detail.
+
+    Used by json.dumps() to store bytes as base64.
+    """
+
+    if isinstance(obj, bytes):
+        return {BYTES_TAG: base64.b64encode(obj).decode("ascii")}
+
+    raise TypeError("Can't save "+type(obj).__name__+" in a snapshot")
+
+def encode_error(error):
+    """
+    Private, implementation detail.
+
+    Returns an error, and its details (see errors.ErrorRecord.as_dict()),
+    as a dictionary that can be saved in a snapshot.
+    """
+
+    if not isinstance(error, ErrorRecord):
+        error = ErrorRecord(error)
+
+    details = error.as_dict()
+    details["Text"] = str(error)
+
+    return details
+
+def decode_error(details):
+    """
+    Private, implementation detail.
+
+    Turns a dictionary from encode_error() back into an errors.ErrorRecord.
+
+    Raises:
+        KeyError/TypeError/ValueError, if it isn't one.
+    """
+
+    if not isinstance(details["Text"], str):
+        raise TypeError("Errors must be strings")
+
+    error = ErrorRecord(details["Text"], device=details.get("Device"),
+                        command=details.get("Command"), exit_code=details.get("ExitCode"),
+                        stage=details.get("Stage"))
+
+    if details.get("Time") is not None:
+        error.time = float(details["Time"])
+
+    return error
+
+def decode_bytes(obj):
+    """
+    Private, implementation detail.
+
+    Used by json.loads() to turn the base64 from encode_bytes() back into bytes.
+    """
+
+    if len(obj) == 1 and BYTES_TAG in obj:
+        return base64.b64decode(obj[BYTES_TAG])
+
+    return obj
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# File System Superblock Prober For The Device Information Obtainer
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is the part of the package that recognises file systems (and other
+things that can be on a volume, like LVM physical volumes and LUKS
+containers) by reading their superblocks directly, instead of running
+blkid for every volume.
+
+Only a few well-known offsets are read, and the types are named the same
+way blkid names them, so the results can be used in place of blkid's.
+
+Recognised types: ext2, ext3, ext4, jbd, xfs, btrfs, vfat, exfat, ntfs,
+swap, LVM2_member, crypto_LUKS, iso9660 and squashfs.
+
+.. module: superblock.py
+    :platform: Linux, macOS, Cygwin
+    :synopsis: In-process file system prober for GetDevInfo.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <support@hamishmb.com>
+
+"""
+
+import os
+import struct
+
+#Page sizes that swap signatures can be found at the end of.
+SWAP_PAGE_SIZES = (4096, 8192, 16384, 65536)
+
+#ext feature flags that ext2/ext3 don't support, and so mean the file system is ext4.
+EXT_COMPAT_HAS_JOURNAL = 0x0004
+EXT_INCOMPAT_JOURNAL_DEV = 0x0008
+EXT3_INCOMPAT_SUPPORTED = 0x0002 | 0x0004 | 0x0010
+EXT3_RO_COMPAT_SUPPORTED = 0x0001 | 0x0002 | 0x0004
+
+class DeviceReader:
+    """
+    Reads small pieces of a device, only reading each piece once.
+
+    Usage:
+
+    >>> with DeviceReader(<aDiskName>) as reader:
+    >>>     data = reader.read(<anOffset>, <aLength>)
+    """
+
+    def __init__(self, disk):
+        self.fd = os.open(disk, os.O_RDONLY)
+        self.cache = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Closes the device."""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def read(self, offset, length):
+        """
+        Reads length bytes at the given offset. The result is shorter
+        than requested if the device ends first.
+        """
+
+        if (offset, length) not in self.cache:
+            self.cache[(offset, length)] = os.pread(self.fd, length, offset)
+
+        return self.cache[(offset, length)]
+
+def probe(disk):
+    """
+    This function finds out what is on a volume by reading its superblock.
+
+    Args:
+        disk (str):     The name of a partition/device/logical volume,
+                        or an image file.
+
+    Returns:
+        tuple (string, string, string)/None. The type, UUID, and label:
+
+            - None          - The type wasn't recognised.
+            - Anything else - The type, UUID, and label. The UUID and/or the
+                              label are "Unknown" if there isn't one, or
+                              we can't find it without reading more.
+
+    Raises:
+        OSError, if the volume couldn't be opened or read.
+
+    Usage:
+
+    >>> file_system, uuid, label = probe(<aDiskName>)
+    """
+
+    with DeviceReader(disk) as reader:
+        for prober in PROBERS:
+            result = prober(reader)
+
+            if result is not None:
+                return result
+
+    return None
+
+#-------------------- Helpers --------------------
+def format_uuid(data):
+    """Formats 16 raw bytes as a standard UUID string."""
+    hexdigits = data.hex()
+    return '-'.join((hexdigits[:8], hexdigits[8:12], hexdigits[12:16], hexdigits[16:20],
+                     hexdigits[20:]))
+
+def format_serial(serial):
+    """Formats a 32-bit volume serial number the way Windows (and blkid) does."""
+    return "%04X-%04X" % (serial >> 16, serial & 0xFFFF)
+
+def decode_label(data):
+    """Decodes a NUL or space-padded label, returning "Unknown" if it's empty."""
+    label = data.split(b"\x00")[0].decode("utf-8", errors="replace").rstrip(" ")
+    return label or "Unknown"
+
+def unknown_if_blank(uuid):
+    """Returns "Unknown" if the UUID is all zeroes (ie not set)."""
+    if not uuid.strip("0-"):
+        return "Unknown"
+
+    return uuid
+
+#-------------------- Probers --------------------
+def probe_luks(reader):
+    """LUKS (version 1 and 2) encrypted containers."""
+    header = reader.read(0, 208)
+
+    if header[:6] != b"LUKS\xba\xbe":
+        return None
+
+    uuid = header[168:208].split(b"\x00")[0].decode("ascii", errors="replace") or "Unknown"
+
+    #Only LUKS2 has labels.
+    label = "Unknown"
+
+    if struct.unpack(">H", header[6:8])[0] == 2:
+        label = decode_label(header[24:72])
+
+    return ("crypto_LUKS", uuid, label)
+
+def probe_lvm2(reader):
+    """LVM2 physical volumes. The label can be in any of the first four sectors."""
+    data = reader.read(0, 2048)
+
+    for sector in range(0, 2048, 512):
+        if data[sector:sector+8] != b"LABELONE" or data[sector+24:sector+32] != b"LVM2 001":
+            continue
+
+        pv_header = sector+struct.unpack("<I", data[sector+20:sector+24])[0]
+        raw_uuid = data[pv_header:pv_header+32].decode("ascii", errors="replace")
+
+        if len(raw_uuid) != 32:
+            return ("LVM2_member", "Unknown", "Unknown")
+
+        #LVM formats its UUIDs in groups of 6-4-4-4-4-4-6.
+        groups = []
+        start = 0
+
+        for length in (6, 4, 4, 4, 4, 4, 6):
+            groups.append(raw_uuid[start:start+length])
+            start += length
+
+        return ("LVM2_member", '-'.join(groups), "Unknown")
+
+    return None
+
+def probe_xfs(reader):
+    """XFS."""
+    superblock = reader.read(0, 120)
+
+    if superblock[:4] != b"XFSB":
+        return None
+
+    return ("xfs", unknown_if_blank(format_uuid(superblock[32:48])),
+            decode_label(superblock[108:120]))
+
+def probe_ext(reader):
+    """ext2, ext3, ext4, and external ext journals."""
+    superblock = reader.read(1024, 256)
+
+    if len(superblock) < 136 or struct.unpack("<H", superblock[56:58])[0] != 0xEF53:
+        return None
+
+    compat, incompat, ro_compat = struct.unpack("<III", superblock[92:104])
+
+    if incompat & EXT_INCOMPAT_JOURNAL_DEV:
+        file_system = "jbd"
+
+    elif incompat & ~EXT3_INCOMPAT_SUPPORTED or ro_compat & ~EXT3_RO_COMPAT_SUPPORTED:
+        file_system = "ext4"
+
+    elif compat & EXT_COMPAT_HAS_JOURNAL:
+        file_system = "ext3"
+
+    else:
+        file_system = "ext2"
+
+    return (file_system, unknown_if_blank(format_uuid(superblock[104:120])),
+            decode_label(superblock[120:136]))
+
+def probe_btrfs(reader):
+    """btrfs. The superblock is 64 KiB in."""
+    superblock = reader.read(65536, 555)
+
+    if superblock[64:72] != b"_BHRfS_M":
+        return None
+
+    return ("btrfs", unknown_if_blank(format_uuid(superblock[32:48])),
+            decode_label(superblock[299:555]))
+
+def probe_swap(reader):
+    """Linux swap. The signature is at the end of the first page."""
+    for page_size in SWAP_PAGE_SIZES:
+        signature = reader.read(page_size-10, 10)
+
+        if signature == b"SWAP-SPACE":
+            #Old-style swap, no UUID or label.
+            return ("swap", "Unknown", "Unknown")
+
+        if signature == b"SWAPSPACE2":
+            header = reader.read(1024, 44)
+            return ("swap", unknown_if_blank(format_uuid(header[12:28])),
+                    decode_label(header[28:44]))
+
+    return None
+
+def probe_squashfs(reader):
+    """squashfs. Neither UUIDs nor labels are supported."""
+    if reader.read(0, 4) in (b"hsqs", b"sqsh"):
+        return ("squashfs", "Unknown", "Unknown")
+
+    return None
+
+def probe_iso9660(reader):
+    """ISO 9660 (CD/DVD images). The UUID is made from the creation date, like blkid does."""
+    descriptor = reader.read(32768, 830)
+
+    if descriptor[1:6] != b"CD001":
+        return None
+
+    label = decode_label(descriptor[40:72])
+
+    #YYYYMMDDHHMMSScc
+    date = descriptor[813:829].decode("ascii", errors="replace")
+    uuid = "Unknown"
+
+    if date.isdigit() and date.strip("0"):
+        uuid = '-'.join((date[:4], date[4:6], date[6:8], date[8:10], date[10:12], date[12:14],
+                         date[14:16]))
+
+    return ("iso9660", uuid, label)
+
+def probe_ntfs(reader):
+    """NTFS. The label is in the MFT, which we don't read."""
+    boot_sector = reader.read(0, 512)
+
+    if boot_sector[3:11] != b"NTFS    ":
+        return None
+
+    return ("ntfs", "%016X" % struct.unpack("<Q", boot_sector[72:80])[0], "Unknown")
+
+def probe_exfat(reader):
+    """exFAT. The label is in the root directory, which we don't read."""
+    boot_sector = reader.read(0, 512)
+
+    if boot_sector[3:11] != b"EXFAT   ":
+        return None
+
+    return ("exfat", format_serial(struct.unpack("<I", boot_sector[100:104])[0]), "Unknown")
+
+def probe_vfat(reader):
+    """FAT12, FAT16, and FAT32."""
+    boot_sector = reader.read(0, 512)
+
+    if boot_sector[510:512] != b"\x55\xaa":
+        return None
+
+    if boot_sector[82:87] == b"FAT32":
+        serial, label = boot_sector[67:71], boot_sector[71:82]
+
+    elif boot_sector[54:57] == b"FAT":
+        serial, label = boot_sector[39:43], boot_sector[43:54]
+
+    else:
+        return None
+
+    label = decode_label(label)
+
+    if label == "NO NAME":
+        label = "Unknown"
+
+    return ("vfat", format_serial(struct.unpack("<I", serial)[0]), label)
+
+#The order matters where more than one signature could be present.
+PROBERS = (probe_luks, probe_lvm2, probe_xfs, probe_ext, probe_btrfs, probe_swap,
+           probe_squashfs, probe_iso9660, probe_ntfs, probe_exfat, probe_vfat)
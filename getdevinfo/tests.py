@@ -39,24 +39,22 @@ elif CYGWIN:
 else:
     from tests import getdevinfo_tests_macos as gd_tests
 
+from tests import getdevinfo_tests_common as gd_common_tests
+
 def usage():
     print("\nUsage: tests.py [OPTION]\n\n")
     print("Options:\n")
     print("       -h, --help:                   Display this help text.")
     print("       -D, --debug:                  Set logging level to debug, to show all logging messages. Default: show only critical logging messages.")
+    print("       -b, --benchmark:              Run the benchmarks (Linux only, doesn't need root) instead of the tests, and")
+    print("                                     fail if any are slower than the baseline.")
+    print("       --save-baseline:              With --benchmark, save the results as the new baseline.")
     print("GetDevinfo "+VERSION+" is released under the GNU GPL Version 3")
     print("Copyright (C) Hamish McIntyre-Bhatty 2013-2020")
 
-#Exit if not running as root (if not on Cygwin).
-if os.geteuid() != 0 and not CYGWIN:
-    sys.exit("You must run the tests as root! Exiting...")
-
-elif CYGWIN:
-    print("NOTE: These tests won't work correctly without administrator privileges.")
-
 #Check all cmdline options are valid.
 try:
-    OPTS, ARGS = getopt.getopt(sys.argv[1:], "hD", ["help", "debug"])
+    OPTS, ARGS = getopt.getopt(sys.argv[1:], "hDb", ["help", "debug", "benchmark", "save-baseline"])
 
 except getopt.GetoptError as err:
     #Invalid option. Show the help message and then exit.
@@ -67,19 +65,45 @@ except getopt.GetoptError as err:
 
 #Log only critical messages by default.
 LOGGER_LEVEL = logging.CRITICAL
+BENCHMARK = False
+SAVE_BASELINE = False
 
 for o, a in OPTS:
     if o in ["-D", "--debug"]:
         LOGGER_LEVEL = logging.DEBUG
+    elif o in ["-b", "--benchmark"]:
+        BENCHMARK = True
+    elif o == "--save-baseline":
+        SAVE_BASELINE = True
     elif o in ["-h", "--help"]:
         usage()
         sys.exit()
     else:
         assert False, "unhandled option"
 
+#Exit if not running as root (if not on Cygwin). The benchmarks don't need it.
+if BENCHMARK:
+    if not LINUX or CYGWIN:
+        sys.exit("The benchmarks only run on Linux! Exiting...")
+
+elif os.geteuid() != 0 and not CYGWIN:
+    sys.exit("You must run the tests as root! Exiting...")
+
+elif CYGWIN:
+    print("NOTE: These tests won't work correctly without administrator privileges.")
+
 #Set up the logger (silence all except critical logging messages).
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s: %(message)s', datefmt='%d/%m/%Y %I:%M:%S %p', level=LOGGER_LEVEL)
 logger = logging
 
-if __name__ == "__main__":
-    unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromModule(gd_tests))
+if __name__ == "__main__" and BENCHMARK:
+    from tests import getdevinfo_benchmarks as gd_benchmarks
+
+    if not gd_benchmarks.main(save=SAVE_BASELINE):
+        sys.exit(1)
+
+elif __name__ == "__main__":
+    SUITE = unittest.TestSuite()
+    SUITE.addTests(unittest.TestLoader().loadTestsFromModule(gd_tests))
+    SUITE.addTests(unittest.TestLoader().loadTestsFromModule(gd_common_tests))
+    unittest.TextTestRunner(verbosity=2).run(SUITE)
@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Linux Benchmarks for GetDevInfo
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+#Times the stages of linux.get_info() that parse and assemble the output of
+#lshw and lsblk, find logical volumes in sysfs, and the /dev/disk lookups,
+#using generated output (and a generated /sys/block) for 10 to 10,000
+#devices. Nothing is run, and no devices are read, so root isn't needed.
+#Run with "tests.py -b".
+#
+#Times are compared to benchmark_baseline.json, after dividing them by the
+#time a fixed calibration workload takes on this machine (measured just
+#before each benchmark, so the machine getting busier or quieter part way
+#through doesn't matter), so baselines saved on one machine are still
+#meaningful on another.
+
+#import modules.
+import os
+import sys
+import json
+import time
+import tempfile
+import xml.etree.ElementTree as ElementTree
+
+#import test data.
+from . import getdevinfo_test_data as data
+
+sys.path.insert(0, os.path.abspath('../'))
+sys.path.insert(0, os.path.abspath('../..'))
+
+import getdevinfo.collector as collector
+import getdevinfo.linux as linux
+
+#The numbers of devices to benchmark with.
+SIZES = (10, 100, 1000, 10000)
+
+#How many times to time each benchmark. Fewer (but at least MIN_REPEATS)
+#are used once a benchmark has taken TIME_BUDGET seconds.
+REPEATS = 10
+MIN_REPEATS = 3
+TIME_BUDGET = 1.0
+
+#Quick benchmarks are run several times per sample, so each sample takes
+#at least this long (in seconds), and isn't just timer noise.
+MIN_SAMPLE_TIME = 0.02
+
+#How much slower than the baseline a benchmark can be before it fails.
+TOLERANCE = 1.0
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+#-------------------------------- Generated output. --------------------------------
+def device_name(index):
+    """Returns the name of the index'th SATA disk, eg sda, sdz, sdaa."""
+    letters = ""
+    index += 1
+
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("a") + remainder) + letters
+
+    return "sd"+letters
+
+def generate_lshw_output(count):
+    """Returns lshw XML output for count disks, each with two partitions."""
+    nodes = []
+
+    for index in range(count):
+        disk = "/dev/"+device_name(index)
+
+        nodes.append("""  <node id="disk:{0}" claimed="true" class="disk" handle="GUID:{0:08x}">
+   <description>ATA Disk</description>
+   <product>ST1000DM003-1CH1</product>
+   <vendor>Seagate</vendor>
+   <physid>0.{0}.0</physid>
+   <logicalname>{1}</logicalname>
+   <size units="bytes">1000204886016</size>
+   <configuration>
+    <setting id="ansiversion" value="5" />
+    <setting id="guid" value="{0:08x}-0000-4000-8000-000000000000" />
+   </configuration>
+   <capabilities>
+    <capability id="gpt-1.00" >GUID Partition Table version 1.00</capability>
+    <capability id="partitioned" >Partitioned disk</capability>
+    <capability id="partitioned:gpt" >GUID partition table</capability>
+   </capabilities>
+    <node id="volume:0" claimed="true" class="volume">
+     <description>Windows FAT volume</description>
+     <vendor>mkfs.fat</vendor>
+     <physid>1</physid>
+     <logicalname>{1}1</logicalname>
+     <capacity>524288000</capacity>
+     <configuration>
+      <setting id="filesystem" value="fat" />
+     </configuration>
+     <capabilities>
+      <capability id="boot" >Contains boot code</capability>
+     </capabilities>
+    </node>
+    <node id="volume:1" claimed="true" class="volume">
+     <description>EXT4 volume</description>
+     <vendor>Linux</vendor>
+     <physid>2</physid>
+     <logicalname>{1}2</logicalname>
+     <logicalname>/</logicalname>
+     <size>999680000000</size>
+     <configuration>
+      <setting id="filesystem" value="ext4" />
+      <setting id="mount.fstype" value="ext4" />
+     </configuration>
+     <capabilities>
+      <capability id="journaled" />
+     </capabilities>
+    </node>
+  </node>""".format(index, disk))
+
+    return """<?xml version="1.0" standalone="yes" ?>
+<!-- generated by lshw-B.02.19.2 -->
+<list>
+"""+"\n".join(nodes)+"\n</list>\n"
+
+def generate_lsblk_output(count):
+    """Returns lsblk JSON output for count NVME disks, each with two partitions."""
+    devices = []
+
+    for index in range(count):
+        disk = "nvme"+str(index)+"n1"
+
+        devices.append({"name": disk, "size": "1000204886016", "type": "disk", "fstype": None,
+                        "vendor": "Samsung ", "model": "Samsung SSD 970 EVO 1TB", "uuid": None,
+                        "children": [
+                            {"name": disk+"p1", "size": "524288000", "type": "part",
+                             "fstype": "vfat", "vendor": None, "model": None,
+                             "uuid": "{0:04X}-{1:04X}".format(index // 65536, index % 65536)},
+                            {"name": disk+"p2", "size": "999680000000", "type": "part",
+                             "fstype": "ext4", "vendor": None, "model": None,
+                             "uuid": "{0:08x}-d36b-4f3a-b48f-18638f1591a8".format(index)},
+                        ]})
+
+    return json.dumps({"blockdevices": devices}, indent=3)
+
+def create_dm_sysfs(root, count):
+    """Creates a fake /sys/block in root, with count logical volumes on sda2 (and a hidden layer for every tenth one)."""
+    files = {}
+
+    for index in range(count):
+        name = "dm-"+str(index)
+        lv_uuid = "{0:08d}xsCGiCAJQ3go2247OU5N3Awl".format(index)
+
+        files[name+"/size"] = "3358720\n"
+        files[name+"/dm/name"] = "fake--vg-lv"+str(index)+"\n"
+        files[name+"/dm/uuid"] = "LVM-Rbzm1ZDHiSDQFUd0Y4HhREcgpWQxOjUW"+lv_uuid+"\n"
+        files[name+"/slaves/sda2/dev"] = "8:2\n"
+
+        if index % 10 == 9:
+            files[name+"/dm/name"] = "fake--vg-lv"+str(index)+"-real\n"
+            files[name+"/dm/uuid"] = "LVM-Rbzm1ZDHiSDQFUd0Y4HhREcgpWQxOjUW"+lv_uuid+"-real\n"
+
+    for name, contents in files.items():
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, "w", encoding="utf-8") as attribute:
+            attribute.write(contents)
+
+def create_disk_links(root, count):
+    """Creates a fake /dev/disk in root, with by-uuid and by-id links for count disks and their partitions."""
+    for kind in ("by-uuid", "by-id"):
+        os.makedirs(os.path.join(root, kind))
+
+    for index in range(count):
+        name = device_name(index)
+        serial = "ata-ST1000DM003-1CH162_W{0:07d}".format(index)
+
+        os.symlink("../../"+name, os.path.join(root, "by-id", serial))
+
+        for number in (1, 2):
+            os.symlink("../../"+name+str(number),
+                       os.path.join(root, "by-id", serial+"-part"+str(number)))
+
+            os.symlink("../../"+name+str(number),
+                       os.path.join(root, "by-uuid", "{0:08x}-{1:04x}-4000-8000-000000000000"
+                                    .format(index, number)))
+
+#-------------------------------- Benchmarks. --------------------------------
+class Benchmarks:
+    """
+    The benchmarks. Each setup_* method prepares the input for a number of
+    devices, and returns a function that runs the code being timed.
+    """
+
+    def __init__(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.links = {}
+
+        #Nothing should read devices or run commands.
+        self.proper_boot_record_function = linux.get_boot_record
+        self.proper_lv_file_system_function = linux.get_lv_file_system
+        linux.get_boot_record = data.fake_get_boot_record
+        linux.get_lv_file_system = data.fake_get_lv_file_system
+        self.proper_sysfs_block = linux.SYSFS_BLOCK
+        self.collector = collector.Collector(linux)
+        self.collector.reset()
+
+    def close(self):
+        """Puts everything back."""
+        linux.get_boot_record = self.proper_boot_record_function
+        linux.get_lv_file_system = self.proper_lv_file_system_function
+        linux.SYSFS_BLOCK = self.proper_sysfs_block
+        self.tempdir.cleanup()
+
+    def get_links_dir(self, count):
+        """Returns a fake /dev/disk for count disks, creating it the first time."""
+        if count not in self.links:
+            self.links[count] = os.path.join(self.tempdir.name, str(count))
+            create_disk_links(self.links[count], count)
+
+        return self.links[count]
+
+    def setup_lshw(self, count):
+        """lshw_stage(): parsing lshw's output, and assembling devices and partitions."""
+        output = generate_lshw_output(count)
+        self.collector.disklinks = linux.get_disk_links(self.get_links_dir(count))
+
+        def run():
+            self.collector.diskinfo = {}
+            linux.lshw_stage(self.collector, {"lshw": output})
+
+        return run
+
+    def setup_lsblk(self, count):
+        """parse_lsblk_output(): parsing lsblk's output."""
+        output = generate_lsblk_output(count)
+        self.collector.disklinks = {}
+
+        def run():
+            self.collector.diskinfo = {}
+            self.collector.lsblk_output = output
+            linux.parse_lsblk_output(self.collector)
+
+        return run
+
+    def setup_lvm(self, count):
+        """parse_device_mapper(): finding logical volumes in /sys/block."""
+        directory = os.path.join(self.tempdir.name, "dm"+str(count))
+        create_dm_sysfs(directory, count)
+
+        def run():
+            linux.SYSFS_BLOCK = directory
+            self.collector.diskinfo = {"/dev/sda2": {"HostDevice": "/dev/sda"}}
+            linux.parse_device_mapper(self.collector)
+
+        return run
+
+    def setup_disk_links(self, count):
+        """get_disk_links(): reading the links in /dev/disk."""
+        directory = self.get_links_dir(count)
+
+        def run():
+            linux.get_disk_links(directory)
+
+        return run
+
+    def setup_uuid_and_id(self, count):
+        """get_uuid() and get_id(): looking up every device and partition."""
+        self.collector.disklinks = linux.get_disk_links(self.get_links_dir(count))
+        disks = []
+
+        for index in range(count):
+            disk = "/dev/"+device_name(index)
+            disks.extend([disk, disk+"1", disk+"2"])
+
+        def run():
+            for disk in disks:
+                linux.get_uuid(self.collector, disk)
+                linux.get_id(self.collector, disk)
+
+        return run
+
+    def setup_capacity(self, count):
+        """get_capacity(): working out every device's and partition's capacity."""
+        nodes = []
+
+        for node, _found_list in linux.parse_lshw_output(generate_lshw_output(count)):
+            nodes.append(node)
+            nodes.extend(node.iter_descendants())
+
+        def run():
+            for node in nodes:
+                linux.get_capacity(node)
+
+        return run
+
+#The benchmarks, in the order they're run.
+BENCHMARKS = ("lshw", "lsblk", "lvm", "disk_links", "uuid_and_id", "capacity")
+
+def calibrate(repeats=MIN_REPEATS):
+    """
+    Returns how long (in seconds) a fixed workload, similar to what the
+    benchmarks do, takes on this machine. The fastest of several runs is
+    used, as it is the least affected by anything else running.
+    """
+
+    document = generate_lsblk_output(200)
+    xml = generate_lshw_output(50)
+    times = []
+
+    for _repeat in range(repeats):
+        start = time.perf_counter()
+
+        for _iteration in range(5):
+            json.loads(document)
+            ElementTree.fromstring(xml)
+            sorted(str(number) for number in range(20000))
+
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+def percentile(samples, percent):
+    """Returns the given percentile of some samples, using the nearest rank."""
+    samples = sorted(samples)
+    rank = max(int(-(-percent * len(samples) // 100)), 1)
+
+    return samples[rank-1]
+
+def run_benchmarks(sizes=SIZES, repeats=REPEATS, output=sys.stdout):
+    """
+    Runs every benchmark at each size, and returns the results, keyed by
+    "benchmark/size". Each result has the best, median, 90th and 99th
+    percentile times (in seconds), the throughput (devices per second,
+    using the median), and the best time relative to the calibration
+    workload.
+    """
+
+    benchmarks = Benchmarks()
+    results = {}
+
+    try:
+        for name in BENCHMARKS:
+            for size in sizes:
+                function = getattr(benchmarks, "setup_"+name)(size)
+
+                calibration = calibrate()
+
+                #Once first, so one-off costs (eg imports) aren't counted.
+                start = time.perf_counter()
+                function()
+                loops = max(int(MIN_SAMPLE_TIME / max(time.perf_counter() - start, 1e-6)), 1)
+                samples = []
+
+                for _repeat in range(repeats):
+                    start = time.perf_counter()
+
+                    for _loop in range(loops):
+                        function()
+
+                    samples.append((time.perf_counter() - start) / loops)
+
+                    if len(samples) >= MIN_REPEATS and sum(samples) > TIME_BUDGET:
+                        break
+
+                median = percentile(samples, 50)
+
+                results[name+"/"+str(size)] = {
+                    "Best": min(samples),
+                    "Median": median,
+                    "P90": percentile(samples, 90),
+                    "P99": percentile(samples, 99),
+                    "Throughput": size / median if median else float("inf"),
+                    "Relative": min(samples) / calibration,
+                }
+
+                output.write(".")
+                output.flush()
+
+    finally:
+        benchmarks.close()
+
+    output.write("\n")
+    return results
+
+def load_baseline(path=BASELINE_PATH):
+    """Returns the saved baseline, or None if there isn't one."""
+    try:
+        with open(path, "r", encoding="utf-8") as baseline_file:
+            return json.load(baseline_file)
+
+    except (OSError, ValueError):
+        return None
+
+def save_baseline(results, path=BASELINE_PATH):
+    """Saves the best time of each result, relative to the calibration time, as the baseline."""
+    baseline = {"Results": {key: result["Relative"]
+                            for key, result in sorted(results.items())}}
+
+    with open(path, "w", encoding="utf-8") as baseline_file:
+        json.dump(baseline, baseline_file, indent=4, sort_keys=True)
+        baseline_file.write("\n")
+
+def find_regressions(results, baseline, tolerance=TOLERANCE):
+    """
+    Returns the results that are more than tolerance slower than the
+    baseline, as a dictionary of how many times slower each one is.
+    The best times are compared, as they are the least affected by
+    anything else running.
+    """
+
+    regressions = {}
+
+    for key, result in results.items():
+        expected = baseline["Results"].get(key)
+
+        if not expected:
+            continue
+
+        ratio = result["Relative"] / expected
+
+        if ratio > 1 + tolerance:
+            regressions[key] = ratio
+
+    return regressions
+
+def report(results, baseline, output=sys.stdout):
+    """Prints a table of the results, compared to the baseline if there is one."""
+    output.write("{0:<20} {1:>8} {2:>12} {3:>12} {4:>12} {5:>14} {6:>12}\n".format(
+        "Benchmark", "Devices", "Median (ms)", "P90 (ms)", "P99 (ms)", "Devices/s", "vs Baseline"))
+
+    for name in BENCHMARKS:
+        for key in sorted((key for key in results if key.split("/")[0] == name),
+                          key=lambda key: int(key.split("/")[1])):
+
+            result = results[key]
+            expected = baseline["Results"].get(key) if baseline is not None else None
+
+            if expected:
+                compared = "{0:.2f}x".format(result["Relative"] / expected)
+
+            else:
+                compared = "-"
+
+            output.write("{0:<20} {1:>8} {2:>12.3f} {3:>12.3f} {4:>12.3f} {5:>14.0f} {6:>12}\n".format(
+                name, key.split("/")[1], result["Median"]*1000, result["P90"]*1000,
+                result["P99"]*1000, result["Throughput"], compared))
+
+def main(sizes=SIZES, repeats=REPEATS, tolerance=TOLERANCE, save=False):
+    """
+    Runs the benchmarks, prints the results, and compares them to the
+    baseline (or saves them as the new baseline if save is True).
+
+    Returns:
+        bool. False if any benchmark was slower than the baseline allows.
+    """
+
+    results = run_benchmarks(sizes, repeats)
+    baseline = load_baseline()
+
+    report(results, baseline)
+
+    if save:
+        save_baseline(results)
+        print("\nSaved the baseline to "+BASELINE_PATH)
+        return True
+
+    if baseline is None:
+        print("\nThere is no baseline to compare to. Save one with --save-baseline.")
+        return True
+
+    regressions = find_regressions(results, baseline, tolerance)
+
+    for key, ratio in sorted(regressions.items()):
+        print("REGRESSION: "+key+" is "+"{0:.2f}".format(ratio)+" times slower than the baseline")
+
+    return not regressions
@@ -18,73 +18,44 @@
 #Note: The non-roman characters in this test data are random.
 #If they by some random chance spell something offensive, I apologise.
 
-import bs4
+import os
+import struct
+import uuid
+import zlib
 
-#Classes for test cases.
+#Classes for test cases. These have the same attributes as linux.LshwNode.
 #--------------------------------------- Good Nodes, unicode strings ------------------------------------
 class Node1:
     def get_copy(self):
         return self
 
-    class logicalname:
-        string = "/dev/nada"
+    logicalname = "/dev/nada"
+    physid = None
+    description = None
+    vendor = "FakeVendor"
+    product = "FakeProduct"
+    size = None
+    capacity = 100000000000
 
-    class vendor:
-        string = "FakeVendor"
-
-    class product:
-        string = "FakeProduct"
-
-    class capacity:
-        string = 100000000000
-
-    class capabilities:
-        children = []
-
-        for _id in range(0, 200):
-            tag = bs4.element.Tag(name="capability")
-            tag["id"] = "test"+str(_id)
-            children.append(tag)
-
-    class configuration:
-        children = []
-
-        tag = bs4.element.Tag(name="setting")
-        tag["id"] = "filesystem"
-        tag["value"] = "fat"
-        children.append(tag)
+    capabilities = ["test"+str(_id) for _id in range(0, 200)]
+    configuration = {"filesystem": "fat"}
+    children = []
 
 class Node2:
     def get_copy(self):
         return self
 
-    class logicalname:
-        string = "/dev/nada"
-
-    class vendor:
-        string = "FakeVendor2"
-
-    class product:
-        string = "FakeProduct2"
-
-    class size:
-        string = 10000000000000000000
+    logicalname = "/dev/nada"
+    physid = None
+    description = None
+    vendor = "FakeVendor2"
+    product = "FakeProduct2"
+    size = 10000000000000000000
+    capacity = None
 
-    class capabilities:
-        children = []
-
-        for _id in ("removable", "uefi", "rewritable"):
-            tag = bs4.element.Tag(name="capability")
-            tag["id"] = _id
-            children.append(tag)
-
-    class configuration:
-        children = []
-
-        tag = bs4.element.Tag(name="setting")
-        tag["id"] = "filesystem"
-        tag["value"] = "ext4"
-        children.append(tag)
+    capabilities = ["removable", "uefi", "rewritable"]
+    configuration = {"filesystem": "ext4"}
+    children = []
 
 def return_good_smartctl_output_1():
     return """{
@@ -264,65 +235,33 @@ class Node3: #Greek characters.
     def get_copy(self):
         return self
 
-    class logicalname:
-        string = "/dev/nada"
-
-    class vendor:
-        string = "ΉΜήυΟομἝἲϾᾍᾈᾁὮᾌ"
-
-    class product:
-        string = "𐅛𐅣𐅸𐅒𐅌𐅮𐅺𐅷𐅑𐅮𐆀𐅸𝈢𝈵𝈭"
-
-    class size:
-        string = 10000000000000000000
-
-    class capabilities:
-        children = []
-
-        for _id in ("ΉΜή", "𐅌𐅮", "test3"):
-            tag = bs4.element.Tag(name="capability")
-            tag["id"] = _id
-            children.append(tag)
+    logicalname = "/dev/nada"
+    physid = None
+    description = None
+    vendor = "ΉΜήυΟομἝἲϾᾍᾈᾁὮᾌ"
+    product = "𐅛𐅣𐅸𐅒𐅌𐅮𐅺𐅷𐅑𐅮𐆀𐅸𝈢𝈵𝈭"
+    size = 10000000000000000000
+    capacity = None
 
-    class configuration:
-        children = []
-
-        tag = bs4.element.Tag(name="setting")
-        tag["id"] = "filesystem"
-        tag["value"] = "ΉΜήυΟομἝἲϾᾍᾈᾁὮᾌ"
-        children.append(tag)
+    capabilities = ["ΉΜή", "𐅌𐅮", "test3"]
+    configuration = {"filesystem": "ΉΜήυΟομἝἲϾᾍᾈᾁὮᾌ"}
+    children = []
 
 class Node4: #Yi characters.
     def get_copy(self):
         return self
 
-    class logicalname:
-        string = "/dev/nada"
-
-    class vendor:
-        string = "ꀒꀲꀯꀭꁎꀦꀄꀴꀿꀬꀝꅮꅧꅌ"
-
-    class product:
-        string = "ꍜꍧꍼꍟꍏꍄꌲꍏꌽꍛꍷꍼꍴ"
-
-    class size:
-        string = 10000000000000000000
+    logicalname = "/dev/nada"
+    physid = None
+    description = None
+    vendor = "ꀒꀲꀯꀭꁎꀦꀄꀴꀿꀬꀝꅮꅧꅌ"
+    product = "ꍜꍧꍼꍟꍏꍄꌲꍏꌽꍛꍷꍼꍴ"
+    size = 10000000000000000000
+    capacity = None
 
-    class capabilities:
-        children = []
-
-        for _id in ("ΉgerhΜή", "𐅌345𐅮", "test3"):
-            tag = bs4.element.Tag(name="capability")
-            tag["id"] = _id
-            children.append(tag)
-
-    class configuration:
-        children = []
-
-        tag = bs4.element.Tag(name="setting")
-        tag["id"] = "filesystem"
-        tag["value"] = "ꀒꀲꀯꀭꁎꀦꀄewrhtyjthgrfeꀴꀿꀬꀝꅮꅧꅌ"
-        children.append(tag)
+    capabilities = ["ΉgerhΜή", "𐅌345𐅮", "test3"]
+    configuration = {"filesystem": "ꀒꀲꀯꀭꁎꀦꀄewrhtyjthgrfeꀴꀿꀬꀝꅮꅧꅌ"}
+    children = []
 
 def return_good_smartctl_output_3():
     return """{
@@ -488,194 +427,122 @@ class ByteNode1:
     def get_copy(self):
         return self
 
-    class logicalname:
-        string = "/dev/nada"
-
-    class vendor:
-        string = b"FakeVendor"
+    logicalname = "/dev/nada"
+    physid = None
+    description = None
+    vendor = b"FakeVendor"
+    product = b"FakeProduct"
+    size = None
+    capacity = 100000000000
 
-    class product:
-        string = b"FakeProduct"
-
-    class capacity:
-        string = 100000000000
-
-    class capabilities:
-        children = []
-
-        for _id in range(0, 200):
-            tag = bs4.element.Tag(name="capability")
-            tag["id"] = b"test"+str(_id).encode("utf-8")
-            children.append(tag)
-
-    class configuration:
-        children = []
-
-        tag = bs4.element.Tag(name="setting")
-        tag["id"] = "filesystem"
-        tag["value"] = b"fat"
-        children.append(tag)
+    capabilities = [b"test"+str(_id).encode("utf-8") for _id in range(0, 200)]
+    configuration = {"filesystem": b"fat"}
+    children = []
 
 class ByteNode2:
     def get_copy(self):
         return self
 
-    class logicalname:
-        string = "/dev/nada"
-
-    class vendor:
-        string = b"FakeVendor2"
-
-    class product:
-        string = b"FakeProduct2"
-
-    class size:
-        string = 10000000000000000000
+    logicalname = "/dev/nada"
+    physid = None
+    description = None
+    vendor = b"FakeVendor2"
+    product = b"FakeProduct2"
+    size = 10000000000000000000
+    capacity = None
 
-    class capabilities:
-        children = []
-
-        for _id in (b"removable", b"uefi", b"rewritable"):
-            tag = bs4.element.Tag(name="capability")
-            tag["id"] = _id
-            children.append(tag)
-
-    class configuration:
-        children = []
-
-        tag = bs4.element.Tag(name="setting")
-        tag["id"] = "filesystem"
-        tag["value"] = b"ext4"
-        children.append(tag)
+    capabilities = [b"removable", b"uefi", b"rewritable"]
+    configuration = {"filesystem": b"ext4"}
+    children = []
 
 # ---------------------------------------------- non-roman chars --------------------------------------
 class ByteNode3: #Greek characters.
     def get_copy(self):
         return self
 
-    class logicalname:
-        string = "/dev/nada"
-
-    class vendor:
-        string = "ΉΜήυΟομἝἲϾᾍᾈᾁὮᾌ".encode("utf-8")
-
-    class product:
-        string = "𐅛𐅣𐅸𐅒𐅌𐅮𐅺𐅷𐅑𐅮𐆀𐅸𝈢𝈵𝈭".encode("utf-8")
-
-    class size:
-        string = 10000000000000000000
-
-    class capabilities:
-        children = []
-
-        for _id in ("ΉΜή".encode("utf-8"), "𐅌𐅮".encode("utf-8"), b"test3"):
-            tag = bs4.element.Tag(name="capability")
-            tag["id"] = _id
-            children.append(tag)
-
-    class configuration:
-        children = []
+    logicalname = "/dev/nada"
+    physid = None
+    description = None
+    vendor = "ΉΜήυΟομἝἲϾᾍᾈᾁὮᾌ".encode("utf-8")
+    product = "𐅛𐅣𐅸𐅒𐅌𐅮𐅺𐅷𐅑𐅮𐆀𐅸𝈢𝈵𝈭".encode("utf-8")
+    size = 10000000000000000000
+    capacity = None
 
-        tag = bs4.element.Tag(name="setting")
-        tag["id"] = "filesystem"
-        tag["value"] = "ΉΜήυΟομἝἲϾᾍᾈᾁὮᾌ".encode("utf-8")
-        children.append(tag)
+    capabilities = ["ΉΜή".encode("utf-8"), "𐅌𐅮".encode("utf-8"), b"test3"]
+    configuration = {"filesystem": "ΉΜήυΟομἝἲϾᾍᾈᾁὮᾌ".encode("utf-8")}
+    children = []
 
 class ByteNode4: #Yi characters.
     def get_copy(self):
         return self
 
-    class logicalname:
-        string = "/dev/nada"
+    logicalname = "/dev/nada"
+    physid = None
+    description = None
+    vendor = "ꀒꀲꀯꀭꁎꀦꀄꀴꀿꀬꀝꅮꅧꅌ".encode("utf-8")
+    product = "ꍜꍧꍼꍟꍏꍄꌲꍏꌽꍛꍷꍼꍴ".encode("utf-8")
+    size = 10000000000000000000
+    capacity = None
 
-    class vendor:
-        string = "ꀒꀲꀯꀭꁎꀦꀄꀴꀿꀬꀝꅮꅧꅌ".encode("utf-8")
-
-    class product:
-        string = "ꍜꍧꍼꍟꍏꍄꌲꍏꌽꍛꍷꍼꍴ".encode("utf-8")
-
-    class size:
-        string = 10000000000000000000
-
-    class capabilities:
-        children = []
-
-        for _id in ("ΉgerhΜή".encode("utf-8"), "𐅌345𐅮".encode("utf-8"), b"test3"):
-            tag = bs4.element.Tag(name="capability")
-            tag["id"] = _id
-            children.append(tag)
-
-    class configuration:
-        children = []
-
-        tag = bs4.element.Tag(name="setting")
-        tag["id"] = "filesystem"
-        tag["value"] = "ꀒꀲꀯꀭꁎꀦꀄewrhtyjthgrfeꀴꀿꀬꀝꅮꅧꅌ".encode("utf-8")
-        children.append(tag)
+    capabilities = ["ΉgerhΜή".encode("utf-8"), "𐅌345𐅮".encode("utf-8"), b"test3"]
+    configuration = {"filesystem": "ꀒꀲꀯꀭꁎꀦꀄewrhtyjthgrfeꀴꀿꀬꀝꅮꅧꅌ".encode("utf-8")}
+    children = []
 
 #----------------------------------- Bad Nodes, missing data, and/or wrong type ------------------------
 class BadNode1:
     def get_copy(self):
         return self
 
-    class logicalname:
-        string = "/dev/nada"
-
-    class vendor:
-        notstring = ""
-
-    class product:
-        notstring = ""
+    logicalname = "/dev/nada"
+    physid = None
+    description = None
+    vendor = None
+    product = None
+    size = None
+    capacity = None
 
-    class capabilities:
-        #int instead of list.
-        children = 9
+    #int instead of list.
+    capabilities = 9
+    configuration = {}
+    children = []
 
 class BadNode2:
     def get_copy(self):
         return self
 
-    class logicalname:
-        string = "/dev/nada"
+    logicalname = "/dev/nada"
+    physid = None
+    description = None
+    vendor = None
+    product = None
+    size = None
 
-    class vendor:
-        notstring = ""
+    #Too long, causes IndexError.
+    capacity = 1000000000000000000000000000000000000000000000000
 
-    class product:
-        notstring = ""
-
-    class capacity:
-        #Too long, causes IndexError.
-        string = 1000000000000000000000000000000000000000000000000
-
-    class capabilities:
-        children = []
-
-        for _id in ("ΉgerhΜή", "𐅌345𐅮", "test3"):
-            tag = bs4.element.Tag(name="capamability") #Wrong name - will be ignored.
-            tag["id"] = _id
-            children.append(tag)
+    #Wrongly-named capability tags are dropped while parsing, so there are none.
+    capabilities = []
+    configuration = {}
+    children = []
 
 class BadNode3:
     def get_copy(self):
         return self
 
-    class logicalname:
-        string = "/dev/nada"
-
-    class vendor:
-        notstring = ""
+    logicalname = "/dev/nada"
+    physid = None
+    description = None
+    vendor = None
+    product = None
 
-    class product:
-        notstring = ""
+    #Should be int, despite the misleading name.
+    size = "fghjk"
+    capacity = None
 
-    class size:
-        #Should be int, despite the misleading name.
-        string = "fghjk"
-
-    class capabilities:
-        #Empty capabilities list.
-        children = []
+    #Empty capabilities list.
+    capabilities = []
+    configuration = {}
+    children = []
 
 def return_bad_smartctl_output_1():
     return """{
@@ -1008,19 +875,6 @@ def return_fake_disk_info_mac():
     return diskinfo
 
 #Functions to return other data.
-def return_fake_lvm_disk_info():
-    return {u'/dev/sda': {u'Product': u'FakeDisk', u'Vendor': u'ThereIsNone', u'Name': u'/dev/sda', u'RawCapacity': u'56483132', u'HostDevice': u'N/A', u'Capacity': u'200GB', u'Partitions': [u'/dev/sda1', u'/dev/sda2'], u'Type': u'Device', u'Description': u'Fake Hard Disk Drive', u'Flags': [u'removable', u'gpt']},
-
-           u'/dev/mapper/fakefedora-root': {u'LVName': u'root', u'VGName': u'fakefedora', u'HostPartition': u'/dev/sda3', u'Vendor': u'Linux', u'Name': u'/dev/mapper/fakefedora-root', u'Capacity': u'13.20 GiB', u'Product': u'LVM Partition', u'UUID': u'TWxt1j-g62o-GYju-3UpB-A4g3-9ZbB-HWb7jf', u'Partitioning': u'N/A', u'HostDevice': u'/dev/sda', u'BootRecord': 'Unknown', u'Flags': [], u'RawCapacity': u'Unknown', u'BootRecordStrings': ['Unknown'], u'FileSystem': u'Unknown', u'Description': u'LVM partition root in volume group fakefedora', u'Aliases': [u'/dev/mapper/fakefedora-root', u'/dev/fakefedora/root'], u'Type': u'Partition', u'ID': u'dm-name-fakefedora-root', u'Partitions': []},
-
-           u'/dev/sda3': {u'Product': u'Host Device: FakeDisk', u'Vendor': u'FakeOS v3', u'Name': u'/dev/sda3', u'RawCapacity': u'564456313', u'HostDevice': u'/dev/sda', u'Capacity': u'25.5GB', u'Partitions': [], u'Type': u'Partition', u'Description': u'BTRFS Volume', u'Flags': [u'removable']},
-
-           u'/dev/sda1': {u'Product': u'Host Device: FakeDisk', u'Vendor': u'FakeOS v3', u'Name': u'/dev/sda1', u'RawCapacity': u'5648313', u'HostDevice': u'/dev/sda', u'Capacity': u'20GB', u'Partitions': [], u'Type': u'Partition', u'Description': u'EXT4 Volume', u'Flags': [u'removable', u'dos']},
-
-           u'/dev/sda2': {u'Product': u'Host Device: FakeDisk', u'Vendor': u'FakeOS v3', u'Name': u'/dev/sda2', u'RawCapacity': u'564313', u'HostDevice': u'/dev/sda', u'Capacity': u'2.5GB', u'Partitions': [], u'Type': u'Partition', u'Description': u'EXT3 Volume', u'Flags': [u'removable', u'apm']},
-
-           u'/dev/mapper/fakefedora-swap': {u'LVName': u'swap', u'VGName': u'fakefedora', u'HostPartition': u'/dev/sda3', u'Vendor': u'Linux', u'Name': u'/dev/mapper/fakefedora-swap', u'Capacity': u'1.60 GiB', u'Product': u'LVM Partition', u'UUID': u'3e8urm-xsCG-iCAJ-Q3go-2247-OU5N-3AwlD1', u'Partitioning': u'N/A', u'HostDevice': u'/dev/sda', u'BootRecord': 'Unknown', u'Flags': [], u'RawCapacity': u'Unknown', u'BootRecordStrings': ['Unknown'], u'FileSystem': u'Unknown', u'Description': u'LVM partition swap in volume group fakefedora', u'Aliases': [u'/dev/mapper/fakefedora-swap', u'/dev/fakefedora/swap'], u'Type': u'Partition', u'ID': u'dm-name-fakefedora-swap', u'Partitions': []}}
-
 def return_fake_diskutil_list_plist():
     return """<?xml version="1.0" encoding="UTF-8"?>
 <!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
@@ -1638,56 +1492,6 @@ def return_fake_diskutil_info_disk0s3_plist():
 </dict>
 </plist>"""
 
-def return_fake_lvm_output():
-    return """  --- Logical volume ---
-  LV Path                /dev/fakefedora/swap
-  LV Name                swap
-  VG Name                fakefedora
-  LV UUID                3e8urm-xsCG-iCAJ-Q3go-2247-OU5N-3AwlD1
-  LV Write Access        read/write
-  LV Creation host, time localhost-live, 2016-12-22 19:49:26 +0000
-  LV Status              available
-  # open                 2
-  LV Size                1.60 GiB
-  Current LE             410
-  Segments               1
-  Allocation             inherit
-  Read ahead sectors     auto
-  - currently set to     256
-  Block device           253:1
-   
-  --- Segments ---
-  Logical extents 0 to 409:
-    Type		linear
-    Physical volume	/dev/sda3
-    Physical extents	0 to 409
-   
-   
-  --- Logical volume ---
-  LV Path                /dev/fakefedora/root
-  LV Name                root
-  VG Name                fakefedora
-  LV UUID                TWxt1j-g62o-GYju-3UpB-A4g3-9ZbB-HWb7jf
-  LV Write Access        read/write
-  LV Creation host, time localhost-live, 2016-12-22 19:49:26 +0000
-  LV Status              available
-  # open                 1
-  LV Size                13.20 GiB
-  Current LE             3379
-  Segments               1
-  Allocation             inherit
-  Read ahead sectors     auto
-  - currently set to     256
-  Block device           253:0
-   
-  --- Segments ---
-  Logical extents 0 to 3378:
-    Type		linear
-    Physical volume	/dev/sda3
-    Physical extents	410 to 3788
-   
-   """.split("\n")
-
 def return_fake_lsuuid_output():
     return """total 0
 lrwxrwxrwx 1 root root 15 Mar 23 08:16 8243-0631 -> ../../sda1
@@ -1737,12 +1541,31 @@ lrwxrwxrwx 1 root root 10 Oct 17 08:45 wwn-0x5002538d40897bed-part7 -> ../../sda
 lrwxrwxrwx 1 root root 10 Oct 17 08:45 wwn-0x5002538d40897bed-part8 -> ../../sda8
 lrwxrwxrwx 1 root root 10 Oct 17 08:45 wwn-0x5002538d40897bed-part9 -> ../../sda9"""
 
+def create_fake_disk_links(root):
+    """Creates a fake /dev/disk in the given folder, with the links from the fake ls output above."""
+    for kind, output in (("by-uuid", return_fake_lsuuid_output()), ("by-id", return_fake_lsid_output())):
+        os.makedirs(root+"/"+kind)
+
+        for line in output.split("\n")[1:]:
+            name, target = line.split()[-3], line.split()[-1]
+            os.symlink(target, root+"/"+kind+"/"+name)
+
 def return_fake_block_dev_output():
     return ["No such file or device", "512", "1024", "2048", "4096", "8192"]
 
-def fake_get_boot_record(disk):
+def fake_get_boot_record(collector, disk):
     return ("Unknown", ["Unknown"])
 
+def return_fake_boot_record():
+    #A GRUB-like MBR, with some extra data after it to check we only read 512 bytes.
+    code = (b"\xebc\x90\x10\x8e\xd0\xbc\x00\xb0" + b"\x00"*80 + b"GRUB \x00Geom\x00Hard Disk\x00Read\x00 Error"
+            + b"\r\n\x00\xbb\x01\x00\xb4\x0e\xcd\x10\xac<\x00u\xf4\xc3")
+
+    return code + b"\x00"*(510-len(code)) + b"\x55\xaa" + b"Not part of the boot record"
+
+def return_fake_boot_record_strings():
+    return ["GRUB", "Geom", "HardDisk", "Read", "Error", ""]
+
 def return_fake_lsblk_output_good_1():
     return """{
    "blockdevices": [
@@ -1967,3 +1790,489 @@ def return_fake_lsblk_output_bad_2_diskinfo():
 #------------------------------- Not valid JSON -------------------------------
 def return_fake_lsblk_output_bad_3():
     return """this is n(ot) valid JSON ()*"""
+
+#-------------------------------- Fake sysfs trees. --------------------------------
+def create_fake_sysfs(root):
+    """Creates a fake /sys/block in the given folder, with a SATA disk, an NVME disk, and a loop device."""
+    files = {
+        "sda/size": "1953525168\n",
+        "sda/removable": "0\n",
+        "sda/device/vendor": "ATA     \n",
+        "sda/device/model": "ST1000DM003-1CH1\n",
+        "sda/sda1/partition": "1\n",
+        "sda/sda1/size": "1024000\n",
+        "sda/sda2/partition": "2\n",
+        "sda/sda2/size": "1952499712\n",
+        "sda/queue/logical_block_size": "512\n",
+        "sda/queue/physical_block_size": "4096\n",
+        "sda/queue/minimum_io_size": "4096\n",
+        "sda/queue/optimal_io_size": "0\n",
+        "nvme0n1/size": "1000215216\n",
+        "nvme0n1/removable": "1\n",
+        "nvme0n1/device/model": "Samsung SSD 970 EVO 500GB               \n",
+        "nvme0n1/nvme0n1p10/partition": "10\n",
+        "nvme0n1/nvme0n1p10/size": "2048\n",
+        "nvme0n1/nvme0n1p9/partition": "9\n",
+        "nvme0n1/nvme0n1p9/size": "garbage\n",
+        "loop0/size": "0\n",
+        #An LV on a partition, an LV in a LUKS container, and a hidden snapshot layer.
+        "dm-0/size": "27682816\n",
+        "dm-0/dm/name": "fakefedora-root\n",
+        "dm-0/dm/uuid": "LVM-kHgpmyQFD8dmUqkbFaFB7pTLgH8qqXjrTWxt1jg62oGYju3UpBA4g39ZbBHWb7jf\n",
+        "dm-0/slaves/sda2/dev": "8:2\n",
+        "dm-0/queue/logical_block_size": "512\n",
+        "dm-0/queue/physical_block_size": "512\n",
+        "dm-0/queue/minimum_io_size": "512\n",
+        "dm-0/queue/optimal_io_size": "1048576\n",
+        "dm-1/size": "3358720\n",
+        "dm-1/dm/name": "my--vg-swap--1\n",
+        "dm-1/dm/uuid": "LVM-Rbzm1ZDHiSDQFUd0Y4HhREcgpWQxOjUW3e8urmxsCGiCAJQ3go2247OU5N3AwlD1\n",
+        "dm-1/slaves/dm-2/dev": "253:2\n",
+        "dm-2/size": "3362816\n",
+        "dm-2/dm/name": "luks-b507c745\n",
+        "dm-2/dm/uuid": "CRYPT-LUKS2-b507c745d3c94c438e880487913fbf00-luks-b507c745\n",
+        "dm-2/slaves/sda1/dev": "8:1\n",
+        "dm-2/holders/dm-1/dev": "253:1\n",
+        "dm-3/size": "27682816\n",
+        "dm-3/dm/name": "fakefedora-root-real\n",
+        "dm-3/dm/uuid": "LVM-kHgpmyQFD8dmUqkbFaFB7pTLgH8qqXjrTWxt1jg62oGYju3UpBA4g39ZbBHWb7jf-real\n",
+        "dm-3/slaves/sda2/dev": "8:2\n",
+    }
+
+    for path, contents in files.items():
+        path = root+"/"+path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, "w", encoding="utf-8") as attribute:
+            attribute.write(contents)
+
+def return_fake_sysfs_diskinfo():
+    diskinfo = {}
+
+    #Fictional /dev/nvme0n1
+    diskinfo["/dev/nvme0n1"] = {}
+    diskinfo["/dev/nvme0n1"]["Name"] = "/dev/nvme0n1"
+    diskinfo["/dev/nvme0n1"]["Type"] = "Device"
+    diskinfo["/dev/nvme0n1"]["HostDevice"] = "N/A"
+    diskinfo["/dev/nvme0n1"]["Partitions"] = ["/dev/nvme0n1p9", "/dev/nvme0n1p10"]
+    diskinfo["/dev/nvme0n1"]["Vendor"] = "Unknown"
+    diskinfo["/dev/nvme0n1"]["Product"] = "Samsung SSD 970 EVO 500GB"
+    diskinfo["/dev/nvme0n1"]["RawCapacity"] = "512110190592"
+    diskinfo["/dev/nvme0n1"]["Capacity"] = "512 GB"
+    diskinfo["/dev/nvme0n1"]["Description"] = "NVME Disk"
+    diskinfo["/dev/nvme0n1"]["Flags"] = ["removable"]
+    diskinfo["/dev/nvme0n1"]["Partitioning"] = "Unknown"
+    diskinfo["/dev/nvme0n1"]["FileSystem"] = "N/A"
+    diskinfo["/dev/nvme0n1"]["UUID"] = "N/A"
+    diskinfo["/dev/nvme0n1"]["ID"] = "Unknown"
+    diskinfo["/dev/nvme0n1"]["BootRecord"], diskinfo["/dev/nvme0n1"]["BootRecordStrings"] = ("Unknown", ["Unknown"])
+
+    #Fictional /dev/nvme0n1p9
+    diskinfo["/dev/nvme0n1p9"] = {}
+    diskinfo["/dev/nvme0n1p9"]["Name"] = "/dev/nvme0n1p9"
+    diskinfo["/dev/nvme0n1p9"]["Type"] = "Partition"
+    diskinfo["/dev/nvme0n1p9"]["HostDevice"] = "/dev/nvme0n1"
+    diskinfo["/dev/nvme0n1p9"]["Partitions"] = []
+    diskinfo["/dev/nvme0n1p9"]["Vendor"] = "N/A"
+    diskinfo["/dev/nvme0n1p9"]["Product"] = "Host Device: Samsung SSD 970 EVO 500GB"
+    diskinfo["/dev/nvme0n1p9"]["RawCapacity"] = "Unknown"
+    diskinfo["/dev/nvme0n1p9"]["Capacity"] = "Unknown"
+    diskinfo["/dev/nvme0n1p9"]["Description"] = "N/A"
+    diskinfo["/dev/nvme0n1p9"]["Flags"] = []
+    diskinfo["/dev/nvme0n1p9"]["FileSystem"] = "Unknown"
+    diskinfo["/dev/nvme0n1p9"]["Partitioning"] = "N/A"
+    diskinfo["/dev/nvme0n1p9"]["UUID"] = "Unknown"
+    diskinfo["/dev/nvme0n1p9"]["ID"] = "Unknown"
+    diskinfo["/dev/nvme0n1p9"]["BootRecord"], diskinfo["/dev/nvme0n1p9"]["BootRecordStrings"] = ("Unknown", ["Unknown"])
+
+    #Fictional /dev/nvme0n1p10
+    diskinfo["/dev/nvme0n1p10"] = {}
+    diskinfo["/dev/nvme0n1p10"]["Name"] = "/dev/nvme0n1p10"
+    diskinfo["/dev/nvme0n1p10"]["Type"] = "Partition"
+    diskinfo["/dev/nvme0n1p10"]["HostDevice"] = "/dev/nvme0n1"
+    diskinfo["/dev/nvme0n1p10"]["Partitions"] = []
+    diskinfo["/dev/nvme0n1p10"]["Vendor"] = "N/A"
+    diskinfo["/dev/nvme0n1p10"]["Product"] = "Host Device: Samsung SSD 970 EVO 500GB"
+    diskinfo["/dev/nvme0n1p10"]["RawCapacity"] = "1048576"
+    diskinfo["/dev/nvme0n1p10"]["Capacity"] = "1 MB"
+    diskinfo["/dev/nvme0n1p10"]["Description"] = "N/A"
+    diskinfo["/dev/nvme0n1p10"]["Flags"] = []
+    diskinfo["/dev/nvme0n1p10"]["FileSystem"] = "Unknown"
+    diskinfo["/dev/nvme0n1p10"]["Partitioning"] = "N/A"
+    diskinfo["/dev/nvme0n1p10"]["UUID"] = "Unknown"
+    diskinfo["/dev/nvme0n1p10"]["ID"] = "Unknown"
+    diskinfo["/dev/nvme0n1p10"]["BootRecord"], diskinfo["/dev/nvme0n1p10"]["BootRecordStrings"] = ("Unknown", ["Unknown"])
+
+    #Fictional /dev/sda
+    diskinfo["/dev/sda"] = {}
+    diskinfo["/dev/sda"]["Name"] = "/dev/sda"
+    diskinfo["/dev/sda"]["Type"] = "Device"
+    diskinfo["/dev/sda"]["HostDevice"] = "N/A"
+    diskinfo["/dev/sda"]["Partitions"] = ["/dev/sda1", "/dev/sda2"]
+    diskinfo["/dev/sda"]["Vendor"] = "ATA"
+    diskinfo["/dev/sda"]["Product"] = "ST1000DM003-1CH1"
+    diskinfo["/dev/sda"]["RawCapacity"] = "1000204886016"
+    diskinfo["/dev/sda"]["Capacity"] = "1 TB"
+    diskinfo["/dev/sda"]["Description"] = "Hard Disk Drive or SATA SSD"
+    diskinfo["/dev/sda"]["Flags"] = []
+    diskinfo["/dev/sda"]["Partitioning"] = "Unknown"
+    diskinfo["/dev/sda"]["FileSystem"] = "N/A"
+    diskinfo["/dev/sda"]["UUID"] = "N/A"
+    diskinfo["/dev/sda"]["ID"] = "Unknown"
+    diskinfo["/dev/sda"]["BootRecord"], diskinfo["/dev/sda"]["BootRecordStrings"] = ("Unknown", ["Unknown"])
+
+    #Fictional /dev/sda1
+    diskinfo["/dev/sda1"] = {}
+    diskinfo["/dev/sda1"]["Name"] = "/dev/sda1"
+    diskinfo["/dev/sda1"]["Type"] = "Partition"
+    diskinfo["/dev/sda1"]["HostDevice"] = "/dev/sda"
+    diskinfo["/dev/sda1"]["Partitions"] = []
+    diskinfo["/dev/sda1"]["Vendor"] = "N/A"
+    diskinfo["/dev/sda1"]["Product"] = "Host Device: ST1000DM003-1CH1"
+    diskinfo["/dev/sda1"]["RawCapacity"] = "524288000"
+    diskinfo["/dev/sda1"]["Capacity"] = "524 MB"
+    diskinfo["/dev/sda1"]["Description"] = "N/A"
+    diskinfo["/dev/sda1"]["Flags"] = []
+    diskinfo["/dev/sda1"]["FileSystem"] = "Unknown"
+    diskinfo["/dev/sda1"]["Partitioning"] = "N/A"
+    diskinfo["/dev/sda1"]["UUID"] = "Unknown"
+    diskinfo["/dev/sda1"]["ID"] = "Unknown"
+    diskinfo["/dev/sda1"]["BootRecord"], diskinfo["/dev/sda1"]["BootRecordStrings"] = ("Unknown", ["Unknown"])
+
+    #Fictional /dev/sda2
+    diskinfo["/dev/sda2"] = {}
+    diskinfo["/dev/sda2"]["Name"] = "/dev/sda2"
+    diskinfo["/dev/sda2"]["Type"] = "Partition"
+    diskinfo["/dev/sda2"]["HostDevice"] = "/dev/sda"
+    diskinfo["/dev/sda2"]["Partitions"] = []
+    diskinfo["/dev/sda2"]["Vendor"] = "N/A"
+    diskinfo["/dev/sda2"]["Product"] = "Host Device: ST1000DM003-1CH1"
+    diskinfo["/dev/sda2"]["RawCapacity"] = "999679852544"
+    diskinfo["/dev/sda2"]["Capacity"] = "999 GB"
+    diskinfo["/dev/sda2"]["Description"] = "N/A"
+    diskinfo["/dev/sda2"]["Flags"] = []
+    diskinfo["/dev/sda2"]["FileSystem"] = "Unknown"
+    diskinfo["/dev/sda2"]["Partitioning"] = "N/A"
+    diskinfo["/dev/sda2"]["UUID"] = "Unknown"
+    diskinfo["/dev/sda2"]["ID"] = "Unknown"
+    diskinfo["/dev/sda2"]["BootRecord"], diskinfo["/dev/sda2"]["BootRecordStrings"] = ("Unknown", ["Unknown"])
+
+    return diskinfo
+
+def return_fake_dm_diskinfo():
+    """Returns the logical volumes we expect to find in the fake sysfs from create_fake_sysfs()."""
+    diskinfo = {}
+
+    diskinfo["/dev/mapper/fakefedora-root"] = {}
+    diskinfo["/dev/mapper/fakefedora-root"]["Name"] = "/dev/mapper/fakefedora-root"
+    diskinfo["/dev/mapper/fakefedora-root"]["Aliases"] = ["/dev/mapper/fakefedora-root", "/dev/fakefedora/root"]
+    diskinfo["/dev/mapper/fakefedora-root"]["VGName"] = "fakefedora"
+    diskinfo["/dev/mapper/fakefedora-root"]["LVName"] = "root"
+    diskinfo["/dev/mapper/fakefedora-root"]["Type"] = "Partition"
+    diskinfo["/dev/mapper/fakefedora-root"]["Partitions"] = []
+    diskinfo["/dev/mapper/fakefedora-root"]["Vendor"] = "Linux"
+    diskinfo["/dev/mapper/fakefedora-root"]["Product"] = "LVM Partition"
+    diskinfo["/dev/mapper/fakefedora-root"]["Description"] = "LVM partition root in volume group fakefedora"
+    diskinfo["/dev/mapper/fakefedora-root"]["Flags"] = []
+    diskinfo["/dev/mapper/fakefedora-root"]["FileSystem"] = "Unknown"
+    diskinfo["/dev/mapper/fakefedora-root"]["Partitioning"] = "N/A"
+    diskinfo["/dev/mapper/fakefedora-root"]["BootRecord"] = "Unknown"
+    diskinfo["/dev/mapper/fakefedora-root"]["BootRecordStrings"] = ["Unknown"]
+    diskinfo["/dev/mapper/fakefedora-root"]["ID"] = "dm-name-fakefedora-root"
+    diskinfo["/dev/mapper/fakefedora-root"]["UUID"] = "TWxt1j-g62o-GYju-3UpB-A4g3-9ZbB-HWb7jf"
+    diskinfo["/dev/mapper/fakefedora-root"]["RawCapacity"] = "14173601792"
+    diskinfo["/dev/mapper/fakefedora-root"]["Capacity"] = "14 GB"
+    diskinfo["/dev/mapper/fakefedora-root"]["HostPartition"] = "/dev/sda2"
+    diskinfo["/dev/mapper/fakefedora-root"]["HostDevice"] = "/dev/sda"
+
+    diskinfo["/dev/mapper/my--vg-swap--1"] = {}
+    diskinfo["/dev/mapper/my--vg-swap--1"]["Name"] = "/dev/mapper/my--vg-swap--1"
+    diskinfo["/dev/mapper/my--vg-swap--1"]["Aliases"] = ["/dev/mapper/my--vg-swap--1", "/dev/my-vg/swap-1"]
+    diskinfo["/dev/mapper/my--vg-swap--1"]["VGName"] = "my-vg"
+    diskinfo["/dev/mapper/my--vg-swap--1"]["LVName"] = "swap-1"
+    diskinfo["/dev/mapper/my--vg-swap--1"]["Type"] = "Partition"
+    diskinfo["/dev/mapper/my--vg-swap--1"]["Partitions"] = []
+    diskinfo["/dev/mapper/my--vg-swap--1"]["Vendor"] = "Linux"
+    diskinfo["/dev/mapper/my--vg-swap--1"]["Product"] = "LVM Partition"
+    diskinfo["/dev/mapper/my--vg-swap--1"]["Description"] = "LVM partition swap-1 in volume group my-vg"
+    diskinfo["/dev/mapper/my--vg-swap--1"]["Flags"] = []
+    diskinfo["/dev/mapper/my--vg-swap--1"]["FileSystem"] = "Unknown"
+    diskinfo["/dev/mapper/my--vg-swap--1"]["Partitioning"] = "N/A"
+    diskinfo["/dev/mapper/my--vg-swap--1"]["BootRecord"] = "Unknown"
+    diskinfo["/dev/mapper/my--vg-swap--1"]["BootRecordStrings"] = ["Unknown"]
+    diskinfo["/dev/mapper/my--vg-swap--1"]["ID"] = "dm-name-my--vg-swap--1"
+    diskinfo["/dev/mapper/my--vg-swap--1"]["UUID"] = "3e8urm-xsCG-iCAJ-Q3go-2247-OU5N-3AwlD1"
+    diskinfo["/dev/mapper/my--vg-swap--1"]["RawCapacity"] = "1719664640"
+    diskinfo["/dev/mapper/my--vg-swap--1"]["Capacity"] = "1 GB"
+    diskinfo["/dev/mapper/my--vg-swap--1"]["HostPartition"] = "/dev/mapper/luks-b507c745"
+    diskinfo["/dev/mapper/my--vg-swap--1"]["HostDevice"] = "Unknown"
+
+    return diskinfo
+
+def fake_get_lv_file_system(collector, disk):
+    return "Unknown"
+
+#-------------------------------- Fake superblocks. --------------------------------
+def write_fake_image(path, pieces, size=131072):
+    """Writes an image file of the given size, with each piece of data at its offset."""
+    with open(path, "wb") as image:
+        image.truncate(size)
+
+        for offset, piece in pieces:
+            image.seek(offset)
+            image.write(piece)
+
+def return_fake_superblock_images():
+    """Returns the data for some fake volume images, and what we expect to find in each."""
+    uuid = bytes(range(0x10, 0x20))
+    uuid_string = "10111213-1415-1617-1819-1a1b1c1d1e1f"
+
+    images = {}
+
+    #ext4 with extents, ext3 with a journal, and plain ext2.
+    for name, compat, incompat in (("ext4", 0x4, 0x42), ("ext3", 0x4, 0x2), ("ext2", 0x0, 0x2)):
+        images[name] = ([(1024+56, b"\x53\xef"),
+                         (1024+92, struct.pack("<III", compat, incompat, 0x1)),
+                         (1024+104, uuid), (1024+120, ("Λabel "+name).encode()+b"\x00")],
+                        (name, uuid_string, "Λabel "+name))
+
+    images["xfs"] = ([(0, b"XFSB"), (32, uuid), (108, b"xfslabel")],
+                     ("xfs", uuid_string, "xfslabel"))
+
+    images["btrfs"] = ([(65536+32, uuid), (65536+64, b"_BHRfS_M"), (65536+299, b"btrfs label")],
+                       ("btrfs", uuid_string, "btrfs label"))
+
+    images["swap"] = ([(1024+12, uuid), (4086, b"SWAPSPACE2")], ("swap", uuid_string, "Unknown"))
+
+    images["vfat"] = ([(3, b"mkfs.fat"), (67, struct.pack("<I", 0x82430631)),
+                       (71, b"NO NAME    FAT32   "), (510, b"\x55\xaa")],
+                      ("vfat", "8243-0631", "Unknown"))
+
+    images["fat16"] = ([(3, b"mkfs.fat"), (39, struct.pack("<I", 0x9B4CDEED)),
+                        (43, b"EFI        FAT16   "), (510, b"\x55\xaa")],
+                       ("vfat", "9B4C-DEED", "EFI"))
+
+    images["exfat"] = ([(3, b"EXFAT   "), (100, struct.pack("<I", 0x1234ABCD))],
+                       ("exfat", "1234-ABCD", "Unknown"))
+
+    images["ntfs"] = ([(3, b"NTFS    "), (72, struct.pack("<Q", 0xEAC64F91C64F0CEF)),
+                       (510, b"\x55\xaa")],
+                      ("ntfs", "EAC64F91C64F0CEF", "Unknown"))
+
+    images["lvm2"] = ([(512, b"LABELONE"), (512+20, struct.pack("<I", 32)), (512+24, b"LVM2 001"),
+                       (512+32, b"3e8urmxsCGiCAJQ3go2247OU5N3AwlD1")],
+                      ("LVM2_member", "3e8urm-xsCG-iCAJ-Q3go-2247-OU5N-3AwlD1", "Unknown"))
+
+    images["luks2"] = ([(0, b"LUKS\xba\xbe\x00\x02"), (24, b"cryptlabel"),
+                        (168, b"b507c745-d3c9-4c43-8e88-0487913fbf00")],
+                       ("crypto_LUKS", "b507c745-d3c9-4c43-8e88-0487913fbf00", "cryptlabel"))
+
+    images["iso9660"] = ([(32768, b"\x01CD001"), (32768+40, b"UBUNTU_22_04                    "),
+                          (32768+813, b"2022041917262400")],
+                         ("iso9660", "2022-04-19-17-26-24-00", "UBUNTU_22_04"))
+
+    images["squashfs"] = ([(0, b"hsqs")], ("squashfs", "Unknown", "Unknown"))
+
+    #An MBR with no file system in it.
+    images["unknown"] = ([(446, b"\x80"), (510, b"\x55\xaa")], None)
+
+    return images
+
+def return_fake_gpt_header(disk_uuid, entries_lba, entry_count, entry_size, entries_crc,
+                           header_crc=None):
+    """Returns a 92-byte GPT header, with the right checksum unless another one is given."""
+    header = (b"EFI PART\x00\x00\x01\x00" + struct.pack("<II", 92, 0) + bytes(36)
+              + uuid.UUID(disk_uuid).bytes_le
+              + struct.pack("<QIII", entries_lba, entry_count, entry_size, entries_crc))
+
+    if header_crc is None:
+        header_crc = zlib.crc32(header)
+
+    return header[:16]+struct.pack("<I", header_crc)+header[20:]
+
+def return_fake_gpt_image(sector_size, entries_lba):
+    """Returns the data for a fake GPT device image, and the partition table we expect to find."""
+    disk_uuid = "10111213-1415-1617-1819-1a1b1c1d1e1f"
+
+    #Type, UUID, start, end, attributes, and name. Entry 2 is unused.
+    entries = {1: ("c12a7328-f81f-11d2-ba4b-00a0c93ec93b", "20212223-2425-2627-2829-2a2b2c2d2e2f",
+                   2048, 4095, 0x1, "EFI System Partition"),
+               3: ("0fc63daf-8483-4772-8e79-3d69d8477de4", "30313233-3435-3637-3839-3a3b3c3d3e3f",
+                   4096, 8191, 0x0, "root")}
+
+    entry_array = bytearray(128*128)
+    partitions = {}
+
+    for number, (type_guid, unique_guid, start, end, attributes, name) in entries.items():
+        entry = (uuid.UUID(type_guid).bytes_le + uuid.UUID(unique_guid).bytes_le
+                 + struct.pack("<QQQ", start, end, attributes) + name.encode("utf-16-le"))
+
+        entry_array[(number-1)*128:(number-1)*128+len(entry)] = entry
+
+        partitions[number] = {"StartLBA": start, "EndLBA": end, "PartitionType": type_guid,
+                              "PartitionName": name, "PartitionUUID": unique_guid,
+                              "PartitionAttributes": attributes}
+
+    pieces = [(446, struct.pack("<B3xB3xII", 0, 0xEE, 1, 0xFFFFFFFF)), (510, b"\x55\xaa"),
+              (sector_size, return_fake_gpt_header(disk_uuid, entries_lba, 128, 128,
+                                                   zlib.crc32(entry_array))),
+              (entries_lba*sector_size, bytes(entry_array))]
+
+    return (pieces, {"Scheme": "gpt", "SectorSize": sector_size, "DiskUUID": disk_uuid,
+                     "Partitions": partitions})
+
+def return_fake_partition_table_images():
+    """Returns the data for some fake device images, and the partition tables we expect to find."""
+    images = {}
+
+    images["gpt"] = return_fake_gpt_image(512, 2)
+    images["gpt-4k"] = return_fake_gpt_image(4096, 2)
+
+    #The entry array doesn't have to be right after the header.
+    images["gpt-far"] = return_fake_gpt_image(512, 1024)
+
+    #A bootable primary partition, and an extended partition with two logical
+    #partitions in it. Each EBR points to the next one.
+    images["mbr"] = ([(446, struct.pack("<B3xB3xII", 0x80, 0x83, 2048, 2048)),
+                      (462, struct.pack("<B3xB3xII", 0, 0x05, 8192, 8192)),
+                      (510, b"\x55\xaa"),
+                      (8192*512+446, struct.pack("<B3xB3xII", 0, 0x83, 63, 1000)),
+                      (8192*512+462, struct.pack("<B3xB3xII", 0, 0x05, 2048, 1000)),
+                      (8192*512+510, b"\x55\xaa"),
+                      (10240*512+446, struct.pack("<B3xB3xII", 0, 0x82, 63, 500)),
+                      (10240*512+510, b"\x55\xaa")],
+                     {"Scheme": "mbr", "SectorSize": 512, "DiskUUID": "N/A",
+                      "Partitions": {1: {"StartLBA": 2048, "EndLBA": 4095, "PartitionType": "0x83",
+                                         "PartitionName": "N/A", "PartitionUUID": "N/A",
+                                         "PartitionAttributes": 0x80},
+                                     2: {"StartLBA": 8192, "EndLBA": 16383, "PartitionType": "0x05",
+                                         "PartitionName": "N/A", "PartitionUUID": "N/A",
+                                         "PartitionAttributes": 0},
+                                     5: {"StartLBA": 8255, "EndLBA": 9254, "PartitionType": "0x83",
+                                         "PartitionName": "N/A", "PartitionUUID": "N/A",
+                                         "PartitionAttributes": 0},
+                                     6: {"StartLBA": 10303, "EndLBA": 10802, "PartitionType": "0x82",
+                                         "PartitionName": "N/A", "PartitionUUID": "N/A",
+                                         "PartitionAttributes": 0}}})
+
+    #The second EBR points back to itself.
+    images["mbr-loop"] = ([(446, struct.pack("<B3xB3xII", 0, 0x0F, 2048, 8192)),
+                           (510, b"\x55\xaa"),
+                           (2048*512+446, struct.pack("<B3xB3xII", 0, 0x83, 63, 1000)),
+                           (2048*512+462, struct.pack("<B3xB3xII", 0, 0x05, 2048, 1000)),
+                           (2048*512+510, b"\x55\xaa"),
+                           (4096*512+446, struct.pack("<B3xB3xII", 0, 0x82, 63, 500)),
+                           (4096*512+462, struct.pack("<B3xB3xII", 0, 0x05, 2048, 1000)),
+                           (4096*512+510, b"\x55\xaa")],
+                          {"Scheme": "mbr", "SectorSize": 512, "DiskUUID": "N/A",
+                           "Partitions": {1: {"StartLBA": 2048, "EndLBA": 10239, "PartitionType": "0x0f",
+                                              "PartitionName": "N/A", "PartitionUUID": "N/A",
+                                              "PartitionAttributes": 0},
+                                          5: {"StartLBA": 2111, "EndLBA": 3110, "PartitionType": "0x83",
+                                              "PartitionName": "N/A", "PartitionUUID": "N/A",
+                                              "PartitionAttributes": 0},
+                                          6: {"StartLBA": 4159, "EndLBA": 4658, "PartitionType": "0x82",
+                                              "PartitionName": "N/A", "PartitionUUID": "N/A",
+                                              "PartitionAttributes": 0}}})
+
+    #No partition table at all.
+    images["unknown"] = ([(0, b"XFSB")], {"Scheme": "Unknown", "SectorSize": 512, "DiskUUID": "N/A",
+                                          "Partitions": {}})
+
+    return images
+
+#-------------------------------- Fake lshw output. --------------------------------
+def return_fake_lshw_output():
+    """Returns some lshw XML output for a disk with an extended partition, and an optical drive."""
+    return """<?xml version="1.0" standalone="yes" ?>
+<!-- generated by lshw-B.02.19.2 -->
+<list>
+  <node id="disk" claimed="true" class="disk" handle="GUID:abcd">
+   <description>ATA Disk</description>
+   <product>ST1000DM003-1CH1</product>
+   <vendor>Seagate</vendor>
+   <physid>0.0.0</physid>
+   <logicalname>/dev/sda</logicalname>
+   <size units="bytes">1000204886016</size>
+   <configuration>
+    <setting id="ansiversion" value="5" />
+    <setting id="signature" value="0a1b2c3d" />
+   </configuration>
+   <capabilities>
+    <capability id="partitioned" >Partitioned disk</capability>
+    <capability id="partitioned:dos" >MS-DOS partition table</capability>
+   </capabilities>
+    <node id="volume:0" claimed="true" class="volume">
+     <description>EXT4 volume</description>
+     <vendor>Linux</vendor>
+     <physid>1</physid>
+     <logicalname>/dev/sda1</logicalname>
+     <logicalname>/</logicalname>
+     <capacity>524288000</capacity>
+     <configuration>
+      <setting id="filesystem" value="ext4" />
+      <setting id="mount.fstype" value="ext4" />
+     </configuration>
+     <capabilities>
+      <capability id="primary" >Primary partition</capability>
+      <capability id="bootable" >Bootable partition (active)</capability>
+     </capabilities>
+    </node>
+    <node id="volume:1" claimed="true" class="volume">
+     <description>Extended partition</description>
+     <physid>2</physid>
+     <logicalname>/dev/sda2</logicalname>
+     <size>999680000000</size>
+     <capabilities>
+      <capability id="primary" >Primary partition</capability>
+      <capability id="extended" >Extended partition</capability>
+     </capabilities>
+      <node id="logicalvolume" claimed="true" class="volume">
+       <description>Linux swap volume</description>
+       <physid>5</physid>
+       <capacity>8589934592</capacity>
+       <configuration>
+        <setting id="filesystem" value="swap" />
+       </configuration>
+      </node>
+    </node>
+  </node>
+  <node id="cdrom" claimed="true" class="disk">
+   <description>DVD-RAM writer</description>
+   <product>DVD+-RW GH50N</product>
+   <vendor>HL-DT-ST</vendor>
+   <physid>0.0.0</physid>
+   <logicalname>/dev/cdrom</logicalname>
+   <logicalname>/dev/sr0</logicalname>
+   <capabilities>
+    <capability id="removable" >support is removable</capability>
+   </capabilities>
+  </node>
+</list>
+"""
+
+#-------------------------------- Fake uevents. --------------------------------
+def return_fake_uevent(action, name, devtype, host=None, subsystem="block", udev=False):
+    """Returns a uevent message like the kernel (or udev) would send."""
+    devpath = "/devices/pci0000:00/block/"
+
+    if host is not None:
+        devpath += host+"/"
+
+    devpath += name
+
+    properties = ("ACTION="+action+"\x00DEVPATH="+devpath+"\x00SUBSYSTEM="+subsystem+"\x00DEVNAME="
+                  + name+"\x00DEVTYPE="+devtype+"\x00SEQNUM=42\x00").encode("utf-8")
+
+    if not udev:
+        return (action+"@"+devpath+"\x00").encode("utf-8")+properties
+
+    #Prefix, magic, header size, properties offset and length, and filter hashes.
+    header = b"libudev\x00"+struct.pack(">I", 0xfeedcafe)+struct.pack("=III", 40, 40, len(properties))
+    header += bytes(40-len(header))
+
+    return header+properties
+
+def fake_read_partition_table(disk):
+    """Returns the fake GPT partition table for any device."""
+    return return_fake_gpt_image(512, 2)[1]
@@ -15,37 +15,6 @@
 # You should have received a copy of the GNU General Public License
 # along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
 
-def get_lv_aliases(line):
-    """Obtain and verify the name of an LVM volume. Return it once found."""
-    alias_list = []
-    default_name = "Unknown"
-
-    #Get relevant part of the output line.
-    temp = line.split()[-1]
-
-    #Try this way first for better compatibility with most systems.
-    alias_list.append("/dev/mapper/"+'-'.join(temp.split("/")[2:]))
-
-    #Alternative ways of obtaining the info.
-    alias_list.append(temp)
-
-    #Weird one for Ubuntu with extra - in it.
-    if "-" in temp:
-        #Get volume group name and logical volume name.
-        vg_name = temp.split("/")[2]
-        lv_name = temp.split("/")[3]
-
-        #Insert another "-" in the middle (if possible).
-        vg_name = vg_name.replace("-", "--")
-
-        #Check whether this works.
-        alias_list.append("/dev/mapper/"+vg_name+"-"+lv_name)
-
-    if len(alias_list) >= 1:
-        default_name = alias_list[0]
-
-    return default_name, alias_list
-
 def print_list_diffs(list1, list2):
     """Prints all the differences between items in the lists"""
     for value in list1:
@@ -0,0 +1,969 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Platform-independent Tests for GetDevInfo
+# This file is part of GetDevInfo.
+# Copyright (C) 2013-2022 Hamish McIntyre-Bhatty
+# GetDevInfo is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# GetDevInfo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with GetDevInfo.  If not, see <http://www.gnu.org/licenses/>.
+
+#import modules.
+import unittest
+import os
+import sys
+import copy
+import json
+import pickle
+import tempfile
+import threading
+import subprocess
+import struct
+import time
+import io
+import contextlib
+
+#import test data and functions.
+from . import getdevinfo_test_data as data
+
+sys.path.insert(0, os.path.abspath('../'))
+sys.path.insert(0, os.path.abspath('../..'))
+
+import getdevinfo.bootrecord as bootrecord
+import getdevinfo.cache as cache
+import getdevinfo.daemon as daemon
+import getdevinfo.errors as errors
+import getdevinfo.getdevinfo as getdevinfo
+import getdevinfo.lazy as lazy
+import getdevinfo.partitiontable as partitiontable
+import getdevinfo.projection as projection
+import getdevinfo.records as records
+import getdevinfo.report as report
+import getdevinfo.snapshot as snapshot
+import getdevinfo.superblock as superblock
+
+class TestBootRecord(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.image = os.path.join(self.tempdir.name, "disk.img")
+
+        with open(self.image, "wb") as image:
+            image.write(data.return_fake_boot_record())
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+        del self.tempdir
+        del self.image
+
+    def test_read_1(self):
+        """Test #1: Test that only the first 512 bytes are read"""
+        self.assertEqual(bootrecord.BootRecordReader().read(self.image),
+                         data.return_fake_boot_record()[:512])
+
+    def test_read_2(self):
+        """Test #2: Test that devices smaller than a boot record are read without error"""
+        with open(self.image, "wb") as image:
+            image.write(b"GRUB")
+
+        self.assertEqual(bootrecord.BootRecordReader().read(self.image), b"GRUB")
+
+    def test_read_3(self):
+        """Test #3: Test that OSError is raised for a device that doesn't exist"""
+        self.assertRaises(OSError, bootrecord.BootRecordReader().read,
+                          os.path.join(self.tempdir.name, "nothere"))
+
+    def test_read_boot_records_1(self):
+        """Test #1: Test that devices that can't be read are left out of the batch results"""
+        missing = os.path.join(self.tempdir.name, "nothere")
+        boot_records = bootrecord.read_boot_records([self.image, missing, self.image])
+
+        self.assertEqual(boot_records, {self.image: data.return_fake_boot_record()[:512]})
+
+    def test_get_strings_1(self):
+        """Test #1: Test that readable strings are found like strings(1) would find them"""
+        self.assertEqual(bootrecord.get_strings(data.return_fake_boot_record()[:512]),
+                         data.return_fake_boot_record_strings())
+
+    def test_get_strings_2(self):
+        """Test #2: Test that an empty boot record gives the same result as strings(1)"""
+        self.assertEqual(bootrecord.get_strings(b""), [""])
+
+class TestSuperblock(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.images = data.return_fake_superblock_images()
+
+        for name, (pieces, _expected) in self.images.items():
+            data.write_fake_image(os.path.join(self.tempdir.name, name), pieces)
+
+        self.maxDiff = None
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+        del self.tempdir
+        del self.images
+
+    def test_probe_1(self):
+        """Test #1: Test that each type, UUID and label is recognised correctly"""
+        for name, (_pieces, expected) in self.images.items():
+            with self.subTest(image=name):
+                self.assertEqual(superblock.probe(os.path.join(self.tempdir.name, name)), expected)
+
+    def test_probe_2(self):
+        """Test #2: Test that a volume too small to hold most superblocks is handled without error"""
+        data.write_fake_image(os.path.join(self.tempdir.name, "tiny"), [(0, b"hsq")], size=3)
+        self.assertIsNone(superblock.probe(os.path.join(self.tempdir.name, "tiny")))
+
+    def test_probe_3(self):
+        """Test #3: Test that OSError is raised for a volume that doesn't exist"""
+        self.assertRaises(OSError, superblock.probe, os.path.join(self.tempdir.name, "nothere"))
+
+class TestPartitionTable(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.images = data.return_fake_partition_table_images()
+
+        for name, (pieces, _expected) in self.images.items():
+            data.write_fake_image(os.path.join(self.tempdir.name, name), pieces, size=8388608)
+
+        self.maxDiff = None
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+        del self.tempdir
+        del self.images
+
+    def test_read_partition_table_1(self):
+        """Test #1: Test that GPT and MBR partition tables are read correctly"""
+        for name, (_pieces, expected) in self.images.items():
+            with self.subTest(image=name):
+                self.assertEqual(partitiontable.read_partition_table(
+                    os.path.join(self.tempdir.name, name)), expected)
+
+    def test_read_partition_table_2(self):
+        """Test #2: Test that a device too small to hold a partition table is handled without error"""
+        data.write_fake_image(os.path.join(self.tempdir.name, "tiny"), [(0, b"\x55\xaa")], size=2)
+
+        self.assertEqual(partitiontable.read_partition_table(os.path.join(self.tempdir.name, "tiny"))["Scheme"],
+                         "Unknown")
+
+    def test_read_partition_table_3(self):
+        """Test #3: Test that OSError is raised for a device that doesn't exist"""
+        self.assertRaises(OSError, partitiontable.read_partition_table,
+                          os.path.join(self.tempdir.name, "nothere"))
+
+    def test_read_partition_table_4(self):
+        """Test #4: Test that corrupt or huge GPT headers and entry arrays are rejected without reading them"""
+        disk_uuid = "10111213-1415-1617-1819-1a1b1c1d1e1f"
+        mbr = [(446, struct.pack("<B3xB3xII", 0, 0xEE, 1, 0xFFFFFFFF)), (510, b"\x55\xaa")]
+
+        headers = {"checksum": data.return_fake_gpt_header(disk_uuid, 2, 128, 128, 0, header_crc=1),
+                   "overflow": data.return_fake_gpt_header(disk_uuid, 2, 0xFFFFFFFF, 0xFFFFFFFF, 0),
+                   "small-entries": data.return_fake_gpt_header(disk_uuid, 2, 128, 100, 0),
+                   "odd-entries": data.return_fake_gpt_header(disk_uuid, 2, 128, 132, 0),
+                   "huge-array": data.return_fake_gpt_header(disk_uuid, 2, 0x100000, 128, 0),
+                   "entries-checksum": data.return_fake_gpt_header(disk_uuid, 2, 128, 128, 1)}
+
+        for name, header in headers.items():
+            path = os.path.join(self.tempdir.name, name)
+            data.write_fake_image(path, mbr+[(512, header)], size=1048576)
+
+            with self.subTest(header=name):
+                self.assertRaises(ValueError, partitiontable.read_partition_table, path)
+
+    def test_read_partition_table_5(self):
+        """Test #5: Test that logical partitions are found on devices with 4096-byte sectors"""
+        pieces, expected = self.images["mbr"]
+        pieces_4k = []
+
+        #Move the EBRs to where they are with 4096-byte sectors.
+        for offset, piece in pieces:
+            lba, offset_in_sector = divmod(offset, 512)
+            pieces_4k.append((lba*4096+offset_in_sector, piece))
+
+        path = os.path.join(self.tempdir.name, "mbr-4k")
+        data.write_fake_image(path, pieces_4k, size=8388608)
+
+        expected = dict(expected, SectorSize=4096)
+
+        self.assertEqual(partitiontable.read_partition_table(path, sector_size=4096), expected)
+        self.assertNotEqual(partitiontable.read_partition_table(path)["Partitions"],
+                            expected["Partitions"])
+
+    def test_get_geometry_1(self):
+        """Test #1: Test that the geometry of a partition in the table is returned"""
+        _pieces, table = self.images["gpt"]
+        self.assertEqual(partitiontable.get_geometry(table, 3), table["Partitions"][3])
+
+    def test_get_geometry_2(self):
+        """Test #2: Test that everything is "Unknown" for a partition that isn't in the table"""
+        _pieces, table = self.images["gpt"]
+        expected = dict.fromkeys(partitiontable.GEOMETRY_FIELDS, "Unknown")
+
+        for number in (2, None):
+            with self.subTest(number=number):
+                self.assertEqual(partitiontable.get_geometry(table, number), expected)
+
+        self.assertEqual(partitiontable.get_geometry(None, 1), expected)
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.proc_partitions = os.path.join(self.tempdir.name, "partitions")
+        self.sysfs_block = os.path.join(self.tempdir.name, "block")
+
+        with open(self.proc_partitions, "w", encoding="utf-8") as partitions:
+            partitions.write("major minor  #blocks  name\n\n   8        0  976762584 sda\n")
+
+        data.create_fake_sysfs(self.sysfs_block)
+
+        self.fingerprint = "a"
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+        del self.tempdir
+
+    def get_fake_fingerprint(self):
+        return self.fingerprint
+
+    def test_get_fingerprint_1(self):
+        """Test #1: Test that the fingerprint only changes when devices change"""
+        first = cache.get_fingerprint(self.proc_partitions, self.sysfs_block)
+        self.assertEqual(cache.get_fingerprint(self.proc_partitions, self.sysfs_block), first)
+
+        #Resize a device.
+        with open(self.proc_partitions, "w", encoding="utf-8") as partitions:
+            partitions.write("major minor  #blocks  name\n\n   8        0       1024 sda\n")
+
+        second = cache.get_fingerprint(self.proc_partitions, self.sysfs_block)
+        self.assertNotEqual(second, first)
+
+        #Add a partition.
+        with open(self.proc_partitions, "a", encoding="utf-8") as partitions:
+            partitions.write("   8        1     512000 sda1\n")
+
+        self.assertNotEqual(cache.get_fingerprint(self.proc_partitions, self.sysfs_block), second)
+
+    def test_get_fingerprint_3(self):
+        """Test #3: Test that sysfs is used if /proc/partitions can't be read"""
+        missing = os.path.join(self.tempdir.name, "missing")
+        first = cache.get_fingerprint(missing, self.sysfs_block)
+        self.assertIsNotNone(first)
+
+        #Resize a device.
+        with open(os.path.join(self.sysfs_block, "sda", "size"), "w", encoding="utf-8") as size:
+            size.write("2048\n")
+
+        self.assertNotEqual(cache.get_fingerprint(missing, self.sysfs_block), first)
+
+    def test_get_fingerprint_2(self):
+        """Test #2: Test that None is returned if there's nothing to make a fingerprint from"""
+        missing = os.path.join(self.tempdir.name, "nothere")
+        self.assertIsNone(cache.get_fingerprint(missing, missing))
+
+    def test_result_cache_1(self):
+        """Test #1: Test that results are returned until the fingerprint changes"""
+        result_cache = cache.ResultCache(ttl=None, fingerprint=self.get_fake_fingerprint)
+        self.assertIsNone(result_cache.get())
+
+        result_cache.store("result")
+        self.assertEqual(result_cache.get(), "result")
+
+        self.fingerprint = "b"
+        self.assertIsNone(result_cache.get())
+
+    def test_result_cache_2(self):
+        """Test #2: Test that results expire, and can be invalidated"""
+        result_cache = cache.ResultCache(ttl=0, fingerprint=self.get_fake_fingerprint)
+        result_cache.store("result")
+        self.assertIsNone(result_cache.get())
+
+        result_cache.ttl = 60
+        result_cache.store("result")
+        self.assertEqual(result_cache.get(), "result")
+
+        result_cache.invalidate()
+        self.assertIsNone(result_cache.get())
+
+    def test_result_cache_3(self):
+        """Test #3: Test that a result stored with an out of date fingerprint isn't returned"""
+        result_cache = cache.ResultCache(ttl=None, fingerprint=self.get_fake_fingerprint)
+        result_cache.store("result", fingerprint="old")
+        self.assertIsNone(result_cache.get())
+
+    def test_result_cache_4(self):
+        """Test #4: Test that results older than max_age aren't returned, but are kept"""
+        result_cache = cache.ResultCache(ttl=None, fingerprint=self.get_fake_fingerprint)
+        result_cache.store("result")
+        time.sleep(0.01)
+
+        self.assertIsNone(result_cache.get(max_age=0))
+        self.assertEqual(result_cache.get(max_age=60), "result")
+
+    def test_single_flight_1(self):
+        """Test #1: Test that callers at the same time share one call, and all get its result"""
+        flights = cache.SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def function():
+            calls.append(None)
+            started.set()
+            release.wait(10)
+            return len(calls)
+
+        def caller():
+            results.append(flights.run("key", function))
+
+        threads = [threading.Thread(target=caller) for _count in range(8)]
+        threads[0].start()
+        started.wait(10)
+
+        for thread in threads[1:]:
+            thread.start()
+
+        #Give the others time to start waiting.
+        time.sleep(0.1)
+        release.set()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [1] * 8)
+
+        #Once it's finished, the next caller makes a new call.
+        self.assertEqual(flights.run("key", function), 2)
+
+    def test_single_flight_2(self):
+        """Test #2: Test that calls that are too old aren't shared, and exceptions reach everyone sharing a call"""
+        flights = cache.SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        results = []
+        raised = []
+
+        def slow():
+            started.set()
+            release.wait(10)
+            return "old"
+
+        def failing():
+            raise ValueError("Scan failed")
+
+        def caller(function, max_age):
+            try:
+                results.append(flights.run("key", function, max_age=max_age))
+
+            except ValueError as err:
+                results.append(str(err))
+                raised.append(err)
+
+        first = threading.Thread(target=caller, args=(slow, None))
+        first.start()
+        started.wait(10)
+        time.sleep(0.01)
+
+        #These are too late for the first call, so they share a second one,
+        #which has to wait for the first to finish.
+        others = [threading.Thread(target=caller, args=(failing, 0)) for _count in range(3)]
+
+        for thread in others:
+            thread.start()
+
+        time.sleep(0.1)
+        release.set()
+
+        for thread in [first] + others:
+            thread.join()
+
+        self.assertEqual(results, ["old"] + ["Scan failed"] * 3)
+
+        #The caller that made the call gets its exception, and the others a
+        #copy each, so their tracebacks aren't mixed up.
+        original = [err for err in raised if err.__cause__ is None]
+
+        self.assertEqual(len(original), 1)
+        self.assertEqual(len(set(id(err) for err in raised)), 3)
+        self.assertTrue(all(err.__cause__ is original[0] for err in raised if err is not original[0]))
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "cache", "snapshot.json")
+
+        self.diskinfo = data.return_fake_disk_info_linux()
+        self.diskinfo["/dev/sda"]["BootRecord"] = data.return_fake_boot_record()
+        self.errors = ["linux.get_info(): Fake error\n"]
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+        del self.tempdir
+        del self.path
+        del self.diskinfo
+        del self.errors
+
+    def test_save_load_1(self):
+        """Test #1: Test that a saved snapshot is loaded the same while the fingerprint matches"""
+        snapshot.save(self.diskinfo, self.errors, "a", path=self.path)
+
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+        self.assertEqual(snapshot.load("a", path=self.path), (self.diskinfo, self.errors))
+        self.assertIsNone(snapshot.load("b", path=self.path))
+        self.assertIsNone(snapshot.load(None, path=self.path))
+
+    def test_save_load_2(self):
+        """Test #2: Test that saving replaces the old snapshot, without leaving temporary files"""
+        snapshot.save(self.diskinfo, self.errors, "a", path=self.path)
+        snapshot.save({}, [], "b", path=self.path)
+
+        self.assertEqual(snapshot.load("b", path=self.path), ({}, []))
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["snapshot.json"])
+
+    def test_load_1(self):
+        """Test #1: Test that missing, corrupt, and old snapshots aren't loaded"""
+        self.assertIsNone(snapshot.load("a", path=self.path))
+
+        snapshot.save(self.diskinfo, self.errors, "a", path=self.path)
+
+        with open(self.path, "r+b") as snapshot_file:
+            snapshot_file.truncate(100)
+
+        self.assertIsNone(snapshot.load("a", path=self.path))
+
+        snapshot.SCHEMA_VERSION += 1
+
+        try:
+            snapshot.save(self.diskinfo, self.errors, "a", path=self.path)
+
+        finally:
+            snapshot.SCHEMA_VERSION -= 1
+
+        self.assertIsNone(snapshot.load("a", path=self.path))
+
+    def test_save_load_3(self):
+        """Test #3: Test that errors are loaded as ErrorRecords, with their details"""
+        error = errors.ErrorRecord("linux.get_info(): Fake error\n", device="/dev/sda",
+                                   command=["lsblk"], exit_code=1, stage="lsblk")
+
+        snapshot.save(self.diskinfo, [error, "macos.get_info(): Plain error\n"], "a",
+                      path=self.path)
+
+        loaded = snapshot.load("a", path=self.path)[1]
+
+        self.assertEqual(loaded, [error, "macos.get_info(): Plain error\n"])
+        self.assertTrue(all(isinstance(each, errors.ErrorRecord) for each in loaded))
+        self.assertEqual(loaded[0].as_dict(), error.as_dict())
+        self.assertEqual(loaded[1].function, "macos.get_info")
+
+    def test_load_2(self):
+        """Test #2: Test that snapshots others can write to aren't loaded"""
+        snapshot.save(self.diskinfo, self.errors, "a", path=self.path)
+        os.chmod(self.path, 0o666)
+
+        self.assertIsNone(snapshot.load("a", path=self.path))
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tempdir.name, "getdevinfo.sock")
+
+        self.diskinfo = data.return_fake_disk_info_linux()
+        self.diskinfo["/dev/sda"]["BootRecord"] = data.return_fake_boot_record()
+        self.errors = []
+
+        self.inventory = daemon.Inventory()
+        self.inventory.publish(self.diskinfo, self.errors)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+        del self.tempdir
+        del self.socket_path
+        del self.diskinfo
+        del self.errors
+        del self.inventory
+
+    def fake_scan(self):
+        return self.diskinfo, self.errors
+
+    def test_publish_1(self):
+        """Test #1: Test that the generation only goes up when something changes"""
+        self.assertFalse(self.inventory.publish(self.diskinfo, self.errors))
+        self.assertEqual(self.inventory.get_state()[0], 1)
+
+        #Published versions are copies.
+        self.diskinfo["/dev/sda"]["Capacity"] = "100GB"
+        self.assertEqual(self.inventory.get_state()[1]["/dev/sda"]["Capacity"], "200GB")
+
+        self.assertTrue(self.inventory.publish(self.diskinfo, self.errors))
+        self.assertEqual(self.inventory.get_state()[0], 2)
+
+    def test_publish_3(self):
+        """Test #3: Test that only the entries that changed are copied, and the rest are shared with the last version"""
+        old = self.inventory.get_state()[1]
+
+        self.diskinfo["/dev/sda1"]["Capacity"] = "21GB"
+        self.diskinfo["/dev/sdb"] = copy.deepcopy(self.diskinfo["/dev/sda"])
+        self.assertTrue(self.inventory.publish(self.diskinfo, self.errors))
+
+        new = self.inventory.get_state()[1]
+
+        self.assertEqual(new, self.diskinfo)
+        self.assertIsNot(new, old)
+        self.assertIs(new["/dev/sda"], old["/dev/sda"])
+        self.assertIsNot(new["/dev/sda1"], self.diskinfo["/dev/sda1"])
+        self.assertIsNot(new["/dev/sdb"], self.diskinfo["/dev/sdb"])
+
+        #The old version isn't changed.
+        self.assertNotEqual(old["/dev/sda1"]["Capacity"], "21GB")
+
+    def test_publish_2(self):
+        """Test #2: Test that changes older than the history are forgotten, and clients asking for them get everything"""
+        inventory = daemon.Inventory(history=2)
+
+        for capacity in ("1GB", "2GB", "3GB", "4GB"):
+            self.diskinfo["/dev/sda1"]["Capacity"] = capacity
+            inventory.publish(self.diskinfo, self.errors)
+
+            #Remove a device, so there's something to forget.
+            self.diskinfo.pop("/dev/sda2", None)
+
+        self.assertEqual(inventory.oldest, 2)
+        self.assertEqual(inventory.changed, {"/dev/sda1": 4})
+
+        response = inventory.handle_request({"Request": "changes", "Since": 2})
+        self.assertFalse(response["Full"])
+        self.assertEqual(list(response["Changed"]), ["/dev/sda1"])
+
+        response = inventory.handle_request({"Request": "changes", "Since": 1})
+        self.assertTrue(response["Full"])
+        self.assertEqual(response["Changed"], self.diskinfo)
+
+    def test_handle_request_1(self):
+        """Test #1: Test that snapshot, device, and fields requests are answered"""
+        self.assertEqual(self.inventory.handle_request({"Request": "snapshot"}),
+                         {"Generation": 1, "DiskInfo": self.diskinfo, "Errors": []})
+
+        self.assertEqual(self.inventory.handle_request({"Request": "device",
+                                                        "Name": "/dev/sda1"}),
+                         {"Generation": 1, "Device": self.diskinfo["/dev/sda1"]})
+
+        response = self.inventory.handle_request({"Request": "fields", "Fields": ["Capacity"],
+                                                  "Devices": ["/dev/sda", "/dev/nope"]})
+
+        self.assertEqual(response, {"Generation": 1, "DiskInfo": {"/dev/sda": {"Capacity": "200GB"}}})
+
+    def test_handle_request_2(self):
+        """Test #2: Test that changes since a generation are answered"""
+        del self.diskinfo["/dev/sda2"]
+        self.diskinfo["/dev/sda1"]["Capacity"] = "21GB"
+        self.inventory.publish(self.diskinfo, self.errors)
+
+        response = self.inventory.handle_request({"Request": "changes", "Since": 1})
+
+        self.assertEqual(response["Generation"], 2)
+        self.assertFalse(response["Full"])
+        self.assertEqual(response["Changed"], {"/dev/sda1": self.diskinfo["/dev/sda1"]})
+        self.assertEqual(response["Removed"], ["/dev/sda2"])
+
+        response = self.inventory.handle_request({"Request": "changes", "Since": 2})
+        self.assertEqual((response["Changed"], response["Removed"]), ({}, []))
+
+        #A generation from before the daemon restarted.
+        response = self.inventory.handle_request({"Request": "changes", "Since": 5})
+        self.assertTrue(response["Full"])
+        self.assertEqual(response["Changed"], self.diskinfo)
+
+    def test_handle_request_3(self):
+        """Test #3: Test that bad requests get errors"""
+        for request in ([], {"Request": "nope"}, {"Request": "device", "Name": "/dev/nope"},
+                        {"Request": "device", "Name": ["/dev/sda"]},
+                        {"Request": "device", "Name": {"/dev/sda": 1}},
+                        {"Request": "fields", "Fields": "Capacity"},
+                        {"Request": "fields", "Fields": [["Capacity"]]},
+                        {"Request": "fields", "Fields": ["Capacity"], "Devices": [{}]},
+                        {"Request": "changes", "Since": "1"}):
+
+            self.assertIn("Error", self.inventory.handle_request(request))
+
+    def test_server_1(self):
+        """Test #1: Test that clients can query the server over its socket"""
+        server = daemon.Server(self.socket_path, scanner=self.fake_scan)
+        server.rescan()
+
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+
+        try:
+            with daemon.Client(socket_path=self.socket_path) as client:
+                self.assertEqual(client.snapshot(), self.diskinfo)
+                self.assertEqual(client.device("/dev/sda"), self.diskinfo["/dev/sda"])
+                self.assertEqual(client.fields(["Type"], devices=["/dev/sda"]),
+                                 {"/dev/sda": {"Type": "Device"}})
+
+                self.assertRaises(ValueError, client.device, "/dev/nope")
+                self.assertRaises(ValueError, client.device, ["/dev/sda"])
+
+                #The connection can still be used after an error.
+                self.assertEqual(client.changes(0)["Generation"], 1)
+
+                #Requests that fail unexpectedly are still answered.
+                server.inventory.handle_request = None
+                self.assertRaises(ValueError, client.device, "/dev/sda")
+
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_server_2(self):
+        """Test #2: Test that a stale socket is replaced, but a live one isn't"""
+        server = daemon.Server(self.socket_path, scanner=self.fake_scan)
+
+        try:
+            self.assertRaises(OSError, daemon.Server, self.socket_path, scanner=self.fake_scan)
+
+        finally:
+            server.socket.close()
+
+        #The socket file is still there, but nothing is listening.
+        server = daemon.Server(self.socket_path, scanner=self.fake_scan)
+        server.server_close()
+
+    def test_server_3(self):
+        """Test #3: Test that only the socket's owner and group can use it"""
+        server = daemon.Server(self.socket_path, scanner=self.fake_scan, group=os.getgid())
+
+        try:
+            socket_stat = os.stat(self.socket_path)
+
+            self.assertEqual(socket_stat.st_mode & 0o777, 0o660)
+            self.assertEqual(socket_stat.st_gid, os.getgid())
+
+        finally:
+            server.server_close()
+
+        self.assertRaises(LookupError, daemon.Server, self.socket_path, scanner=self.fake_scan,
+                          group="nosuchgroup-getdevinfo")
+
+        self.assertFalse(os.path.exists(self.socket_path))
+
+class TestProjection(unittest.TestCase):
+    def setUp(self):
+        self.diskinfo = data.return_fake_disk_info_linux()
+
+    def tearDown(self):
+        del self.diskinfo
+
+    def test_normalise_1(self):
+        """Test #1: Test that the structural fields are always included, and unknown fields are rejected"""
+        self.assertIsNone(projection.normalise(None))
+        self.assertEqual(projection.normalise("UUID"),
+                         projection.STRUCTURAL_FIELDS | {"UUID"})
+
+        self.assertRaises(ValueError, projection.normalise, ["UUID", "Colour"])
+
+    def test_wants_1(self):
+        """Test #1: Test that wants() is True if any of the fields were asked for"""
+        fields = projection.normalise(["UUID"])
+
+        self.assertTrue(projection.wants(None, "BootRecord"))
+        self.assertTrue(projection.wants(fields, "ID", "UUID"))
+        self.assertFalse(projection.wants(fields, "BootRecord", "BootRecordStrings"))
+
+    def test_project_1(self):
+        """Test #1: Test that only the fields asked for are kept"""
+        fields = projection.normalise(["Capacity"])
+        copy = projection.project_copy(self.diskinfo, fields)
+
+        #The original isn't changed by project_copy().
+        self.assertEqual(self.diskinfo, data.return_fake_disk_info_linux())
+
+        projection.project(self.diskinfo, fields)
+        self.assertEqual(copy, self.diskinfo)
+
+        for info in self.diskinfo.values():
+            self.assertEqual(set(info), projection.STRUCTURAL_FIELDS | {"Capacity"})
+
+    def test_project_2(self):
+        """Test #2: Test that changing a copy of every field doesn't change the original"""
+        copy = projection.project_copy(self.diskinfo, None)
+        self.assertEqual(copy, self.diskinfo)
+
+        copy["/dev/sda"]["Capacity"] = "1 B"
+        copy["/dev/sda"]["Partitions"].append("/dev/sda99")
+        del copy["/dev/sda1"]
+
+        self.assertEqual(self.diskinfo, data.return_fake_disk_info_linux())
+
+    def test_get_info_1(self):
+        """Test #1: Test that callers can change what get_info() returns without changing the cache"""
+        getdevinfo.CACHE.store((self.diskinfo, []))
+
+        try:
+            first, errors_list = getdevinfo.get_info(name_main=True)
+            first["/dev/sda"]["Partitions"].clear()
+            errors_list.append("an error\n")
+            first.clear()
+
+            self.assertEqual(getdevinfo.get_info(name_main=True),
+                             (data.return_fake_disk_info_linux(), []))
+
+        finally:
+            getdevinfo.CACHE.invalidate()
+
+    def test_costs_1(self):
+        """Test #1: Test that every field has a known cost class"""
+        for cost in projection.COSTS.values():
+            self.assertIn(cost, (projection.COST_FREE, projection.COST_LOOKUP,
+                                 projection.COST_READ, projection.COST_COMMAND))
+
+        for field in partitiontable.GEOMETRY_FIELDS:
+            self.assertIn(field, projection.COSTS)
+
+class TestErrors(unittest.TestCase):
+    def test_error_store_1(self):
+        """Test #1: Test that only the most recent errors are kept, and strings become records"""
+        store = errors.ErrorStore(limit=3)
+
+        for number in range(5):
+            store.append("linux.get_info(): Error "+str(number)+"\n")
+
+        self.assertEqual(store, ["linux.get_info(): Error 2\n", "linux.get_info(): Error 3\n",
+                                 "linux.get_info(): Error 4\n"])
+
+        self.assertEqual(store.dropped, 2)
+        self.assertEqual(store[-1].function, "linux.get_info")
+        self.assertEqual(store[-1].message, "Error 4")
+        self.assertEqual("".join(store[:1]), "linux.get_info(): Error 2\n")
+
+        #Errors can still be saved as JSON, and pickled.
+        self.assertEqual(json.loads(json.dumps(list(store))), store)
+        self.assertEqual(pickle.loads(pickle.dumps(store[0])).function, "linux.get_info")
+
+    def test_error_record_1(self):
+        """Test #1: Test that records say which stage they came from, and keep their details"""
+        with errors.in_stage("lshw"):
+            record = errors.ErrorRecord("linux.get_info(): Exception: failed while running lshw\n",
+                                        command=["lshw", "-xml"], exit_code=1)
+
+        self.assertEqual(record.stage, "lshw")
+        self.assertIsNone(errors.ErrorRecord("No function\n").stage)
+        self.assertIsNone(errors.ErrorRecord("No function\n").function)
+
+        self.assertEqual(record.as_dict()["Command"], ["lshw", "-xml"])
+        self.assertEqual(record.as_dict()["ExitCode"], 1)
+        self.assertIsNone(record.device)
+
+class TestLazy(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+    def tearDown(self):
+        del self.calls
+
+    def read(self, disk):
+        self.calls.append(disk)
+        return ("record of "+disk, ["strings of "+disk])
+
+    def test_lazy_dict_1(self):
+        """Test #1: Test that deferred values are only worked out when read, and only once"""
+        info = lazy.LazyDict()
+        info["Name"] = "/dev/sda"
+        info["BootRecord"], info["BootRecordStrings"] = lazy.split(lazy.Deferred(self.read, "/dev/sda"), 2)
+
+        self.assertEqual(self.calls, [])
+        self.assertEqual(len(info), 3)
+        self.assertIn("BootRecord", info)
+        self.assertTrue(info.is_deferred("BootRecord"))
+
+        self.assertEqual(info["BootRecordStrings"], ["strings of /dev/sda"])
+        self.assertEqual(info.get("BootRecord"), "record of /dev/sda")
+        self.assertFalse(info.is_deferred("BootRecord"))
+        self.assertEqual(self.calls, ["/dev/sda"])
+
+    def test_lazy_dict_2(self):
+        """Test #2: Test that a LazyDict compares, copies, and serialises like a normal dictionary"""
+        info = lazy.LazyDict()
+        info["Name"] = "/dev/sda"
+        info["BootRecord"], info["BootRecordStrings"] = lazy.split(lazy.Deferred(self.read, "/dev/sda"), 2)
+
+        expected = {"Name": "/dev/sda", "BootRecord": "record of /dev/sda",
+                    "BootRecordStrings": ["strings of /dev/sda"]}
+
+        #Subsets share deferred values with the original.
+        subset = info.subset(["Name", "BootRecord", "Colour"])
+        self.assertEqual(sorted(subset), ["BootRecord", "Name"])
+        self.assertEqual(self.calls, [])
+
+        self.assertEqual({"/dev/sda": info}, {"/dev/sda": expected})
+        self.assertEqual(dict(info), expected)
+        self.assertEqual(json.loads(json.dumps(info)), expected)
+        self.assertIs(type(copy.deepcopy(info)), dict)
+        self.assertEqual(subset["BootRecord"], "record of /dev/sda")
+        self.assertEqual(self.calls, ["/dev/sda"])
+
+class TestRecords(unittest.TestCase):
+    def setUp(self):
+        self.diskinfo = data.return_fake_disk_info_linux()
+        self.maxDiff = None
+
+    def tearDown(self):
+        del self.diskinfo
+
+    def test_from_diskinfo_1(self):
+        """Test #1: Test that records give back the same disk info dictionary"""
+        device_records = records.from_diskinfo(self.diskinfo)
+
+        self.assertEqual(records.to_diskinfo(device_records), self.diskinfo)
+        self.assertEqual(records.InventoryView(device_records), self.diskinfo)
+
+        #Records survive being pickled.
+        self.assertEqual(pickle.loads(pickle.dumps(device_records)), device_records)
+
+    def test_from_diskinfo_2(self):
+        """Test #2: Test that capacities are numbers, and strings are shared between records"""
+        self.diskinfo["/dev/sda"]["Product"] = "Fake Disk"
+        self.diskinfo["/dev/sda"]["Colour"] = "Blue"
+
+        first = records.DeviceRecord.from_info(self.diskinfo["/dev/sda"])
+        second = records.DeviceRecord.from_info({"Product": "".join(["Fake ", "Disk"])})
+
+        self.assertIs(first.Product, second.Product)
+        self.assertEqual(first.RawCapacity, int(self.diskinfo["/dev/sda"]["RawCapacity"]))
+        self.assertEqual(first.Flags, ("removable", "gpt"))
+        self.assertRaises(AttributeError, getattr, first, "UUID")
+
+        view = first.as_dict()
+
+        self.assertEqual(dict(view), self.diskinfo["/dev/sda"])
+        self.assertNotIn("UUID", view)
+        self.assertRaises(KeyError, view.__getitem__, "UUID")
+
+class TestReport(unittest.TestCase):
+    def setUp(self):
+        self.scan_report = report.ScanReport()
+
+    def tearDown(self):
+        del self.scan_report
+
+    def test_run_1(self):
+        """Test #1: Test that commands are recorded with their exit codes, even if they fail"""
+        self.assertEqual(report.run(self.scan_report, ["echo", "test"], stdout=subprocess.PIPE).stdout,
+                         b"test\n")
+        self.assertRaises(subprocess.CalledProcessError, report.run, self.scan_report, ["false"],
+                          check=True)
+        self.assertRaises(OSError, report.run, self.scan_report, ["thiscommanddoesnotexist-getdevinfo"])
+
+        #Commands run without a report aren't recorded anywhere.
+        report.run(None, ["true"])
+
+        self.assertEqual(self.scan_report.forks, 3)
+        self.assertEqual([(command.argv, command.returncode) for command in self.scan_report.commands],
+                         [(["echo", "test"], 0), (["false"], 1),
+                          (["thiscommanddoesnotexist-getdevinfo"], None)])
+
+    def test_scan_report_1(self):
+        """Test #1: Test that stage and device times add up, and nothing is recorded once the report is finished"""
+        for _count in range(2):
+            with report.stage(self.scan_report, "first"):
+                with report.device(self.scan_report, "/dev/sda"):
+                    time.sleep(0.01)
+
+        self.assertIs(self.scan_report.finish(), self.scan_report)
+
+        with report.stage(self.scan_report, "second"):
+            report.run(self.scan_report, ["true"])
+
+        self.assertEqual(set(self.scan_report.stages), {"first"})
+        self.assertGreaterEqual(self.scan_report.stages["first"], 0.02)
+        self.assertGreaterEqual(self.scan_report.devices["/dev/sda"], 0.02)
+        self.assertEqual(self.scan_report.forks, 0)
+        self.assertGreaterEqual(self.scan_report.duration, 0.02)
+
+        #The report can be saved as JSON, and printed.
+        self.assertEqual(json.loads(json.dumps(self.scan_report.as_dict()))["Stages"],
+                         self.scan_report.stages)
+
+        self.assertIn("/dev/sda", self.scan_report.format())
+
+    def test_scan_report_2(self):
+        """Test #2: Test that scans running at the same time each record in their own report"""
+        other_report = report.ScanReport()
+        barrier = threading.Barrier(2)
+
+        def scan(scan_report, name):
+            with report.stage(scan_report, name):
+                barrier.wait()
+                report.run(scan_report, [name])
+
+        threads = [threading.Thread(target=scan, args=(self.scan_report, "true")),
+                   threading.Thread(target=scan, args=(other_report, "false"))]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(set(self.scan_report.stages), {"true"})
+        self.assertEqual(set(other_report.stages), {"false"})
+        self.assertEqual([command.argv for command in self.scan_report.commands], [["true"]])
+        self.assertEqual([command.argv for command in other_report.commands], [["false"]])
+
+class TestCommandLine(unittest.TestCase):
+    def setUp(self):
+        self.diskinfo = {"/dev/sda": {"Name": "/dev/sda", "Capacity": "500 GB", "BootRecord": b"\x00"},
+                         "/dev/sda1": {"Name": "/dev/sda1", "Capacity": "1 GB"}}
+
+        self.errors = errors.ErrorStore()
+        self.errors.append("linux.get_info(): No disks found!\n")
+
+        self.events = [getdevinfo.DeviceEvent(name, info) for name, info in self.diskinfo.items()]
+        self.events.append(getdevinfo.Summary(self.diskinfo, self.errors,
+                                              report.ScanReport().finish()))
+
+    def tearDown(self):
+        del self.diskinfo
+        del self.errors
+        del self.events
+
+    def test_print_json_1(self):
+        """Test #1: Test that ndjson has one object per device, and errors go to stderr"""
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            with self.assertRaises(SystemExit):
+                getdevinfo.print_json(iter(self.events), "ndjson", timings=False)
+
+        lines = stdout.getvalue().splitlines()
+
+        self.assertEqual([json.loads(line, object_hook=snapshot.decode_bytes) for line in lines],
+                         list(self.diskinfo.values()))
+
+        self.assertEqual(json.loads(stderr.getvalue())["Message"], "No disks found!")
+
+    def test_print_json_2(self):
+        """Test #2: Test that json is one object, keyed by device name, and the timings can go to stderr"""
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        self.errors.clear()
+
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            getdevinfo.print_json(iter(self.events), "json", timings=True)
+
+        self.assertEqual(json.loads(stdout.getvalue(), object_hook=snapshot.decode_bytes),
+                         self.diskinfo)
+
+        self.assertIn("Stages", json.loads(stderr.getvalue()))
@@ -32,6 +32,7 @@ from . import getdevinfo_test_functions as functions
 sys.path.insert(0, os.path.abspath('../'))
 sys.path.insert(0, os.path.abspath('../..'))
 
+import getdevinfo.collector as collector
 import getdevinfo.cygwin as cygwin
 
 class TestMain(unittest.TestCase):
@@ -185,9 +186,11 @@ class TestMain(unittest.TestCase):
 
 class TestComputeBlockSize(unittest.TestCase):
     def setUp(self):
+        self.collector = collector.Collector(cygwin)
         self.correct_results = [None, "512", "1024", "2048", "4096"]
 
     def tearDown(self):
+        del self.collector
         del self.correct_results
 
     def test_compute_block_size(self):
@@ -207,7 +210,7 @@ class TestComputeBlockSize(unittest.TestCase):
                          data.return_good_smartctl_output_2(), data.return_good_smartctl_output_3(),
                          data.return_good_smartctl_output_4()):
 
-            self.assertEqual(cygwin.compute_block_size(testdata),
+            self.assertEqual(cygwin.compute_block_size(self.collector, testdata),
                              self.correct_results[count])
 
             count += 1
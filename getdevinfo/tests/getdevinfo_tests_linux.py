@@ -23,6 +23,11 @@ import unittest
 import os
 import sys
 import plistlib
+import tempfile
+import socket
+import asyncio
+import time
+import threading
 
 #import test data and functions.
 from . import getdevinfo_test_data as data
@@ -31,18 +36,24 @@ from . import getdevinfo_test_functions as functions
 sys.path.insert(0, os.path.abspath('../'))
 sys.path.insert(0, os.path.abspath('../..'))
 
+import getdevinfo.aio as aio
+import getdevinfo.collector as collector
+import getdevinfo.getdevinfo as getdevinfo
 import getdevinfo.linux as linux
+import getdevinfo.monitor as monitor
+import getdevinfo.projection as projection
+import getdevinfo.report as report
 
 class TestMain(unittest.TestCase):
     def setUp(self):
         #Disk info.
-        linux.DISKINFO = data.return_fake_disk_info_linux()
+        self.collector = collector.Collector(linux)
+        self.collector.diskinfo = data.return_fake_disk_info_linux()
 
-        #Ls ID output.
-        linux.LSIDOUTPUT = data.return_fake_lsid_output()
-
-        #Ls UUID output.
-        linux.LSUUIDOUTPUT = data.return_fake_lsuuid_output()
+        #Links in /dev/disk/by-id and /dev/disk/by-uuid.
+        self.tempdir = tempfile.TemporaryDirectory()
+        data.create_fake_disk_links(self.tempdir.name)
+        self.collector.disklinks = linux.get_disk_links(self.tempdir.name)
 
         #Good nodes, unicode strings.
         self.node1 = data.Node1().get_copy()
@@ -66,9 +77,9 @@ class TestMain(unittest.TestCase):
         self.badnode3 = data.BadNode3().get_copy()
 
     def tearDown(self):
-        del linux.DISKINFO
-        del linux.LSIDOUTPUT
-        del linux.LSUUIDOUTPUT
+        del self.collector
+        self.tempdir.cleanup()
+        del self.tempdir
 
         del self.node1
         del self.node2
@@ -215,175 +226,841 @@ class TestMain(unittest.TestCase):
     #------------------------------------ Tests for get_partitioning ------------------------------------
     def test_get_partitioning_1(self):
         """Test #1: Test that GPT is detected correctly"""
-        self.assertEqual(linux.get_partitioning("/dev/sda"), "gpt")
+        self.assertEqual(linux.get_partitioning(self.collector, "/dev/sda"), "gpt")
 
     def test_get_partitioning_2(self):
         """Test #2: Test that MBR is detected correctly"""
-        self.assertEqual(linux.get_partitioning("/dev/sda1"), "mbr")
+        self.assertEqual(linux.get_partitioning(self.collector, "/dev/sda1"), "mbr")
 
     def test_get_partitioning_3(self):
         """Test #3: Test that APM is not detected -- outside scope"""
-        self.assertEqual(linux.get_partitioning("/dev/sda2"), "Unknown")
+        self.assertEqual(linux.get_partitioning(self.collector, "/dev/sda2"), "Unknown")
 
     def test_get_partitioning_4(self):
         """Test #4: Test that Unknown is returned when no partition scheme is present"""
-        self.assertEqual(linux.get_partitioning("/dev/sda3"), "Unknown")
+        self.assertEqual(linux.get_partitioning(self.collector, "/dev/sda3"), "Unknown")
 
     def test_get_partitioning_5(self):
         """Test #5: Test that Unknown is returned when the disk is not in the dictionary"""
-        self.assertEqual(linux.get_partitioning("thisisnotadisk1"), "Unknown")
+        self.assertEqual(linux.get_partitioning(self.collector, "thisisnotadisk1"), "Unknown")
 
     #------------------------------------ Tests for get_file_system ------------------------------------
     def test_get_file_system_1(self):
         """Test #1: Test that fat is detected correctly as 'vfat' (unicode strings)"""
-        self.assertEqual(linux.get_file_system(self.node1), "vfat")
+        self.assertEqual(linux.get_file_system(self.collector, self.node1), "vfat")
 
     def test_get_file_system_2(self):
         """Test #2: Test that ext4 is detected correctly (unicode strings)"""
-        self.assertEqual(linux.get_file_system(self.node2), "ext4")
+        self.assertEqual(linux.get_file_system(self.collector, self.node2), "ext4")
 
     def test_get_file_system_3(self):
         """Test #3: Test that non-roman characters are handled correctly (unicode strings)"""
-        self.assertEqual(linux.get_file_system(self.node3), "ΉΜήυΟομἝἲϾᾍᾈᾁὮᾌ")
+        self.assertEqual(linux.get_file_system(self.collector, self.node3), "ΉΜήυΟομἝἲϾᾍᾈᾁὮᾌ")
 
     def test_get_file_system_4(self):
         """Test #4: Test that mixed characters are handled correctly (unicode strings)"""
-        self.assertEqual(linux.get_file_system(self.node4), "ꀒꀲꀯꀭꁎꀦꀄewrhtyjthgrfeꀴꀿꀬꀝꅮꅧꅌ")
+        self.assertEqual(linux.get_file_system(self.collector, self.node4), "ꀒꀲꀯꀭꁎꀦꀄewrhtyjthgrfeꀴꀿꀬꀝꅮꅧꅌ")
 
     def test_get_file_system_5(self):
         """Test #1: Test that fat is detected correctly as 'vfat' (byte strings)"""
-        self.assertEqual(linux.get_file_system(self.bytenode1), "vfat")
+        self.assertEqual(linux.get_file_system(self.collector, self.bytenode1), "vfat")
 
     def test_get_file_system_6(self):
         """Test #6: Test that ext4 is detected correctly (byte strings)"""
-        self.assertEqual(linux.get_file_system(self.bytenode2), "ext4")
+        self.assertEqual(linux.get_file_system(self.collector, self.bytenode2), "ext4")
 
     def test_get_file_system_7(self):
         """Test #7: Test that non-roman characters are handled correctly (byte strings)"""
-        self.assertEqual(linux.get_file_system(self.bytenode3), "ΉΜήυΟομἝἲϾᾍᾈᾁὮᾌ")
+        self.assertEqual(linux.get_file_system(self.collector, self.bytenode3), "ΉΜήυΟομἝἲϾᾍᾈᾁὮᾌ")
 
     def test_get_file_system_8(self):
         """Test #8: Test that mixed characters are handled correctly (byte strings)"""
-        self.assertEqual(linux.get_file_system(self.bytenode4), "ꀒꀲꀯꀭꁎꀦꀄewrhtyjthgrfeꀴꀿꀬꀝꅮꅧꅌ")
+        self.assertEqual(linux.get_file_system(self.collector, self.bytenode4), "ꀒꀲꀯꀭꁎꀦꀄewrhtyjthgrfeꀴꀿꀬꀝꅮꅧꅌ")
 
     #------------------------------------ Tests for get_uuid ------------------------------------
     def test_get_uuid_1(self):
         """Test #1: Test that the UUID is returned correctly when present"""
-        self.assertEqual(linux.get_uuid("/dev/sda1"), "8243-0631")
+        self.assertEqual(linux.get_uuid(self.collector, "/dev/sda1"), "8243-0631")
 
     def test_get_uuid_2(self):
         """Test #2: Test that Unknown is returned when the UUID is not present"""
-        self.assertEqual(linux.get_uuid("/dev/sda3"), "Unknown")
+        self.assertEqual(linux.get_uuid(self.collector, "/dev/sda3"), "Unknown")
 
     def test_get_uuid_3(self):
         """Test #3: Test that Unknown is returned when we ask for the UUID of a disk that is not present"""
-        self.assertEqual(linux.get_uuid("/dev/sda34"), "Unknown")
+        self.assertEqual(linux.get_uuid(self.collector, "/dev/sda34"), "Unknown")
 
     #------------------------------------ Tests for get_id ------------------------------------
     def test_get_id_1(self):
         """Test #1: Test that the ID is returned correctly for a partition when present"""
-        self.assertEqual(linux.get_id("/dev/sda1"), "ata-Samsung_SSD_850_EVO_500GB_S21JNXAGC48182L-part1")
+        self.assertEqual(linux.get_id(self.collector, "/dev/sda1"), "ata-Samsung_SSD_850_EVO_500GB_S21JNXAGC48182L-part1")
 
     def test_get_id_2(self):
         """Test #2: Test that the ID is returned correctly for a device when present"""
-        self.assertEqual(linux.get_id("/dev/sdb"), "ata-ST1000DM003-1CH162_W1D2BRDP")
+        self.assertEqual(linux.get_id(self.collector, "/dev/sdb"), "ata-ST1000DM003-1CH162_W1D2BRDP")
 
     def test_get_id_3(self):
         """Test #3: Test that Unknown is returned for a device/partition that is not present"""
-        self.assertEqual(linux.get_id("/dev/sdf"), "Unknown")
+        self.assertEqual(linux.get_id(self.collector, "/dev/sdf"), "Unknown")
+
+    def test_get_id_4(self):
+        """Test #4: Test that the ID is found when asking for a device through a link to it"""
+        os.symlink("sdb", self.tempdir.name+"/sdb-link")
+        self.assertEqual(linux.get_id(self.collector, self.tempdir.name+"/sdb-link"), "ata-ST1000DM003-1CH162_W1D2BRDP")
+
+    #------------------------------------ Tests for get_disk_links ------------------------------------
+    def test_get_disk_links_1(self):
+        """Test #1: Test that links are indexed by kernel name, sorted, and missing folders are empty"""
+        self.assertEqual(self.collector.disklinks["by-id"]["sdb"], ["ata-ST1000DM003-1CH162_W1D2BRDP",
+                                                          "wwn-0x5000c5006e19c6f2"])
+
+        self.assertEqual(self.collector.disklinks["by-uuid"]["sda10"], ["fcacb083-163d-4d0a-94a1-22536f5bba9b"])
+        self.assertEqual(self.collector.disklinks["by-label"], {})
 
     #------------------------------------ Tests for get_boot_record ------------------------------------
+    def test_get_boot_record_1(self):
+        """Test #1: Test that the boot record and its strings are returned correctly"""
+        with tempfile.TemporaryDirectory() as tempdir:
+            image = os.path.join(tempdir, "disk.img")
+
+            with open(image, "wb") as image_file:
+                image_file.write(data.return_fake_boot_record())
+
+            boot_record, boot_record_strings = linux.get_boot_record(self.collector, image)
+
+        self.assertEqual(boot_record, data.return_fake_boot_record()[:512].decode("utf-8", errors="replace"))
+        self.assertEqual(boot_record_strings, data.return_fake_boot_record_strings())
+
+    def test_get_boot_record_2(self):
+        """Test #2: Test that ("Unknown", ["Unknown"]) is returned when the disk can't be read"""
+        self.assertEqual(linux.get_boot_record(self.collector, "/dev/thisisnotadisk"), ("Unknown", ["Unknown"]))
 
 class TestParseLSBLKOutput(unittest.TestCase):
     def setUp(self):
         self.proper_boot_record_function = linux.get_boot_record
         linux.get_boot_record = data.fake_get_boot_record
-        linux.DISKINFO = {}
+        self.collector = collector.Collector(linux)
+        self.collector.reset()
         self.maxDiff = None
 
     def tearDown(self):
         linux.get_boot_record = self.proper_boot_record_function
-        del linux.DISKINFO
+        del self.collector
 
     def test_parse_lsblk_output_1(self):
         """Test #1: Test that this returns expected results with good data in normal circumstances"""
-        linux.LSBLKOUTPUT = data.return_fake_lsblk_output_good_1()
-        linux.LSUUIDOUTPUT = ""
-        linux.LSIDOUTPUT = ""
+        self.collector.lsblk_output = data.return_fake_lsblk_output_good_1()
+        self.collector.disklinks = {}
 
         diskinfo = data.return_fake_lsblk_output_good_1_diskinfo()
 
-        linux.parse_lsblk_output()
+        linux.parse_lsblk_output(self.collector)
 
         #Remove any extra CD devices detected.
-        linux.DISKINFO.pop("/dev/sr0", None)
+        self.collector.diskinfo.pop("/dev/sr0", None)
 
-        self.assertEqual(linux.DISKINFO, diskinfo)
+        self.assertEqual(self.collector.diskinfo, diskinfo)
 
     def test_parse_lsblk_output_2(self):
         """Test #2: Test that this returns expected results with missing vendor, model and size elements for devices"""
-        linux.LSBLKOUTPUT = data.return_fake_lsblk_output_bad_1()
-        linux.LSUUIDOUTPUT = ""
-        linux.LSIDOUTPUT = ""
+        self.collector.lsblk_output = data.return_fake_lsblk_output_bad_1()
+        self.collector.disklinks = {}
 
         diskinfo = data.return_fake_lsblk_output_bad_1_diskinfo()
 
-        linux.parse_lsblk_output()
+        linux.parse_lsblk_output(self.collector)
 
         #Remove any extra CD devices detected.
-        linux.DISKINFO.pop("/dev/sr0", None)
+        self.collector.diskinfo.pop("/dev/sr0", None)
 
-        self.assertEqual(linux.DISKINFO, diskinfo)
+        self.assertEqual(self.collector.diskinfo, diskinfo)
 
     def test_parse_lsblk_output_3(self):
         """Test #3: Test that this returns expected results with missing uuid, fstype, and size elements for children"""
-        linux.LSBLKOUTPUT = data.return_fake_lsblk_output_bad_2()
-        linux.LSUUIDOUTPUT = ""
-        linux.LSIDOUTPUT = ""
+        self.collector.lsblk_output = data.return_fake_lsblk_output_bad_2()
+        self.collector.disklinks = {}
 
         diskinfo = data.return_fake_lsblk_output_bad_2_diskinfo()
 
-        linux.parse_lsblk_output()
+        linux.parse_lsblk_output(self.collector)
 
-        self.assertEqual(linux.DISKINFO, diskinfo)
+        self.assertEqual(self.collector.diskinfo, diskinfo)
 
     def test_parse_lsblk_output_4(self):
         """Test #4: Test that this returns nothing when lsblk returns invalid JSON"""
-        linux.LSBLKOUTPUT = data.return_fake_lsblk_output_bad_3()
-        linux.LSUUIDOUTPUT = ""
-        linux.LSIDOUTPUT = ""
+        self.collector.lsblk_output = data.return_fake_lsblk_output_bad_3()
+        self.collector.disklinks = {}
 
         diskinfo = {}
 
-        linux.parse_lsblk_output()
+        linux.parse_lsblk_output(self.collector)
 
-        self.assertEqual(linux.DISKINFO, diskinfo)
+        self.assertEqual(self.collector.diskinfo, diskinfo)
 
-class TestParseLVMOutput(unittest.TestCase):
+class TestParseSysfs(unittest.TestCase):
     def setUp(self):
-        linux.LVMOUTPUT = data.return_fake_lvm_output()
-        linux.DISKINFO = data.return_fake_disk_info_linux()
-        self.correct_disk_info = data.return_fake_lvm_disk_info()
-        linux.get_lv_aliases_test = functions.get_lv_aliases
+        self.proper_boot_record_function = linux.get_boot_record
+        self.proper_lv_file_system_function = linux.get_lv_file_system
+        self.proper_sysfs_block = linux.SYSFS_BLOCK
+
+        self.tempdir = tempfile.TemporaryDirectory()
+        data.create_fake_sysfs(self.tempdir.name)
+
+        linux.get_boot_record = data.fake_get_boot_record
+        linux.get_lv_file_system = data.fake_get_lv_file_system
+        linux.SYSFS_BLOCK = self.tempdir.name
+        self.collector = collector.Collector(linux)
+        self.collector.reset()
         self.maxDiff = None
 
     def tearDown(self):
-        del linux.LVMOUTPUT
-        del linux.DISKINFO
-        del self.correct_disk_info
+        linux.get_boot_record = self.proper_boot_record_function
+        linux.get_lv_file_system = self.proper_lv_file_system_function
+        linux.SYSFS_BLOCK = self.proper_sysfs_block
+        self.tempdir.cleanup()
+
+        del self.collector
+        del self.tempdir
 
-    def test_parse_and_assemble_lvm_output(self):
-        """Test #1: Test that we run without error and that the result is as expected."""
-        linux.parse_lvm_output(testing=True)
+    def test_parse_sysfs_1(self):
+        """Test #1: Test that devices and partitions are found, skipping loop and device mapper devices"""
+        linux.parse_sysfs(self.collector)
 
         try:
-            self.assertEqual(linux.DISKINFO, self.correct_disk_info)
+            self.assertEqual(self.collector.diskinfo, data.return_fake_sysfs_diskinfo())
 
         except AssertionError as e:
-            functions.print_dict_diffs(linux.DISKINFO, self.correct_disk_info)
+            functions.print_dict_diffs(self.collector.diskinfo, data.return_fake_sysfs_diskinfo())
 
             raise e
 
+    def test_parse_sysfs_2(self):
+        """Test #2: Test that nothing is found, without error, if /sys/block is missing"""
+        linux.SYSFS_BLOCK = self.tempdir.name+"/nothere"
+        linux.parse_sysfs(self.collector)
+
+        self.assertEqual(self.collector.diskinfo, {})
+
+    def test_parse_sysfs_3(self):
+        """Test #3: Test that boot records and file systems aren't read if they weren't asked for"""
+        linux.get_boot_record = self.proper_boot_record_function
+        linux.get_lv_file_system = self.proper_lv_file_system_function
+        self.collector.fields = projection.normalise({"Capacity"})
+
+        linux.parse_sysfs(self.collector)
+        projection.project(self.collector.diskinfo, self.collector.fields)
+
+        #The fake devices don't exist, so reading them would have failed.
+        self.assertEqual(self.collector.errors, [])
+
+        expected = data.return_fake_sysfs_diskinfo()
+        projection.project(expected, projection.normalise({"Capacity"}))
+
+        self.assertEqual(self.collector.diskinfo, expected)
+
+    def test_parse_sysfs_4(self):
+        """Test #4: Test that boot records and file systems are only read when lazy fields are read"""
+        proper_read_boot_record = linux.read_boot_record
+        proper_read_lv_file_system = linux.read_lv_file_system
+        calls = []
+
+        def fake_read_boot_record(each_collector, disk):
+            calls.append(disk)
+            return data.fake_get_boot_record(each_collector, disk)
+
+        def fake_read_lv_file_system(each_collector, disk):
+            calls.append(disk)
+            return data.fake_get_lv_file_system(each_collector, disk)
+
+        linux.get_boot_record = self.proper_boot_record_function
+        linux.get_lv_file_system = self.proper_lv_file_system_function
+        linux.read_boot_record = fake_read_boot_record
+        linux.read_lv_file_system = fake_read_lv_file_system
+        self.collector.lazy = True
+
+        try:
+            linux.parse_sysfs(self.collector)
+            self.assertEqual(calls, [])
+
+            #Reading one field only reads that one.
+            self.assertEqual(self.collector.diskinfo["/dev/sda1"]["FileSystem"], "Unknown")
+            self.assertEqual(calls, ["/dev/sda1"])
+
+            self.assertEqual(self.collector.diskinfo, data.return_fake_sysfs_diskinfo())
+
+        finally:
+            linux.read_boot_record = proper_read_boot_record
+            linux.read_lv_file_system = proper_read_lv_file_system
+
+        #Each boot record (with its strings) and file system is read once.
+        self.assertEqual(sorted(calls), sorted(list(self.collector.diskinfo)
+                                               + [disk for disk in self.collector.diskinfo
+                                                  if self.collector.diskinfo[disk]["Type"] == "Partition"]))
+
+    def test_get_devices_1(self):
+        """Test #1: Test that only the named devices, their partitions, and the LVs on them are found"""
+        #Leave out the fields that come from outside the fake sysfs.
+        fields = set(projection.COSTS).difference(("UUID", "ID", "Partitioning"),
+                                                   linux.partitiontable.GEOMETRY_FIELDS,
+                                                   projection.OPTIONAL_FIELDS)
+
+        expected = data.return_fake_sysfs_diskinfo()
+        expected.update(data.return_fake_dm_diskinfo())
+        expected = {disk: info for disk, info in expected.items() if disk.startswith("/dev/mapper")
+                    or disk.startswith("/dev/sda")}
+
+        projection.project(expected, projection.normalise(fields))
+
+        #Partitions and LVs find the device they're on.
+        for disks in (["/dev/sda"], ["/dev/sda1"], ["/dev/mapper/fakefedora-root", "/dev/sda"]):
+            with self.subTest(disks=disks):
+                self.assertEqual(linux.get_devices(disks, fields=fields), expected)
+
+    def test_get_devices_2(self):
+        """Test #2: Test that devices that don't exist are reported, and the others are still found"""
+        diskinfo = linux.get_devices(["/dev/nothere", "/dev/nvme0n1p10"], fields={"Capacity"})
+        errors = linux.ERRORS
+
+        self.assertEqual(sorted(diskinfo), ["/dev/nvme0n1", "/dev/nvme0n1p10", "/dev/nvme0n1p9"])
+        self.assertEqual(len(errors), 1)
+        self.assertIn("/dev/nothere", errors[0])
+
+    def test_get_devices_3(self):
+        """Test #3: Test that getdevinfo.get_devices() waits for a scan that is already running"""
+        started = threading.Event()
+        release = threading.Event()
+        results = []
+
+        def slow_scan():
+            started.set()
+            release.wait(10)
+
+        running = threading.Thread(target=getdevinfo.FLIGHTS.run, args=(object(), slow_scan))
+        running.start()
+        started.wait(10)
+
+        waiting = threading.Thread(target=lambda: results.append(getdevinfo.get_devices(
+            ["/dev/nvme0n1"], fields={"Capacity"})))
+
+        waiting.start()
+        waiting.join(0.1)
+
+        self.assertTrue(waiting.is_alive())
+        self.assertEqual(results, [])
+
+        release.set()
+        running.join()
+        waiting.join()
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(sorted(results[0]), ["/dev/nvme0n1", "/dev/nvme0n1p10", "/dev/nvme0n1p9"])
+
+    def test_collector_1(self):
+        """Test #1: Test that collectors can scan at the same time, without sharing any state"""
+        fields = {"Capacity", "VGName"}
+        expected = linux.get_devices(["/dev/sda"], fields=fields)
+        diskinfo = linux.DISKINFO
+
+        collectors = [collector.Collector(linux) for _count in range(4)]
+        results = [None] * len(collectors)
+
+        def scan(index):
+            results[index] = collectors[index].get_devices(["/dev/sda", "/dev/nothere"+str(index)],
+                                                           fields=fields)
+
+        for each_collector in collectors:
+            each_collector.module.get_boot_record = data.fake_get_boot_record
+            each_collector.module.get_lv_file_system = data.fake_get_lv_file_system
+            each_collector.module.SYSFS_BLOCK = self.tempdir.name
+
+        threads = [threading.Thread(target=scan, args=(index,)) for index in range(len(collectors))]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        for index, each_collector in enumerate(collectors):
+            self.assertEqual(results[index], expected)
+            self.assertIsNot(results[index], results[(index+1) % len(collectors)])
+            self.assertEqual(len(each_collector.errors), 1)
+            self.assertIn("/dev/nothere"+str(index), each_collector.errors[0])
+
+        #The module's own state isn't touched.
+        self.assertIs(linux.DISKINFO, diskinfo)
+        self.assertIs(linux.COLLECTOR.diskinfo, diskinfo)
+
+    def test_collector_2(self):
+        """Test #2: Test that two full scans can run in parallel threads without corrupting each other"""
+        #Leave out the fields that come from outside the fake sysfs.
+        fields = set(projection.COSTS).difference(("UUID", "ID", "Partitioning", "BootRecord",
+                                                   "BootRecordStrings"),
+                                                  linux.partitiontable.GEOMETRY_FIELDS,
+                                                  projection.OPTIONAL_FIELDS)
+
+        expected = data.return_fake_sysfs_diskinfo()
+        expected.update(data.return_fake_dm_diskinfo())
+        projection.project(expected, projection.normalise(fields))
+
+        collectors = [collector.Collector(linux) for _count in range(2)]
+        results = [None] * len(collectors)
+        seen = [[] for _count in collectors]
+
+        #Both scans wait for each other once they've found a device, so they overlap.
+        barrier = threading.Barrier(len(collectors))
+
+        def on_ready(index, name, _info):
+            if not seen[index]:
+                barrier.wait(timeout=10)
+
+            seen[index].append(name)
+
+        def scan(index):
+            collectors[index].listener = lambda name, info: on_ready(index, name, info)
+            results[index] = collectors[index].get_info(fields=fields, backend="sysfs")
+
+        threads = [threading.Thread(target=scan, args=(index,)) for index in range(len(collectors))]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertIsNot(results[0], results[1])
+        self.assertIsNot(collectors[0].report, collectors[1].report)
+
+        for index, each_collector in enumerate(collectors):
+            with self.subTest(index=index):
+                self.assertEqual(results[index], expected)
+                self.assertIs(each_collector.diskinfo, results[index])
+                self.assertEqual(each_collector.errors, [])
+                self.assertEqual(sorted(seen[index]), sorted(expected))
+                self.assertEqual(set(each_collector.report.stages), {"sysfs", "lvm"})
+
+    def test_iter_info_1(self):
+        """Test #1: Test that each device is yielded once it is finished, before the partitions on it, then a summary"""
+        proper_collect_info = linux.collect_info
+        proper_read_partition_table = linux.partitiontable.read_partition_table
+
+        #The partition tables and block sizes are read by the last stages.
+        fields = projection.normalise({"Capacity", "Product", "Partitioning", "PhysicalBlockSize"})
+        found = []
+
+        def fake_collect_info(scanner, fields=None, lazy=False):
+            proper_collect_info(scanner, backend="sysfs", fields=fields, lazy=lazy)
+            found.append(sorted(scanner.diskinfo))
+
+        expected = data.return_fake_sysfs_diskinfo()
+        expected.update(data.return_fake_dm_diskinfo())
+
+        linux.collect_info = fake_collect_info
+        linux.partitiontable.read_partition_table = data.fake_read_partition_table
+
+        try:
+            events = list(getdevinfo.iter_info(name_main=True, use_cache=False, fields=fields))
+
+        finally:
+            linux.collect_info = proper_collect_info
+            linux.partitiontable.read_partition_table = proper_read_partition_table
+
+        names = [event.name for event in events[:-1]]
+
+        self.assertTrue(all(isinstance(event, getdevinfo.DeviceEvent) for event in events[:-1]))
+        self.assertEqual(sorted(names), found[0])
+        self.assertEqual(sorted(names), sorted(expected))
+
+        #Each device is only yielded once, and is the same as in the summary.
+        self.assertEqual(len(names), len(set(names)))
+        self.assertEqual({event.name: event.info for event in events[:-1]}, events[-1].diskinfo)
+        self.assertEqual(events[-1].diskinfo["/dev/sda"]["Partitioning"], "gpt")
+        self.assertEqual(events[-1].diskinfo["/dev/sda"]["PhysicalBlockSize"], 4096)
+
+        for name in names:
+            if expected[name]["Type"] == "Partition" and expected[name]["HostDevice"] in expected:
+                self.assertLess(names.index(expected[name]["HostDevice"]), names.index(name))
+
+        self.assertIsInstance(events[-1], getdevinfo.Summary)
+        self.assertEqual(set(events[-1].report.stages), {"sysfs", "lvm", "blocksizes",
+                                                        "partitiontables"})
+        self.assertIsNotNone(events[-1].report.duration)
+        self.assertIsNone(linux.COLLECTOR.listener)
+
+    def test_iter_info_2(self):
+        """Test #2: Test that devices are yielded before the last stage finishes if nothing later changes them"""
+        proper_collect_info = linux.collect_info
+        proper_lvm_stage = linux.lvm_stage
+
+        fields = projection.normalise({"Name", "Capacity", "UUID"})
+        first_yielded = threading.Event()
+        overlapped = []
+
+        def fake_collect_info(scanner, fields=None, lazy=False):
+            proper_collect_info(scanner, backend="sysfs", fields=fields, lazy=lazy)
+
+        def fake_lvm_stage(scanner, outputs):
+            #The last stage doesn't finish until a device has been yielded.
+            overlapped.append(first_yielded.wait(timeout=10))
+            proper_lvm_stage(scanner, outputs)
+
+        expected = data.return_fake_sysfs_diskinfo()
+        expected.update(data.return_fake_dm_diskinfo())
+        projection.project(expected, fields)
+
+        linux.collect_info = fake_collect_info
+        linux.lvm_stage = fake_lvm_stage
+        events = []
+
+        try:
+            for event in getdevinfo.iter_info(name_main=True, use_cache=False, fields=fields):
+                first_yielded.set()
+                events.append(event)
+
+        finally:
+            linux.collect_info = proper_collect_info
+            linux.lvm_stage = proper_lvm_stage
+
+        self.assertEqual(overlapped, [True])
+        self.assertEqual(events[0].name, "/dev/nvme0n1")
+        self.assertEqual({event.name: event.info for event in events[:-1]}, expected)
+        self.assertEqual(events[-1].diskinfo, expected)
+        self.assertEqual(set(events[-1].report.stages), {"links", "sysfs", "lvm"})
+
+    def test_get_block_sizes_1(self):
+        """Test #1: Test that block sizes are read from sysfs, using the device's for partitions"""
+        sda = {"LogicalBlockSize": 512, "PhysicalBlockSize": 4096, "MinimumIOSize": 4096,
+               "OptimalIOSize": 0}
+
+        volume = {"LogicalBlockSize": 512, "PhysicalBlockSize": 512, "MinimumIOSize": 512,
+                  "OptimalIOSize": 1048576}
+
+        self.assertEqual(linux.get_block_sizes(["/dev/sda", "/dev/sda2", "/dev/mapper/fakefedora-root"]),
+                         {"/dev/sda": sda, "/dev/sda2": sda, "/dev/mapper/fakefedora-root": volume})
+
+        #They're read again each time, eg in case the device has been replaced.
+        with open(os.path.join(self.tempdir.name, "sda", "queue", "physical_block_size"), "w",
+                  encoding="utf-8") as attribute:
+            attribute.write("512\n")
+
+        self.assertEqual(linux.get_block_size("/dev/sda"), "512")
+        self.assertEqual(linux.get_block_sizes(["/dev/sda"])["/dev/sda"]["PhysicalBlockSize"], 512)
+
+        #But during a scan, ones that have already been read are reused.
+        self.collector.blocksizes = {"/dev/sda": sda}
+        self.collector.diskinfo = {"/dev/sda": {}, "/dev/sda2": {}}
+        linux.add_block_sizes(self.collector, ["/dev/sda", "/dev/sda2"])
+
+        self.assertEqual(self.collector.diskinfo["/dev/sda"], sda)
+        self.assertEqual(self.collector.diskinfo["/dev/sda2"]["PhysicalBlockSize"], 512)
+
+    def test_get_block_sizes_2(self):
+        """Test #2: Test that block sizes are only added to the disk info dictionary if asked for"""
+        self.assertNotIn("LogicalBlockSize", linux.get_device("/dev/sda")["/dev/sda"])
+
+        diskinfo = linux.get_device("/dev/sda", fields={"PhysicalBlockSize"})
+        errors = linux.ERRORS
+
+        self.assertEqual(diskinfo["/dev/sda1"]["PhysicalBlockSize"], 4096)
+        self.assertNotIn("LogicalBlockSize", diskinfo["/dev/sda1"])
+        #The fake swap LV has no queue folder, and doesn't exist, so only it fails.
+        self.assertEqual([error for error in errors if "get_block_sizes" in error],
+                         ["linux.get_block_sizes(): Exception: [Errno 2] No such file or directory: "
+                          + "'/dev/mapper/my--vg-swap--1' while opening /dev/mapper/my--vg-swap--1\n"])
+
+    def test_get_partition_number_1(self):
+        """Test #1: Test that partition numbers are read from sysfs"""
+        self.assertEqual(linux.get_partition_number("/dev/nvme0n1", "/dev/nvme0n1p10"), 10)
+
+    def test_get_partition_number_2(self):
+        """Test #2: Test that partition numbers are taken from the name if they aren't in sysfs"""
+        self.assertEqual(linux.get_partition_number("/dev/mmcblk0", "/dev/mmcblk0p3"), 3)
+        self.assertIsNone(linux.get_partition_number("/dev/mapper/fake", "/dev/mapper/fake-root"))
+
+    def test_parse_device_mapper_1(self):
+        """Test #1: Test that logical volumes are found, skipping other dm devices and hidden layers"""
+        linux.parse_sysfs(self.collector)
+        linux.parse_device_mapper(self.collector)
+
+        expected = data.return_fake_sysfs_diskinfo()
+        expected.update(data.return_fake_dm_diskinfo())
+
+        try:
+            self.assertEqual(self.collector.diskinfo, expected)
+
+        except AssertionError as e:
+            functions.print_dict_diffs(self.collector.diskinfo, expected)
+
+            raise e
+
+    def test_split_dm_name_1(self):
+        """Test #1: Test that device-mapper names are split like LVM splits them"""
+        for dm_name, expected in (("fedora-root", ("fedora", "root", None)),
+                                  ("ubuntu--vg-root", ("ubuntu-vg", "root", None)),
+                                  ("a---b", ("a-", "b", None)),
+                                  ("vg-pool-tpool", ("vg", "pool", "tpool")),
+                                  ("nolv", ("nolv", "", None))):
+
+            with self.subTest(dm_name=dm_name):
+                self.assertEqual(linux.split_dm_name(dm_name), expected)
+
+    def test_partition_tables_stage_1(self):
+        """Test #1: Test that the partitioning scheme and partition geometry come from the partition tables"""
+        proper_read_partition_table = linux.partitiontable.read_partition_table
+        _pieces, table = data.return_fake_partition_table_images()["gpt"]
+
+        def fake_read_partition_table(disk):
+            if disk == "/dev/nvme0n1":
+                raise ValueError("GPT header checksum doesn't match")
+
+            if disk != "/dev/sda":
+                raise OSError("Permission denied")
+
+            return table
+
+        linux.parse_sysfs(self.collector)
+        linux.partitiontable.read_partition_table = fake_read_partition_table
+
+        try:
+            linux.partition_tables_stage(self.collector, {})
+
+        finally:
+            linux.partitiontable.read_partition_table = proper_read_partition_table
+
+        unknown = dict.fromkeys(linux.partitiontable.GEOMETRY_FIELDS, "Unknown")
+
+        self.assertEqual(self.collector.diskinfo["/dev/sda"]["Partitioning"], "gpt")
+        self.assertEqual(self.collector.diskinfo["/dev/nvme0n1"]["Partitioning"], "Unknown")
+
+        #A corrupt partition table is recorded, like one that can't be read.
+        self.assertTrue(any("checksum" in error and error.device == "/dev/nvme0n1"
+                            for error in self.collector.errors))
+
+        for partition, geometry in (("/dev/sda1", table["Partitions"][1]), ("/dev/sda2", unknown),
+                                    ("/dev/nvme0n1p9", unknown)):
+            with self.subTest(partition=partition):
+                for key, value in geometry.items():
+                    self.assertEqual(self.collector.diskinfo[partition][key], value)
+
+class TestParseLshwOutput(unittest.TestCase):
+    def setUp(self):
+        self.proper_boot_record_function = linux.get_boot_record
+        linux.get_boot_record = data.fake_get_boot_record
+        self.collector = collector.Collector(linux)
+        self.collector.reset()
+
+    def tearDown(self):
+        linux.get_boot_record = self.proper_boot_record_function
+        del self.collector
+
+    def test_parse_lshw_output_1(self):
+        """Test #1: Test that each device is yielded with its partitions, in document order"""
+        nodes = [node for node, _found_list in linux.parse_lshw_output(data.return_fake_lshw_output())]
+
+        self.assertEqual([node.logicalname for node in nodes], ["/dev/sda", "/dev/cdrom"])
+        self.assertEqual([(node.logicalname, node.physid) for node in nodes[0].iter_descendants()],
+                         [("/dev/sda1", "1"), ("/dev/sda2", "2"), (None, "5")])
+
+        self.assertEqual(nodes[0].size, "1000204886016")
+        self.assertEqual(nodes[0].capabilities, ["partitioned", "partitioned:dos"])
+        self.assertEqual(nodes[0].configuration, {"ansiversion": "5", "signature": "0a1b2c3d"})
+        self.assertEqual(nodes[0].children[0].configuration["filesystem"], "ext4")
+
+    def test_parse_lshw_output_2(self):
+        """Test #2: Test that nothing is yielded, without error, for an empty list"""
+        self.assertEqual(list(linux.parse_lshw_output("<list></list>")), [])
+
+    def test_lshw_stage_1(self):
+        """Test #1: Test that devices and partitions (including logical partitions) are added"""
+        linux.lshw_stage(self.collector, {"lshw": data.return_fake_lshw_output()})
+
+        self.assertEqual(self.collector.diskinfo["/dev/sda"]["Partitions"],
+                         ["/dev/sda1", "/dev/sda2", "/dev/sda5"])
+        self.assertEqual(self.collector.diskinfo["/dev/sda"]["Partitioning"], "mbr")
+        self.assertEqual(self.collector.diskinfo["/dev/sda"]["Capacity"], "1 TB")
+        self.assertEqual(self.collector.diskinfo["/dev/sda1"]["FileSystem"], "ext4")
+        self.assertEqual(self.collector.diskinfo["/dev/sda1"]["Flags"], ["primary", "bootable"])
+        self.assertEqual(self.collector.diskinfo["/dev/sda2"]["FileSystem"], "N/A")
+        self.assertEqual(self.collector.diskinfo["/dev/sda5"]["FileSystem"], "swap")
+        self.assertEqual(self.collector.diskinfo["/dev/cdrom"]["Capacity"], "N/A")
+
+class TestMonitor(unittest.TestCase):
+    def setUp(self):
+        self.proper_boot_record_function = linux.get_boot_record
+        self.proper_lv_file_system_function = linux.get_lv_file_system
+        self.proper_read_partition_table = linux.partitiontable.read_partition_table
+        self.proper_sysfs_block = linux.SYSFS_BLOCK
+        self.proper_disk_links_dir = linux.DISK_LINKS_DIR
+
+        self.tempdir = tempfile.TemporaryDirectory()
+        data.create_fake_sysfs(self.tempdir.name)
+
+        linux.get_boot_record = data.fake_get_boot_record
+        linux.get_lv_file_system = data.fake_get_lv_file_system
+        linux.partitiontable.read_partition_table = data.fake_read_partition_table
+        linux.SYSFS_BLOCK = self.tempdir.name
+        linux.DISK_LINKS_DIR = self.tempdir.name+"/nothere"
+        self.collector = collector.Collector(linux)
+
+        self.monitor = monitor.Monitor(collector=self.collector)
+        self.maxDiff = None
+
+    def tearDown(self):
+        linux.get_boot_record = self.proper_boot_record_function
+        linux.get_lv_file_system = self.proper_lv_file_system_function
+        linux.partitiontable.read_partition_table = self.proper_read_partition_table
+        linux.SYSFS_BLOCK = self.proper_sysfs_block
+        linux.DISK_LINKS_DIR = self.proper_disk_links_dir
+        self.tempdir.cleanup()
+
+        del self.collector
+        del self.tempdir
+        del self.monitor
+
+    def test_parse_uevent_1(self):
+        """Test #1: Test that kernel and udev messages are parsed"""
+        event = {"ACTION": "add", "DEVPATH": "/devices/pci0000:00/block/sda", "SUBSYSTEM": "block",
+                 "DEVNAME": "sda", "DEVTYPE": "disk", "SEQNUM": "42"}
+
+        for message in (data.return_fake_uevent("add", "sda", "disk"),
+                        data.return_fake_uevent("add", "sda", "disk", udev=True)):
+
+            with self.subTest(message=message):
+                self.assertEqual(monitor.parse_uevent(message), event)
+
+    def test_parse_uevent_2(self):
+        """Test #2: Test that messages that aren't uevents are ignored"""
+        for message in (b"", b"garbage", b"libudev\x00short", b"add@/devices\x00SUBSYSTEM=block"):
+            with self.subTest(message=message):
+                self.assertIsNone(monitor.parse_uevent(message))
+
+    def test_handle_message_1(self):
+        """Test #1: Test that an added device is probed, along with its partitions"""
+        update = self.monitor.handle_message(data.return_fake_uevent("add", "sda", "disk"))
+
+        self.assertEqual(update["Action"], "add")
+        self.assertEqual(update["Name"], "/dev/sda")
+        self.assertEqual(update["SeqNum"], "42")
+        self.assertGreaterEqual(update["Latency"], 0)
+        self.assertEqual(list(self.monitor.history), [update])
+
+        self.assertEqual(sorted(self.collector.diskinfo), ["/dev/sda", "/dev/sda1", "/dev/sda2"])
+        self.assertEqual(self.collector.diskinfo["/dev/sda"]["Partitioning"], "gpt")
+        self.assertEqual(self.collector.diskinfo["/dev/sda1"]["StartLBA"], 2048)
+
+    def test_handle_message_2(self):
+        """Test #2: Test that removed partitions and devices are removed"""
+        self.monitor.handle_message(data.return_fake_uevent("add", "sda", "disk"))
+        self.monitor.handle_message(data.return_fake_uevent("add", "nvme0n1", "disk"))
+
+        self.monitor.handle_message(data.return_fake_uevent("remove", "sda2", "partition", host="sda"))
+        self.assertEqual(self.collector.diskinfo["/dev/sda"]["Partitions"], ["/dev/sda1"])
+        self.assertNotIn("/dev/sda2", self.collector.diskinfo)
+
+        self.monitor.handle_message(data.return_fake_uevent("remove", "sda", "disk"))
+        self.assertEqual(sorted(self.collector.diskinfo), ["/dev/nvme0n1", "/dev/nvme0n1p10", "/dev/nvme0n1p9"])
+
+    def test_handle_message_3(self):
+        """Test #3: Test that logical volumes are added and removed, and other events ignored"""
+        self.assertIsNone(self.monitor.handle_message(data.return_fake_uevent("add", "loop0", "disk")))
+        self.assertIsNone(self.monitor.handle_message(data.return_fake_uevent("add", "dm-2", "disk")))
+        self.assertIsNone(self.monitor.handle_message(data.return_fake_uevent("add", "sda", "disk",
+                                                                                subsystem="bdi")))
+
+        self.assertEqual(self.monitor.handle_message(data.return_fake_uevent("add", "dm-0", "disk"))["Name"],
+                         "/dev/mapper/fakefedora-root")
+
+        self.assertEqual(self.monitor.handle_message(data.return_fake_uevent("remove", "dm-0", "disk"))["Name"],
+                         "/dev/mapper/fakefedora-root")
+
+        self.assertEqual(self.collector.diskinfo, {})
+
+    def test_handle_message_4(self):
+        """Test #4: Test that udev's events are used by default, and the links it made are read"""
+        self.assertEqual(self.monitor.group, monitor.UEVENT_GROUP_UDEV)
+
+        #udev has made the links by the time it sends the event.
+        linux.DISK_LINKS_DIR = os.path.join(self.tempdir.name, "links")
+        os.makedirs(os.path.join(linux.DISK_LINKS_DIR, "by-uuid"))
+        os.symlink("../../sda1", os.path.join(linux.DISK_LINKS_DIR, "by-uuid", "1234-ABCD"))
+
+        self.monitor.handle_message(data.return_fake_uevent("add", "sda", "disk", udev=True))
+
+        self.assertEqual(self.collector.diskinfo["/dev/sda1"]["UUID"], "1234-ABCD")
+
+    def test_handle_message_5(self):
+        """Test #5: Test that devices are re-probed with sysfs, even if the scan used lshw"""
+        self.collector.backend = "lshw"
+        self.collector.diskinfo["/dev/sda"] = {"Name": "/dev/sda", "Type": "Device", "Partitions": [],
+                                               "Description": "ATA Disk"}
+
+        self.monitor.handle_message(data.return_fake_uevent("change", "sda", "disk"))
+
+        self.assertEqual(self.collector.backend, "lshw")
+        self.assertEqual(self.collector.diskinfo["/dev/sda"]["Description"],
+                         data.return_fake_sysfs_diskinfo()["/dev/sda"]["Description"])
+
+    def test_handle_message_6(self):
+        """Test #6: Test that a boot sector rewritten between two uevents is read again, along with the partitions'"""
+        linux.get_boot_record = self.proper_boot_record_function
+        proper_reader = linux.bootrecord.BootRecordReader
+
+        images = {disk: b"Before the scan" for disk in ("/dev/sda", "/dev/sda1", "/dev/sda2")}
+        tables = {"/dev/sda": data.return_fake_gpt_image(512, 2)[1]}
+
+        class FakeReader:
+            def read(self, disk):
+                return images[disk]
+
+        #What boot_records_stage() read in the last full scan. They've all been
+        #rewritten since.
+        self.collector.bootrecords = dict(images)
+        images.update({disk: b"First MBR" for disk in images})
+
+        linux.bootrecord.BootRecordReader = FakeReader
+        linux.partitiontable.read_partition_table = lambda disk: tables[disk]
+
+        try:
+            self.monitor.handle_message(data.return_fake_uevent("add", "sda", "disk"))
+
+            for disk in images:
+                self.assertEqual(self.collector.diskinfo[disk]["BootRecord"], "First MBR")
+
+            self.assertEqual(self.collector.diskinfo["/dev/sda"]["Partitioning"], "gpt")
+
+            #Rewrite the MBR, and the partition table with it.
+            images.update({disk: b"Second MBR" for disk in images})
+            tables["/dev/sda"] = data.return_fake_partition_table_images()["mbr"][1]
+
+            self.monitor.handle_message(data.return_fake_uevent("change", "sda1", "partition",
+                                                                host="sda"))
+
+        finally:
+            linux.bootrecord.BootRecordReader = proper_reader
+
+        for disk in images:
+            self.assertEqual(self.collector.diskinfo[disk]["BootRecord"], "Second MBR")
+
+        self.assertEqual(self.collector.diskinfo["/dev/sda"]["Partitioning"], "mbr")
+        self.assertEqual(self.collector.diskinfo["/dev/sda1"]["PartitionType"], "0x83")
+        self.assertEqual(self.collector.partitiontables["/dev/sda"]["Scheme"], "mbr")
+
+    def test_run_1(self):
+        """Test #1: Test that messages are received from the socket and applied"""
+        sender, self.monitor.sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+
+        try:
+            sender.send(data.return_fake_uevent("add", "sda", "disk"))
+            sender.send(data.return_fake_uevent("change", "sda1", "partition", host="sda"))
+            self.monitor.run(max_events=2)
+
+        finally:
+            sender.close()
+            self.monitor.close()
+
+        self.assertEqual([update["Name"] for update in self.monitor.history], ["/dev/sda", "/dev/sda1"])
+        self.assertIn("/dev/sda2", self.collector.diskinfo)
+
 class TestComputeBlockSize(unittest.TestCase):
     def setUp(self):
         self.block_sizes, self.correct_results = (data.return_fake_block_dev_output(),
@@ -409,6 +1086,289 @@ class TestComputeBlockSize(unittest.TestCase):
             self.assertEqual(linux.compute_block_size(testdata),
                              self.correct_results[self.block_sizes.index(testdata)])
 
+class TestRunStages(unittest.TestCase):
+    def setUp(self):
+        self.collector = collector.Collector(linux)
+        self.collector.reset()
+        self.ran = []
+
+    def tearDown(self):
+        del self.collector
+        del self.ran
+
+    def record_stage(self, name):
+        """Returns a stage function that records that it ran, and what output it was given."""
+        def stage(_collector, outputs):
+            self.ran.append((name, dict(outputs)))
+
+        return stage
+
+    def failing_stage(self, _collector, outputs):
+        raise ValueError("Stage failed")
+
+    def test_run_stages_1(self):
+        """Test #1: Test that stages run after their dependencies, and get the output of the commands"""
+        commands = {"echo": ["echo", "test"], "echo2": ["echo", "test2"]}
+        stages = {"second": (self.record_stage("second"), ["first", "echo2"]),
+                  "first": (self.record_stage("first"), ["echo"])}
+
+        linux.run_stages(self.collector, commands, stages)
+
+        self.assertEqual([name for name, _outputs in self.ran], ["first", "second"])
+        self.assertEqual(self.ran[0][1]["echo"], "test\n")
+        self.assertEqual(self.ran[1][1], {"echo": "test\n", "echo2": "test2\n"})
+        self.assertEqual(self.collector.errors, [])
+
+    def test_run_stages_2(self):
+        """Test #2: Test that a failed command doesn't stop the other stages from running"""
+        commands = {"bad": ["thiscommanddoesnotexist-getdevinfo"], "echo": ["echo", "test"]}
+        stages = {"first": (self.record_stage("first"), ["bad"]),
+                  "second": (self.record_stage("second"), ["echo", "first"])}
+
+        linux.run_stages(self.collector, commands, stages)
+
+        self.assertEqual([name for name, _outputs in self.ran], ["first", "second"])
+        self.assertIsNone(self.ran[1][1]["bad"])
+        self.assertEqual(len(self.collector.errors), 1)
+
+    def test_run_stages_3(self):
+        """Test #3: Test that a stage that raises an exception doesn't stop the stages that depend on it"""
+        stages = {"first": (self.failing_stage, []),
+                  "second": (self.record_stage("second"), ["first"])}
+
+        linux.run_stages(self.collector, {}, stages)
+
+        self.assertEqual([name for name, _outputs in self.ran], ["second"])
+        self.assertEqual(len(self.collector.errors), 1)
+        self.assertIn("in stage first", self.collector.errors[0])
+
+    def test_run_stages_4(self):
+        """Test #4: Test that the time taken by each stage and command is recorded in the scan report"""
+        commands = {"echo": ["echo", "test"], "false": ["false"]}
+        stages = {"first": (self.record_stage("first"), ["echo"]),
+                  "second": (self.failing_stage, ["false"])}
+
+        scan_report = self.collector.report = report.ScanReport()
+        linux.run_stages(self.collector, commands, stages)
+        scan_report.finish()
+
+        self.assertEqual(set(scan_report.stages), {"first", "second"})
+        self.assertEqual(scan_report.forks, 2)
+
+        #The errors say which command and stage they came from.
+        errors = sorted(self.collector.errors, key=lambda error: str(error.stage))
+
+        self.assertEqual([(error.command, error.exit_code, error.stage) for error in errors],
+                         [(["false"], 1, None), (None, None, "second")])
+        self.assertEqual(sorted((command.argv[0], command.returncode) for command in scan_report.commands),
+                         [("echo", 0), ("false", 1)])
+
+class TestRunStagesAsync(unittest.TestCase):
+    def setUp(self):
+        self.collector = collector.Collector(linux)
+        self.collector.reset()
+        self.ran = []
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        del self.collector
+        del self.ran
+        del self.loop
+
+    def record_stage(self, name):
+        """Returns a stage function that records that it ran, and what output it was given."""
+        def stage(_collector, outputs):
+            self.ran.append((name, dict(outputs)))
+
+        return stage
+
+    def test_run_stages_async_1(self):
+        """Test #1: Test that stages run after their dependencies, and get the output of the commands"""
+        commands = {"echo": ["echo", "test"], "bad": ["thiscommanddoesnotexist-getdevinfo"],
+                    "false": ["false"]}
+
+        stages = {"second": (self.record_stage("second"), ["first", "bad", "false"]),
+                  "first": (self.record_stage("first"), ["echo"])}
+
+        self.loop.run_until_complete(aio.run_stages_async(self.collector, commands, stages, limit=1))
+
+        self.assertEqual([name for name, _outputs in self.ran], ["first", "second"])
+        self.assertEqual(self.ran[0][1]["echo"], "test\n")
+        self.assertEqual(self.ran[1][1], {"echo": "test\n", "bad": None, "false": None})
+        self.assertEqual(len(self.collector.errors), 2)
+
+    def test_run_stages_async_2(self):
+        """Test #2: Test that cancelling kills the commands, and doesn't run any more stages"""
+        commands = {"sleep": ["sleep", "30"]}
+        stages = {"first": (self.record_stage("first"), ["sleep"])}
+
+        task = self.loop.create_task(aio.run_stages_async(self.collector, commands, stages))
+        self.loop.call_later(0.2, task.cancel)
+
+        start = time.monotonic()
+        self.assertRaises(asyncio.CancelledError, self.loop.run_until_complete, task)
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual(self.ran, [])
+
+class TestGetInfoAsync(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.fields = projection.normalise({"Capacity"})
+        self.diskinfo = {"/dev/sda": {"Capacity": "500 GB"}}
+        self.proper_get_linux_info_async = aio.get_linux_info_async
+        self.proper_run_stages_async = aio.run_stages_async
+        self.proper_errors_path = getdevinfo.ERRORS_PATH
+
+        getdevinfo.ERRORS_PATH = None
+        getdevinfo.invalidate()
+
+    def tearDown(self):
+        aio.get_linux_info_async = self.proper_get_linux_info_async
+        aio.run_stages_async = self.proper_run_stages_async
+        getdevinfo.ERRORS_PATH = self.proper_errors_path
+
+        self.loop.close()
+        del self.loop
+        del self.fields
+        del self.diskinfo
+        del self.proper_get_linux_info_async
+        del self.proper_run_stages_async
+        del self.proper_errors_path
+
+    def test_get_info_async_1(self):
+        """Test #1: Test that a scan already running in another thread is shared"""
+        started = threading.Event()
+        release = threading.Event()
+        scan_report = report.ScanReport().finish()
+
+        def slow_scan():
+            started.set()
+            release.wait(10)
+            return (self.diskinfo, []), scan_report
+
+        running = threading.Thread(target=getdevinfo.FLIGHTS.run,
+                                   args=((self.fields, False, False), slow_scan))
+
+        running.start()
+        started.wait(10)
+        threading.Timer(0.1, release.set).start()
+
+        diskinfo, shared_report = self.loop.run_until_complete(
+            aio.get_info_async(fields=self.fields, timings=True))
+
+        running.join()
+
+        self.assertEqual(diskinfo, self.diskinfo)
+        self.assertIs(shared_report, scan_report)
+
+    def test_get_info_async_2(self):
+        """Test #2: Test that getdevinfo.get_info() shares a scan started by get_info_async()"""
+        started = threading.Event()
+        calls = []
+        results = []
+
+        async def fake_get_linux_info_async(fields=None, limit=None, collector=None, lazy=False): #pylint: disable=unused-argument
+            calls.append(None)
+            started.set()
+            await asyncio.sleep(0.2)
+
+            collector.reset(fields, lazy)
+            collector.diskinfo.update(self.diskinfo)
+            collector.report = report.ScanReport().finish()
+
+        aio.get_linux_info_async = fake_get_linux_info_async
+
+        def caller():
+            started.wait(10)
+            results.append(getdevinfo.get_info(fields=self.fields))
+
+        thread = threading.Thread(target=caller)
+        thread.start()
+
+        diskinfo = self.loop.run_until_complete(aio.get_info_async(fields=self.fields))
+        thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(diskinfo, self.diskinfo)
+        self.assertEqual(results, [self.diskinfo])
+
+    def test_get_info_async_3(self):
+        """Test #3: Test that lazy is passed on, and the results are saved outside the event loop"""
+        proper_finish_scan = getdevinfo.finish_scan
+        scans = []
+        threads = []
+
+        async def fake_get_linux_info_async(fields=None, limit=None, collector=None, lazy=False): #pylint: disable=unused-argument
+            scans.append(lazy)
+            collector.reset(fields, lazy)
+            collector.diskinfo.update(self.diskinfo)
+            collector.report = report.ScanReport().finish()
+
+        def fake_finish_scan(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return proper_finish_scan(*args, **kwargs)
+
+        aio.get_linux_info_async = fake_get_linux_info_async
+        getdevinfo.finish_scan = fake_finish_scan
+
+        try:
+            diskinfo = self.loop.run_until_complete(aio.get_info_async(fields=self.fields,
+                                                                       lazy=True))
+
+        finally:
+            getdevinfo.finish_scan = proper_finish_scan
+
+        self.assertEqual(diskinfo, self.diskinfo)
+        self.assertEqual(scans, [True])
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+    def test_get_linux_info_async_1(self):
+        """Test #1: Test that only one scan runs at a time, even with different collectors"""
+        running = []
+        overlapped = []
+
+        async def fake_run_stages_async(each_collector, _commands, _stages, env=None, limit=None): #pylint: disable=unused-argument
+            running.append(each_collector)
+            overlapped.append(len(running) > 1)
+            await asyncio.sleep(0.05)
+            each_collector.diskinfo.update(self.diskinfo)
+            running.remove(each_collector)
+
+        aio.run_stages_async = fake_run_stages_async
+        collectors = [collector.Collector(linux) for _count in range(3)]
+
+        async def scan_all():
+            await asyncio.gather(*[aio.get_linux_info_async(fields=self.fields, collector=each_collector)
+                                   for each_collector in collectors])
+
+        self.loop.run_until_complete(scan_all())
+
+        self.assertEqual(overlapped, [False] * 3)
+        self.assertEqual([each_collector.diskinfo for each_collector in collectors],
+                         [self.diskinfo] * 3)
+
+class TestGetCommandsAndStages(unittest.TestCase):
+    def test_get_commands_and_stages_1(self):
+        """Test #1: Test that every stage is run if all the fields are wanted"""
+        commands, stages = linux.get_commands_and_stages()
+
+        self.assertEqual(set(commands), {"lshw", "lsblk"})
+        self.assertEqual(set(stages), {"bootrecords", "links", "lshw", "lsblk", "lvm",
+                                       "partitiontables"})
+
+        #Partition tables don't wait for the logical volumes.
+        self.assertEqual(stages["partitiontables"][1], ["lsblk"])
+
+    def test_get_commands_and_stages_2(self):
+        """Test #2: Test that stages for fields that weren't asked for are skipped"""
+        commands, stages = linux.get_commands_and_stages("sysfs", projection.normalise({"UUID"}))
+
+        self.assertEqual(commands, {})
+        self.assertEqual(set(stages), {"links", "sysfs", "lvm"})
+        self.assertEqual(stages["sysfs"][1], ["links"])
+
 class TestGetInfo(unittest.TestCase):
     def test_get_info(self):
         """Test that the information can be collected on this system without error"""
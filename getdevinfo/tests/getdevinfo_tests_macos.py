@@ -31,6 +31,7 @@ from . import getdevinfo_test_functions as functions
 sys.path.insert(0, os.path.abspath('../'))
 sys.path.insert(0, os.path.abspath('../..'))
 
+import getdevinfo.collector as collector
 import getdevinfo.macos as macos
 
 class TestIsPartition(unittest.TestCase):
@@ -55,9 +56,16 @@ class TestIsPartition(unittest.TestCase):
 
             self.assertTrue(macos.is_partition(partition))
 
+    def test_get_partition_number_1(self):
+        """Test #1: Test that partition numbers are found from partition names"""
+        for partition, number in (("disk0s2", 2), ("disk1s45", 45), ("disk25s456", 456), ("disk0", None)):
+            with self.subTest(partition=partition):
+                self.assertEqual(macos.get_partition_number(partition), number)
+
 class TestGetVendorProductCapacityDescription(unittest.TestCase):
     def setUp(self):
-        macos.DISKINFO = data.return_fake_disk_info_mac()
+        self.collector = collector.Collector(macos)
+        self.collector.diskinfo = data.return_fake_disk_info_mac()
         self.badplist0 = plistlib.loads(bytes(data.return_fake_diskutil_info_bad_disk0_plist(), "utf-8"))
         self.plist0 = plistlib.loads(bytes(data.return_fake_diskutil_info_disk0_plist(), "utf-8"))
 
@@ -68,7 +76,7 @@ class TestGetVendorProductCapacityDescription(unittest.TestCase):
         self.plist0s3 = plistlib.loads(bytes(data.return_fake_diskutil_info_disk0s3_plist(), "utf-8"))
 
     def tearDown(self):
-        del macos.DISKINFO
+        del self.collector
         del self.badplist0
         del self.plist0
 
@@ -82,81 +90,81 @@ class TestGetVendorProductCapacityDescription(unittest.TestCase):
     #------------------------------------ Tests for get_vendor ------------------------------------
     def test_get_vendor_1(self):
         """Test #1: Test that u"Unknown" is returned when vendor info is missing."""
-        macos.PLIST = self.badplist0
-        self.assertEqual(macos.get_vendor(disk="disk0"), "Unknown")
+        self.collector.plist = self.badplist0
+        self.assertEqual(macos.get_vendor(self.collector, disk="disk0"), "Unknown")
 
     def test_get_vendor_2(self):
         """Test #2: Test that the vendor is returned correctly for host devices (roman chars)."""
-        macos.PLIST = self.plist0
-        self.assertEqual(macos.get_vendor(disk="disk0"), "VBOX")
+        self.collector.plist = self.plist0
+        self.assertEqual(macos.get_vendor(self.collector, disk="disk0"), "VBOX")
 
     def test_get_vendor_3(self):
         """Test #3: Test that the vendor is returned correctly for host devices (non-roman chars)."""
-        macos.PLIST = self.plist0nonroman
-        self.assertEqual(macos.get_vendor(disk="disk0"), "ΉΜήυΟομἝἲϾᾍᾈᾁὮᾌ")
+        self.collector.plist = self.plist0nonroman
+        self.assertEqual(macos.get_vendor(self.collector, disk="disk0"), "ΉΜήυΟομἝἲϾᾍᾈᾁὮᾌ")
 
     def test_get_vendor_4(self):
         """Test #4: Test that the vendor is returned correctly for partitions, using the host disk data, when missing."""
-        macos.PLIST = self.plist0s1
-        self.assertEqual(macos.get_vendor(disk="disk0s1"), "ThereIsNone")
+        self.collector.plist = self.plist0s1
+        self.assertEqual(macos.get_vendor(self.collector, disk="disk0s1"), "ThereIsNone")
 
     def test_get_vendor_5(self):
         """Test #5: Test that the vendor is returned correctly for partitions, using the host disk data, when present."""
-        macos.PLIST = self.plist0s2
-        self.assertEqual(macos.get_vendor(disk="disk0s2"), "ThereIsNone")
+        self.collector.plist = self.plist0s2
+        self.assertEqual(macos.get_vendor(self.collector, disk="disk0s2"), "ThereIsNone")
 
     #------------------------------------ Tests for get_product ------------------------------------
     def test_get_product_1(self):
         """Test #1: Test that u"Unknown" is returned when product info is missing."""
-        macos.PLIST = self.badplist0
-        self.assertEqual(macos.get_product(disk="disk0"), "Unknown")
+        self.collector.plist = self.badplist0
+        self.assertEqual(macos.get_product(self.collector, disk="disk0"), "Unknown")
 
     def test_get_product_2(self):
         """Test #2: Test that the product is returned correctly for host devices (roman chars)."""
-        macos.PLIST = self.plist0
-        self.assertEqual(macos.get_product(disk="disk0"), "HARDDISK")
+        self.collector.plist = self.plist0
+        self.assertEqual(macos.get_product(self.collector, disk="disk0"), "HARDDISK")
 
     def test_get_product_3(self):
         """Test #3: Test that the product is returned correctly for host devices (non-roman chars)."""
-        macos.PLIST = self.plist0nonroman
-        self.assertEqual(macos.get_product(disk="disk0"), "ꍜꍧꍼꍟꍏꍄꌲꍏꌽꍛꍷꍼꍴ")
+        self.collector.plist = self.plist0nonroman
+        self.assertEqual(macos.get_product(self.collector, disk="disk0"), "ꍜꍧꍼꍟꍏꍄꌲꍏꌽꍛꍷꍼꍴ")
 
     def test_get_product_4(self):
         """Test #4: Test that the product is returned correctly for partitions, using the host disk data, when missing."""
-        macos.PLIST = self.plist0s1
-        self.assertEqual(macos.get_product(disk="disk0s1"), "FakeDisk")
+        self.collector.plist = self.plist0s1
+        self.assertEqual(macos.get_product(self.collector, disk="disk0s1"), "FakeDisk")
 
     def test_get_product_5(self):
         """Test #5: Test that the product is returned correctly for partitions, using the host disk data, when present."""
-        macos.PLIST = self.plist0s2
-        self.assertEqual(macos.get_product(disk="disk0s2"), "FakeDisk")
+        self.collector.plist = self.plist0s2
+        self.assertEqual(macos.get_product(self.collector, disk="disk0s2"), "FakeDisk")
 
     #------------------------------------ Tests for get_capacity ------------------------------------
     def test_get_capacity_1(self):
         """Test #1: Test that u"Unknown", u"Unknown" is returned when capacity info is missing."""
-        macos.PLIST = self.badplist0
-        raw_capacity, human_size = macos.get_capacity()
+        self.collector.plist = self.badplist0
+        raw_capacity, human_size = macos.get_capacity(self.collector)
         self.assertEqual(raw_capacity, "Unknown")
         self.assertEqual(human_size, "Unknown")
 
     def test_get_capacity_2(self):
         """Test #2: Test that capacity is returned correctly for host devices."""
-        macos.PLIST = self.plist0
-        raw_capacity, human_size = macos.get_capacity()
+        self.collector.plist = self.plist0
+        raw_capacity, human_size = macos.get_capacity(self.collector)
         self.assertEqual(raw_capacity, "42948853248")
         self.assertEqual(human_size, "42 GB")
 
     def test_get_capacity_3(self):
         """Test #3: Test that the capacity is returned correctly for partitions (42 GB)."""
-        macos.PLIST = self.plist0s2
-        raw_capacity, human_size = macos.get_capacity()
+        self.collector.plist = self.plist0s2
+        raw_capacity, human_size = macos.get_capacity(self.collector)
         self.assertEqual(raw_capacity, "42089095168")
         self.assertEqual(human_size, "42 GB")
 
     def test_get_capacity_4(self):
         """Test #4: Test that the capacity is returned correctly for partitions (650 EB)."""
-        macos.PLIST = self.plist0s3
-        raw_capacity, human_size = macos.get_capacity()
+        self.collector.plist = self.plist0s3
+        raw_capacity, human_size = macos.get_capacity(self.collector)
         self.assertEqual(raw_capacity, "650002432000000000000")
         self.assertEqual(human_size, "650 EB")
 
@@ -171,8 +179,8 @@ class TestGetVendorProductCapacityDescription(unittest.TestCase):
 
         """
 
-        macos.PLIST = self.badplist0
-        self.assertEqual(macos.get_description(disk="disk0"), "Unknown Hard Disk Drive ")
+        self.collector.plist = self.badplist0
+        self.assertEqual(macos.get_description(self.collector, disk="disk0"), "Unknown Hard Disk Drive ")
 
     def test_get_description_2(self):
         """Test #2: Test that the description (for a host device) is generated correctly when:
@@ -183,8 +191,8 @@ class TestGetVendorProductCapacityDescription(unittest.TestCase):
 
         """
 
-        macos.PLIST = self.plist0
-        self.assertEqual(macos.get_description(disk="disk0"), "Internal Hard Disk Drive (Connected through SATA)")
+        self.collector.plist = self.plist0
+        self.assertEqual(macos.get_description(self.collector, disk="disk0"), "Internal Hard Disk Drive (Connected through SATA)")
 
     def test_get_description_3(self):
         """Test #3: Test that the description (for a partition) is generated correctly when:
@@ -195,8 +203,8 @@ class TestGetVendorProductCapacityDescription(unittest.TestCase):
 
         """
 
-        macos.PLIST = self.plist0s1
-        self.assertEqual(macos.get_description(disk="disk0s1"), "Internal Removable Drive (Connected through SATA)")
+        self.collector.plist = self.plist0s1
+        self.assertEqual(macos.get_description(self.collector, disk="disk0s1"), "Internal Removable Drive (Connected through SATA)")
 
     def test_get_description_4(self):
         """Test #4: Test that the description (for a partition) is generated correctly when:
@@ -207,8 +215,8 @@ class TestGetVendorProductCapacityDescription(unittest.TestCase):
 
         """
 
-        macos.PLIST = self.plist0s2
-        self.assertEqual(macos.get_description(disk="disk0s2"), "External Hard Disk Drive (Connected through USB)")
+        self.collector.plist = self.plist0s2
+        self.assertEqual(macos.get_description(self.collector, disk="disk0s2"), "External Hard Disk Drive (Connected through USB)")
 
     def test_get_description_5(self):
         """Test #5: Test that the description (for a partition) is generated correctly when:
@@ -219,11 +227,12 @@ class TestGetVendorProductCapacityDescription(unittest.TestCase):
 
         """
 
-        macos.PLIST = self.plist0s3
-        self.assertEqual(macos.get_description(disk="disk0s3"), "External Solid State Drive (Connected through Thunderbolt)")
+        self.collector.plist = self.plist0s3
+        self.assertEqual(macos.get_description(self.collector, disk="disk0s3"), "External Solid State Drive (Connected through Thunderbolt)")
 
 class TestComputeBlockSize(unittest.TestCase):
     def setUp(self):
+        self.collector = collector.Collector(macos)
         self.block_sizes, self.correct_results = (["Not a plist",
                                                    data.return_fake_diskutil_info_bad_disk0_plist(),
                                                    data.return_fake_diskutil_info_disk0_plist(),
@@ -233,6 +242,7 @@ class TestComputeBlockSize(unittest.TestCase):
                                                   [None, None, "512", "1024", "2048", "4096"])
 
     def tearDown(self):
+        del self.collector
         del self.block_sizes
         del self.correct_results
 
@@ -248,7 +258,7 @@ class TestComputeBlockSize(unittest.TestCase):
         """
 
         for testdata in self.block_sizes:
-            self.assertEqual(macos.compute_block_size("FakeDisk", bytes(testdata, "utf-8")), self.correct_results[self.block_sizes.index(testdata)])
+            self.assertEqual(macos.compute_block_size(self.collector, "FakeDisk", bytes(testdata, "utf-8")), self.correct_results[self.block_sizes.index(testdata)])
 
 class TestGetInfo(unittest.TestCase):
     def test_get_info(self):
@@ -17,12 +17,12 @@ here = path.abspath(path.dirname(__file__))
 
 if platform.system() == "Linux":
     LINUX = True
-    dependencies = ("lshw", "blkid", "lsblk", "lvdisplay", "dd", "strings", "blockdev")
+    dependencies = ("lshw", "blkid", "lsblk", "blockdev")
 
 elif "CYGWIN" in platform.system():
     LINUX = True
     CYGWIN = True
-    dependencies = ("/sbin/blkid", "/usr/sbin/smartctl", "cygpath", "dd", "strings")
+    dependencies = ("/sbin/blkid", "/usr/sbin/smartctl", "cygpath")
 
 elif platform.system() == "Darwin":
     LINUX = False
@@ -88,6 +88,6 @@ setup(
 
     keywords='devices hardware',
     packages=find_packages(),
-    install_requires=['beautifulsoup4', 'lxml'],
+    install_requires=[],
     python_requires='>=2.8, !=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*, !=3.4.*',
 )